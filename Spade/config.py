@@ -13,7 +13,12 @@ class Settings:
 
         # URLS
         self.SPACE_TRACKER_AUTH_URL = "https://www.space-track.org/ajaxauth/login"
-        self.SPACE_TRACKER_FULL_CATLOG = "https://www.space-track.org/basicspacedata/query/class/gp/EPOCH/%3Enow-30/orderby/NORAD_CAT_ID,EPOCH/format/xml"
+        # xml, csv or json. CSV is several times smaller than the XML and faster to parse
+        self.SPACE_TRACKER_FORMAT = os.environ.get("SPACE_TRACKER_FORMAT", "xml")
+        self.SPACE_TRACKER_FULL_CATLOG = (
+            "https://www.space-track.org/basicspacedata/query/class/gp/EPOCH/%3Enow-30/orderby/NORAD_CAT_ID,EPOCH/format/"
+            + self.SPACE_TRACKER_FORMAT
+        )
 
         self.DISCOS_BASE_URL = "https://discosweb.esoc.esa.int"
 
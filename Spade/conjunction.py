@@ -0,0 +1,383 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from math import pi, sqrt
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Spade.models import USC
+from Spade.orbit_parameters import EARTH_RADIUS, compute_derived_parameters
+from Spade.propagation import (
+    DEFAULT_CHUNK_ELEMENTS,
+    ERROR_NONE,
+    OrbitalElements,
+    as_times,
+    propagate,
+)
+
+"""
+This file contains a conjunction pre-screening engine. It narrows the all-pairs problem in
+three steps:
+    1. Orbit filter, pairs whose perigee/apogee shells do not overlap can never meet.
+    2. Spatial grid, at every time step only objects in neighbouring grid cells are compared.
+    3. Linear refinement, the relative motion of each remaining pair is extrapolated to its
+       time of closest approach around the step.
+The result is a list of candidates for a proper conjunction assessment, not probabilities.
+"""
+
+# Margin added to the perigee/apogee shells. Mean element shells differ from the osculating
+# SGP4 radius by a few km, plus the screening threshold itself.
+ORBIT_FILTER_MARGIN_KM = 25.0
+
+# Used when DISCOS gave neither SPAN nor an average cross section
+DEFAULT_HARD_BODY_RADIUS_M = 1.0
+
+_CELL_BITS = 21
+_CELL_OFFSET = 1 << (_CELL_BITS - 1)
+_CELL_MASK = (1 << _CELL_BITS) - 1
+
+# The own cell plus the 13 neighbours in one half-space, so every pair is visited once
+_NEIGHBOUR_OFFSETS = [(0, 0, 0)] + [
+    (dx, dy, dz)
+    for dx in (-1, 0, 1)
+    for dy in (-1, 0, 1)
+    for dz in (-1, 0, 1)
+    if (dx, dy, dz) > (0, 0, 0)
+]
+
+
+@dataclass
+class ConjunctionCandidate:
+    """
+    A close approach found by screen_conjunctions.
+
+    Attributes:
+        primary: NORAD_CAT_ID of the first object.
+        secondary: NORAD_CAT_ID of the second object.
+        primary_index: Position of the first object in the screened catalog.
+        secondary_index: Position of the second object in the screened catalog.
+        time: Estimated time of closest approach (UTC).
+        miss_distance: Estimated miss distance in km.
+        relative_speed: Relative speed at closest approach in km/s.
+        combined_hard_body_radius: Sum of both hard body radii in meters.
+    """
+
+    primary: Optional[str]
+    secondary: Optional[str]
+    primary_index: int
+    secondary_index: int
+    time: datetime
+    miss_distance: float
+    relative_speed: float
+    combined_hard_body_radius: float
+
+
+def hard_body_radius(usc: USC) -> float:
+    """
+    Radius in meters of the sphere enclosing the object, from DISCOS SPAN, DIAMETER or
+    X_SECT_AVG in that order.
+    """
+    if usc.SPAN:
+        return usc.SPAN / 2.0
+    if usc.DIAMETER:
+        return usc.DIAMETER / 2.0
+    if usc.X_SECT_AVG:
+        return sqrt(usc.X_SECT_AVG / pi)
+    return DEFAULT_HARD_BODY_RADIUS_M
+
+
+def orbit_shells(elements: OrbitalElements) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the perigee and apogee radius in km of every row.
+    """
+    derived = compute_derived_parameters(elements.mean_motion, elements.eccentricity)
+    return (
+        derived["PERIAPSIS"] + EARTH_RADIUS,
+        derived["APOAPSIS"] + EARTH_RADIUS,
+    )
+
+
+def shells_overlap(
+    perigee: np.ndarray,
+    apogee: np.ndarray,
+    first: np.ndarray,
+    second: np.ndarray,
+    margin: float,
+) -> np.ndarray:
+    """
+    Vectorized apogee/perigee filter for the pairs (first[k], second[k]).
+
+    Returns:
+        True where the two radius ranges, widened by `margin`, overlap.
+    """
+    return (np.maximum(perigee[first], perigee[second]) - margin) <= (
+        np.minimum(apogee[first], apogee[second]) + margin
+    )
+
+
+def objects_with_overlap(
+    perigee: np.ndarray, apogee: np.ndarray, margin: float
+) -> np.ndarray:
+    """
+    Returns a mask of the objects whose shell overlaps the shell of at least one other object.
+    The rest cannot be part of any conjunction and are not propagated.
+    """
+    count = len(perigee)
+    mask = np.zeros(count, dtype=bool)
+    if count < 2:
+        return mask
+
+    order = np.argsort(perigee, kind="stable")
+    low = perigee[order] - margin
+    high = apogee[order] + margin
+    # overlaps one of the objects before it in perigee order
+    reach = np.maximum.accumulate(high)
+    mask[order[1:]] |= reach[:-1] >= low[1:]
+    # overlaps the next object, which is enough since that one starts lowest
+    mask[order[:-1]] |= low[1:] <= high[:-1]
+    return mask
+
+
+def _cell_keys(cells: np.ndarray) -> np.ndarray:
+    shifted = (cells + _CELL_OFFSET) & _CELL_MASK
+    return (
+        (shifted[:, 0] << (2 * _CELL_BITS))
+        | (shifted[:, 1] << _CELL_BITS)
+        | shifted[:, 2]
+    )
+
+
+def _expand_ranges(
+    starts: np.ndarray, stops: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For every k yields (k, p) for p in range(starts[k], stops[k]), as two flat arrays.
+    """
+    counts = np.maximum(stops - starts, 0)
+    owners = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, starts[owners] + offsets
+
+
+def grid_pairs(position: np.ndarray, cell_size: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds every pair of points closer than `cell_size` using a uniform grid.
+
+    Args:
+        position: (n, 3) positions.
+        cell_size: Search radius, used as the grid cell edge.
+
+    Returns:
+        Two index arrays (first, second) with first != second, every pair once.
+    """
+    cells = np.floor(position / cell_size).astype(np.int64)
+    keys = _cell_keys(cells)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    firsts: List[np.ndarray] = []
+    seconds: List[np.ndarray] = []
+    for offset in _NEIGHBOUR_OFFSETS:
+        neighbour = _cell_keys(cells[order] + np.array(offset, dtype=np.int64))
+        stops = np.searchsorted(sorted_keys, neighbour, side="right")
+        if offset == (0, 0, 0):
+            starts = np.arange(1, len(order) + 1)
+        else:
+            starts = np.searchsorted(sorted_keys, neighbour, side="left")
+        owners, partners = _expand_ranges(starts, stops)
+        firsts.append(order[owners])
+        seconds.append(order[partners])
+
+    first = np.concatenate(firsts)
+    second = np.concatenate(seconds)
+    difference = position[first] - position[second]
+    close = np.einsum("ij,ij->i", difference, difference) <= cell_size * cell_size
+    return first[close], second[close]
+
+
+def _screen_block(
+    elements: OrbitalElements,
+    times: np.ndarray,
+    step_seconds: float,
+    threshold: float,
+    margin: float,
+) -> Tuple[np.ndarray, ...]:
+    """
+    Screens one block of time steps.
+
+    Returns:
+        Arrays (first, second, step, miss, tca_seconds, relative_speed) with one entry per pair
+        and step that came within `threshold`, step relative to the block.
+    """
+    perigee, apogee = orbit_shells(elements)
+    ephemeris = propagate(elements, times)
+    half_step = step_seconds / 2.0
+
+    found: List[Tuple[np.ndarray, ...]] = []
+    for step in range(len(times)):
+        valid = np.flatnonzero(ephemeris.error[:, step] == ERROR_NONE)
+        position = ephemeris.position[valid, step]
+        velocity = ephemeris.velocity[valid, step]
+        if len(valid) < 2:
+            continue
+
+        # no pair can be faster relative to each other than the two fastest objects
+        # head-on, e.g. about 18 km/s for a HEO perigee against a LEO object
+        speed = np.sqrt(np.einsum("ij,ij->i", velocity, velocity))
+        fastest = np.partition(speed, len(speed) - 2)[-2:]
+        relative_speed = fastest.sum()
+        search_radius = threshold + relative_speed * half_step
+
+        first, second = grid_pairs(position, search_radius)
+        first, second = valid[first], valid[second]
+        keep = shells_overlap(perigee, apogee, first, second, margin)
+        first, second = first[keep], second[keep]
+        if len(first) == 0:
+            continue
+
+        # closest approach assuming straight line relative motion around this step
+        dr = ephemeris.position[first, step] - ephemeris.position[second, step]
+        dv = ephemeris.velocity[first, step] - ephemeris.velocity[second, step]
+        dv2 = np.einsum("ij,ij->i", dv, dv)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tca = np.where(dv2 > 0.0, -np.einsum("ij,ij->i", dr, dv) / dv2, 0.0)
+        tca = np.clip(tca, -half_step, half_step)
+        miss_vector = dr + dv * tca[:, None]
+        miss = np.sqrt(np.einsum("ij,ij->i", miss_vector, miss_vector))
+
+        hit = miss <= threshold
+        found.append(
+            (
+                first[hit],
+                second[hit],
+                np.full(hit.sum(), step),
+                miss[hit],
+                tca[hit],
+                np.sqrt(dv2[hit]),
+            )
+        )
+
+    if not found:
+        empty = np.empty(0)
+        return (empty.astype(np.int64),) * 3 + (empty,) * 3
+    return tuple(np.concatenate(column) for column in zip(*found))
+
+
+def _time_blocks(times: np.ndarray, objects: int) -> Iterator[Tuple[int, np.ndarray]]:
+    block = max(DEFAULT_CHUNK_ELEMENTS // max(objects, 1), 1)
+    for start in range(0, len(times), block):
+        yield start, times[start : start + block]
+
+
+def _closest_per_event(
+    first: np.ndarray,
+    second: np.ndarray,
+    step: np.ndarray,
+    miss: np.ndarray,
+) -> np.ndarray:
+    """
+    A pair is usually within the threshold for several consecutive steps around one close
+    approach. Returns the indices of the smallest miss of every run of consecutive steps.
+    """
+    if len(first) == 0:
+        return np.empty(0, dtype=np.int64)
+    low = np.minimum(first, second)
+    high = np.maximum(first, second)
+    order = np.lexsort((step, high, low))
+    low, high, step = low[order], high[order], step[order]
+    new_event = np.ones(len(order), dtype=bool)
+    new_event[1:] = (
+        (low[1:] != low[:-1]) | (high[1:] != high[:-1]) | (step[1:] - step[:-1] > 1)
+    )
+    event = np.cumsum(new_event) - 1
+    best = np.lexsort((miss[order], event))
+    first_of_event = np.ones(len(best), dtype=bool)
+    first_of_event[1:] = event[best][1:] != event[best][:-1]
+    return order[best[first_of_event]]
+
+
+def screen_conjunctions(
+    catalog: Union[Sequence[USC], OrbitalElements],
+    times,
+    threshold: float = 5.0,
+    hard_body_radii: Optional[Sequence[float]] = None,
+    margin: float = ORBIT_FILTER_MARGIN_KM,
+    processes: Optional[int] = None,
+) -> List[ConjunctionCandidate]:
+    """
+    Finds pairs of objects that come within `threshold` km of each other.
+
+    Args:
+        catalog: USC objects or prebuilt OrbitalElements.
+        times: Evenly spaced datetimes / datetime64 values covering the screening window.
+               The closest approach between two steps is estimated, so steps of 10 to 60
+               seconds are enough for LEO.
+        threshold: Screening distance in km.
+        hard_body_radii: Radius in meters per catalog entry. Taken from the USC physical
+                         data when not given, see hard_body_radius.
+        margin: km added to the perigee/apogee shells before comparing them.
+        processes: Spread blocks of time steps over this many worker processes.
+
+    Returns:
+        The closest approach of every encounter, sorted by miss distance.
+    """
+    if isinstance(catalog, OrbitalElements):
+        elements = catalog
+        radii = np.full(len(elements), DEFAULT_HARD_BODY_RADIUS_M)
+    else:
+        elements = OrbitalElements.from_catalog(catalog)
+        radii = np.array([hard_body_radius(usc) for usc in catalog])[elements.index]
+    if hard_body_radii is not None:
+        radii = np.asarray(hard_body_radii, dtype=np.float64)[elements.index]
+
+    times = as_times(times)
+    step_seconds = 0.0
+    if len(times) > 1:
+        step_seconds = float(np.max(np.diff(times)) / np.timedelta64(1, "s"))
+
+    perigee, apogee = orbit_shells(elements)
+    candidates = np.flatnonzero(
+        objects_with_overlap(perigee, apogee, margin + threshold)
+    )
+    elements = elements.take(candidates)
+    radii = radii[candidates]
+
+    blocks = list(_time_blocks(times, len(elements)))
+    arguments = (step_seconds, threshold, margin + threshold)
+    if processes is None or processes <= 1 or len(blocks) <= 1:
+        results = [_screen_block(elements, block, *arguments) for _, block in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(_screen_block, elements, block, *arguments)
+                for _, block in blocks
+            ]
+            results = [future.result() for future in futures]
+
+    first, second, step, miss, tca, speed = (
+        np.concatenate([result[column] for result in results]) for column in range(6)
+    )
+    step = step + np.concatenate(
+        [np.full(len(result[0]), start) for (start, _), result in zip(blocks, results)]
+    ).astype(np.int64)
+
+    found: List[ConjunctionCandidate] = []
+    for k in _closest_per_event(first, second, step, miss).tolist():
+        i, j = sorted((int(first[k]), int(second[k])))
+        moment = times[step[k]] + np.timedelta64(int(round(tca[k] * 1e6)), "us")
+        found.append(
+            ConjunctionCandidate(
+                primary=elements.norad_cat_id[i],
+                secondary=elements.norad_cat_id[j],
+                primary_index=int(elements.index[i]),
+                secondary_index=int(elements.index[j]),
+                time=moment.astype(datetime),
+                miss_distance=float(miss[k]),
+                relative_speed=float(speed[k]),
+                combined_hard_body_radius=float(radii[i] + radii[j]),
+            )
+        )
+
+    found.sort(key=lambda candidate: candidate.miss_distance)
+    return found
@@ -1,22 +1,43 @@
+from __future__ import annotations
+
 from copy import deepcopy
 from datetime import datetime, timedelta
 import json
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 import requests
 from requests import Session, Response
 from requests.exceptions import HTTPError
 import os
 from dotenv import load_dotenv
 from os.path import join, isfile
-from Spade.types import DiscosObjectList, DiscosObjectListResponse
+from Spade.types import DiscosObjectList, DiscosObjectListResponse, DiscosSyncState
 from pathlib import Path
 
-from Spade.config import Settings
+from Spade.quarantine import Quarantine
+
+if TYPE_CHECKING:
+    # Importing Spade.config reads the credentials, which the fetchers get passed in
+    from Spade.config import Settings
 
 """
 This file contains functions that will download files from different sources like spaceTracker
 """
 
+SPACE_TRACK_FILE_PREFIX = "FULL_CATLOG_"
+SPACE_TRACK_CACHE_TTL = timedelta(hours=2)
+# File extension of each `gp` output format, importers.parseSpaceTrack picks the parser by it
+SPACE_TRACK_EXTENSIONS = {"xml": ".XML", "csv": ".csv", "json": ".json"}
+DISCOS_FILE_PREFIX = "DISCOS_ALL_"
+DISCOS_CACHE_TTL = timedelta(weeks=2)
+DISCOS_SYNC_STATE_FILE = "DISCOS_SYNC_STATE.json"
+# An incremental sync revalidates one of this many slices of the known objects, so with a
+# daily sync every object is downloaded again at least every two weeks
+DISCOS_REVALIDATION_SLICES = 14
+# DISCOS_ALL_ files kept on disk, every sync writes a new one
+DISCOS_KEEP_FILES = 2
+# How often an incremental sync should run, the scheduler uses it as the DISCOS interval
+DISCOS_SYNC_INTERVAL = timedelta(days=1)
+
 
 def downloadedFileList(path: str) -> List[str]:
     """
@@ -28,8 +49,39 @@ def downloadedFileList(path: str) -> List[str]:
     return onlyfiles
 
 
+def _file_datetime(filename: str, fileprefix: str, settings: Settings) -> datetime:
+    """
+    The download time in a filename like FULL_CATLOG_<DATE_FORMAT>.XML.
+
+    Raises:
+        ValueError: When the name holds no valid date.
+    """
+    base_name = os.path.splitext(filename)[0]
+    return datetime.strptime(base_name[len(fileprefix) :], settings.DATE_FORMAT)
+
+
+def pruneDownloads(fileprefix: str, keep: int, settings: Settings):
+    """
+    Removes all but the newest `keep` downloaded files starting with `fileprefix`. Files
+    without a valid date in their name are left alone.
+    """
+    dated = []
+    for filename in downloadedFileList(settings.DOWNLOADED_DATA_PATH):
+        if filename.startswith(fileprefix):
+            try:
+                dated.append((_file_datetime(filename, fileprefix, settings), filename))
+            except ValueError:
+                continue
+    dated.sort(reverse=True)
+    for _, filename in dated[keep:]:
+        os.remove(join(settings.DOWNLOADED_DATA_PATH, filename))
+
+
 def isCacheAvaliable(
-    fileprefix: str, max_cache_age: timedelta, settings: Settings
+    fileprefix: str,
+    max_cache_age: timedelta,
+    settings: Settings,
+    quarantine: Optional[Quarantine] = None,
 ) -> Optional[str]:
     """
     Checks if a cached file exists that is newer than the maximum allowed age.
@@ -42,6 +94,9 @@ def isCacheAvaliable(
         max_cache_age (timedelta): The maximum duration a file can be considered
                                    "fresh". For example, timedelta(hours=2) or
                                    timedelta(days=1).
+        quarantine (Optional[Quarantine]): Where filenames without a valid date go.
+                                   Without one they are counted and reported in
+                                   one line.
 
     Returns:
         Optional[str]: The full path to the newest valid cache file, or None
@@ -51,28 +106,46 @@ def isCacheAvaliable(
 
     most_recent_file: Optional[str] = None
     most_recent_time = cutoff_time
+    report = quarantine is None
+    if quarantine is None:
+        quarantine = Quarantine()
 
-    for filename in downloadedFileList(settings.DOWNLOADED_DATA_PATH):
+    for index, filename in enumerate(downloadedFileList(settings.DOWNLOADED_DATA_PATH)):
         if filename.startswith(fileprefix):
             try:
-                base_name = os.path.splitext(filename)[0]
-                timestamp_str = base_name[len(fileprefix) :]
-                file_datetime = datetime.strptime(timestamp_str, settings.DATE_FORMAT)
+                file_datetime = _file_datetime(filename, fileprefix, settings)
 
                 if file_datetime > most_recent_time:
                     most_recent_time = file_datetime
                     most_recent_file = filename
 
-            except (ValueError, IndexError):
-                print(f"Could not parse date from filename: {filename}")
+            except (ValueError, IndexError) as e:
+                quarantine.add(filename, e, index, settings.DOWNLOADED_DATA_PATH)
                 continue
 
+    if report:
+        quarantine.report(settings.DOWNLOADED_DATA_PATH)
+
     if most_recent_file:
         return join(settings.DOWNLOADED_DATA_PATH, most_recent_file)
 
     return None
 
 
+def space_track_extension(url: str) -> str:
+    """
+    File extension for the output format of a Space-Track query URL, e.g. ".csv" for a
+    query ending in `format/csv`. Space-Track answers in XML without a format.
+    """
+    segments = url.rstrip("/").split("/")
+    output_format = "xml"
+    if "format" in segments and segments.index("format") + 1 < len(segments):
+        output_format = segments[segments.index("format") + 1].lower()
+    if output_format not in SPACE_TRACK_EXTENSIONS:
+        raise ValueError(f"Unsupported Space-Track format: {output_format}")
+    return SPACE_TRACK_EXTENSIONS[output_format]
+
+
 def get_auth_space_tracker(session: Session, settings: Settings) -> bool:
     """
     Requests auth cookies from space tracker
@@ -130,18 +203,21 @@ def fetch_api(session: Session, url: str, params=None, headers=None) -> Response
         return None
 
 
-def fetch_DISCOS(url: str, settings: Settings, params=None) -> Response | None:
+def fetch_DISCOS(
+    url: str, settings: Settings, params=None, session: Session | None = None
+) -> Response | None:
     headers = {
         "Authorization": f"Bearer {settings.DISCOS_TOKEN}",
         "DiscosWeb-Api-Version": "2",
     }
 
-    session = Session()
+    if session is None:
+        session = Session()
     return fetch_api(session=session, url=url, params=params, headers=headers)
 
 
 def fetch_object_list_DISCOS(
-    settings: Settings, params: Dict[str, str]
+    settings: Settings, params: Dict[str, str], session: Session | None = None
 ) -> DiscosObjectListResponse | None:
     """
     Retrieve a list of DISCOS objects.
@@ -149,6 +225,7 @@ def fetch_object_list_DISCOS(
     Args:
         settings (Settings): A settings object required to make api calls
         params (Params): A Dictonary for requesting page size and page numbers
+        session (Session | None): Session to reuse connections from, a new one if None
     Returns
     -------
     DiscosObjectList | None
@@ -156,7 +233,7 @@ def fetch_object_list_DISCOS(
         - None if the request fails.
     """
     url = settings.DISCOS_BASE_URL + "/api/objects"
-    res = fetch_DISCOS(url, settings, params)
+    res = fetch_DISCOS(url, settings, params, session)
     if res is None:
         print("There was an Error fetching object list from DISCOS")
         return None
@@ -168,6 +245,8 @@ def fetch_object_list_DISCOS(
 def fetch_all_objects_DISCOS(
     settings: Settings,
     page_size: int = 100,
+    filter: str = "active=true",
+    session: Session | None = None,
 ) -> DiscosObjectList | None:
     """
     Retrieve every DISCOS object, transparently paging through the API. Only retrieves ACTIVE satellites
@@ -178,6 +257,10 @@ def fetch_all_objects_DISCOS(
         Your application settings with DISCOS credentials.
     page_size : int, default 100
         The number of records to request per page (max supported by API).
+    filter : str, default "active=true"
+        DISCOS filter expression, e.g. "and(eq(active,true),gt(id,60000))".
+    session : Session | None
+        Session used for every page, so pages reuse one connection. A new one if None.
 
     Returns
     -------
@@ -187,6 +270,8 @@ def fetch_all_objects_DISCOS(
     if page_size < 1 or page_size > 100:
         raise ValueError("page_size must be in the range 1-100")
 
+    if session is None:
+        session = Session()
     all_objects: DiscosObjectList = []
 
     page_number: int = 1
@@ -197,10 +282,10 @@ def fetch_all_objects_DISCOS(
         page_params = {
             "page[size]": str(page_size),
             "page[number]": str(page_number),
-            "filter": "active=true",
+            "filter": filter,
         }
 
-        page_data = fetch_object_list_DISCOS(settings, page_params)
+        page_data = fetch_object_list_DISCOS(settings, page_params, session)
         if page_data is None or page_data["data"] is None or page_data["meta"] is None:
             print(f"response was not formatted properly: {page_data}")
             return None
@@ -222,6 +307,9 @@ def fetch_all_objects_DISCOS(
 def save_discos_objects(
     settings: Settings,
     page_size: int = 100,
+    incremental: bool = False,
+    max_cache_age: timedelta = DISCOS_CACHE_TTL,
+    session: Session | None = None,
 ) -> str | None:
     """
     Fetch every DISCOS object and write the result to disk as JSON.
@@ -230,60 +318,223 @@ def save_discos_objects(
     ----------
     settings : Settings
         Your application settings with DISCOS credentials.
-    file_path : str | Path, default "discos_objects.json"
-        Where to save the JSON file.
-    params : Optional[Dict[str, str]]
-        Extra query parameters forwarded to the API.
     page_size : int, default 100
         Page size to use while downloading the objects.
+    incremental : bool, default False
+        Update the previous download with sync_discos_objects instead of downloading
+        everything again. Meant to be run often, e.g. with max_cache_age of a day.
+    max_cache_age : timedelta, default DISCOS_CACHE_TTL (2 weeks)
+        A download younger than this is returned without contacting DISCOS.
+    session : Session | None
+        Session to reuse between calls, e.g. by a long running scheduler.
 
     Returns
     -------
     str | None
         The resolved file path on success as string, or None if the fetch fails.
     """
-    filePrefix = "DISCOS_ALL_"
-
-    avaliableFile = isCacheAvaliable(filePrefix, timedelta(weeks=2), settings)
+    avaliableFile = isCacheAvaliable(DISCOS_FILE_PREFIX, max_cache_age, settings)
     if avaliableFile:
         return avaliableFile
 
+    if incremental:
+        return sync_discos_objects(settings, page_size=page_size, session=session)
+
     data = fetch_all_objects_DISCOS(
         settings=settings,
         page_size=page_size,
+        session=session,
     )
 
     if data is None:
         print("Saving aborted: could not download DISCOS objects.")
         return None
 
+    newFileName = _write_discos_objects(data, settings)
+    if newFileName is not None:
+        # lets a later incremental save continue from this download
+        _save_discos_sync_state(settings, newFileName, data, cursor=0)
+    return newFileName
+
+
+def _write_discos_objects(data: DiscosObjectList, settings: Settings) -> str | None:
     try:
         datestr = datetime.now().strftime(settings.DATE_FORMAT)
-        newFileName = settings.DOWNLOADED_DATA_PATH + filePrefix + datestr + ".json"
+        newFileName = (
+            settings.DOWNLOADED_DATA_PATH + DISCOS_FILE_PREFIX + datestr + ".json"
+        )
         with open(newFileName, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         print(f"Wrote {len(data)} objects to {newFileName}")
-        return newFileName
     except Exception as e:
         print(f"Error writing full catlog to a file, error: {e}")
+        return None
+    pruneDownloads(DISCOS_FILE_PREFIX, DISCOS_KEEP_FILES, settings)
+    return newFileName
 
 
-def fetch_full_catlog_ST(settings: Settings) -> str | None:
+def load_discos_sync_state(settings: Settings) -> DiscosSyncState | None:
+    """
+    Returns the state saved by the last sync_discos_objects, or None when there is none
+    or the catalog file it points to is gone.
     """
-    Makes request to space tracker to download OMM (XML) file. Places file into downloaded_data folder for later use
+    path = join(settings.DOWNLOADED_DATA_PATH, DISCOS_SYNC_STATE_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            state: DiscosSyncState = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isfile(state.get("file", "")):
+        return None
+    return state
+
+
+def _save_discos_sync_state(
+    settings: Settings, filename: str, data: DiscosObjectList, cursor: int
+):
+    ids = sorted(int(item["id"]) for item in data)
+    state: DiscosSyncState = {
+        "file": filename,
+        "last_id": ids[-1] if ids else 0,
+        "ids": ids,
+        "cursor": cursor,
+    }
+    path = join(settings.DOWNLOADED_DATA_PATH, DISCOS_SYNC_STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def revalidation_range(
+    ids: List[int], cursor: int, slices: int = DISCOS_REVALIDATION_SLICES
+) -> tuple[int, int] | None:
+    """
+    Returns the first and last id to revalidate for slice `cursor` of the sorted `ids`, or
+    None when the slice is empty. The ranges of consecutive slices meet, so together they
+    also cover the ids between known ones, e.g. of objects that became active again.
+    """
+    size = -(-len(ids) // slices)
+    start = (cursor % slices) * size
+    part = ids[start : start + size]
+    if not part:
+        return None
+    return (ids[start - 1] + 1 if start else 0), part[-1]
+
+
+def sync_discos_objects(
+    settings: Settings,
+    page_size: int = 100,
+    slices: int = DISCOS_REVALIDATION_SLICES,
+    session: Session | None = None,
+) -> str | None:
+    """
+    Brings the last DISCOS download up to date without paging through every object.
+
+    The ids of the last sync are kept in DISCOS_SYNC_STATE_FILE. A sync then downloads only
+        - the active objects with an id larger than any seen before, which are the objects
+          added since, and
+        - the active objects of one of `slices` id ranges of the known objects. Those replace
+          the stored copies, and known objects in the range that are not returned any more
+          (no longer active) are dropped. The next sync checks the next range.
+    Without a previous sync every active object is downloaded. Only the newest
+    DISCOS_KEEP_FILES downloads are kept.
+
+    Parameters
+    ----------
+    settings : Settings
+        Your application settings with DISCOS credentials.
+    page_size : int, default 100
+        Page size to use while downloading the objects.
+    slices : int, default DISCOS_REVALIDATION_SLICES
+        Number of syncs it takes to revalidate every known object.
+    session : Session | None
+        Session to reuse for all requests, a new one if None.
+
+    Returns
+    -------
+    str | None
+        Path of the new DISCOS_ALL_ file, or None if a fetch fails. The previous file and
+        state are kept on failure.
+    """
+    if session is None:
+        session = Session()
+    state = load_discos_sync_state(settings)
+    if state is None:
+        print("No previous DISCOS sync, fetching all objects")
+        data = fetch_all_objects_DISCOS(settings, page_size=page_size, session=session)
+        if data is None:
+            print("Sync aborted: could not download DISCOS objects.")
+            return None
+        cursor = 0
+    else:
+        with open(state["file"], encoding="utf-8") as f:
+            objects: Dict[str, Any] = {item["id"]: item for item in json.load(f)}
+
+        added = fetch_all_objects_DISCOS(
+            settings,
+            page_size=page_size,
+            filter=f"and(eq(active,true),gt(id,{state['last_id']}))",
+            session=session,
+        )
+        if added is None:
+            print("Sync aborted: could not download new DISCOS objects.")
+            return None
+
+        cursor = state["cursor"] % slices
+        bounds = revalidation_range(state["ids"], cursor, slices)
+        if bounds is not None:
+            first, last = bounds
+            checked = fetch_all_objects_DISCOS(
+                settings,
+                page_size=page_size,
+                filter=f"and(eq(active,true),ge(id,{first}),le(id,{last}))",
+                session=session,
+            )
+            if checked is None:
+                print("Sync aborted: could not revalidate DISCOS objects.")
+                return None
+            for object_id in state["ids"]:
+                if first <= object_id <= last:
+                    objects.pop(str(object_id), None)
+            objects.update((item["id"], item) for item in checked)
+        print(f"DISCOS sync: {len(added)} new objects, ids {bounds} revalidated")
+
+        objects.update((item["id"], item) for item in added)
+        data = sorted(objects.values(), key=lambda item: int(item["id"]))
+        cursor = (cursor + 1) % slices
+
+    newFileName = _write_discos_objects(data, settings)
+    if newFileName is None:
+        return None
+    _save_discos_sync_state(settings, newFileName, data, cursor)
+    return newFileName
+
+
+def fetch_full_catlog_ST(
+    settings: Settings, session: Session | None = None
+) -> str | None:
+    """
+    Makes request to space tracker to download OMM file, as XML, CSV or JSON depending on the format of
+    settings.SPACE_TRACKER_FULL_CATLOG. Places file into downloaded_data folder for later use
+    Args:
+        settings (Settings): A settings object required to make api calls
+        session (Session | None): A session that is kept between calls. It logs in on first
+            use and is reused while its login is valid. A new session if None.
     Returns:
         string (str | None):
                 - A `str` containing the file path of the newly created data
                 - `None` if there was a errror fetching the catlog
     """
-    filePrefix = "FULL_CATLOG_"
+    filePrefix = SPACE_TRACK_FILE_PREFIX
+    extension = space_track_extension(settings.SPACE_TRACKER_FULL_CATLOG)
 
     # First check if we can used cached file
-    avaliableFile = isCacheAvaliable(filePrefix, timedelta(hours=2), settings)
+    avaliableFile = isCacheAvaliable(filePrefix, SPACE_TRACK_CACHE_TTL, settings)
     if avaliableFile:
         return avaliableFile
 
-    session = Session()
+    if session is None:
+        session = Session()
 
     if (
         settings.SPACE_TRACKER_USERNAME is None
@@ -292,17 +543,22 @@ def fetch_full_catlog_ST(settings: Settings) -> str | None:
         print("Error with grabbing username and password from env file")
         return None
 
-    loginSuccess = get_auth_space_tracker(session, settings)
-    if not loginSuccess:
-        print("Error logging in, not fetching catlog")
-        return None
-    response = fetch_api(session, settings.SPACE_TRACKER_FULL_CATLOG)
+    response = None
+    if session.cookies:
+        # Logged in before, the login is only repeated when it expired
+        response = fetch_api(session, settings.SPACE_TRACKER_FULL_CATLOG)
+    if response is None:
+        loginSuccess = get_auth_space_tracker(session, settings)
+        if not loginSuccess:
+            print("Error logging in, not fetching catlog")
+            return None
+        response = fetch_api(session, settings.SPACE_TRACKER_FULL_CATLOG)
     if response is None:
         print("Fetching Full Space Tracker Catlog failed")
         return None
     try:
         datestr = datetime.now().strftime(settings.DATE_FORMAT)
-        newFileName = settings.DOWNLOADED_DATA_PATH + filePrefix + datestr + ".XML"
+        newFileName = settings.DOWNLOADED_DATA_PATH + filePrefix + datestr + extension
         with open(newFileName, "wb") as f:
             f.write(response.content)
         return newFileName
@@ -0,0 +1,75 @@
+from collections import deque
+from typing import Deque, Iterable, Iterator
+
+from Spade.models import USC
+
+"""
+This file contains a streaming deduplication stage for element sets. The Space-Track `gp`
+query returns every element set of the last 30 days ordered by NORAD_CAT_ID and then EPOCH,
+so all element sets of an object arrive together and the newest one comes last. That order
+lets the stage keep only the current object's element sets in memory.
+"""
+
+
+def _norad_key(norad_cat_id: str):
+    """
+    Sort key matching Space-Track's numeric NORAD_CAT_ID order.
+    """
+    try:
+        return (int(norad_cat_id), "")
+    except ValueError:
+        return (0, norad_cat_id)
+
+
+def latest_epochs(uscs: Iterable[USC], keep: int = 1) -> Iterator[USC]:
+    """
+    Yields only the newest `keep` element sets of every NORAD_CAT_ID.
+
+    The input must be ordered by NORAD_CAT_ID and then EPOCH. At most `keep` objects are held
+    at any time. Element sets of one object are yielded oldest first. Records without a
+    NORAD_CAT_ID can not be told apart, so they are all yielded as they arrive.
+
+    Args:
+        uscs: USC objects ordered like Settings.SPACE_TRACKER_FULL_CATLOG, e.g. the output of
+              iterSpaceTrackXML.
+        keep: Number of element sets kept per object.
+
+    Raises:
+        ValueError: When `keep` is less than 1, or the input is not ordered by NORAD_CAT_ID
+                    and EPOCH. Objects before the out of order one have been yielded.
+    """
+    if keep < 1:
+        raise ValueError(f"keep must be at least 1, got {keep}")
+
+    current: Deque[USC] = deque(maxlen=keep)
+    current_key = None
+
+    for usc in uscs:
+        if not usc.NORAD_CAT_ID:
+            yield usc
+            continue
+        key = _norad_key(usc.NORAD_CAT_ID)
+        if current and key == current_key:
+            previous = current[-1]
+            if (
+                usc.EPOCH is not None
+                and previous.EPOCH is not None
+                and usc.EPOCH < previous.EPOCH
+            ):
+                raise ValueError(
+                    f"Element sets of NORAD ID {usc.NORAD_CAT_ID} are not ordered by EPOCH"
+                )
+            current.append(usc)
+            continue
+
+        if current_key is not None and key < current_key:
+            raise ValueError(
+                f"NORAD ID {usc.NORAD_CAT_ID} after {current[-1].NORAD_CAT_ID}, "
+                "input is not ordered by NORAD_CAT_ID"
+            )
+        yield from current
+        current.clear()
+        current.append(usc)
+        current_key = key
+
+    yield from current
@@ -0,0 +1,323 @@
+import json
+import math
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from Spade.models import USC
+
+"""
+This file contains a diff engine for catalog snapshots. Every USC is reduced to a key
+(NORAD_CAT_ID, or INTERNATIONAL_DESIGNATOR for objects without one) and a tuple of its
+field values. Two snapshots are joined on the key with dicts and the tuples are compared in
+one step, only records whose tuples differ are compared field by field, so a diff is linear
+in the size of the snapshots.
+
+The field comparison normalizes values (floats to FLOAT_DIGITS significant digits, stripped
+strings, NaN and "" as None), so a record that only differs by formatting is counted as
+unchanged.
+
+Example:
+    diff = diff_snapshots(yesterday, today)
+    diff.added, diff.removed, diff.changed
+    write_change_feed(diff, "changes.ndjson")
+"""
+
+# SOURCES records where a value came from, not what the object is
+DEFAULT_DIFF_FIELDS = tuple(f.name for f in fields(USC) if f.name not in ("SOURCES",))
+
+# Fields that change with every new element set
+ELEMENT_FIELDS = (
+    "EPOCH",
+    "MEAN_MOTION",
+    "ECCENTRICITY",
+    "INCLINATION",
+    "RA_OF_ASC_NODE",
+    "ARG_OF_PERIGEE",
+    "MEAN_ANOMALY",
+    "MEAN_MOTION_DOT",
+    "MEAN_MOTION_DDOT",
+    "B_STAR",
+    "ELEMENT_SET_NUM",
+    "REV_AT_EPOCH",
+    "SEMIMAJOR_AXIS",
+    "PERIOD",
+    "APOAPSIS",
+    "PERIAPSIS",
+)
+
+# Changes between two element sets larger than these are unlikely to be drag or noise
+DEFAULT_JUMP_THRESHOLDS = {
+    "SEMIMAJOR_AXIS": 1.0,  # km
+    "INCLINATION": 0.01,  # degrees
+    "ECCENTRICITY": 0.0005,
+}
+
+# Floats are compared at this many significant digits, so values that only differ by
+# rounding in the source format are equal
+FLOAT_DIGITS = 12
+
+
+def snapshot_key(usc: USC) -> Optional[str]:
+    """
+    Key that joins the same object across snapshots: the NORAD_CAT_ID, else the
+    INTERNATIONAL_DESIGNATOR, else the DISCOS object id. None when the object has none.
+    """
+    if usc.NORAD_CAT_ID:
+        return usc.NORAD_CAT_ID.strip().lstrip("0") or "0"
+    if usc.INTERNATIONAL_DESIGNATOR and usc.INTERNATIONAL_DESIGNATOR.strip():
+        return "ID:" + usc.INTERNATIONAL_DESIGNATOR.strip()
+    if usc.DISCOS_ID:
+        return "DISCOS:" + usc.DISCOS_ID
+    return None
+
+
+def _normalize(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        return float(f"{value:.{FLOAT_DIGITS}g}")
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(_normalize(item) for item in value)) or None
+    return value
+
+
+@dataclass
+class FieldChange:
+    """
+    One field that differs between two snapshots.
+
+    Attributes:
+        field: Name of the USC field.
+        old: Value in the old snapshot.
+        new: Value in the new snapshot.
+    """
+
+    field: str
+    old: Any
+    new: Any
+
+    @property
+    def delta(self) -> Optional[float]:
+        """
+        new - old for numeric fields with both values, else None.
+        """
+        if isinstance(self.old, (int, float)) and isinstance(self.new, (int, float)):
+            if isinstance(self.old, bool) or isinstance(self.new, bool):
+                return None
+            return self.new - self.old
+        return None
+
+
+@dataclass
+class RecordChange:
+    """
+    An object present in both snapshots whose content changed.
+    """
+
+    key: str
+    old: USC
+    new: USC
+    changes: List[FieldChange]
+
+    def change(self, name: str) -> Optional[FieldChange]:
+        for change in self.changes:
+            if change.field == name:
+                return change
+        return None
+
+    @property
+    def fields(self) -> List[str]:
+        return [change.field for change in self.changes]
+
+    @property
+    def elements_only(self) -> bool:
+        """
+        True when only element set fields changed, i.e. the object just got a new TLE.
+        """
+        return all(change.field in ELEMENT_FIELDS for change in self.changes)
+
+
+@dataclass
+class SnapshotDiff:
+    """
+    Result of diff_snapshots.
+
+    Attributes:
+        added: Objects only in the new snapshot.
+        removed: Objects only in the old snapshot, e.g. decayed ones.
+        changed: Objects in both snapshots with different content.
+        unchanged: Number of objects in both snapshots with the same content.
+        unkeyed: Objects of the new snapshot without any snapshot_key. They can not be
+                 matched to the old snapshot, so they are neither added nor changed.
+    """
+
+    added: List[USC] = field(default_factory=list)
+    removed: List[USC] = field(default_factory=list)
+    changed: List[RecordChange] = field(default_factory=list)
+    unchanged: int = 0
+    unkeyed: List[USC] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def changed_field(self, name: str) -> List[RecordChange]:
+        """
+        Changes that include `name`, e.g. changed_field("DRY_MASS").
+        """
+        return [change for change in self.changed if change.change(name) is not None]
+
+    def element_jumps(
+        self, thresholds: Optional[Dict[str, float]] = None
+    ) -> List[RecordChange]:
+        """
+        Changes where an element moved more than its threshold between the two element
+        sets, candidates for maneuvers.
+
+        Args:
+            thresholds: Largest expected absolute change per field, defaults to
+                        DEFAULT_JUMP_THRESHOLDS.
+        """
+        if thresholds is None:
+            thresholds = DEFAULT_JUMP_THRESHOLDS
+        jumps = []
+        for record in self.changed:
+            for name, limit in thresholds.items():
+                change = record.change(name)
+                if change is not None and change.delta is not None:
+                    if abs(change.delta) > limit:
+                        jumps.append(record)
+                        break
+        return jumps
+
+
+def _values_getter(diff_fields: Sequence[str]) -> Callable[[USC], Tuple]:
+    getter = attrgetter(*diff_fields)
+    if len(diff_fields) == 1:
+        return lambda usc: (getter(usc),)
+    return getter
+
+
+def _field_changes(
+    old: USC, new: USC, getter: Callable[[USC], Tuple], diff_fields: Sequence[str]
+) -> List[FieldChange]:
+    return [
+        FieldChange(name, before, after)
+        for name, before, after in zip(diff_fields, getter(old), getter(new))
+        if _normalize(before) != _normalize(after)
+    ]
+
+
+def diff_snapshots(
+    old: Iterable[USC],
+    new: Iterable[USC],
+    diff_fields: Sequence[str] = DEFAULT_DIFF_FIELDS,
+) -> SnapshotDiff:
+    """
+    Compares two catalog snapshots.
+
+    Args:
+        old: The previous snapshot.
+        new: The current snapshot.
+        diff_fields: USC fields that are compared, the rest is ignored.
+
+    Returns:
+        SnapshotDiff: Added and removed objects in the order of their snapshot, changed
+                      objects in the order of `new`. When a key appears more than once in a
+                      snapshot the last USC wins, for a Space-Track catalog ordered by EPOCH
+                      that is the newest element set.
+    """
+    getter = _values_getter(diff_fields)
+    old_by_key = {snapshot_key(usc): usc for usc in old}
+    old_by_key.pop(None, None)
+
+    result = SnapshotDiff()
+    new_by_key: Dict[Optional[str], USC] = {}
+    for usc in new:
+        key = snapshot_key(usc)
+        if key is None:
+            result.unkeyed.append(usc)
+        else:
+            new_by_key[key] = usc
+    for key, usc in new_by_key.items():
+        before = old_by_key.get(key)
+        if before is None:
+            result.added.append(usc)
+            continue
+        if getter(usc) == getter(before):
+            result.unchanged += 1
+            continue
+        changes = _field_changes(before, usc, getter, diff_fields)
+        if changes:
+            result.changed.append(RecordChange(key, before, usc, changes))
+        else:
+            result.unchanged += 1
+
+    result.removed = [usc for key, usc in old_by_key.items() if key not in new_by_key]
+    return result
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def iter_change_feed(diff: SnapshotDiff) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the diff as JSON serializable change records:
+        {"op": "add", "key": ..., "record": {non empty fields}}
+        {"op": "remove", "key": ...}
+        {"op": "change", "key": ..., "fields": {field: [old, new]}}
+    """
+    for usc in diff.added:
+        record = {
+            f.name: _json_value(getattr(usc, f.name))
+            for f in fields(USC)
+            if getattr(usc, f.name) not in (None, [])
+        }
+        yield {"op": "add", "key": snapshot_key(usc), "record": record}
+    for usc in diff.removed:
+        yield {"op": "remove", "key": snapshot_key(usc)}
+    for record in diff.changed:
+        yield {
+            "op": "change",
+            "key": record.key,
+            "fields": {
+                change.field: [_json_value(change.old), _json_value(change.new)]
+                for change in record.changes
+            },
+        }
+
+
+def write_change_feed(diff: SnapshotDiff, filename: str) -> int:
+    """
+    Writes the change feed as newline delimited JSON, one change per line.
+
+    Returns:
+        Number of changes written.
+    """
+    count = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        for change in iter_change_feed(diff):
+            f.write(json.dumps(change, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
@@ -0,0 +1,310 @@
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+from dataclasses import fields
+from datetime import date, datetime
+from itertools import islice
+from operator import attrgetter
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Tuple
+from typing import get_args, get_type_hints
+
+from Spade.models import USC
+from Spade.tle import format_tles
+
+"""
+This file contains exporters that stream USC objects to CSV, NDJSON, JSON, SQLite and TLE
+files. They take any iterable of USC, e.g. iterSpaceTrackXML, and write one record at a
+time through a large write buffer, so memory use does not grow with the size of the catalog.
+
+Columns are always the USC fields in declaration order (EXPORT_COLUMNS). Dates and datetimes
+are written as ISO 8601 strings and SOURCES as a `;` separated string, except in JSON
+where it stays a list. Text formats are gzip compressed when the filename ends in `.gz` or
+`compress=True` is passed.
+
+Example:
+    export(iterSpaceTrackXML("FULL_CATLOG.XML"), "catalog.csv.gz")
+"""
+
+EXPORT_COLUMNS: Tuple[str, ...] = tuple(f.name for f in fields(USC))
+SOURCES_SEPARATOR = ";"
+WRITE_BUFFER_SIZE = 1 << 20
+DEFAULT_TABLE = "satellites"
+TLE_CHUNK_SIZE = 10_000
+
+_HINTS = get_type_hints(USC)
+
+
+def _python_type(name: str) -> type:
+    hint = _HINTS[name]
+    for candidate in (hint, *get_args(hint)):
+        if candidate in (float, int, str, datetime, date):
+            return candidate
+        if getattr(candidate, "__origin__", None) in (list, List):
+            return list
+    return str
+
+
+_COLUMN_TYPES = {name: _python_type(name) for name in EXPORT_COLUMNS}
+
+
+def column_type(name: str) -> type:
+    """
+    Python type of a USC field: float, int, str, datetime, date or list.
+    """
+    return _COLUMN_TYPES[name]
+
+
+_SQLITE_TYPES = {float: "REAL", int: "INTEGER"}
+
+# Columns whose values need converting before they are written
+_ISO_COLUMNS = [
+    index
+    for index, name in enumerate(EXPORT_COLUMNS)
+    if _COLUMN_TYPES[name] in (datetime, date)
+]
+_LIST_COLUMNS = [
+    index for index, name in enumerate(EXPORT_COLUMNS) if _COLUMN_TYPES[name] is list
+]
+
+_row = attrgetter(*EXPORT_COLUMNS)
+
+
+def _flat_row(usc: USC) -> List[Any]:
+    """
+    Column values with dates as ISO strings and lists joined, for CSV and SQLite.
+    """
+    row = list(_row(usc))
+    for index in _ISO_COLUMNS:
+        if row[index] is not None:
+            row[index] = row[index].isoformat()
+    for index in _LIST_COLUMNS:
+        row[index] = SOURCES_SEPARATOR.join(row[index]) if row[index] else None
+    return row
+
+
+def json_record(usc: USC) -> Dict[str, Any]:
+    """
+    The USC as a JSON serializable dict in EXPORT_COLUMNS order.
+    """
+    row = list(_row(usc))
+    for index in _ISO_COLUMNS:
+        if row[index] is not None:
+            row[index] = row[index].isoformat()
+    return dict(zip(EXPORT_COLUMNS, row))
+
+
+def _open_text(filename: str, compress: Optional[bool]) -> IO[str]:
+    if compress is None:
+        compress = filename.endswith(".gz")
+    if compress:
+        # level 6 compresses catalogs within about 1% of the default level 9, in less time
+        raw = gzip.open(filename, "wb", compresslevel=6)
+        return io.TextIOWrapper(
+            io.BufferedWriter(raw, WRITE_BUFFER_SIZE), encoding="utf-8", newline=""
+        )
+    return open(
+        filename, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER_SIZE
+    )
+
+
+def export_csv(
+    uscs: Iterable[USC], filename: str, compress: Optional[bool] = None
+) -> int:
+    """
+    Writes the USC objects as CSV with a header row of EXPORT_COLUMNS. Missing values are
+    empty cells.
+
+    Args:
+        uscs: Any iterable of USC, it is consumed once.
+        filename: Output file, gzip compressed when it ends in `.gz`.
+        compress: Forces compression on or off regardless of the filename.
+
+    Returns:
+        Number of records written.
+    """
+    count = 0
+    with _open_text(filename, compress) as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for usc in uscs:
+            writer.writerow(_flat_row(usc))
+            count += 1
+    return count
+
+
+def export_ndjson(
+    uscs: Iterable[USC], filename: str, compress: Optional[bool] = None
+) -> int:
+    """
+    Writes the USC objects as newline delimited JSON, one object per line.
+
+    Returns:
+        Number of records written.
+    """
+    count = 0
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    with _open_text(filename, compress) as f:
+        for usc in uscs:
+            f.write(encode(json_record(usc)))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def export_json(
+    uscs: Iterable[USC],
+    filename: str,
+    compress: Optional[bool] = None,
+    indent: Optional[int] = 2,
+) -> int:
+    """
+    Writes the USC objects as one JSON array, pretty printed with `indent`. The array is
+    written element by element, it is never built in memory.
+
+    Returns:
+        Number of records written.
+    """
+    count = 0
+    encode = json.JSONEncoder(ensure_ascii=False, indent=indent).encode
+    with _open_text(filename, compress) as f:
+        f.write("[")
+        for usc in uscs:
+            if count:
+                f.write(",")
+            f.write("\n")
+            f.write(encode(json_record(usc)))
+            count += 1
+        f.write("\n]\n")
+    return count
+
+
+def export_tle(
+    uscs: Iterable[USC],
+    filename: str,
+    compress: Optional[bool] = None,
+    three_line: bool = False,
+) -> int:
+    """
+    Writes the element sets of the USC objects as TLEs, or as 3LEs with a name line. Objects
+    without an element set or with values that do not fit the TLE format are skipped.
+    Objects are formatted TLE_CHUNK_SIZE at a time by tle.format_tles.
+
+    Returns:
+        Number of records written.
+    """
+    count = skipped = 0
+    uscs = iter(uscs)
+    with _open_text(filename, compress) as f:
+        while True:
+            chunk = list(islice(uscs, TLE_CHUNK_SIZE))
+            if not chunk:
+                break
+            text, written = format_tles(chunk, three_line)
+            f.write(text)
+            count += written
+            skipped += len(chunk) - written
+    if skipped:
+        print(
+            f"Skipped {skipped} objects that can not be written as TLEs to {filename}"
+        )
+    return count
+
+
+def export_3le(uscs: Iterable[USC], filename: str, **options) -> int:
+    return export_tle(uscs, filename, three_line=True, **options)
+
+
+def export_sqlite(
+    uscs: Iterable[USC], filename: str, table: str = DEFAULT_TABLE
+) -> int:
+    """
+    Writes the USC objects into a SQLite table with one column per EXPORT_COLUMNS entry.
+    An existing table of the same name is replaced. Rows are streamed into a single
+    executemany inside one transaction, and NORAD_CAT_ID is indexed afterwards.
+
+    Returns:
+        Number of records written.
+    """
+    if not table.isidentifier():
+        raise ValueError(f"Invalid table name: {table}")
+
+    columns = ", ".join(
+        f"{name} {_SQLITE_TYPES.get(_COLUMN_TYPES[name], 'TEXT')}"
+        for name in EXPORT_COLUMNS
+    )
+    insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(EXPORT_COLUMNS))})"
+
+    connection = sqlite3.connect(filename)
+    try:
+        # the file is rebuilt from scratch on failure, so skip the rollback journal
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        with connection:
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+            connection.execute(f"CREATE TABLE {table} ({columns})")
+            count = connection.executemany(insert, map(_flat_row, uscs)).rowcount
+            connection.execute(
+                f"CREATE INDEX {table}_norad_cat_id ON {table} (NORAD_CAT_ID)"
+            )
+    finally:
+        connection.close()
+    return count
+
+
+Exporter = Callable[..., int]
+
+EXPORTERS: Dict[str, Exporter] = {
+    "csv": export_csv,
+    "ndjson": export_ndjson,
+    "json": export_json,
+    "sqlite": export_sqlite,
+    "tle": export_tle,
+    "3le": export_3le,
+}
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".json": "json",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+    ".db": "sqlite",
+    ".tle": "tle",
+    ".3le": "3le",
+}
+
+
+def export_format(filename: str) -> str:
+    """
+    Returns the export format for a filename from its extension, ignoring a trailing `.gz`.
+
+    Raises:
+        ValueError: When the extension is not known.
+    """
+    base = filename[:-3] if filename.endswith(".gz") else filename
+    extension = os.path.splitext(base)[1].lower()
+    if extension not in _EXTENSIONS:
+        raise ValueError(f"Unknown export format for {filename}")
+    return _EXTENSIONS[extension]
+
+
+def export(
+    uscs: Iterable[USC], filename: str, format: Optional[str] = None, **options
+) -> int:
+    """
+    Exports with the exporter for `format`, or for the filename extension when None.
+
+    Returns:
+        Number of records written.
+    """
+    if format is None:
+        format = export_format(filename)
+    if format not in EXPORTERS:
+        raise ValueError(f"Unknown export format: {format}")
+    if format == "sqlite" and filename.endswith(".gz"):
+        raise ValueError("SQLite exports can not be gzip compressed")
+    return EXPORTERS[format](uscs, filename, **options)
@@ -0,0 +1,349 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from Spade.models import USC
+
+"""
+This file contains an append-only history store for element sets. Every refresh can be
+appended, only element sets that are not stored yet (by NORAD_CAT_ID and EPOCH) are written,
+so the store grows with the number of new element sets and not with the number of refreshes.
+
+Storage is a directory of segment files, one per append. Every segment holds its rows sorted
+by NORAD_CAT_ID and EPOCH as compressed columns:
+    - NORAD_CAT_ID and EPOCH are delta encoded integers, mostly small or zero.
+    - The mean elements are float64 bit patterns XORed with the previous row. Consecutive
+      element sets of an object share their high bits, so the XOR is mostly zero bytes.
+"""
+
+HISTORY_FIELDS = (
+    "MEAN_MOTION",
+    "ECCENTRICITY",
+    "INCLINATION",
+    "RA_OF_ASC_NODE",
+    "ARG_OF_PERIGEE",
+    "MEAN_ANOMALY",
+    "B_STAR",
+    "MEAN_MOTION_DOT",
+    "MEAN_MOTION_DDOT",
+    "ELEMENT_SET_NUM",
+    "REV_AT_EPOCH",
+)
+INTEGER_FIELDS = ("ELEMENT_SET_NUM", "REV_AT_EPOCH")
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".npz"
+
+_ALPHA5 = "ABCDEFGHJKLMNPQRSTUVWXYZ"  # I and O are not used
+
+
+def norad_number(norad_cat_id: str) -> int:
+    """
+    Converts a NORAD_CAT_ID to a number, including Alpha-5 ids like "A0001" (100001).
+    """
+    if norad_cat_id[:1].isalpha():
+        return (10 + _ALPHA5.index(norad_cat_id[0].upper())) * 10000 + int(
+            norad_cat_id[1:]
+        )
+    return int(norad_cat_id)
+
+
+@dataclass
+class ElementHistory:
+    """
+    Element sets of one object, oldest first.
+
+    Attributes:
+        norad_cat_id: The object.
+        epoch: datetime64[us] epochs.
+        columns: One array per name in HISTORY_FIELDS, NaN where the value was missing.
+    """
+
+    norad_cat_id: str
+    epoch: np.ndarray
+    columns: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.epoch)
+
+
+def _encode(norad: np.ndarray, epoch: np.ndarray, values: np.ndarray) -> Dict:
+    bits = values.view(np.uint64)
+    previous = np.zeros_like(bits)
+    previous[1:] = bits[:-1]
+    return {
+        "norad_delta": np.diff(norad, prepend=0),
+        "epoch_delta": np.diff(epoch, prepend=0),
+        "value_xor": bits ^ previous,
+    }
+
+
+def _search(
+    norad: np.ndarray, epoch: np.ndarray, find_norad: np.ndarray, find_epoch: np.ndarray
+) -> np.ndarray:
+    """
+    np.searchsorted (side="left") for rows sorted by NORAD_CAT_ID and then EPOCH. Finds the
+    rows of every NORAD_CAT_ID, then bisects their epochs for all searched rows at once.
+    """
+    low = np.searchsorted(norad, find_norad, side="left")
+    high = np.searchsorted(norad, find_norad, side="right")
+    while True:
+        active = low < high
+        if not active.any():
+            return low
+        middle = (low + high) // 2
+        below = active & (epoch[np.minimum(middle, len(epoch) - 1)] < find_epoch)
+        above = active & ~below
+        low[below] = middle[below] + 1
+        high[above] = middle[above]
+
+
+def _decode(segment) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    norad = np.cumsum(segment["norad_delta"])
+    epoch = np.cumsum(segment["epoch_delta"])
+    bits = np.bitwise_xor.accumulate(segment["value_xor"], axis=0)
+    return norad, epoch, bits.view(np.float64)
+
+
+class ElementHistoryStore:
+    """
+    Append-only element set history kept in a directory.
+
+    Opening the store loads every segment into memory as sorted columns, so queries are
+    binary searches.
+
+    Args:
+        path: Directory of the store, created when missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._norad = np.empty(0, dtype=np.int64)
+        self._epoch = np.empty(0, dtype=np.int64)  # microseconds since 1970
+        self._values = np.empty((0, len(HISTORY_FIELDS)), dtype=np.float64)
+        self._ids: Dict[int, str] = {}
+        self._designators: Dict[int, str] = {}
+        self._names: Dict[int, str] = {}
+
+        segments = [
+            self._read_segment(os.path.join(self.path, name))
+            for name in self._segment_files()
+        ]
+        if segments:
+            for *_, objects in segments:
+                self._add_objects(objects)
+            norad, epoch, values = (
+                np.concatenate([segment[k] for segment in segments]) for k in range(3)
+            )
+            # sorted once for all segments
+            order = np.lexsort((epoch, norad))
+            norad, epoch, values = norad[order], epoch[order], values[order]
+            # a compaction interrupted before it removed the old segments leaves every row
+            # twice, keep one row per NORAD_CAT_ID and EPOCH
+            first = np.ones(len(norad), dtype=bool)
+            first[1:] = (norad[1:] != norad[:-1]) | (epoch[1:] != epoch[:-1])
+            self._norad, self._epoch, self._values = (
+                norad[first],
+                epoch[first],
+                values[first],
+            )
+
+    def __len__(self) -> int:
+        return len(self._norad)
+
+    def _segment_files(self) -> List[str]:
+        return sorted(
+            name
+            for name in os.listdir(self.path)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _read_segment(self, filename: str):
+        with np.load(filename) as segment:
+            norad, epoch, values = _decode(segment)
+            objects = (
+                segment["object_norad"].tolist(),
+                segment["object_id"].tolist(),
+                segment["object_designator"].tolist(),
+                segment["object_name"].tolist(),
+            )
+        return norad, epoch, values, objects
+
+    # the objects tuple holds the numbers, ids, designators and names of a segment's objects
+    def _add_objects(self, objects):
+        for number, norad_cat_id, designator, name in zip(*objects):
+            self._ids[number] = norad_cat_id
+            self._designators[number] = designator
+            if name:
+                self._names[number] = name
+
+    def _stored(self, norad: np.ndarray, epoch: np.ndarray) -> np.ndarray:
+        """
+        Which of the rows are in the store already.
+        """
+        if not len(self._norad):
+            return np.zeros(len(norad), dtype=bool)
+        position = _search(self._norad, self._epoch, norad, epoch)
+        found = np.minimum(position, len(self._norad) - 1)
+        return (self._norad[found] == norad) & (self._epoch[found] == epoch)
+
+    def _merge(self, norad, epoch, values, objects):
+        """
+        Merges sorted rows that are not stored yet into the sorted store, in linear time.
+        """
+        self._add_objects(objects)
+        position = _search(self._norad, self._epoch, norad, epoch)
+        self._norad = np.insert(self._norad, position, norad)
+        self._epoch = np.insert(self._epoch, position, epoch)
+        self._values = np.insert(self._values, position, values, axis=0)
+
+    def append(self, catalog: Iterable[USC]) -> int:
+        """
+        Adds the element sets that are not in the store yet as a new segment.
+
+        Objects without NORAD_CAT_ID or EPOCH are skipped.
+
+        Returns:
+            Number of element sets written.
+        """
+        rows: Dict[Tuple[int, int], USC] = {}
+        for usc in catalog:
+            if usc.NORAD_CAT_ID is None or usc.EPOCH is None:
+                continue
+            key = (
+                norad_number(usc.NORAD_CAT_ID),
+                int(np.datetime64(usc.EPOCH, "us").astype(np.int64)),
+            )
+            rows[key] = usc
+        if not rows:
+            return 0
+
+        keys = sorted(rows)
+        norad = np.array([key[0] for key in keys], dtype=np.int64)
+        epoch = np.array([key[1] for key in keys], dtype=np.int64)
+        new = ~self._stored(norad, epoch)
+        if not new.any():
+            return 0
+        keys = [key for key, is_new in zip(keys, new.tolist()) if is_new]
+        norad, epoch = norad[new], epoch[new]
+        values = np.array(
+            [[getattr(rows[key], field) for field in HISTORY_FIELDS] for key in keys],
+            dtype=np.float64,
+        )
+
+        latest: Dict[int, USC] = {key[0]: rows[key] for key in keys}
+        objects = (
+            list(latest),
+            [usc.NORAD_CAT_ID for usc in latest.values()],
+            [usc.INTERNATIONAL_DESIGNATOR or "" for usc in latest.values()],
+            [usc.SATELLITE_NAME or "" for usc in latest.values()],
+        )
+        self._write_segment(norad, epoch, values, objects)
+        self._merge(norad, epoch, values, objects)
+        return len(keys)
+
+    def _write_segment(self, norad, epoch, values, objects, number=None):
+        if number is None:
+            existing = self._segment_files()
+            number = (
+                int(existing[-1][len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)]) + 1
+                if existing
+                else 1
+            )
+        filename = os.path.join(
+            self.path, f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+        )
+        temporary = filename + ".tmp"
+        with open(temporary, "wb") as f:
+            np.savez_compressed(
+                f,
+                object_norad=np.array(objects[0], dtype=np.int64),
+                object_id=np.array(objects[1], dtype=str),
+                object_designator=np.array(objects[2], dtype=str),
+                object_name=np.array(objects[3], dtype=str),
+                **_encode(norad, epoch, values),
+            )
+        os.replace(temporary, filename)
+
+    def compact(self):
+        """
+        Rewrites all segments as a single one. Compresses better than many small segments.
+
+        The new segment is complete on disk before the old ones are removed. When that is
+        interrupted the store still opens with every row once, the next compact cleans up.
+        """
+        old = self._segment_files()
+        if len(old) <= 1:
+            return
+        numbers = list(self._designators)
+        objects = (
+            numbers,
+            [self._ids[number] for number in numbers],
+            [self._designators[number] for number in numbers],
+            [self._names.get(number, "") for number in numbers],
+        )
+        last = int(old[-1][len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+        self._write_segment(self._norad, self._epoch, self._values, objects, last + 1)
+        for name in old:
+            os.remove(os.path.join(self.path, name))
+
+    def history(
+        self,
+        norad_cat_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> ElementHistory:
+        """
+        Returns the element sets of one object with start <= EPOCH <= end.
+        """
+        number = norad_number(norad_cat_id)
+        first = np.searchsorted(self._norad, number, side="left")
+        last = np.searchsorted(self._norad, number, side="right")
+        epochs = self._epoch[first:last]
+        if start is not None:
+            first += np.searchsorted(epochs, _microseconds(start), side="left")
+        if end is not None:
+            last = first + np.searchsorted(
+                self._epoch[first:last], _microseconds(end), side="right"
+            )
+        values = self._values[first:last]
+        return ElementHistory(
+            norad_cat_id=norad_cat_id,
+            epoch=self._epoch[first:last].astype("datetime64[us]"),
+            columns={field: values[:, k] for k, field in enumerate(HISTORY_FIELDS)},
+        )
+
+    def as_of(self, moment: datetime) -> List[USC]:
+        """
+        Returns the catalog as it was known at `moment`, the newest element set of every
+        object with EPOCH <= moment.
+        """
+        known = self._epoch <= _microseconds(moment)
+        # rows are sorted by object and epoch, so the last known row of an object is one
+        # whose next row is another object or not known yet
+        last = known.copy()
+        last[:-1] &= (self._norad[1:] != self._norad[:-1]) | ~known[1:]
+        return [self._to_usc(row) for row in np.flatnonzero(last).tolist()]
+
+    def _to_usc(self, row: int) -> USC:
+        number = int(self._norad[row])
+        fields = {}
+        for field, value in zip(HISTORY_FIELDS, self._values[row].tolist()):
+            if value != value:  # NaN
+                continue
+            fields[field] = int(value) if field in INTEGER_FIELDS else value
+        return USC(
+            INTERNATIONAL_DESIGNATOR=self._designators.get(number, ""),
+            SATELLITE_NAME=self._names.get(number),
+            NORAD_CAT_ID=self._ids[number],
+            EPOCH=np.datetime64(int(self._epoch[row]), "us").astype(datetime),
+            **fields,
+        )
+
+
+def _microseconds(moment: datetime) -> int:
+    return int(np.datetime64(moment, "us").astype(np.int64))
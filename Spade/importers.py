@@ -1,7 +1,14 @@
+import csv
+import gzip
 import json
+import os
+import re
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Optional, Any
+from typing import Callable, Iterator, List, Dict, Optional, Any, Tuple
 from Spade.models import USC
+from Spade.dedup import latest_epochs
+from Spade.quarantine import NotReplayable, Quarantine, iter_quarantine
+from Spade.tle import parse_tle
 from datetime import datetime, date
 
 from Spade.types import DiscosObjectList
@@ -66,12 +73,157 @@ user_defined_map = {
 }
 
 
+def iterXMLtoUSC(
+    filename: str,
+    item_location: str,
+    standard_map: Dict[str, str],
+    user_defined_map: Optional[Dict[str, str]] = user_defined_map,
+    user_defined_path: Optional[str] = "./data/userDefinedParameters",
+    quarantine: Optional[Quarantine] = None,
+) -> Iterator[USC]:
+    """
+    Streaming version of XMLtoUSC. Yields USC objects while the file is read and frees every
+    item once it is converted, so memory does not grow with the file size. Only a plain
+    child path like './body/segment' can be streamed, any other ElementTree XPath (e.g.
+    './/segment') reads the whole file first.
+
+    Args:
+        filename: Path to the XML file.
+        item_location: The XPath to find iterable elements (e.g., './body/segment').
+        standard_map: Maps USC attributes to their direct XPath from the item.
+        user_defined_map: Maps USC attributes to the 'parameter' attribute value
+                          in user-defined tags.
+        user_defined_path: The path from the item to the user-defined container tag.
+        quarantine: Where items that are not a valid USC go, with their index in the
+                    file. Without one they are counted and reported in one line.
+
+    Raises:
+        ET.ParseError: When the file is not valid XML, possibly after yielding some items.
+        ErrorRateExceeded: When the quarantine's max_error_rate is exceeded.
+    """
+    report = quarantine is None
+    if quarantine is None:
+        quarantine = Quarantine()
+    try:
+        yield from _iterXMLUSCs(
+            filename,
+            item_location,
+            standard_map,
+            user_defined_map,
+            user_defined_path,
+            quarantine,
+        )
+    finally:
+        if report:
+            quarantine.report(filename)
+
+
+_XML_TAG = re.compile(r"[A-Za-z_][\w.-]*")
+
+
+def _child_path(item_location: str) -> Optional[List[str]]:
+    """
+    Splits a plain child path like './omm/body/segment' into its tags. Returns None for
+    any other XPath, e.g. with '//', '*' or predicates.
+    """
+    parts = item_location.split("/")
+    if parts[0] == ".":
+        parts = parts[1:]
+    if not parts or not all(_XML_TAG.fullmatch(part) for part in parts):
+        return None
+    return parts
+
+
+def _xml_item_params(
+    item: ET.Element,
+    standard_map: Dict[str, str],
+    user_defined_map: Optional[Dict[str, str]],
+    user_defined_path: Optional[str],
+) -> Dict[str, Any]:
+    raw_params: Dict[str, Any] = {}
+
+    # 1. Process standard, path-based parameters
+    for usc_attr, xml_path in standard_map.items():
+        found = item.find(xml_path)
+        if found is not None:
+            # an empty element is None, like a blank CSV or JSON cell
+            raw_params[usc_attr] = (found.text or "").strip()
+
+    # 2. Process special user-defined parameters if maps are provided
+    if user_defined_map and user_defined_path:
+        for user_def_element in item.findall(f"{user_defined_path}/USER_DEFINED"):
+            param_key = user_def_element.get("parameter")
+            if param_key in user_defined_map:
+                usc_attr = user_defined_map[param_key]
+                raw_params[usc_attr] = (
+                    user_def_element.text.strip() if user_def_element.text else None
+                )
+    return raw_params
+
+
+def _iterXMLItems(filename: str, item_location: str) -> Iterator[ET.Element]:
+    """
+    Yields the elements at `item_location`. A plain child path is streamed with iterparse
+    and every item is cleared once the caller is done with it. Any other XPath is run with
+    findall on the whole parsed file.
+    """
+    item_path = _child_path(item_location)
+    if item_path is None:
+        yield from ET.parse(filename).getroot().findall(item_location)
+        return
+
+    path: List[str] = []
+    root = None
+    for event, element in ET.iterparse(filename, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            else:
+                path.append(element.tag)
+            continue
+
+        if path != item_path:
+            if path:
+                path.pop()
+            if len(path) == 0 and root is not None:
+                # Done with a top level element, drop what is left of it
+                root.clear()
+            continue
+        path.pop()
+        yield element
+        element.clear()
+
+
+def _iterXMLUSCs(
+    filename: str,
+    item_location: str,
+    standard_map: Dict[str, str],
+    user_defined_map: Optional[Dict[str, str]],
+    user_defined_path: Optional[str],
+    quarantine: Quarantine,
+) -> Iterator[USC]:
+    for index, item in enumerate(_iterXMLItems(filename, item_location)):
+        raw_params = _xml_item_params(
+            item, standard_map, user_defined_map, user_defined_path
+        )
+
+        # 3. Convert types and create the USC object
+        try:
+            typed_params = convert_types(raw_params)
+            usc = USC(**typed_params)
+        except (KeyError, TypeError, ValueError) as e:
+            quarantine.add(raw_params, e, index, filename)
+            continue
+        yield usc
+
+
 def XMLtoUSC(
     filename: str,
     item_location: str,
     standard_map: Dict[str, str],
     user_defined_map: Optional[Dict[str, str]] = user_defined_map,
     user_defined_path: Optional[str] = "./data/userDefinedParameters",
+    quarantine: Optional[Quarantine] = None,
 ) -> List[USC]:
     """
     Generic helper to parse an XML file into a list of USC objects based on maps.
@@ -83,119 +235,333 @@ def XMLtoUSC(
         user_defined_map: Maps USC attributes to the 'parameter' attribute value
                           in user-defined tags.
         user_defined_path: The path from the item to the user-defined container tag.
+        quarantine: Where items that are not a valid USC go, see iterXMLtoUSC.
 
     Returns:
         A list of populated USC objects.
+
+    Raises:
+        ErrorRateExceeded: When the quarantine's max_error_rate is exceeded.
     """
     try:
-        tree = ET.parse(filename)
-        root = tree.getroot()
+        return list(
+            iterXMLtoUSC(
+                filename,
+                item_location,
+                standard_map,
+                user_defined_map,
+                user_defined_path,
+                quarantine,
+            )
+        )
     except ET.ParseError as e:
         print(f"Error parsing XML file '{filename}': {e}")
         return []
 
-    usc_items: List[USC] = []
 
-    for item in root.findall(item_location):
-        raw_params: Dict[str, Any] = {}
+SPACE_TRACK_XML_MAP = {
+    "SATELLITE_NAME": "./metadata/OBJECT_NAME",
+    "INTERNATIONAL_DESIGNATOR": "./metadata/OBJECT_ID",
+    "CENTER_NAME": "./metadata/CENTER_NAME",
+    "TIME_SYSTEM": "./metadata/TIME_SYSTEM",
+    "MEAN_ELEMENT_THEORY": "./metadata/MEAN_ELEMENT_THEORY",
+    "EPOCH": "./data/meanElements/EPOCH",
+    "MEAN_MOTION": "./data/meanElements/MEAN_MOTION",
+    "ECCENTRICITY": "./data/meanElements/ECCENTRICITY",
+    "INCLINATION": "./data/meanElements/INCLINATION",
+    "RA_OF_ASC_NODE": "./data/meanElements/RA_OF_ASC_NODE",
+    "ARG_OF_PERIGEE": "./data/meanElements/ARG_OF_PERICENTER",
+    "MEAN_ANOMALY": "./data/meanElements/MEAN_ANOMALY",
+    "EPHEMERIS_TYPE": "./data/tleParameters/EPHEMERIS_TYPE",
+    "CLASSIFICATION": "./data/tleParameters/CLASSIFICATION_TYPE",
+    "NORAD_CAT_ID": "./data/tleParameters/NORAD_CAT_ID",
+    "ELEMENT_SET_NUM": "./data/tleParameters/ELEMENT_SET_NO",
+    "REV_AT_EPOCH": "./data/tleParameters/REV_AT_EPOCH",
+    "B_STAR": "./data/tleParameters/BSTAR",
+    "MEAN_MOTION_DOT": "./data/tleParameters/MEAN_MOTION_DOT",
+    "MEAN_MOTION_DDOT": "./data/tleParameters/MEAN_MOTION_DDOT",
+}
 
-        # 1. Process standard, path-based parameters
-        for usc_attr, xml_path in standard_map.items():
-            element = item.find(xml_path)
-            if element is not None and element.text is not None:
-                raw_params[usc_attr] = element.text.strip()
-
-        # 2. Process special user-defined parameters if maps are provided
-        if user_defined_map and user_defined_path:
-            for user_def_element in item.findall(f"{user_defined_path}/USER_DEFINED"):
-                param_key = user_def_element.get("parameter")
-                if param_key in user_defined_map:
-                    usc_attr = user_defined_map[param_key]
-                    raw_params[usc_attr] = (
-                        user_def_element.text.strip() if user_def_element.text else None
-                    )
 
-        # 3. Convert types and create the USC object
-        try:
-            typed_params = convert_types(raw_params)
-            usc_items.append(USC(**typed_params))
-        except (KeyError, TypeError, ValueError) as e:
-            norad_id = raw_params.get("NORAD_CAT_ID", "UNKNOWN")
-            print(
-                f"Could not create USC for NORAD ID {norad_id}. "
-                f"Missing data or type error: {e}"
-            )
-
-    return usc_items
+def iterSpaceTrackXML(
+    filename: str, quarantine: Optional[Quarantine] = None
+) -> Iterator[USC]:
+    """
+    Streams the USC objects of a Space-Track.org OMM XML file, in file order.
+    """
+    return iterXMLtoUSC(
+        filename, "./omm/body/segment", SPACE_TRACK_XML_MAP, quarantine=quarantine
+    )
 
 
-def spaceTrackXML(filename):
+def spaceTrackXML(
+    filename, keep_epochs: Optional[int] = None, quarantine: Optional[Quarantine] = None
+):
     """
     Parses a Space-Track.org OMM XML file and returns a list of USC objects.
 
     Args:
         filename: The path to the XML file.
+        keep_epochs: Only keep the newest this many element sets per NORAD_CAT_ID. The
+                     file must be ordered by NORAD_CAT_ID and EPOCH like the `gp` query
+                     in Settings.SPACE_TRACKER_FULL_CATLOG. None keeps every element set.
+        quarantine: Where segments that are not a valid USC go, see iterXMLtoUSC.
 
     Returns:
         A list of USC objects, each populated with data for a single satellite.
     """
+    if keep_epochs is None:
+        return XMLtoUSC(
+            filename, "./omm/body/segment", SPACE_TRACK_XML_MAP, quarantine=quarantine
+        )
 
-    XML_TO_USC_MAP = {
-        "SATELLITE_NAME": "./metadata/OBJECT_NAME",
-        "INTERNATIONAL_DESIGNATOR": "./metadata/OBJECT_ID",
-        "CENTER_NAME": "./metadata/CENTER_NAME",
-        "TIME_SYSTEM": "./metadata/TIME_SYSTEM",
-        "MEAN_ELEMENT_THEORY": "./metadata/MEAN_ELEMENT_THEORY",
-        "EPOCH": "./data/meanElements/EPOCH",
-        "MEAN_MOTION": "./data/meanElements/MEAN_MOTION",
-        "ECCENTRICITY": "./data/meanElements/ECCENTRICITY",
-        "INCLINATION": "./data/meanElements/INCLINATION",
-        "RA_OF_ASC_NODE": "./data/meanElements/RA_OF_ASC_NODE",
-        "ARG_OF_PERIGEE": "./data/meanElements/ARG_OF_PERICENTER",
-        "MEAN_ANOMALY": "./data/meanElements/MEAN_ANOMALY",
-        "EPHEMERIS_TYPE": "./data/tleParameters/EPHEMERIS_TYPE",
-        "CLASSIFICATION": "./data/tleParameters/CLASSIFICATION_TYPE",
-        "NORAD_CAT_ID": "./data/tleParameters/NORAD_CAT_ID",
-        "ELEMENT_SET_NUM": "./data/tleParameters/ELEMENT_SET_NO",
-        "REV_AT_EPOCH": "./data/tleParameters/REV_AT_EPOCH",
-        "B_STAR": "./data/tleParameters/BSTAR",
-        "MEAN_MOTION_DOT": "./data/tleParameters/MEAN_MOTION_DOT",
-        "MEAN_MOTION_DDOT": "./data/tleParameters/MEAN_MOTION_DDOT",
-    }
+    try:
+        return list(latest_epochs(iterSpaceTrackXML(filename, quarantine), keep_epochs))
+    except ET.ParseError as e:
+        print(f"Error parsing XML file '{filename}': {e}")
+        return []
+
+
+# Space-Track's CSV and JSON `gp` output use the leaf tag names of the XML as column names
+SPACE_TRACK_OMM_COLUMNS: Dict[str, str] = {
+    **{path.rsplit("/", 1)[1]: attr for attr, path in SPACE_TRACK_XML_MAP.items()},
+    **user_defined_map,
+}
+
+# The same conversions convert_types does, looked up once per column instead of per value
+_OMM_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    **dict.fromkeys(
+        (
+            "MEAN_MOTION_DOT",
+            "MEAN_MOTION_DDOT",
+            "B_STAR",
+            "INCLINATION",
+            "RA_OF_ASC_NODE",
+            "ECCENTRICITY",
+            "ARG_OF_PERIGEE",
+            "MEAN_ANOMALY",
+            "MEAN_MOTION",
+            "SEMIMAJOR_AXIS",
+            "PERIOD",
+            "APOAPSIS",
+            "PERIAPSIS",
+        ),
+        float,
+    ),
+    **dict.fromkeys(("ELEMENT_SET_NUM", "REV_AT_EPOCH", "EPHEMERIS_TYPE"), int),
+    "EPOCH": datetime.fromisoformat,
+    "LAUNCH_DATE": date.fromisoformat,
+    "DECAY_DATE": date.fromisoformat,
+}
+
+OmmConverter = List[Tuple[Any, str, Optional[Callable[[Any], Any]]]]
+
+
+def omm_converter(columns: List[Any], names: List[str]) -> OmmConverter:
+    """
+    Builds the converter table of one CSV header or JSON record layout: the column (an index
+    or a key), the USC field and the conversion of every column that maps to a USC field.
+
+    Args:
+        columns: How each column is looked up in a row, e.g. its index.
+        names: The Space-Track column names, in the same order as columns.
+    """
+    return [
+        (
+            column,
+            SPACE_TRACK_OMM_COLUMNS[name],
+            _OMM_CONVERTERS.get(SPACE_TRACK_OMM_COLUMNS[name]),
+        )
+        for column, name in zip(columns, names)
+        if name in SPACE_TRACK_OMM_COLUMNS
+    ]
+
+
+def _omm_row_to_usc(
+    row: Any, converter: OmmConverter, quarantine: Quarantine, index: int, source: str
+) -> Optional[USC]:
+    typed_params: Dict[str, Any] = {}
+    try:
+        for column, usc_attr, convert in converter:
+            value = row[column]
+            if isinstance(value, str):
+                value = value.strip()
+            # blank cells are None like blank XML elements in convert_types
+            if value is None or value == "":
+                typed_params[usc_attr] = None
+            else:
+                typed_params[usc_attr] = value if convert is None else convert(value)
+        return USC(**typed_params)
+    except (KeyError, TypeError, ValueError) as e:
+        # quarantined by USC field, so it can be replayed like an XML segment
+        raw = {usc_attr: row[column] for column, usc_attr, _ in converter}
+        quarantine.add(raw, e, index, source)
+        return None
+
+
+def iterSpaceTrackCSV(
+    filename: str, quarantine: Optional[Quarantine] = None
+) -> Iterator[USC]:
+    """
+    Streams the USC objects of a Space-Track.org `gp` query with `format/csv`, in file
+    order. Gives the same objects as iterSpaceTrackXML on the XML of the same query.
 
-    return XMLtoUSC(filename, "./omm/body/segment", XML_TO_USC_MAP)
+    Args:
+        filename: The path to the CSV file.
+        quarantine: Where rows that are not a valid USC go, with their index after the
+                    header. Without one they are counted and reported in one line.
+    """
+    report = quarantine is None
+    if quarantine is None:
+        quarantine = Quarantine()
+    try:
+        with open(filename, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            converter = omm_converter(list(range(len(header))), header)
+            for index, row in enumerate(reader):
+                if len(row) != len(header):
+                    error = ValueError(
+                        f"Row has {len(row)} columns, the header has {len(header)}"
+                    )
+                    # by USC field like every other record, so it can be fixed and
+                    # replayed. Cells past the header are dropped, missing ones are None
+                    raw = {
+                        usc_attr: row[column] if column < len(row) else None
+                        for column, usc_attr, _ in converter
+                    }
+                    quarantine.add(raw, error, index, filename)
+                    continue
+                usc = _omm_row_to_usc(row, converter, quarantine, index, filename)
+                if usc is not None:
+                    yield usc
+    finally:
+        if report:
+            quarantine.report(filename)
+
+
+def iterSpaceTrackJSON(
+    filename: str, quarantine: Optional[Quarantine] = None
+) -> Iterator[USC]:
+    """
+    Yields the USC objects of a Space-Track.org `gp` query with `format/json`, in file
+    order. Gives the same objects as iterSpaceTrackXML on the XML of the same query.
+
+    Args:
+        filename: The path to the JSON file.
+        quarantine: Where records that are not a valid USC go, with their index in the
+                    list. Without one they are counted and reported in one line.
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if not isinstance(data, list):
+        raise TypeError("JSON file content must be a list of objects.")
+
+    report = quarantine is None
+    if quarantine is None:
+        quarantine = Quarantine()
+    converter: OmmConverter = []
+    layout: Optional[Tuple[str, ...]] = None
+    try:
+        for index, item in enumerate(data):
+            keys = tuple(item)
+            if keys != layout:
+                # Space-Track writes every record with the same keys, so this runs once
+                layout = keys
+                converter = omm_converter(list(keys), list(keys))
+            usc = _omm_row_to_usc(item, converter, quarantine, index, filename)
+            if usc is not None:
+                yield usc
+    finally:
+        if report:
+            quarantine.report(filename)
+
+
+_SPACE_TRACK_IMPORTERS: Dict[
+    str, Callable[[str, Optional[Quarantine]], Iterator[USC]]
+] = {
+    ".csv": iterSpaceTrackCSV,
+    ".json": iterSpaceTrackJSON,
+}
 
 
-def jsonToUSC(filename: str, attribute_map: Dict[str, str]) -> List[USC]:
+def parseSpaceTrack(
+    filename: str,
+    keep_epochs: Optional[int] = None,
+    quarantine: Optional[Quarantine] = None,
+) -> List[USC]:
+    """
+    Parses a Space-Track.org `gp` download in any of the formats fetch_full_catlog_ST
+    saves, picked by the file extension: `.XML`, `.csv` or `.json`.
+
+    Args:
+        filename: The path to the file.
+        keep_epochs: Only keep the newest this many element sets per NORAD_CAT_ID, see
+                     spaceTrackXML. None keeps every element set.
+        quarantine: Where records that are not a valid USC go. Without one they are
+                    counted and reported in one line.
+
+    Returns:
+        A list of USC objects, each populated with data for a single satellite.
+
+    Raises:
+        ErrorRateExceeded: When the quarantine's max_error_rate is exceeded.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".xml":
+        return spaceTrackXML(filename, keep_epochs, quarantine)
+    if extension not in _SPACE_TRACK_IMPORTERS:
+        raise ValueError(f"Unknown Space-Track file format: {filename}")
+
+    uscs = _SPACE_TRACK_IMPORTERS[extension](filename, quarantine)
+    if keep_epochs is not None:
+        uscs = latest_epochs(uscs, keep_epochs)
+    return list(uscs)
+
+
+def jsonToUSC(
+    filename: str,
+    attribute_map: Dict[str, str],
+    quarantine: Optional[Quarantine] = None,
+    id_field: Optional[str] = None,
+) -> List[USC]:
     with open(filename, "r") as f:
         data: DiscosObjectList = json.load(f)
 
     if not isinstance(data, list):
         raise TypeError("JSON file content must be a list of objects.")
 
+    report = quarantine is None
+    if quarantine is None:
+        quarantine = Quarantine()
     usc_items: List[USC] = []
 
-    for item in data:
+    for index, item in enumerate(data):
         raw_params: Dict[str, Any] = {}
         attributes = item["attributes"]
         for usc_key, json_key in attribute_map.items():
             if json_key in attributes:
                 raw_params[usc_key] = attributes[json_key]
+        if id_field is not None and item.get("id") is not None:
+            raw_params[id_field] = str(item["id"])
 
         try:
             typed_params = convert_types(raw_params)
             usc_items.append(USC(**typed_params))
         except (KeyError, TypeError, ValueError) as e:
-            norad_id = raw_params.get("NORAD_CAT_ID", "UNKNOWN")
-            print(
-                f"Could not create USC for NORAD ID {norad_id}. "
-                f"Missing data or type error: {e}"
-            )
+            quarantine.add(raw_params, e, index, filename)
 
+    if report:
+        quarantine.report(filename)
     return usc_items
 
 
-def parseDISCOSJSON(filename: str) -> List[USC]:
+def parseDISCOSJSON(
+    filename: str, quarantine: Optional[Quarantine] = None
+) -> List[USC]:
     JSON_To_USC_Map = {
         "SATELLITE_NAME": "name",
         "INTERNATIONAL_DESIGNATOR": "cosparId",
@@ -213,4 +579,62 @@ def parseDISCOSJSON(filename: str) -> List[USC]:
         "MISSION_DESC": "mission",
     }
 
-    return jsonToUSC(filename, JSON_To_USC_Map)
+    return jsonToUSC(filename, JSON_To_USC_Map, quarantine, id_field="DISCOS_ID")
+
+
+def iterNDJSONtoUSC(filename: str) -> Iterator[USC]:
+    """
+    Reads a newline delimited JSON export written by exporters.export_ndjson, one USC per
+    line. Files ending in `.gz` are decompressed while reading.
+    """
+    opener = gzip.open if filename.endswith(".gz") else open
+    with opener(filename, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield USC(**convert_types(json.loads(line)))
+
+
+def iterTLEtoUSC(filename: str) -> Iterator[USC]:
+    """
+    Reads a TLE or 3LE file, e.g. one written by exporters.export_tle, one USC per element
+    set. Files ending in `.gz` are decompressed while reading.
+
+    Raises:
+        ValueError: On a malformed line or bad checksum.
+    """
+    opener = gzip.open if filename.endswith(".gz") else open
+    with opener(filename, "rt", encoding="utf-8") as f:
+        yield from parse_tle(f)
+
+
+def replayQuarantine(
+    filename: str, quarantine: Optional[Quarantine] = None
+) -> Iterator[USC]:
+    """
+    Imports the records a Quarantine wrote to `filename` again, e.g. after fixing them or
+    convert_types, without parsing the files they came from.
+
+    Args:
+        filename: The NDJSON file of the quarantine.
+        quarantine: Where records that still fail go, with their original source and
+                    offset. Records that are not a dict of USC fields go there as
+                    NotReplayable. Without one they are counted and reported in one line.
+    """
+    report = quarantine is None
+    if quarantine is None:
+        quarantine = Quarantine()
+    try:
+        for record in iter_quarantine(filename):
+            if not isinstance(record.raw, dict):
+                error = NotReplayable(
+                    f"{type(record.raw).__name__} record is not keyed by USC field"
+                )
+                quarantine.add(record.raw, error, record.offset, record.source)
+                continue
+            try:
+                yield USC(**convert_types(record.raw))
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                quarantine.add(record.raw, e, record.offset, record.source)
+    finally:
+        if report:
+            quarantine.report(filename)
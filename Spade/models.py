@@ -85,6 +85,7 @@ class USC:
     MISSION_DESC: Optional[str] = (
         None  # Mission Description (e.g 	Amateur Technology, Defense Technology	)
     )
+    DISCOS_ID: Optional[str] = None  # ESA DISCOS object id
     # General Import Data
     SOURCES: List[str] = field(
         default_factory=list
@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+from math import pi
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from Spade.models import USC
+
+"""
+This file contains a batch stage that computes SEMIMAJOR_AXIS, PERIOD, APOAPSIS and PERIAPSIS
+from MEAN_MOTION and ECCENTRICITY for a whole catalog at once. Space-Track only sends these as
+USER_DEFINED parameters, so DISCOS-only and merged records are often missing them.
+"""
+
+EARTH_MU = (
+    398600.4418  # km^3/s^2, same constant Space-Track uses for USER_DEFINED values
+)
+EARTH_RADIUS = 6378.135  # km
+
+DERIVED_FIELDS = ("SEMIMAJOR_AXIS", "PERIOD", "APOAPSIS", "PERIAPSIS")
+
+# Space-Track rounds the supplied values to 3 decimals, anything past these is a real mismatch
+DEFAULT_TOLERANCES = {
+    "SEMIMAJOR_AXIS": 0.5,  # km
+    "PERIOD": 0.01,  # minutes
+    "APOAPSIS": 0.5,  # km
+    "PERIAPSIS": 0.5,  # km
+}
+
+
+@dataclass
+class DerivedParameterMismatch:
+    """
+    A supplied derived value that disagrees with the one recomputed from the mean elements.
+
+    Attributes:
+        index: Position of the object in the catalog.
+        norad_cat_id: NORAD_CAT_ID of the object.
+        field: Name of the USC field that disagrees.
+        supplied: Value the object carried.
+        computed: Value recomputed from MEAN_MOTION and ECCENTRICITY.
+    """
+
+    index: int
+    norad_cat_id: Optional[str]
+    field: str
+    supplied: float
+    computed: float
+
+    @property
+    def difference(self) -> float:
+        return self.supplied - self.computed
+
+
+def compute_derived_parameters(
+    mean_motion: np.ndarray, eccentricity: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Computes the derived parameters for arrays of mean elements.
+
+    Args:
+        mean_motion: Mean motion in revolutions per day.
+        eccentricity: Eccentricity, same shape as mean_motion.
+
+    Returns:
+        {field name: array} for every name in DERIVED_FIELDS. Rows with a mean motion that
+        is not positive get NaN.
+    """
+    mean_motion = np.asarray(mean_motion, dtype=np.float64)
+    eccentricity = np.asarray(eccentricity, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_motion = np.where(mean_motion > 0.0, mean_motion, np.nan)
+        n_rad_s = mean_motion * (2.0 * pi / 86400.0)
+        semimajor_axis = np.cbrt(EARTH_MU / (n_rad_s * n_rad_s))
+        return {
+            "SEMIMAJOR_AXIS": semimajor_axis,
+            "PERIOD": 1440.0 / mean_motion,
+            "APOAPSIS": semimajor_axis * (1.0 + eccentricity) - EARTH_RADIUS,
+            "PERIAPSIS": semimajor_axis * (1.0 - eccentricity) - EARTH_RADIUS,
+        }
+
+
+def _columns(catalog: Sequence[USC]) -> np.ndarray:
+    """
+    Reads MEAN_MOTION, ECCENTRICITY and the DERIVED_FIELDS of every object in a single pass.
+
+    Returns:
+        Array of shape (6, len(catalog)), None becomes NaN.
+    """
+    rows = [
+        (
+            usc.MEAN_MOTION,
+            usc.ECCENTRICITY,
+            usc.SEMIMAJOR_AXIS,
+            usc.PERIOD,
+            usc.APOAPSIS,
+            usc.PERIAPSIS,
+        )
+        for usc in catalog
+    ]
+    return np.array(rows, dtype=np.float64).reshape(len(rows), 6).T
+
+
+def fill_derived_parameters(
+    catalog: Sequence[USC],
+    tolerances: Optional[Dict[str, float]] = None,
+) -> List[DerivedParameterMismatch]:
+    """
+    Fills missing derived parameters on every object in place and validates the ones
+    that were supplied.
+
+    Objects without MEAN_MOTION or ECCENTRICITY are left untouched and not validated, even
+    though SEMIMAJOR_AXIS and PERIOD only need the mean motion. Supplied values are never
+    overwritten, the ones that disagree with the recomputed value are returned instead.
+
+    Args:
+        catalog: The USC objects to fill.
+        tolerances: Allowed absolute difference per field, defaults to DEFAULT_TOLERANCES.
+
+    Returns:
+        One DerivedParameterMismatch per supplied value outside its tolerance.
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    mean_motion, eccentricity, *supplied_columns = _columns(catalog)
+    computed = compute_derived_parameters(mean_motion, eccentricity)
+    elements = ~np.isnan(mean_motion) & ~np.isnan(eccentricity)
+
+    mismatches: List[DerivedParameterMismatch] = []
+    for name, supplied in zip(DERIVED_FIELDS, supplied_columns):
+        values = computed[name]
+        known = elements & ~np.isnan(values)
+
+        missing = np.flatnonzero(np.isnan(supplied) & known)
+        for row, value in zip(missing.tolist(), values[missing].tolist()):
+            setattr(catalog[row], name, value)
+
+        wrong = known & (np.abs(supplied - values) > tolerances[name])
+        for row in np.flatnonzero(wrong):
+            mismatches.append(
+                DerivedParameterMismatch(
+                    index=int(row),
+                    norad_cat_id=catalog[row].NORAD_CAT_ID,
+                    field=name,
+                    supplied=float(supplied[row]),
+                    computed=float(values[row]),
+                )
+            )
+
+    mismatches.sort(key=lambda mismatch: mismatch.index)
+    return mismatches
@@ -0,0 +1,360 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set
+from typing import Tuple
+
+from requests import Session
+
+from Spade.search import reconcile
+from Spade.snapshots import (
+    DEFAULT_KEEP_SNAPSHOTS,
+    DEFAULT_SNAPSHOT_FORMATS,
+    SnapshotWriter,
+)
+
+if TYPE_CHECKING:
+    from Spade.scheduler import SourceSchedule
+
+"""
+This file contains a refresh orchestrator that runs the sources of a refresh at the same
+time instead of one after another. A refresh is a graph of stages:
+
+    fetch:space-track -> parse:space-track -> export:space-track --+
+                                           \\                       +-> publish
+                                            +-> reconcile          |
+                                           /                       |
+    fetch:discos      -> parse:discos      -> export:discos -------+
+
+Every stage runs on a thread as soon as the stages it depends on finished, so the
+Space-Track download and the DISCOS pagination overlap and a source is exported while the
+other one is still downloading. A refresh takes about as long as its slowest source
+instead of the sum of all of them. Downloads wait on the network without holding the GIL;
+parsing holds it, but still overlaps the downloads of the other sources.
+
+run_stages returns a RefreshReport with the start and end of every stage and the critical
+path, the chain of stages that decided when a stage could finish.
+
+Usage:
+    report = refresh_all(settings, default_sources(), snapshot_dir="snapshots/")
+    print(report.summary())
+"""
+
+
+class StageFailed(Exception):
+    """
+    Raised by a stage whose step returned no result, e.g. a fetch that returned None.
+    """
+
+
+@dataclass
+class Stage:
+    """
+    One step of a refresh.
+
+    Attributes:
+        name: Unique name, e.g. "fetch:discos".
+        run: Called with the results of the stages in `after`, by name.
+        after: Names of the stages that must finish first.
+        source: Source the stage belongs to, None for stages combining sources.
+    """
+
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    after: Tuple[str, ...] = ()
+    source: Optional[str] = None
+
+
+@dataclass
+class StageResult:
+    """
+    What happened to one stage. Times are seconds since the start of the refresh.
+    """
+
+    name: str
+    after: Tuple[str, ...]
+    source: Optional[str]
+    started: float = 0.0
+    finished: float = 0.0
+    value: Any = None
+    error: Optional[BaseException] = None
+    skipped: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.skipped
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+
+@dataclass
+class RefreshReport:
+    stages: Dict[str, StageResult] = field(default_factory=dict)
+    wall_time: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self.stages.values())
+
+    def value(self, name: str) -> Any:
+        return self.stages[name].value
+
+    def critical_path(self, name: Optional[str] = None) -> List[StageResult]:
+        """
+        The chain of stages ending in `name` (by default the stage that finished last)
+        where each stage waited for the previous one, first stage first. Making any of
+        them faster makes `name` finish earlier.
+        """
+        ran = [result for result in self.stages.values() if not result.skipped]
+        if name is None:
+            if not ran:
+                return []
+            name = max(ran, key=lambda result: result.finished).name
+
+        path: List[StageResult] = []
+        result: Optional[StageResult] = self.stages[name]
+        while result is not None:
+            path.append(result)
+            waited_for = [
+                self.stages[dependency]
+                for dependency in result.after
+                if not self.stages[dependency].skipped
+            ]
+            result = max(waited_for, key=lambda r: r.finished, default=None)
+        path.reverse()
+        return path
+
+    def source_critical_paths(self) -> Dict[str, List[StageResult]]:
+        """
+        The critical path of the last stage of every source.
+        """
+        last: Dict[str, StageResult] = {}
+        for result in self.stages.values():
+            if result.source is None or result.skipped:
+                continue
+            if (
+                result.source not in last
+                or result.finished > last[result.source].finished
+            ):
+                last[result.source] = result
+        return {
+            source: self.critical_path(result.name) for source, result in last.items()
+        }
+
+    def summary(self) -> str:
+        """
+        A table of every stage followed by the critical paths, for logging.
+        """
+        lines = [f"Refresh took {self.wall_time:.2f}s"]
+        for result in sorted(self.stages.values(), key=lambda r: r.started):
+            if result.skipped:
+                status = "skipped"
+            elif result.error is not None:
+                status = f"failed: {result.error}"
+            else:
+                status = "ok"
+            lines.append(
+                f"  {result.name:<24} {result.started:8.2f}s {result.duration:8.2f}s"
+                f"  {status}"
+            )
+
+        def describe(path: List[StageResult]) -> str:
+            return " -> ".join(f"{r.name} ({r.duration:.2f}s)" for r in path)
+
+        for source, path in self.source_critical_paths().items():
+            lines.append(f"Critical path of {source}: {describe(path)}")
+        lines.append(f"Critical path: {describe(self.critical_path())}")
+        return "\n".join(lines)
+
+
+def _check_stages(stages: Dict[str, Stage]):
+    for stage in stages.values():
+        for dependency in stage.after:
+            if dependency not in stages:
+                raise ValueError(f"{stage.name} depends on unknown stage {dependency}")
+
+    # Kahn's algorithm, stages left over are part of a cycle
+    remaining = {name: set(stage.after) for name, stage in stages.items()}
+    while True:
+        done = [name for name, after in remaining.items() if not after]
+        if not done:
+            break
+        for name in done:
+            del remaining[name]
+        for after in remaining.values():
+            after.difference_update(done)
+    if remaining:
+        raise ValueError(f"Stages depend on each other: {sorted(remaining)}")
+
+
+def run_stages(
+    stages: Iterable[Stage], max_workers: Optional[int] = None
+) -> RefreshReport:
+    """
+    Runs every stage once, each as soon as the stages it depends on finished.
+
+    A stage that raises fails, and every stage depending on it is skipped. The other stages
+    still run.
+
+    Args:
+        stages: The stages, in any order.
+        max_workers: Number of threads, defaults to one per stage.
+
+    Returns:
+        A RefreshReport with the result of every stage.
+
+    Raises:
+        ValueError: When a stage depends on an unknown stage or the stages form a cycle.
+    """
+    by_name: Dict[str, Stage] = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Duplicate stage {stage.name}")
+        by_name[stage.name] = stage
+    _check_stages(by_name)
+
+    report = RefreshReport(
+        {
+            name: StageResult(name, stage.after, stage.source)
+            for name, stage in by_name.items()
+        }
+    )
+    if not by_name:
+        return report
+
+    start = time.monotonic()
+    waiting = dict(by_name)
+    running: Dict[Future, str] = {}
+    done: Set[str] = set()
+
+    def run(stage: Stage, inputs: Dict[str, Any]) -> Any:
+        report.stages[stage.name].started = time.monotonic() - start
+        try:
+            return stage.run(inputs)
+        finally:
+            report.stages[stage.name].finished = time.monotonic() - start
+
+    with ThreadPoolExecutor(max_workers or len(by_name)) as executor:
+        while waiting or running:
+            for name, stage in list(waiting.items()):
+                if not all(dependency in done for dependency in stage.after):
+                    continue
+                del waiting[name]
+                results = [report.stages[dependency] for dependency in stage.after]
+                if all(result.ok for result in results):
+                    inputs = {result.name: result.value for result in results}
+                    running[executor.submit(run, stage, inputs)] = name
+                else:
+                    report.stages[name].skipped = True
+                    done.add(name)
+            if not running:
+                # only skips happened, their dependents are checked on the next pass
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    report.stages[name].value = future.result()
+                except Exception as e:
+                    report.stages[name].error = e
+                done.add(name)
+
+    report.wall_time = time.monotonic() - start
+    return report
+
+
+def refresh_stages(
+    settings,
+    sources: Iterable["SourceSchedule"],
+    sessions: Optional[Dict[str, Session]] = None,
+    writer: Optional[SnapshotWriter] = None,
+    keep: int = DEFAULT_KEEP_SNAPSHOTS,
+) -> List[Stage]:
+    """
+    Builds the stages of a refresh of every source.
+
+    Every source gets a fetch and a parse stage, and an export stage when a writer is given.
+    With a writer a publish stage publishes the snapshot once every source is exported.
+    When both "space-track" and "discos" are refreshed a reconcile stage matches the DISCOS
+    objects to the Space-Track catalog with search.reconcile.
+
+    Args:
+        settings: Settings passed to every fetch.
+        sources: How to fetch and parse each source, e.g. scheduler.default_sources().
+        sessions: Session of each source by name, a new one for sources without.
+        writer: Snapshot the catalogs are exported to, nothing is exported when None.
+        keep: Number of snapshots kept after publishing.
+    """
+    sessions = sessions if sessions is not None else {}
+    stages: List[Stage] = []
+    names = []
+    for source in sources:
+        name = source.name
+        names.append(name)
+        session = sessions.setdefault(name, Session())
+
+        def fetch(inputs, source=source, session=session):
+            filename = source.fetch(settings, session)
+            if filename is None:
+                raise StageFailed(f"Fetching {source.name} failed")
+            return filename
+
+        def parse(inputs, source=source):
+            return source.parse(inputs[f"fetch:{source.name}"])
+
+        stages.append(Stage(f"fetch:{name}", fetch, source=name))
+        stages.append(Stage(f"parse:{name}", parse, (f"fetch:{name}",), name))
+        if writer is not None:
+            stages.append(
+                Stage(
+                    f"export:{name}",
+                    lambda inputs, name=name: writer.add(name, inputs[f"parse:{name}"]),
+                    (f"parse:{name}",),
+                    name,
+                )
+            )
+
+    if "space-track" in names and "discos" in names:
+        stages.append(
+            Stage(
+                "reconcile",
+                lambda inputs: reconcile(
+                    inputs["parse:discos"], inputs["parse:space-track"]
+                ),
+                ("parse:discos", "parse:space-track"),
+            )
+        )
+    if writer is not None:
+        stages.append(
+            Stage(
+                "publish",
+                lambda inputs: writer.publish(keep),
+                tuple(f"export:{name}" for name in names),
+            )
+        )
+    return stages
+
+
+def refresh_all(
+    settings,
+    sources: Iterable["SourceSchedule"],
+    sessions: Optional[Dict[str, Session]] = None,
+    snapshot_dir: Optional[str] = None,
+    formats: Iterable[str] = DEFAULT_SNAPSHOT_FORMATS,
+    keep: int = DEFAULT_KEEP_SNAPSHOTS,
+) -> RefreshReport:
+    """
+    Refreshes every source at once and, with a snapshot_dir, publishes a snapshot of them.
+    A snapshot is only published when every source was exported.
+
+    Returns:
+        The RefreshReport, e.g. report.value("parse:discos") is the DISCOS catalog.
+    """
+    writer = SnapshotWriter(snapshot_dir, formats) if snapshot_dir is not None else None
+    report = run_stages(refresh_stages(settings, sources, sessions, writer, keep))
+    if writer is not None and not report.stages["publish"].ok:
+        writer.discard()
+    return report
@@ -0,0 +1,397 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from math import ceil, log2
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Spade.models import USC
+from Spade.orbit_parameters import EARTH_RADIUS, compute_derived_parameters
+from Spade.propagation import (
+    DEFAULT_CHUNK_ELEMENTS,
+    ERROR_NONE,
+    JD_SGP4_EPOCH_ORIGIN,
+    SGP4_EPOCH_ORIGIN,
+    OrbitalElements,
+    gstime,
+    propagate_chunk,
+    propagate_rows,
+)
+
+"""
+This file contains a batch pass predictor. It finds when catalog objects are above the
+horizon of a set of ground stations in three steps:
+    1. Objects whose ground track and horizon can never reach a station's latitude are pruned.
+    2. The rest are propagated on a coarse time grid and checked for elevation crossings.
+    3. Every crossing is refined by bisection to get AOS, TCA and LOS.
+"""
+
+# WGS-84 ellipsoid for the station coordinates
+WGS84_A = 6378.137  # km
+WGS84_F = 1.0 / 298.257223563
+EARTH_ROTATION_RAD_S = 7.292115146706979e-5
+
+# Objects with a perigee below this altitude have re-entered or are about to
+MIN_PERIGEE_KM = 80.0
+
+
+@dataclass
+class GroundStation:
+    """
+    A site to predict passes for.
+
+    Attributes:
+        name: Label copied to every Pass of this station.
+        latitude: Geodetic latitude in degrees.
+        longitude: Longitude in degrees, east positive.
+        altitude: Height above the WGS-84 ellipsoid in km.
+        min_elevation: Elevation in degrees above which an object counts as visible.
+    """
+
+    name: str
+    latitude: float
+    longitude: float
+    altitude: float = 0.0
+    min_elevation: float = 10.0
+
+    def ecef(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the station position in km and its local up unit vector, both in ECEF.
+        """
+        lat = np.radians(self.latitude)
+        lon = np.radians(self.longitude)
+        e2 = WGS84_F * (2.0 - WGS84_F)
+        n = WGS84_A / np.sqrt(1.0 - e2 * np.sin(lat) ** 2)
+        position = np.array(
+            [
+                (n + self.altitude) * np.cos(lat) * np.cos(lon),
+                (n + self.altitude) * np.cos(lat) * np.sin(lon),
+                (n * (1.0 - e2) + self.altitude) * np.sin(lat),
+            ]
+        )
+        up = np.array(
+            [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+        )
+        return position, up
+
+
+@dataclass
+class Pass:
+    """
+    One pass of an object over a station.
+
+    Attributes:
+        station: GroundStation.name.
+        norad_cat_id: NORAD_CAT_ID of the object.
+        index: Position of the object in the catalog.
+        aos: Acquisition of signal, the object rises above min_elevation.
+        tca: Time of closest approach to the station.
+        los: Loss of signal, the object sets below min_elevation.
+        max_elevation: Elevation at TCA in degrees.
+        aos_clipped: The object was already up at the start of the window.
+        los_clipped: The object was still up at the end of the window.
+    """
+
+    station: str
+    norad_cat_id: Optional[str]
+    index: int
+    aos: datetime
+    tca: datetime
+    los: datetime
+    max_elevation: float
+    aos_clipped: bool = False
+    los_clipped: bool = False
+
+
+def teme_to_ecef(
+    position: np.ndarray, velocity: np.ndarray, times: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rotates TEME states to the Earth fixed frame by Greenwich sidereal time. Polar motion and
+    the UT1-UTC difference are ignored, which is well below what pass prediction needs.
+
+    Args:
+        position: (..., 3) TEME positions in km.
+        velocity: (..., 3) TEME velocities in km/s.
+        times: datetime64 values broadcastable to position[..., 0].
+    """
+    days = (
+        np.asarray(times, dtype="datetime64[us]") - SGP4_EPOCH_ORIGIN
+    ) / np.timedelta64(86_400_000_000, "us")
+    gmst = gstime(days + JD_SGP4_EPOCH_ORIGIN)
+    cos_g = np.cos(gmst)
+    sin_g = np.sin(gmst)
+
+    ecef_position = np.empty_like(position)
+    ecef_position[..., 0] = cos_g * position[..., 0] + sin_g * position[..., 1]
+    ecef_position[..., 1] = -sin_g * position[..., 0] + cos_g * position[..., 1]
+    ecef_position[..., 2] = position[..., 2]
+
+    ecef_velocity = np.empty_like(velocity)
+    ecef_velocity[..., 0] = (
+        cos_g * velocity[..., 0]
+        + sin_g * velocity[..., 1]
+        + EARTH_ROTATION_RAD_S * ecef_position[..., 1]
+    )
+    ecef_velocity[..., 1] = (
+        -sin_g * velocity[..., 0]
+        + cos_g * velocity[..., 1]
+        - EARTH_ROTATION_RAD_S * ecef_position[..., 0]
+    )
+    ecef_velocity[..., 2] = velocity[..., 2]
+    return ecef_position, ecef_velocity
+
+
+def can_be_visible(elements: OrbitalElements, station: GroundStation) -> np.ndarray:
+    """
+    Returns a mask of the objects that can ever rise above the station's min_elevation.
+
+    An object's sub-satellite point never gets further from the equator than its inclination
+    (180 - inclination when retrograde). Seen from its apogee it can be above min_elevation
+    up to an earth central angle away from that point, so stations further away can never see
+    it. Objects with a perigee below MIN_PERIGEE_KM are dropped as decayed.
+    """
+    derived = compute_derived_parameters(elements.mean_motion, elements.eccentricity)
+    apogee_radius = derived["APOAPSIS"] + EARTH_RADIUS
+    elevation = np.radians(station.min_elevation)
+    with np.errstate(invalid="ignore"):
+        central_angle = (
+            np.arccos(
+                np.clip(EARTH_RADIUS / apogee_radius * np.cos(elevation), -1.0, 1.0)
+            )
+            - elevation
+        )
+    max_latitude = np.radians(
+        np.minimum(elements.inclination, 180.0 - elements.inclination)
+    )
+    return (max_latitude + central_angle >= abs(np.radians(station.latitude))) & (
+        derived["PERIAPSIS"] >= MIN_PERIGEE_KM
+    )
+
+
+def _topocentric(
+    position: np.ndarray,
+    velocity: np.ndarray,
+    times: np.ndarray,
+    site: np.ndarray,
+    up: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the sine of the elevation and the range rate of TEME states seen from a site.
+    """
+    ecef_position, ecef_velocity = teme_to_ecef(position, velocity, times)
+    rho = ecef_position - site
+    distance = np.sqrt(np.einsum("...i,...i->...", rho, rho))
+    sin_elevation = np.einsum("...i,i->...", rho, up) / distance
+    range_rate = np.einsum("...i,...i->...", rho, ecef_velocity) / distance
+    return sin_elevation, range_rate
+
+
+def _bisect(
+    elements: OrbitalElements,
+    low: np.ndarray,
+    high: np.ndarray,
+    value: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray],
+    tolerance: np.timedelta64,
+) -> np.ndarray:
+    """
+    Narrows every [low, high] interval, a sign change of `value`, down to `tolerance`.
+
+    Args:
+        elements: One row per interval.
+        low: datetime64 start of every interval, `value` is negative there.
+        high: datetime64 end of every interval, `value` is positive there.
+        value: Called with (position, velocity, times) of the TEME states.
+
+    Returns:
+        The midpoint of every final interval.
+    """
+    if len(elements) == 0:
+        return low
+    widest = (high - low).max()
+    iterations = max(ceil(log2(max(widest / tolerance, 1.0))), 0)
+    for _ in range(iterations):
+        middle = low + (high - low) // 2
+        position, velocity, _ = propagate_rows(elements, middle)
+        positive = value(position, velocity, middle) >= 0.0
+        high = np.where(positive, middle, high)
+        low = np.where(positive, low, middle)
+    return low + (high - low) // 2
+
+
+def _passes_for_chunk(
+    elements: OrbitalElements,
+    stations: Sequence[GroundStation],
+    times: np.ndarray,
+    tolerance: np.timedelta64,
+) -> List[Pass]:
+    """
+    Predicts the passes of one chunk of objects over every station.
+    """
+    coarse_position, coarse_velocity, error = propagate_chunk(elements, times)
+    found: List[Pass] = []
+
+    for station in stations:
+        rows = np.flatnonzero(can_be_visible(elements, station))
+        if len(rows) == 0:
+            continue
+        site, up = station.ecef()
+        sin_min = np.sin(np.radians(station.min_elevation))
+        subset = elements.take(rows)
+
+        sin_elevation, range_rate = _topocentric(
+            coarse_position[rows], coarse_velocity[rows], times[None, :], site, up
+        )
+        above = (sin_elevation >= sin_min) & (error[rows] == ERROR_NONE)
+
+        # d is +1 on the first sample above the horizon and -1 one past the last one
+        padded = np.zeros((len(rows), len(times) + 2), dtype=np.int8)
+        padded[:, 1:-1] = above
+        d = np.diff(padded, axis=1)
+        rise_row, rise_k = np.nonzero(d == 1)
+        set_row, set_k = np.nonzero(d == -1)
+        if len(rise_row) == 0:
+            continue
+
+        def elevation_value(position, velocity, at):
+            return _topocentric(position, velocity, at, site, up)[0] - sin_min
+
+        def rate_value(position, velocity, at):
+            return _topocentric(position, velocity, at, site, up)[1]
+
+        # AOS, between the last sample below and the first one above
+        aos_clipped = rise_k == 0
+        aos = times[rise_k].copy()
+        refine = ~aos_clipped
+        aos[refine] = _bisect(
+            subset.take(rise_row[refine]),
+            times[rise_k[refine] - 1],
+            times[rise_k[refine]],
+            elevation_value,
+            tolerance,
+        )
+
+        # LOS, between the last sample above and the first one below, elevation is falling
+        los_clipped = set_k == len(times)
+        los = times[set_k - 1].copy()
+        refine = ~los_clipped
+        los[refine] = _bisect(
+            subset.take(set_row[refine]),
+            times[set_k[refine] - 1],
+            times[set_k[refine]],
+            lambda position, velocity, at: -elevation_value(position, velocity, at),
+            tolerance,
+        )
+
+        # TCA, where the range rate turns from negative to positive around the highest sample
+        peak_k = np.array(
+            [
+                start + int(np.argmax(sin_elevation[row, start:stop]))
+                for row, start, stop in zip(
+                    rise_row.tolist(), rise_k.tolist(), set_k.tolist()
+                )
+            ],
+            dtype=np.int64,
+        )
+        low_k = np.maximum(peak_k - 1, rise_k)
+        high_k = np.minimum(peak_k + 1, set_k - 1)
+        brackets = (range_rate[rise_row, low_k] < 0.0) & (
+            range_rate[rise_row, high_k] >= 0.0
+        )
+        tca = times[peak_k].copy()
+        tca[brackets] = _bisect(
+            subset.take(rise_row[brackets]),
+            times[low_k[brackets]],
+            times[high_k[brackets]],
+            rate_value,
+            tolerance,
+        )
+        tca = np.minimum(np.maximum(tca, aos), los)
+
+        position, velocity, _ = propagate_rows(subset.take(rise_row), tca)
+        max_elevation = np.degrees(
+            np.arcsin(
+                np.clip(_topocentric(position, velocity, tca, site, up)[0], -1.0, 1.0)
+            )
+        )
+
+        for k, row in enumerate(rise_row.tolist()):
+            found.append(
+                Pass(
+                    station=station.name,
+                    norad_cat_id=subset.norad_cat_id[row],
+                    index=int(subset.index[row]),
+                    aos=aos[k].astype(datetime),
+                    tca=tca[k].astype(datetime),
+                    los=los[k].astype(datetime),
+                    max_elevation=float(max_elevation[k]),
+                    aos_clipped=bool(aos_clipped[k]),
+                    los_clipped=bool(los_clipped[k]),
+                )
+            )
+
+    return found
+
+
+def predict_passes(
+    catalog: Union[Sequence[USC], OrbitalElements],
+    stations: Sequence[GroundStation],
+    start: datetime,
+    duration: timedelta = timedelta(hours=24),
+    step: timedelta = timedelta(seconds=60),
+    tolerance: timedelta = timedelta(seconds=1),
+    processes: Optional[int] = None,
+) -> List[Pass]:
+    """
+    Predicts every pass of every catalog object over every station in a time window.
+
+    Args:
+        catalog: USC objects or prebuilt OrbitalElements.
+        stations: The ground stations.
+        start: Start of the window (UTC).
+        duration: Length of the window.
+        step: Coarse sampling step. Passes shorter than this can be missed.
+        tolerance: Precision of AOS, TCA and LOS.
+        processes: Spread chunks of objects over this many worker processes.
+
+    Returns:
+        The passes sorted by station and AOS.
+    """
+    elements = (
+        catalog
+        if isinstance(catalog, OrbitalElements)
+        else OrbitalElements.from_catalog(catalog)
+    )
+    first = np.datetime64(start, "us")
+    times = first + np.arange(
+        0, int(duration / step) + 1, dtype=np.int64
+    ) * np.timedelta64(step, "us")
+    tolerance = np.timedelta64(tolerance, "us")
+
+    visible = np.zeros(len(elements), dtype=bool)
+    for station in stations:
+        visible |= can_be_visible(elements, station)
+    elements = elements.take(visible)
+
+    chunk_size = max(DEFAULT_CHUNK_ELEMENTS // len(times), 1)
+    chunks = [
+        elements.take(slice(begin, begin + chunk_size))
+        for begin in range(0, len(elements), chunk_size)
+    ]
+
+    found: List[Pass] = []
+    if processes is None or processes <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            found.extend(_passes_for_chunk(chunk, stations, times, tolerance))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(_passes_for_chunk, chunk, stations, times, tolerance)
+                for chunk in chunks
+            ]
+            for future in futures:
+                found.extend(future.result())
+
+    found.sort(key=lambda found_pass: (found_pass.station, found_pass.aos))
+    return found
@@ -0,0 +1,1369 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from datetime import datetime
+from math import pi, sqrt
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Spade.models import USC
+from Spade.orbit_parameters import EARTH_RADIUS
+
+"""
+This file contains a NumPy vectorized SGP4/SDP4 propagator. It turns the mean elements stored
+on USC objects into TEME positions and velocities for a whole catalog and an array of times at
+once. The math follows Vallado's reference implementation ("Revisiting Spacetrack Report #3",
+2006) in its improved mode, with every scalar replaced by an (objects x times) array.
+"""
+
+# WGS-72 constants, the gravity model Space-Track fits its element sets with. The radius is
+# orbit_parameters.EARTH_RADIUS, MU differs from its EARTH_MU
+MU = 398600.8
+XKE = 60.0 / sqrt(EARTH_RADIUS**3 / MU)
+J2 = 0.001082616
+J3 = -0.00000253881
+J4 = -0.00000165597
+J3OJ2 = J3 / J2
+
+TWOPI = 2.0 * pi
+X2O3 = 2.0 / 3.0
+DEG2RAD = pi / 180.0
+
+# sgp4 epochs count days from 1949 December 31 00:00 UT (Julian date 2433281.5)
+SGP4_EPOCH_ORIGIN = np.datetime64("1949-12-31T00:00:00", "us")
+JD_SGP4_EPOCH_ORIGIN = 2433281.5
+
+# Number of (object, time) pairs propagated together. Every intermediate array has this many
+# elements, so this bounds memory use to a few hundred MB no matter the catalog size.
+DEFAULT_CHUNK_ELEMENTS = 1_000_000
+
+# Error codes, same meaning as in the reference implementation
+ERROR_NONE = 0
+ERROR_ECCENTRICITY = 1
+ERROR_MEAN_MOTION = 2
+ERROR_PERTURBED_ECCENTRICITY = 3
+ERROR_SEMILATUS_RECTUM = 4
+ERROR_DECAYED = 6
+
+SGP4_REQUIRED_FIELDS = (
+    "EPOCH",
+    "MEAN_MOTION",
+    "ECCENTRICITY",
+    "INCLINATION",
+    "RA_OF_ASC_NODE",
+    "ARG_OF_PERIGEE",
+    "MEAN_ANOMALY",
+)
+
+
+@dataclass
+class OrbitalElements:
+    """
+    Column arrays of the SGP4 mean elements of a catalog.
+
+    Angles are in degrees and mean motion in revolutions per day, the same units USC uses.
+    `index` is the position of every row in the catalog it was built from.
+    """
+
+    index: np.ndarray
+    norad_cat_id: np.ndarray
+    epoch: np.ndarray  # datetime64[us], UTC
+    mean_motion: np.ndarray
+    eccentricity: np.ndarray
+    inclination: np.ndarray
+    ra_of_asc_node: np.ndarray
+    arg_of_perigee: np.ndarray
+    mean_anomaly: np.ndarray
+    b_star: np.ndarray
+
+    @classmethod
+    def from_catalog(cls, catalog: Sequence[USC]) -> "OrbitalElements":
+        """
+        Builds element arrays from USC objects. Objects missing any of SGP4_REQUIRED_FIELDS
+        are skipped, a missing B_STAR is treated as no drag.
+        """
+        rows: List[int] = []
+        columns: Dict[str, list] = {name: [] for name in SGP4_REQUIRED_FIELDS}
+        norad_ids: List[Optional[str]] = []
+        b_stars: List[float] = []
+
+        for position, usc in enumerate(catalog):
+            values = [getattr(usc, name) for name in SGP4_REQUIRED_FIELDS]
+            if any(value is None for value in values):
+                continue
+            rows.append(position)
+            for name, value in zip(SGP4_REQUIRED_FIELDS, values):
+                columns[name].append(value)
+            norad_ids.append(usc.NORAD_CAT_ID)
+            b_stars.append(usc.B_STAR or 0.0)
+
+        return cls(
+            index=np.array(rows, dtype=np.int64),
+            norad_cat_id=np.array(norad_ids, dtype=object),
+            epoch=np.array(columns["EPOCH"], dtype="datetime64[us]"),
+            mean_motion=np.array(columns["MEAN_MOTION"], dtype=np.float64),
+            eccentricity=np.array(columns["ECCENTRICITY"], dtype=np.float64),
+            inclination=np.array(columns["INCLINATION"], dtype=np.float64),
+            ra_of_asc_node=np.array(columns["RA_OF_ASC_NODE"], dtype=np.float64),
+            arg_of_perigee=np.array(columns["ARG_OF_PERIGEE"], dtype=np.float64),
+            mean_anomaly=np.array(columns["MEAN_ANOMALY"], dtype=np.float64),
+            b_star=np.array(b_stars, dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def take(self, selection: Union[slice, np.ndarray]) -> "OrbitalElements":
+        """
+        Returns the rows picked by a slice, index array or boolean mask.
+        """
+        return OrbitalElements(
+            **{f.name: getattr(self, f.name)[selection] for f in fields(self)}
+        )
+
+
+@dataclass
+class Ephemeris:
+    """
+    Result of a propagation.
+
+    Attributes:
+        elements: The propagated rows, in the same order as the arrays below.
+        times: The requested times as datetime64[us].
+        position: TEME position in km, shape (objects, times, 3).
+        velocity: TEME velocity in km/s, shape (objects, times, 3).
+        error: SGP4 error code per (object, time), 0 when the state is valid. Position and
+               velocity are NaN where the code is 1 to 4.
+    """
+
+    elements: OrbitalElements
+    times: np.ndarray
+    position: np.ndarray
+    velocity: np.ndarray
+    error: np.ndarray
+
+
+def gstime(jdut1: np.ndarray) -> np.ndarray:
+    """
+    Greenwich sidereal time in radians for a UT1 Julian date.
+    """
+    tut1 = (jdut1 - 2451545.0) / 36525.0
+    temp = (
+        -6.2e-6 * tut1 * tut1 * tut1
+        + 0.093104 * tut1 * tut1
+        + (876600.0 * 3600 + 8640184.812866) * tut1
+        + 67310.54841
+    )
+    return np.mod(temp * DEG2RAD / 240.0, TWOPI)
+
+
+def _dscom(epoch, ep, argpp, inclp, nodep, np_):
+    """
+    Lunar and solar terms used to initialize deep space objects, at tc = 0.
+    """
+    zes = 0.01675
+    zel = 0.05490
+    c1ss = 2.9864797e-6
+    c1l = 4.7968065e-7
+    zsinis = 0.39785416
+    zcosis = 0.91744867
+    zcosgs = 0.1945905
+    zsings = -0.98088458
+
+    nm = np_
+    em = ep
+    snodm = np.sin(nodep)
+    cnodm = np.cos(nodep)
+    sinomm = np.sin(argpp)
+    cosomm = np.cos(argpp)
+    sinim = np.sin(inclp)
+    cosim = np.cos(inclp)
+    emsq = em * em
+    betasq = 1.0 - emsq
+    rtemsq = np.sqrt(betasq)
+
+    day = epoch + 18261.5
+    xnodce = np.mod(4.5236020 - 9.2422029e-4 * day, TWOPI)
+    stem = np.sin(xnodce)
+    ctem = np.cos(xnodce)
+    zcosil = 0.91375164 - 0.03568096 * ctem
+    zsinil = np.sqrt(1.0 - zcosil * zcosil)
+    zsinhl = 0.089683511 * stem / zsinil
+    zcoshl = np.sqrt(1.0 - zsinhl * zsinhl)
+    gam = 5.8351514 + 0.0019443680 * day
+    zx = 0.39785416 * stem / zsinil
+    zy = zcoshl * ctem + 0.91744867 * zsinhl * stem
+    zx = np.arctan2(zx, zy)
+    zx = gam + zx - xnodce
+    zcosgl = np.cos(zx)
+    zsingl = np.sin(zx)
+
+    zcosg = zcosgs
+    zsing = zsings
+    zcosi = zcosis
+    zsini = zsinis
+    zcosh = cnodm
+    zsinh = snodm
+    cc = c1ss
+    xnoi = 1.0 / nm
+
+    out = {}
+    for lsflg in (1, 2):
+        a1 = zcosg * zcosh + zsing * zcosi * zsinh
+        a3 = -zsing * zcosh + zcosg * zcosi * zsinh
+        a7 = -zcosg * zsinh + zsing * zcosi * zcosh
+        a8 = zsing * zsini
+        a9 = zsing * zsinh + zcosg * zcosi * zcosh
+        a10 = zcosg * zsini
+        a2 = cosim * a7 + sinim * a8
+        a4 = cosim * a9 + sinim * a10
+        a5 = -sinim * a7 + cosim * a8
+        a6 = -sinim * a9 + cosim * a10
+
+        x1 = a1 * cosomm + a2 * sinomm
+        x2 = a3 * cosomm + a4 * sinomm
+        x3 = -a1 * sinomm + a2 * cosomm
+        x4 = -a3 * sinomm + a4 * cosomm
+        x5 = a5 * sinomm
+        x6 = a6 * sinomm
+        x7 = a5 * cosomm
+        x8 = a6 * cosomm
+
+        z31 = 12.0 * x1 * x1 - 3.0 * x3 * x3
+        z32 = 24.0 * x1 * x2 - 6.0 * x3 * x4
+        z33 = 12.0 * x2 * x2 - 3.0 * x4 * x4
+        z1 = 3.0 * (a1 * a1 + a2 * a2) + z31 * emsq
+        z2 = 6.0 * (a1 * a3 + a2 * a4) + z32 * emsq
+        z3 = 3.0 * (a3 * a3 + a4 * a4) + z33 * emsq
+        z11 = -6.0 * a1 * a5 + emsq * (-24.0 * x1 * x7 - 6.0 * x3 * x5)
+        z12 = -6.0 * (a1 * a6 + a3 * a5) + emsq * (
+            -24.0 * (x2 * x7 + x1 * x8) - 6.0 * (x3 * x6 + x4 * x5)
+        )
+        z13 = -6.0 * a3 * a6 + emsq * (-24.0 * x2 * x8 - 6.0 * x4 * x6)
+        z21 = 6.0 * a2 * a5 + emsq * (24.0 * x1 * x5 - 6.0 * x3 * x7)
+        z22 = 6.0 * (a4 * a5 + a2 * a6) + emsq * (
+            24.0 * (x2 * x5 + x1 * x6) - 6.0 * (x4 * x7 + x3 * x8)
+        )
+        z23 = 6.0 * a4 * a6 + emsq * (24.0 * x2 * x6 - 6.0 * x4 * x8)
+        z1 = z1 + z1 + betasq * z31
+        z2 = z2 + z2 + betasq * z32
+        z3 = z3 + z3 + betasq * z33
+        s3 = cc * xnoi
+        s2 = -0.5 * s3 / rtemsq
+        s4 = s3 * rtemsq
+        s1 = -15.0 * em * s4
+        s5 = x1 * x3 + x2 * x4
+        s6 = x2 * x3 + x1 * x4
+        s7 = x2 * x4 - x1 * x3
+
+        prefix = "s" if lsflg == 1 else ""
+        out.update(
+            {
+                f"{prefix}s1": s1,
+                f"{prefix}s2": s2,
+                f"{prefix}s3": s3,
+                f"{prefix}s4": s4,
+                f"{prefix}s5": s5,
+                f"{prefix}s6": s6,
+                f"{prefix}s7": s7,
+                f"{prefix}z1": z1,
+                f"{prefix}z2": z2,
+                f"{prefix}z3": z3,
+                f"{prefix}z11": z11,
+                f"{prefix}z12": z12,
+                f"{prefix}z13": z13,
+                f"{prefix}z21": z21,
+                f"{prefix}z22": z22,
+                f"{prefix}z23": z23,
+                f"{prefix}z31": z31,
+                f"{prefix}z32": z32,
+                f"{prefix}z33": z33,
+            }
+        )
+
+        # switch to lunar terms for the second pass
+        zcosg = zcosgl
+        zsing = zsingl
+        zcosi = zcosil
+        zsini = zsinil
+        zcosh = zcoshl * cnodm + zsinhl * snodm
+        zsinh = snodm * zcoshl - cnodm * zsinhl
+        cc = c1l
+
+    o = out
+    return {
+        "sinim": sinim,
+        "cosim": cosim,
+        "emsq": emsq,
+        "zmol": np.mod(4.7199672 + 0.22997150 * day - gam, TWOPI),
+        "zmos": np.mod(6.2565837 + 0.017201977 * day, TWOPI),
+        # solar terms
+        "se2": 2.0 * o["ss1"] * o["ss6"],
+        "se3": 2.0 * o["ss1"] * o["ss7"],
+        "si2": 2.0 * o["ss2"] * o["sz12"],
+        "si3": 2.0 * o["ss2"] * (o["sz13"] - o["sz11"]),
+        "sl2": -2.0 * o["ss3"] * o["sz2"],
+        "sl3": -2.0 * o["ss3"] * (o["sz3"] - o["sz1"]),
+        "sl4": -2.0 * o["ss3"] * (-21.0 - 9.0 * emsq) * zes,
+        "sgh2": 2.0 * o["ss4"] * o["sz32"],
+        "sgh3": 2.0 * o["ss4"] * (o["sz33"] - o["sz31"]),
+        "sgh4": -18.0 * o["ss4"] * zes,
+        "sh2": -2.0 * o["ss2"] * o["sz22"],
+        "sh3": -2.0 * o["ss2"] * (o["sz23"] - o["sz21"]),
+        # lunar terms
+        "ee2": 2.0 * o["s1"] * o["s6"],
+        "e3": 2.0 * o["s1"] * o["s7"],
+        "xi2": 2.0 * o["s2"] * o["z12"],
+        "xi3": 2.0 * o["s2"] * (o["z13"] - o["z11"]),
+        "xl2": -2.0 * o["s3"] * o["z2"],
+        "xl3": -2.0 * o["s3"] * (o["z3"] - o["z1"]),
+        "xl4": -2.0 * o["s3"] * (-21.0 - 9.0 * emsq) * zel,
+        "xgh2": 2.0 * o["s4"] * o["z32"],
+        "xgh3": 2.0 * o["s4"] * (o["z33"] - o["z31"]),
+        "xgh4": -18.0 * o["s4"] * zel,
+        "xh2": -2.0 * o["s2"] * o["z22"],
+        "xh3": -2.0 * o["s2"] * (o["z23"] - o["z21"]),
+        **o,
+    }
+
+
+def _dsinit(m, c):
+    """
+    Deep space secular rates and resonance coefficients.
+
+    Args:
+        m: Near earth model arrays of the deep space rows.
+        c: Output of _dscom for the same rows.
+    """
+    q22 = 1.7891679e-6
+    q31 = 2.1460748e-6
+    q33 = 2.2123015e-7
+    root22 = 1.7891679e-6
+    root44 = 7.3636953e-9
+    root54 = 2.1765803e-9
+    rptim = 4.37526908801129966e-3
+    root32 = 3.7393792e-7
+    root52 = 1.1428639e-7
+    znl = 1.5835218e-4
+    zns = 1.19459e-5
+
+    nm = m["no"]
+    em = m["ecco"]
+    inclm = m["inclo"]
+    sinim = c["sinim"]
+    cosim = c["cosim"]
+    emsq = c["emsq"]
+    n = len(nm)
+
+    irez = np.zeros(n, dtype=np.int8)
+    irez[(0.0034906585 < nm) & (nm < 0.0052359877)] = 1
+    irez[(8.26e-3 <= nm) & (nm <= 9.24e-3) & (em >= 0.5)] = 2
+
+    near_equatorial = (inclm < 5.2359877e-2) | (inclm > pi - 5.2359877e-2)
+    safe_sinim = np.where(sinim != 0.0, sinim, 1.0)
+
+    ses = c["ss1"] * zns * c["ss5"]
+    sis = c["ss2"] * zns * (c["sz11"] + c["sz13"])
+    sls = -zns * c["ss3"] * (c["sz1"] + c["sz3"] - 14.0 - 6.0 * emsq)
+    sghs = c["ss4"] * zns * (c["sz31"] + c["sz33"] - 6.0)
+    shs = -zns * c["ss2"] * (c["sz21"] + c["sz23"])
+    shs = np.where(near_equatorial, 0.0, shs)
+    shs = np.where(sinim != 0.0, shs / safe_sinim, shs)
+    sgs = sghs - cosim * shs
+
+    dedt = ses + c["s1"] * znl * c["s5"]
+    didt = sis + c["s2"] * znl * (c["z11"] + c["z13"])
+    dmdt = sls - znl * c["s3"] * (c["z1"] + c["z3"] - 14.0 - 6.0 * emsq)
+    sghl = c["s4"] * znl * (c["z31"] + c["z33"] - 6.0)
+    shll = -znl * c["s2"] * (c["z21"] + c["z23"])
+    shll = np.where(near_equatorial, 0.0, shll)
+    domdt = sgs + sghl
+    dnodt = shs
+    domdt = np.where(sinim != 0.0, domdt - cosim / safe_sinim * shll, domdt)
+    dnodt = np.where(sinim != 0.0, dnodt + shll / safe_sinim, dnodt)
+
+    theta = np.mod(m["gsto"], TWOPI)
+    zeros = np.zeros(n)
+    out = {
+        "irez": irez,
+        "dedt": dedt,
+        "didt": didt,
+        "dmdt": dmdt,
+        "dnodt": dnodt,
+        "domdt": domdt,
+        "xfact": zeros.copy(),
+        "xlamo": zeros.copy(),
+        "del1": zeros.copy(),
+        "del2": zeros.copy(),
+        "del3": zeros.copy(),
+    }
+    for name in (
+        "d2201",
+        "d2211",
+        "d3210",
+        "d3222",
+        "d4410",
+        "d4422",
+        "d5220",
+        "d5232",
+        "d5421",
+        "d5433",
+    ):
+        out[name] = zeros.copy()
+
+    aonv = np.power(nm / XKE, X2O3)
+
+    # geopotential resonance for 12 hour orbits
+    r2 = irez == 2
+    if r2.any():
+        em2 = m["ecco"][r2]
+        emsq2 = m["eccsq"][r2]
+        eoc = em2 * emsq2
+        ci = cosim[r2]
+        si = sinim[r2]
+        cosisq = ci * ci
+        low = em2 <= 0.65
+
+        g201 = -0.306 - (em2 - 0.64) * 0.440
+        g211 = np.where(
+            low,
+            3.616 - 13.2470 * em2 + 16.2900 * emsq2,
+            -72.099 + 331.819 * em2 - 508.738 * emsq2 + 266.724 * eoc,
+        )
+        g310 = np.where(
+            low,
+            -19.302 + 117.3900 * em2 - 228.4190 * emsq2 + 156.5910 * eoc,
+            -346.844 + 1582.851 * em2 - 2415.925 * emsq2 + 1246.113 * eoc,
+        )
+        g322 = np.where(
+            low,
+            -18.9068 + 109.7927 * em2 - 214.6334 * emsq2 + 146.5816 * eoc,
+            -342.585 + 1554.908 * em2 - 2366.899 * emsq2 + 1215.972 * eoc,
+        )
+        g410 = np.where(
+            low,
+            -41.122 + 242.6940 * em2 - 471.0940 * emsq2 + 313.9530 * eoc,
+            -1052.797 + 4758.686 * em2 - 7193.992 * emsq2 + 3651.957 * eoc,
+        )
+        g422 = np.where(
+            low,
+            -146.407 + 841.8800 * em2 - 1629.014 * emsq2 + 1083.4350 * eoc,
+            -3581.690 + 16178.110 * em2 - 24462.770 * emsq2 + 12422.520 * eoc,
+        )
+        g520 = np.where(
+            low,
+            -532.114 + 3017.977 * em2 - 5740.032 * emsq2 + 3708.2760 * eoc,
+            np.where(
+                em2 > 0.715,
+                -5149.66 + 29936.92 * em2 - 54087.36 * emsq2 + 31324.56 * eoc,
+                1464.74 - 4664.75 * em2 + 3763.64 * emsq2,
+            ),
+        )
+        below = em2 < 0.7
+        g533 = np.where(
+            below,
+            -919.22770 + 4988.6100 * em2 - 9064.7700 * emsq2 + 5542.21 * eoc,
+            -37995.780 + 161616.52 * em2 - 229838.20 * emsq2 + 109377.94 * eoc,
+        )
+        g521 = np.where(
+            below,
+            -822.71072 + 4568.6173 * em2 - 8491.4146 * emsq2 + 5337.524 * eoc,
+            -51752.104 + 218913.95 * em2 - 309468.16 * emsq2 + 146349.42 * eoc,
+        )
+        g532 = np.where(
+            below,
+            -853.66600 + 4690.2500 * em2 - 8624.7700 * emsq2 + 5341.4 * eoc,
+            -40023.880 + 170470.89 * em2 - 242699.48 * emsq2 + 115605.82 * eoc,
+        )
+
+        sini2 = si * si
+        f220 = 0.75 * (1.0 + 2.0 * ci + cosisq)
+        f221 = 1.5 * sini2
+        f321 = 1.875 * si * (1.0 - 2.0 * ci - 3.0 * cosisq)
+        f322 = -1.875 * si * (1.0 + 2.0 * ci - 3.0 * cosisq)
+        f441 = 35.0 * sini2 * f220
+        f442 = 39.3750 * sini2 * sini2
+        f522 = (
+            9.84375
+            * si
+            * (
+                sini2 * (1.0 - 2.0 * ci - 5.0 * cosisq)
+                + 0.33333333 * (-2.0 + 4.0 * ci + 6.0 * cosisq)
+            )
+        )
+        f523 = si * (
+            4.92187512 * sini2 * (-2.0 - 4.0 * ci + 10.0 * cosisq)
+            + 6.56250012 * (1.0 + 2.0 * ci - 3.0 * cosisq)
+        )
+        f542 = (
+            29.53125
+            * si
+            * (2.0 - 8.0 * ci + cosisq * (-12.0 + 8.0 * ci + 10.0 * cosisq))
+        )
+        f543 = (
+            29.53125
+            * si
+            * (-2.0 - 8.0 * ci + cosisq * (12.0 + 8.0 * ci - 10.0 * cosisq))
+        )
+
+        nm2 = nm[r2]
+        aonv2 = aonv[r2]
+        xno2 = nm2 * nm2
+        ainv2 = aonv2 * aonv2
+        temp1 = 3.0 * xno2 * ainv2
+        temp = temp1 * root22
+        out["d2201"][r2] = temp * f220 * g201
+        out["d2211"][r2] = temp * f221 * g211
+        temp1 = temp1 * aonv2
+        temp = temp1 * root32
+        out["d3210"][r2] = temp * f321 * g310
+        out["d3222"][r2] = temp * f322 * g322
+        temp1 = temp1 * aonv2
+        temp = 2.0 * temp1 * root44
+        out["d4410"][r2] = temp * f441 * g410
+        out["d4422"][r2] = temp * f442 * g422
+        temp1 = temp1 * aonv2
+        temp = temp1 * root52
+        out["d5220"][r2] = temp * f522 * g520
+        out["d5232"][r2] = temp * f523 * g532
+        temp = 2.0 * temp1 * root54
+        out["d5421"][r2] = temp * f542 * g521
+        out["d5433"][r2] = temp * f543 * g533
+
+        out["xlamo"][r2] = np.mod(
+            m["mo"][r2] + m["nodeo"][r2] + m["nodeo"][r2] - theta[r2] - theta[r2],
+            TWOPI,
+        )
+        out["xfact"][r2] = (
+            m["mdot"][r2]
+            + dmdt[r2]
+            + 2.0 * (m["nodedot"][r2] + dnodt[r2] - rptim)
+            - m["no"][r2]
+        )
+
+    # synchronous resonance terms
+    r1 = irez == 1
+    if r1.any():
+        emsq1 = emsq[r1]
+        ci = cosim[r1]
+        si = sinim[r1]
+        aonv1 = aonv[r1]
+        nm1 = nm[r1]
+        g200 = 1.0 + emsq1 * (-2.5 + 0.8125 * emsq1)
+        g310 = 1.0 + 2.0 * emsq1
+        g300 = 1.0 + emsq1 * (-6.0 + 6.60937 * emsq1)
+        f220 = 0.75 * (1.0 + ci) * (1.0 + ci)
+        f311 = 0.9375 * si * si * (1.0 + 3.0 * ci) - 0.75 * (1.0 + ci)
+        f330 = 1.0 + ci
+        f330 = 1.875 * f330 * f330 * f330
+        del1 = 3.0 * nm1 * nm1 * aonv1 * aonv1
+        out["del2"][r1] = 2.0 * del1 * f220 * g200 * q22
+        out["del3"][r1] = 3.0 * del1 * f330 * g300 * q33 * aonv1
+        out["del1"][r1] = del1 * f311 * g310 * q31 * aonv1
+        out["xlamo"][r1] = np.mod(
+            m["mo"][r1] + m["nodeo"][r1] + m["argpo"][r1] - theta[r1], TWOPI
+        )
+        out["xfact"][r1] = (
+            m["mdot"][r1]
+            + m["xpidot"][r1]
+            - rptim
+            + dmdt[r1]
+            + domdt[r1]
+            + dnodt[r1]
+            - m["no"][r1]
+        )
+
+    return out
+
+
+def _sgp4_init(elements: OrbitalElements) -> Dict[str, np.ndarray]:
+    """
+    Computes the per object SGP4 constants. Returns a dict of arrays with one value per row.
+    """
+    epoch = (elements.epoch - SGP4_EPOCH_ORIGIN) / np.timedelta64(86400_000_000, "us")
+    ecco = elements.eccentricity.astype(np.float64)
+    inclo = elements.inclination * DEG2RAD
+    nodeo = elements.ra_of_asc_node * DEG2RAD
+    argpo = elements.arg_of_perigee * DEG2RAD
+    mo = elements.mean_anomaly * DEG2RAD
+    no_kozai = elements.mean_motion * TWOPI / 1440.0
+    bstar = elements.b_star.astype(np.float64)
+
+    temp4 = 1.5e-12
+    ss = 78.0 / EARTH_RADIUS + 1.0
+    qzms2t = ((120.0 - 78.0) / EARTH_RADIUS) ** 4
+
+    # initl: un-kozai the mean motion
+    eccsq = ecco * ecco
+    omeosq = 1.0 - eccsq
+    rteosq = np.sqrt(omeosq)
+    cosio = np.cos(inclo)
+    cosio2 = cosio * cosio
+    ak = np.power(XKE / no_kozai, X2O3)
+    d1 = 0.75 * J2 * (3.0 * cosio2 - 1.0) / (rteosq * omeosq)
+    del_ = d1 / (ak * ak)
+    adel = ak * (1.0 - del_ * del_ - del_ * (1.0 / 3.0 + 134.0 * del_ * del_ / 81.0))
+    del_ = d1 / (adel * adel)
+    no = no_kozai / (1.0 + del_)
+    ao = np.power(XKE / no, X2O3)
+    sinio = np.sin(inclo)
+    po = ao * omeosq
+    con42 = 1.0 - 5.0 * cosio2
+    con41 = -con42 - cosio2 - cosio2
+    posq = po * po
+    rp = ao * (1.0 - ecco)
+    gsto = gstime(epoch + JD_SGP4_EPOCH_ORIGIN)
+
+    isimp = rp < 220.0 / EARTH_RADIUS + 1.0
+
+    # for perigees below 156 km, s and qoms2t are altered
+    perige = (rp - 1.0) * EARTH_RADIUS
+    low_perigee = perige < 156.0
+    sfour_km = np.where(perige < 98.0, 20.0, perige - 78.0)
+    qzms24 = np.where(low_perigee, ((120.0 - sfour_km) / EARTH_RADIUS) ** 4, qzms2t)
+    sfour = np.where(low_perigee, sfour_km / EARTH_RADIUS + 1.0, ss)
+
+    pinvsq = 1.0 / posq
+    tsi = 1.0 / (ao - sfour)
+    eta = ao * ecco * tsi
+    etasq = eta * eta
+    eeta = ecco * eta
+    psisq = np.abs(1.0 - etasq)
+    coef = qzms24 * tsi**4
+    coef1 = coef / psisq**3.5
+    cc2 = (
+        coef1
+        * no
+        * (
+            ao * (1.0 + 1.5 * etasq + eeta * (4.0 + etasq))
+            + 0.375 * J2 * tsi / psisq * con41 * (8.0 + 3.0 * etasq * (8.0 + etasq))
+        )
+    )
+    cc1 = bstar * cc2
+    eccentric = ecco > 1.0e-4
+    safe_ecco = np.where(eccentric, ecco, 1.0)
+    safe_eeta = np.where(eccentric, eeta, 1.0)
+    cc3 = np.where(eccentric, -2.0 * coef * tsi * J3OJ2 * no * sinio / safe_ecco, 0.0)
+    x1mth2 = 1.0 - cosio2
+    cc4 = (
+        2.0
+        * no
+        * coef1
+        * ao
+        * omeosq
+        * (
+            eta * (2.0 + 0.5 * etasq)
+            + ecco * (0.5 + 2.0 * etasq)
+            - J2
+            * tsi
+            / (ao * psisq)
+            * (
+                -3.0 * con41 * (1.0 - 2.0 * eeta + etasq * (1.5 - 0.5 * eeta))
+                + 0.75
+                * x1mth2
+                * (2.0 * etasq - eeta * (1.0 + etasq))
+                * np.cos(2.0 * argpo)
+            )
+        )
+    )
+    cc5 = 2.0 * coef1 * ao * omeosq * (1.0 + 2.75 * (etasq + eeta) + eeta * etasq)
+    cosio4 = cosio2 * cosio2
+    temp1 = 1.5 * J2 * pinvsq * no
+    temp2 = 0.5 * temp1 * J2 * pinvsq
+    temp3 = -0.46875 * J4 * pinvsq * pinvsq * no
+    mdot = (
+        no
+        + 0.5 * temp1 * rteosq * con41
+        + 0.0625 * temp2 * rteosq * (13.0 - 78.0 * cosio2 + 137.0 * cosio4)
+    )
+    argpdot = (
+        -0.5 * temp1 * con42
+        + 0.0625 * temp2 * (7.0 - 114.0 * cosio2 + 395.0 * cosio4)
+        + temp3 * (3.0 - 36.0 * cosio2 + 49.0 * cosio4)
+    )
+    xhdot1 = -temp1 * cosio
+    nodedot = (
+        xhdot1
+        + (0.5 * temp2 * (4.0 - 19.0 * cosio2) + 2.0 * temp3 * (3.0 - 7.0 * cosio2))
+        * cosio
+    )
+    xpidot = argpdot + nodedot
+    omgcof = bstar * cc3 * np.cos(argpo)
+    xmcof = np.where(eccentric, -X2O3 * coef * bstar / safe_eeta, 0.0)
+    nodecf = 3.5 * omeosq * xhdot1 * cc1
+    t2cof = 1.5 * cc1
+    xlcof_denominator = np.where(np.abs(cosio + 1.0) > 1.5e-12, 1.0 + cosio, temp4)
+    xlcof = -0.25 * J3OJ2 * sinio * (3.0 + 5.0 * cosio) / xlcof_denominator
+    aycof = -0.5 * J3OJ2 * sinio
+    delmo = (1.0 + eta * np.cos(mo)) ** 3
+    sinmao = np.sin(mo)
+    x7thm1 = 7.0 * cosio2 - 1.0
+
+    deep = TWOPI / no >= 225.0
+    isimp = isimp | deep
+
+    cc1sq = cc1 * cc1
+    d2 = 4.0 * ao * tsi * cc1sq
+    temp = d2 * tsi * cc1 / 3.0
+    d3 = (17.0 * ao + sfour) * temp
+    d4 = 0.5 * temp * ao * tsi * (221.0 * ao + 31.0 * sfour) * cc1
+    t3cof = d2 + 2.0 * cc1sq
+    t4cof = 0.25 * (3.0 * d3 + cc1 * (12.0 * d2 + 10.0 * cc1sq))
+    t5cof = 0.2 * (
+        3.0 * d4 + 12.0 * cc1 * d3 + 6.0 * d2 * d2 + 15.0 * cc1sq * (2.0 * d2 + cc1sq)
+    )
+    d2, d3, d4, t3cof, t4cof, t5cof = (
+        np.where(isimp, 0.0, value) for value in (d2, d3, d4, t3cof, t4cof, t5cof)
+    )
+
+    model = {
+        "ecco": ecco,
+        "eccsq": eccsq,
+        "inclo": inclo,
+        "nodeo": nodeo,
+        "argpo": argpo,
+        "mo": mo,
+        "no": no,
+        "bstar": bstar,
+        "gsto": gsto,
+        "isimp": isimp,
+        "deep": deep,
+        "con41": con41,
+        "x1mth2": x1mth2,
+        "x7thm1": x7thm1,
+        "cc1": cc1,
+        "cc4": cc4,
+        "cc5": cc5,
+        "d2": d2,
+        "d3": d3,
+        "d4": d4,
+        "delmo": delmo,
+        "eta": eta,
+        "argpdot": argpdot,
+        "omgcof": omgcof,
+        "sinmao": sinmao,
+        "t2cof": t2cof,
+        "t3cof": t3cof,
+        "t4cof": t4cof,
+        "t5cof": t5cof,
+        "mdot": mdot,
+        "nodedot": nodedot,
+        "xpidot": xpidot,
+        "xlcof": xlcof,
+        "xmcof": xmcof,
+        "nodecf": nodecf,
+        "aycof": aycof,
+    }
+
+    if deep.any():
+        subset = {name: value[deep] for name, value in model.items()}
+        dscom = _dscom(
+            epoch[deep],
+            subset["ecco"],
+            subset["argpo"],
+            subset["inclo"],
+            subset["nodeo"],
+            subset["no"],
+        )
+        dsinit = _dsinit(subset, dscom)
+        model["deep_space"] = {
+            **{
+                name: dscom[name]
+                for name in (
+                    "e3",
+                    "ee2",
+                    "se2",
+                    "se3",
+                    "sgh2",
+                    "sgh3",
+                    "sgh4",
+                    "sh2",
+                    "sh3",
+                    "si2",
+                    "si3",
+                    "sl2",
+                    "sl3",
+                    "sl4",
+                    "xgh2",
+                    "xgh3",
+                    "xgh4",
+                    "xh2",
+                    "xh3",
+                    "xi2",
+                    "xi3",
+                    "xl2",
+                    "xl3",
+                    "xl4",
+                    "zmol",
+                    "zmos",
+                )
+            },
+            **dsinit,
+        }
+
+    return model
+
+
+def _resonance_rates(d, irez, xli, xni, atime):
+    """
+    Mean motion rates of the resonant rows. `irez` is 1 (synchronous) or 2 (half-day).
+    """
+    if irez == 1:
+        fasx2 = 0.13130908
+        fasx4 = 2.8843198
+        fasx6 = 0.37448087
+        a1 = xli - fasx2
+        a2 = 2.0 * (xli - fasx4)
+        a3 = 3.0 * (xli - fasx6)
+        xndt = d["del1"] * np.sin(a1) + d["del2"] * np.sin(a2) + d["del3"] * np.sin(a3)
+        xnddt = (
+            d["del1"] * np.cos(a1)
+            + 2.0 * d["del2"] * np.cos(a2)
+            + 3.0 * d["del3"] * np.cos(a3)
+        )
+    else:
+        g22 = 5.7686396
+        g32 = 0.95240898
+        g44 = 1.8014998
+        g52 = 1.0508330
+        g54 = 4.4108898
+        xomi = d["argpo"] + d["argpdot"] * atime
+        x2omi = xomi + xomi
+        x2li = xli + xli
+        angles = (
+            (d["d2201"], x2omi + xli - g22, 1.0),
+            (d["d2211"], xli - g22, 1.0),
+            (d["d3210"], xomi + xli - g32, 1.0),
+            (d["d3222"], -xomi + xli - g32, 1.0),
+            (d["d4410"], x2omi + x2li - g44, 2.0),
+            (d["d4422"], x2li - g44, 2.0),
+            (d["d5220"], xomi + xli - g52, 1.0),
+            (d["d5232"], -xomi + xli - g52, 1.0),
+            (d["d5421"], xomi + x2li - g54, 2.0),
+            (d["d5433"], -xomi + x2li - g54, 2.0),
+        )
+        xndt = sum(coefficient * np.sin(angle) for coefficient, angle, _ in angles)
+        xnddt = sum(
+            factor * coefficient * np.cos(angle)
+            for coefficient, angle, factor in angles
+        )
+    xldot = xni + d["xfact"]
+    return xndt, xldot, xnddt * xldot
+
+
+def _dspace(m, ds, t, em, argpm, inclm, mm, nodem, nm):
+    """
+    Deep space secular effects and resonance integration for the deep space rows.
+    Every (row, time) pair integrates from the epoch in 720 minute steps.
+    """
+    rptim = 4.37526908801129966e-3
+    stepp = 720.0
+    step2 = 259200.0
+
+    col = lambda name: ds[name][:, None]  # noqa: E731
+
+    theta = np.mod(m["gsto"][:, None] + t * rptim, TWOPI)
+    em = em + col("dedt") * t
+    inclm = inclm + col("didt") * t
+    argpm = argpm + col("domdt") * t
+    nodem = nodem + col("dnodt") * t
+    mm = mm + col("dmdt") * t
+
+    for irez in (1, 2):
+        r = ds["irez"] == irez
+        if not r.any():
+            continue
+
+        tr = t[r]
+        d = {name: ds[name][r][:, None] for name in ds if name != "irez"}
+        d["argpo"] = m["argpo"][r][:, None]
+        d["argpdot"] = m["argpdot"][r][:, None]
+        no = m["no"][r][:, None]
+
+        atime = np.zeros_like(tr)
+        xni = np.broadcast_to(no, tr.shape).copy()
+        xli = np.broadcast_to(d["xlamo"], tr.shape).copy()
+        delt = np.where(tr > 0.0, stepp, -stepp)
+
+        while True:
+            xndt, xldot, xnddt = _resonance_rates(d, irez, xli, xni, atime)
+            stepping = np.abs(tr - atime) >= stepp
+            if not stepping.any():
+                break
+            xli = np.where(stepping, xli + xldot * delt + xndt * step2, xli)
+            xni = np.where(stepping, xni + xndt * delt + xnddt * step2, xni)
+            atime = np.where(stepping, atime + delt, atime)
+
+        ft = tr - atime
+        nm[r] = xni + xndt * ft + xnddt * ft * ft * 0.5
+        xl = xli + xldot * ft + xndt * ft * ft * 0.5
+        if irez == 1:
+            mm[r] = xl - nodem[r] - argpm[r] + theta[r]
+        else:
+            mm[r] = xl - 2.0 * nodem[r] + 2.0 * theta[r]
+
+    return em, argpm, inclm, mm, nodem, nm
+
+
+def _dpper(ds, t, ep, inclp, nodep, argpp, mp):
+    """
+    Lunar-solar periodics for the deep space rows.
+    """
+    zns = 1.19459e-5
+    zes = 0.01675
+    znl = 1.5835218e-4
+    zel = 0.05490
+
+    col = lambda name: ds[name][:, None]  # noqa: E731
+
+    zm = col("zmos") + zns * t
+    zf = zm + 2.0 * zes * np.sin(zm)
+    sinzf = np.sin(zf)
+    f2 = 0.5 * sinzf * sinzf - 0.25
+    f3 = -0.5 * sinzf * np.cos(zf)
+    ses = col("se2") * f2 + col("se3") * f3
+    sis = col("si2") * f2 + col("si3") * f3
+    sls = col("sl2") * f2 + col("sl3") * f3 + col("sl4") * sinzf
+    sghs = col("sgh2") * f2 + col("sgh3") * f3 + col("sgh4") * sinzf
+    shs = col("sh2") * f2 + col("sh3") * f3
+
+    zm = col("zmol") + znl * t
+    zf = zm + 2.0 * zel * np.sin(zm)
+    sinzf = np.sin(zf)
+    f2 = 0.5 * sinzf * sinzf - 0.25
+    f3 = -0.5 * sinzf * np.cos(zf)
+    sel = col("ee2") * f2 + col("e3") * f3
+    sil = col("xi2") * f2 + col("xi3") * f3
+    sll = col("xl2") * f2 + col("xl3") * f3 + col("xl4") * sinzf
+    sghl = col("xgh2") * f2 + col("xgh3") * f3 + col("xgh4") * sinzf
+    shll = col("xh2") * f2 + col("xh3") * f3
+
+    # peo, pinco, plo, pgho and pho are zero after initialization
+    pe = ses + sel
+    pinc = sis + sil
+    pl = sls + sll
+    pgh = sghs + sghl
+    ph = shs + shll
+
+    inclp = inclp + pinc
+    ep = ep + pe
+    sinip = np.sin(inclp)
+    cosip = np.cos(inclp)
+
+    # direct application for inclinations of 0.2 rad and above
+    ph_direct = ph / np.where(sinip != 0.0, sinip, 1.0)
+    argpp_direct = argpp + pgh - cosip * ph_direct
+    nodep_direct = nodep + ph_direct
+
+    # lyddane modification for low inclinations
+    sinop = np.sin(nodep)
+    cosop = np.cos(nodep)
+    alfdp = sinip * sinop + (ph * cosop + pinc * cosip * sinop)
+    betdp = sinip * cosop + (-ph * sinop + pinc * cosip * cosop)
+    nodep_mod = np.fmod(nodep, TWOPI)
+    xls = mp + argpp + pl + pgh + (cosip - pinc * sinip) * nodep_mod
+    xnoh = nodep_mod
+    nodep_lyd = np.arctan2(alfdp, betdp)
+    wrap = np.abs(xnoh - nodep_lyd) > pi
+    nodep_lyd = np.where(
+        wrap,
+        np.where(nodep_lyd < xnoh, nodep_lyd + TWOPI, nodep_lyd - TWOPI),
+        nodep_lyd,
+    )
+    mp = mp + pl
+    argpp_lyd = xls - mp - cosip * nodep_lyd
+
+    direct = inclp >= 0.2
+    nodep = np.where(direct, nodep_direct, nodep_lyd)
+    argpp = np.where(direct, argpp_direct, argpp_lyd)
+    return ep, inclp, nodep, argpp, mp
+
+
+def _kepler(u, axnl, aynl):
+    """
+    Solves Kepler's equation for the mean longitude `u`. Only the elements that have not
+    converged yet are iterated, most of them converge within a few steps.
+
+    Returns:
+        sin and cos of the eccentric longitude, as used by the reference implementation.
+    """
+    shape = u.shape
+    u = u.ravel()
+    axnl = axnl.ravel()
+    aynl = aynl.ravel()
+    eo1 = u.copy()
+    sineo1 = np.empty_like(u)
+    coseo1 = np.empty_like(u)
+    pending = np.arange(u.size)
+
+    for _ in range(10):
+        e = eo1[pending]
+        ax = axnl[pending]
+        ay = aynl[pending]
+        sin_e = np.sin(e)
+        cos_e = np.cos(e)
+        sineo1[pending] = sin_e
+        coseo1[pending] = cos_e
+        tem5 = (u[pending] - ay * cos_e + ax * sin_e - e) / (
+            1.0 - cos_e * ax - sin_e * ay
+        )
+        np.clip(tem5, -0.95, 0.95, out=tem5)
+        eo1[pending] = e + tem5
+        pending = pending[np.abs(tem5) >= 1.0e-12]
+        if pending.size == 0:
+            break
+
+    return sineo1.reshape(shape), coseo1.reshape(shape)
+
+
+def _sgp4(
+    model: Dict[str, np.ndarray], t: np.ndarray, deep: bool
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Propagates every row of `model` to the minutes since epoch in `t`, shape (rows, times).
+    All rows must be near earth objects, or all deep space objects when `deep` is set.
+
+    Returns:
+        position (rows, times, 3) in km, velocity (rows, times, 3) in km/s and error codes.
+    """
+    temp4 = 1.5e-12
+    vkmpersec = EARTH_RADIUS * XKE / 60.0
+    col = lambda name: model[name][:, None]  # noqa: E731
+    shape = t.shape
+
+    # update for secular gravity and atmospheric drag
+    xmdf = col("mo") + col("mdot") * t
+    argpm = col("argpo") + col("argpdot") * t
+    nodedf = col("nodeo") + col("nodedot") * t
+    t2 = t * t
+    nodem = nodedf + col("nodecf") * t2
+    tempa = 1.0 - col("cc1") * t
+    tempe = col("bstar") * col("cc4") * t
+    templ = col("t2cof") * t2
+    mm = xmdf
+
+    full = ~model["isimp"]
+    if full.any():
+        # drag terms for objects that are neither deep space nor below 220 km perigee
+        tf = t[full]
+        xmdf_f = xmdf[full]
+        delomg = model["omgcof"][full][:, None] * tf
+        delmtemp = 1.0 + model["eta"][full][:, None] * np.cos(xmdf_f)
+        delm = model["xmcof"][full][:, None] * (
+            delmtemp * delmtemp * delmtemp - model["delmo"][full][:, None]
+        )
+        temp = delomg + delm
+        mm = xmdf.copy()
+        mm[full] = xmdf_f + temp
+        argpm[full] -= temp
+        t2f = t2[full]
+        t3 = t2f * tf
+        t4 = t3 * tf
+        tempa[full] -= (
+            model["d2"][full][:, None] * t2f
+            + model["d3"][full][:, None] * t3
+            + model["d4"][full][:, None] * t4
+        )
+        tempe[full] += (
+            model["bstar"][full][:, None]
+            * model["cc5"][full][:, None]
+            * (np.sin(mm[full]) - model["sinmao"][full][:, None])
+        )
+        templ[full] += model["t3cof"][full][:, None] * t3 + t4 * (
+            model["t4cof"][full][:, None] + tf * model["t5cof"][full][:, None]
+        )
+
+    nm = np.broadcast_to(col("no"), shape)
+    em = np.broadcast_to(col("ecco"), shape)
+    inclm = np.broadcast_to(col("inclo"), shape)
+
+    if deep:
+        ds = model["deep_space"]
+        em, argpm, inclm, mm, nodem, nm = _dspace(
+            model, ds, t, em, argpm, inclm, mm, nodem, nm.copy()
+        )
+
+    error = np.zeros(shape, dtype=np.int8)
+    error[nm <= 0.0] = ERROR_MEAN_MOTION
+
+    am = np.power(XKE / nm, X2O3) * tempa * tempa
+    nm = XKE / np.power(am, 1.5)
+    em = em - tempe
+
+    error[(error == 0) & ((em >= 1.0) | (em < -0.001))] = ERROR_ECCENTRICITY
+    em = np.maximum(em, 1.0e-6)
+
+    mm = mm + col("no") * templ
+    xlm = mm + argpm + nodem
+    nodem = np.fmod(nodem, TWOPI)
+    argpm = np.mod(argpm, TWOPI)
+    xlm = np.mod(xlm, TWOPI)
+    mm = np.mod(xlm - argpm - nodem, TWOPI)
+
+    if deep:
+        # lunar-solar periodics
+        ep, xincp, nodep, argpp, mp = _dpper(ds, t, em, inclm, nodem, argpm, mm)
+        negative = xincp < 0.0
+        if negative.any():
+            xincp = np.where(negative, -xincp, xincp)
+            nodep = np.where(negative, nodep + pi, nodep)
+            argpp = np.where(negative, argpp - pi, argpp)
+        error[(error == 0) & ((ep < 0.0) | (ep > 1.0))] = ERROR_PERTURBED_ECCENTRICITY
+
+        # long period periodics use the perturbed inclination
+        sinip = np.sin(xincp)
+        cosip = np.cos(xincp)
+        aycof = -0.5 * J3OJ2 * sinip
+        xlcof_denominator = np.where(np.abs(cosip + 1.0) > 1.5e-12, 1.0 + cosip, temp4)
+        xlcof = -0.25 * J3OJ2 * sinip * (3.0 + 5.0 * cosip) / xlcof_denominator
+        cosisq = cosip * cosip
+        con41 = 3.0 * cosisq - 1.0
+        x1mth2 = 1.0 - cosisq
+        x7thm1 = 7.0 * cosisq - 1.0
+    else:
+        ep, xincp, nodep, argpp, mp = em, inclm, nodem, argpm, mm
+        sinip = np.sin(col("inclo"))
+        cosip = np.cos(col("inclo"))
+        aycof = col("aycof")
+        xlcof = col("xlcof")
+        con41 = col("con41")
+        x1mth2 = col("x1mth2")
+        x7thm1 = col("x7thm1")
+
+    axnl = ep * np.cos(argpp)
+    temp = 1.0 / (am * (1.0 - ep * ep))
+    aynl = ep * np.sin(argpp) + temp * aycof
+    xl = mp + argpp + nodep + temp * xlcof * axnl
+
+    u = np.mod(xl - nodep, TWOPI)
+    sineo1, coseo1 = _kepler(u, axnl, aynl)
+
+    # short period preliminary quantities
+    ecose = axnl * coseo1 + aynl * sineo1
+    esine = axnl * sineo1 - aynl * coseo1
+    el2 = axnl * axnl + aynl * aynl
+    pl = am * (1.0 - el2)
+    error[(error == 0) & (pl < 0.0)] = ERROR_SEMILATUS_RECTUM
+
+    rl = am * (1.0 - ecose)
+    rdotl = np.sqrt(am) * esine / rl
+    rvdotl = np.sqrt(pl) / rl
+    betal = np.sqrt(1.0 - el2)
+    temp = esine / (1.0 + betal)
+    am_rl = am / rl
+    sinu = am_rl * (sineo1 - aynl - axnl * temp)
+    cosu = am_rl * (coseo1 - axnl + aynl * temp)
+    su = np.arctan2(sinu, cosu)
+    sin2u = (cosu + cosu) * sinu
+    cos2u = 1.0 - 2.0 * sinu * sinu
+    temp = 1.0 / pl
+    temp1 = 0.5 * J2 * temp
+    temp2 = temp1 * temp
+
+    # update for short period periodics
+    mrt = rl * (1.0 - 1.5 * temp2 * betal * con41) + 0.5 * temp1 * x1mth2 * cos2u
+    su = su - 0.25 * temp2 * x7thm1 * sin2u
+    xnode = nodep + 1.5 * temp2 * cosip * sin2u
+    xinc = xincp + 1.5 * temp2 * cosip * sinip * cos2u
+    mvt = rdotl - nm * temp1 * x1mth2 * sin2u / XKE
+    rvdot = rvdotl + nm * temp1 * (x1mth2 * cos2u + 1.5 * con41) / XKE
+
+    # orientation vectors
+    sinsu = np.sin(su)
+    cossu = np.cos(su)
+    snod = np.sin(xnode)
+    cnod = np.cos(xnode)
+    sini = np.sin(xinc)
+    cosi = np.cos(xinc)
+    xmx = -snod * cosi
+    xmy = cnod * cosi
+
+    mr = mrt * EARTH_RADIUS
+    mvt = mvt * vkmpersec
+    rvdot = rvdot * vkmpersec
+    position = np.empty(shape + (3,))
+    velocity = np.empty(shape + (3,))
+    for axis, (u_axis, v_axis) in enumerate(
+        (
+            (xmx * sinsu + cnod * cossu, xmx * cossu - cnod * sinsu),
+            (xmy * sinsu + snod * cossu, xmy * cossu - snod * sinsu),
+            (sini * sinsu, sini * cossu),
+        )
+    ):
+        np.multiply(mr, u_axis, out=position[..., axis])
+        velocity[..., axis] = mvt * u_axis + rvdot * v_axis
+
+    error[(error == 0) & (mrt < 1.0)] = ERROR_DECAYED
+    invalid = (error != ERROR_NONE) & (error != ERROR_DECAYED)
+    position[invalid] = np.nan
+    velocity[invalid] = np.nan
+    return position, velocity, error
+
+
+def as_times(times) -> np.ndarray:
+    """
+    Turns a datetime, a sequence of datetimes or datetime64 values into a 1-D
+    datetime64[us] array, the form every propagation function takes its times in.
+    """
+    if isinstance(times, datetime):
+        times = [times]
+    return np.atleast_1d(np.asarray(times, dtype="datetime64[us]"))
+
+
+def propagate_chunk(
+    elements: OrbitalElements, times: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Propagates every row of `elements` at once, in this process. propagate splits a catalog
+    into chunks of this. Near earth and deep space rows run as separate groups so neither
+    pays for the other's branches.
+
+    `times` is datetime64[us], either shared by every row, shape (times,), or per row,
+    shape (rows, times).
+
+    Returns:
+        TEME position (km) and velocity (km/s), shape (rows, times, 3), and the error code
+        of every row and time, shape (rows, times).
+    """
+    with np.errstate(all="ignore"):
+        model = _sgp4_init(elements)
+        if times.ndim == 1:
+            times = times[None, :]
+        tsince = (times - elements.epoch[:, None]) / np.timedelta64(60_000_000, "us")
+
+        deep = model["deep"]
+        if not deep.any():
+            return _sgp4(model, tsince, deep=False)
+
+        position = np.empty(tsince.shape + (3,))
+        velocity = np.empty(tsince.shape + (3,))
+        error = np.empty(tsince.shape, dtype=np.int8)
+        for rows, is_deep in ((~deep, False), (deep, True)):
+            if not rows.any():
+                continue
+            group = {
+                name: value[rows]
+                for name, value in model.items()
+                if name != "deep_space"
+            }
+            if is_deep:
+                group["deep_space"] = model["deep_space"]
+            position[rows], velocity[rows], error[rows] = _sgp4(
+                group, tsince[rows], deep=is_deep
+            )
+        return position, velocity, error
+
+
+def iter_propagate(
+    catalog: Union[Sequence[USC], OrbitalElements],
+    times,
+    chunk_size: Optional[int] = None,
+    processes: Optional[int] = None,
+) -> Iterator[Ephemeris]:
+    """
+    Propagates a catalog in chunks of objects and yields one Ephemeris per chunk.
+
+    Only the yielded chunk, and with processes one more per worker, is held in memory at a
+    time, so this is the way to run a whole catalog over many time steps and reduce the
+    states on the fly.
+
+    Args:
+        catalog: USC objects or prebuilt OrbitalElements.
+        times: A datetime, or array of datetimes / datetime64 values (UTC).
+        chunk_size: Objects per chunk. Defaults to DEFAULT_CHUNK_ELEMENTS // len(times).
+        processes: Spread chunks over this many worker processes. None runs in-process.
+    """
+    elements = (
+        catalog
+        if isinstance(catalog, OrbitalElements)
+        else OrbitalElements.from_catalog(catalog)
+    )
+    times = as_times(times)
+    if chunk_size is None:
+        chunk_size = max(DEFAULT_CHUNK_ELEMENTS // max(len(times), 1), 1)
+
+    chunks = [
+        elements.take(slice(start, start + chunk_size))
+        for start in range(0, len(elements), chunk_size)
+    ]
+
+    if processes is None or processes <= 1 or len(chunks) <= 1:
+        results = (propagate_chunk(chunk, times) for chunk in chunks)
+        for chunk, (position, velocity, error) in zip(chunks, results):
+            yield Ephemeris(chunk, times, position, velocity, error)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        # pool.map would submit every chunk at once and queue up all their results, so
+        # only one chunk per worker is submitted ahead of the one being yielded
+        pending: Deque[Tuple[OrbitalElements, Future]] = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(propagate_chunk, chunk, times)))
+            if len(pending) > processes:
+                done, future = pending.popleft()
+                yield Ephemeris(done, times, *future.result())
+        for done, future in pending:
+            yield Ephemeris(done, times, *future.result())
+
+
+def propagate(
+    catalog: Union[Sequence[USC], OrbitalElements],
+    times,
+    chunk_size: Optional[int] = None,
+    processes: Optional[int] = None,
+) -> Ephemeris:
+    """
+    Propagates every object of a catalog to every time in one call.
+
+    The output arrays hold objects x times x 3 doubles each, so use iter_propagate when that
+    does not fit in memory.
+
+    Args:
+        catalog: USC objects or prebuilt OrbitalElements. Objects without complete mean
+                 elements are skipped, see Ephemeris.elements.index for the kept rows.
+        times: A datetime, or array of datetimes / datetime64 values (UTC).
+        chunk_size: Objects propagated together, see iter_propagate.
+        processes: Number of worker processes, None to run in-process.
+
+    Returns:
+        An Ephemeris with TEME positions (km) and velocities (km/s).
+    """
+    elements = (
+        catalog
+        if isinstance(catalog, OrbitalElements)
+        else OrbitalElements.from_catalog(catalog)
+    )
+    times = as_times(times)
+    position = np.empty((len(elements), len(times), 3))
+    velocity = np.empty((len(elements), len(times), 3))
+    error = np.empty((len(elements), len(times)), dtype=np.int8)
+
+    start = 0
+    for part in iter_propagate(elements, times, chunk_size, processes):
+        stop = start + len(part.elements)
+        position[start:stop] = part.position
+        velocity[start:stop] = part.velocity
+        error[start:stop] = part.error
+        start = stop
+
+    return Ephemeris(elements, times, position, velocity, error)
+
+
+def propagate_rows(
+    elements: OrbitalElements, times: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Propagates every row of `elements` to its own time, for refining events found on a
+    coarse time grid.
+
+    Args:
+        elements: The rows to propagate.
+        times: One datetime64 per row.
+
+    Returns:
+        position (rows, 3) in km, velocity (rows, 3) in km/s and error codes (rows,).
+    """
+    times = np.asarray(times, dtype="datetime64[us]")
+    position, velocity, error = propagate_chunk(elements, times[:, None])
+    return position[:, 0], velocity[:, 0], error[:, 0]
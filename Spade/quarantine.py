@@ -0,0 +1,183 @@
+import json
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+"""
+This file contains the quarantine the importers send records to that could not be turned
+into a USC. Instead of printing every bad record, an import adds it to a Quarantine with its
+raw values, the error class and where in the file it was:
+
+    with Quarantine("quarantine.ndjson", max_error_rate=0.05) as quarantine:
+        catalog = spaceTrackXML(filename, quarantine=quarantine)
+    print(quarantine.summary())
+
+Records are buffered and written as newline delimited JSON, so a bad batch can be fixed and
+replayed with importers.replayQuarantine without parsing the whole file again. Errors are
+counted per error class. With max_error_rate an import stops with ErrorRateExceeded as soon
+as too many of the records seen so far failed, instead of importing a broken dump to the end.
+"""
+
+DEFAULT_BUFFER_SIZE = 1000
+# The error rate is only checked once this many records were seen, so one bad record at
+# the start of a file does not abort it
+DEFAULT_MIN_RECORDS = 100
+
+
+@dataclass
+class QuarantinedRecord:
+    """
+    A record that could not be imported.
+
+    Attributes:
+        source: Where the record came from, e.g. the filename.
+        offset: Index of the record in the source, counting from 0.
+        error_type: Class name of the error, e.g. "ValueError".
+        message: The error message.
+        raw: The raw values of the record, by USC field name where known.
+    """
+
+    source: str
+    offset: int
+    error_type: str
+    message: str
+    raw: Any
+
+
+class ErrorRateExceeded(Exception):
+    """
+    Raised when more records failed than Quarantine.max_error_rate allows.
+    """
+
+    def __init__(self, source: str, failed: int, seen: int, counts: Dict[str, int]):
+        self.source = source
+        self.failed = failed
+        self.seen = seen
+        self.counts = counts
+        super().__init__(
+            f"Aborted import of {source}: {failed} of the first {seen} records failed "
+            f"({_format_counts(counts)})"
+        )
+
+
+class NotReplayable(Exception):
+    """
+    A quarantined record whose raw value is not a dict of USC fields, e.g. a filename, so
+    importers.replayQuarantine can not import it.
+    """
+
+
+def _format_counts(counts: Dict[str, int]) -> str:
+    return ", ".join(f"{name} {count}" for name, count in counts.most_common())
+
+
+class Quarantine:
+    """
+    Buffered sink for records that failed to import.
+
+    Args:
+        path: NDJSON file the records are appended to. None keeps them in memory only.
+        max_error_rate: Largest fraction of failed records allowed, None never aborts.
+        min_records: Records that must be seen before the error rate is checked.
+        buffer_size: Records kept in memory before they are written to `path`.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_error_rate: Optional[float] = None,
+        min_records: int = DEFAULT_MIN_RECORDS,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        self.path = path
+        self.max_error_rate = max_error_rate
+        self.min_records = min_records
+        self.buffer_size = buffer_size
+        self.records: List[QuarantinedRecord] = []
+        self.counts: Counter = Counter()
+        self.failed = 0
+        self._failed_by_source: Counter = Counter()
+
+    def add(self, raw: Any, error: BaseException, offset: int, source: str = ""):
+        """
+        Quarantines one record.
+
+        Args:
+            raw: The raw values of the record.
+            error: What went wrong.
+            offset: Index of the record in its source, counting from 0. Together with the
+                    number of failures of the source it gives the error rate.
+            source: Where the record came from.
+
+        Raises:
+            ErrorRateExceeded: When the error rate of `source` is over max_error_rate.
+        """
+        error_type = type(error).__name__
+        self.records.append(
+            QuarantinedRecord(source, offset, error_type, str(error), raw)
+        )
+        self.counts[error_type] += 1
+        self.failed += 1
+        self._failed_by_source[source] += 1
+        if self.path is not None and len(self.records) >= self.buffer_size:
+            self.flush()
+
+        seen = offset + 1
+        failed = self._failed_by_source[source]
+        if (
+            self.max_error_rate is not None
+            and seen >= self.min_records
+            and failed > self.max_error_rate * seen
+        ):
+            self.flush()
+            raise ErrorRateExceeded(source, failed, seen, self.counts)
+
+    def flush(self):
+        """
+        Appends the buffered records to `path`. Does nothing without a path.
+        """
+        if self.path is None or not self.records:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(json.dumps(asdict(record), default=str))
+                f.write("\n")
+        self.records.clear()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> "Quarantine":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def summary(self) -> str:
+        """
+        One line with the number of quarantined records per error class.
+        """
+        if not self.failed:
+            return "No records quarantined"
+        return f"Quarantined {self.failed} records: {_format_counts(self.counts)}"
+
+    def report(self, source: str):
+        """
+        Prints one line about the quarantined records when there are any. This is what the
+        importers do when they are not given a quarantine.
+        """
+        if self.failed:
+            print(
+                f"{source}: skipped {self.failed} records that could not be read "
+                f"({_format_counts(self.counts)})"
+            )
+
+
+def iter_quarantine(path: str) -> Iterator[QuarantinedRecord]:
+    """
+    Reads back the records a Quarantine wrote to `path`.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield QuarantinedRecord(**json.loads(line))
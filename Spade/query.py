@@ -0,0 +1,287 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Spade.models import USC
+
+"""
+This file contains an in-memory query engine over a catalog. CatalogIndex keeps hash indexes
+on categorical fields and sorted indexes on numeric and date fields, so lookups and range
+queries do not have to scan every USC.
+
+Example:
+    index = CatalogIndex(listOfUSCs)
+    index.query(
+        Equals("OBJECT_TYPE", "PAYLOAD"),
+        Equals("COUNTRY_CODE", "US"),
+        Between("INCLINATION", 97.0, 99.0),
+        Between("PERIAPSIS", None, 2000.0),
+    )
+"""
+
+DEFAULT_HASH_FIELDS = (
+    "NORAD_CAT_ID",
+    "INTERNATIONAL_DESIGNATOR",
+    "OBJECT_TYPE",
+    "COUNTRY_CODE",
+    "RCS_SIZE",
+)
+
+DEFAULT_RANGE_FIELDS = (
+    "INCLINATION",
+    "PERIAPSIS",
+    "APOAPSIS",
+    "PERIOD",
+    "EPOCH",
+    "DRY_MASS",
+)
+
+
+@dataclass(frozen=True)
+class Equals:
+    """
+    Matches objects whose `field` equals `value`.
+    """
+
+    field: str
+    value: Any
+
+    def matches(self, usc: USC) -> bool:
+        return getattr(usc, self.field) == self.value
+
+
+@dataclass(frozen=True)
+class OneOf:
+    """
+    Matches objects whose `field` is any of `values`.
+    """
+
+    field: str
+    values: Tuple[Any, ...]
+
+    def __init__(self, field: str, values: Iterable[Any]):
+        object.__setattr__(self, "field", field)
+        object.__setattr__(self, "values", tuple(values))
+
+    def matches(self, usc: USC) -> bool:
+        return getattr(usc, self.field) in self.values
+
+
+@dataclass(frozen=True)
+class Between:
+    """
+    Matches objects whose `field` is within [low, high]. A None bound is open, objects
+    without a value never match.
+    """
+
+    field: str
+    low: Any = None
+    high: Any = None
+
+    def matches(self, usc: USC) -> bool:
+        value = getattr(usc, self.field)
+        if value is None:
+            return False
+        if self.low is not None and value < self.low:
+            return False
+        if self.high is not None and value > self.high:
+            return False
+        return True
+
+
+Predicate = Any  # Equals | OneOf | Between
+
+
+def _sortable(values: Sequence[Any]) -> np.ndarray:
+    """
+    Converts field values to an array that sorts the same way, datetimes become datetime64.
+    """
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, (datetime, date)):
+        return np.array(values, dtype="datetime64[us]")
+    return np.array(values, dtype=np.float64)
+
+
+def _present(column: np.ndarray) -> np.ndarray:
+    return ~np.isnat(column) if column.dtype.kind == "M" else ~np.isnan(column)
+
+
+def _bound(values: np.ndarray, bound: Any) -> Any:
+    if values.dtype.kind == "M":
+        return np.datetime64(bound, "us")
+    return float(bound)
+
+
+class CatalogIndex:
+    """
+    Hash and sorted indexes over a list of USC objects.
+
+    The index is a snapshot, build a new one after adding or changing objects.
+
+    Args:
+        catalog: The objects to index. Query results are objects from this list.
+        hash_fields: Fields with a value -> positions dictionary, for equality lookups.
+        range_fields: Fields with a sorted array of values, for range queries.
+    """
+
+    def __init__(
+        self,
+        catalog: Sequence[USC],
+        hash_fields: Sequence[str] = DEFAULT_HASH_FIELDS,
+        range_fields: Sequence[str] = DEFAULT_RANGE_FIELDS,
+    ):
+        self.catalog = list(catalog)
+        self._hash: Dict[str, Dict[Hashable, np.ndarray]] = {}
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        # hash fields as integer codes in catalog order, to filter candidates
+        self._codes: Dict[str, Tuple[Dict[Hashable, int], np.ndarray]] = {}
+
+        for name in hash_fields:
+            buckets: Dict[Hashable, List[int]] = {}
+            for position, usc in enumerate(self.catalog):
+                # None is a bucket of its own, so Equals(name, None) matches like a scan
+                buckets.setdefault(getattr(usc, name), []).append(position)
+            self._hash[name] = {
+                value: np.array(positions, dtype=np.int64)
+                for value, positions in buckets.items()
+            }
+            codes = np.full(len(self.catalog), -1, dtype=np.int64)
+            mapping: Dict[Hashable, int] = {}
+            for code, (value, positions) in enumerate(self._hash[name].items()):
+                mapping[value] = code
+                codes[positions] = code
+            self._codes[name] = (mapping, codes)
+
+        for name in range_fields:
+            column = _sortable([getattr(usc, name) for usc in self.catalog])
+            present = np.flatnonzero(_present(column))
+            order = present[np.argsort(column[present], kind="stable")]
+            self._columns[name] = column
+            self._sorted[name] = (column[order], order)
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def lookup(self, field: str, value: Any) -> List[USC]:
+        """
+        Returns the objects whose hash indexed `field` equals `value`, in catalog order.
+        """
+        positions = self._hash[field].get(value)
+        if positions is None:
+            return []
+        return [self.catalog[position] for position in positions.tolist()]
+
+    def values(self, field: str) -> List[Any]:
+        """
+        Returns the distinct values of a hash indexed field, without None.
+        """
+        return [value for value in self._hash[field] if value is not None]
+
+    def _positions(self, predicate: Predicate) -> Optional[np.ndarray]:
+        """
+        Returns the sorted positions matching `predicate` from an index, None when the field
+        has no index.
+        """
+        name = predicate.field
+        if isinstance(predicate, Equals) and name in self._hash:
+            return self._hash[name].get(predicate.value, np.empty(0, dtype=np.int64))
+        if isinstance(predicate, OneOf) and name in self._hash:
+            index = self._hash[name]
+            buckets = [index[value] for value in predicate.values if value in index]
+            if not buckets:
+                return np.empty(0, dtype=np.int64)
+            return np.sort(np.concatenate(buckets))
+        if isinstance(predicate, Between) and name in self._sorted:
+            start, stop = self._range(predicate)
+            return np.sort(self._sorted[name][1][start:stop])
+        return None
+
+    def _range(self, predicate: "Between") -> Tuple[int, int]:
+        """
+        Returns the slice of the sorted index of predicate.field within the bounds.
+        """
+        values, _ = self._sorted[predicate.field]
+        start, stop = 0, len(values)
+        if predicate.low is not None:
+            start = np.searchsorted(values, _bound(values, predicate.low), side="left")
+        if predicate.high is not None:
+            stop = np.searchsorted(values, _bound(values, predicate.high), side="right")
+        return int(start), max(int(stop), int(start))
+
+    def _estimate(self, predicate: Predicate) -> int:
+        """
+        Number of objects an index would return for `predicate`, len(catalog) without one.
+        """
+        name = predicate.field
+        if isinstance(predicate, Equals) and name in self._hash:
+            return len(self._hash[name].get(predicate.value, ()))
+        if isinstance(predicate, OneOf) and name in self._hash:
+            return sum(
+                len(self._hash[name].get(value, ())) for value in predicate.values
+            )
+        if isinstance(predicate, Between) and name in self._sorted:
+            start, stop = self._range(predicate)
+            return stop - start
+        return len(self.catalog)
+
+    def _filter(self, positions: np.ndarray, predicate: Predicate) -> np.ndarray:
+        """
+        Keeps the candidate positions that match `predicate`.
+        """
+        name = predicate.field
+        if isinstance(predicate, Between) and name in self._columns:
+            column = self._columns[name][positions]
+            keep = _present(column)
+            if predicate.low is not None:
+                keep &= column >= _bound(column, predicate.low)
+            if predicate.high is not None:
+                keep &= column <= _bound(column, predicate.high)
+            return positions[keep]
+        if isinstance(predicate, (Equals, OneOf)) and name in self._codes:
+            mapping, codes = self._codes[name]
+            wanted = (
+                [predicate.value] if isinstance(predicate, Equals) else predicate.values
+            )
+            wanted_codes = [mapping[value] for value in wanted if value in mapping]
+            return positions[np.isin(codes[positions], wanted_codes)]
+        matches = [
+            predicate.matches(self.catalog[position]) for position in positions.tolist()
+        ]
+        return positions[np.array(matches, dtype=bool)]
+
+    def query_positions(self, *predicates: Predicate) -> np.ndarray:
+        """
+        Returns the catalog positions matching all predicates, in catalog order.
+
+        The most selective indexed predicate picks the candidates and the others are only
+        checked on those.
+        """
+        if not predicates:
+            return np.arange(len(self.catalog))
+
+        ranked = sorted(predicates, key=self._estimate)
+        positions = self._positions(ranked[0])
+        rest = ranked[1:]
+        if positions is None:
+            positions = np.arange(len(self.catalog))
+            rest = ranked
+
+        for predicate in rest:
+            if len(positions) == 0:
+                break
+            positions = self._filter(positions, predicate)
+        return positions
+
+    def query(self, *predicates: Predicate) -> List[USC]:
+        """
+        Returns the objects matching all predicates, in catalog order.
+
+        Args:
+            predicates: Equals, OneOf and Between conditions on any USC field. Fields without
+                        an index still work but are checked object by object.
+        """
+        positions = self.query_positions(*predicates)
+        return [self.catalog[position] for position in positions.tolist()]
@@ -0,0 +1,273 @@
+import argparse
+import random
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from requests import Session
+
+from Spade.data_fetcher import (
+    DISCOS_SYNC_INTERVAL,
+    SPACE_TRACK_CACHE_TTL,
+    fetch_full_catlog_ST,
+    save_discos_objects,
+)
+from Spade.diff import diff_snapshots
+from Spade.importers import parseDISCOSJSON, parseSpaceTrack
+from Spade.models import USC
+from Spade.orchestrator import Stage, run_stages
+from Spade.snapshots import (
+    DEFAULT_KEEP_SNAPSHOTS,
+    DEFAULT_SNAPSHOT_FORMATS,
+    publish_snapshot,
+)
+
+"""
+This file contains a long running refresh scheduler. Instead of cron starting main.py over
+and over, one process keeps every source's HTTP session and latest catalog in memory and
+refreshes each source on its own schedule:
+
+    - A source runs again `interval` plus a random jitter after its last run. The interval is
+      never shorter than the source's cache TTL, a run before that would only hit the cache.
+    - A refresh that returns the same file as the last one (a cache hit) is not parsed again.
+    - A new file is parsed and diffed against the catalog in memory. Only when the content
+      changed is a new snapshot published with snapshots.publish_snapshot.
+
+Usage:
+    python -m Spade.scheduler --snapshot-dir snapshots/
+"""
+
+DEFAULT_JITTER = timedelta(minutes=5)
+# How long to wait before retrying a source whose refresh failed
+RETRY_DELAY = timedelta(minutes=15)
+
+
+@dataclass
+class SourceSchedule:
+    """
+    How and how often one source is refreshed.
+
+    Attributes:
+        name: Source name, used for the snapshot file names.
+        fetch: Downloads the source and returns the file, or None on failure. Gets the
+               settings and the source's long lived session.
+        parse: Reads the downloaded file into USC objects.
+        cache_ttl: How long a download stays fresh in the fetcher's cache.
+        interval: Time between refreshes, raised to cache_ttl when shorter.
+        jitter: Up to this much random delay is added to every interval, so sources and
+                instances do not hit the APIs in lockstep.
+    """
+
+    name: str
+    fetch: Callable[[object, Session], Optional[str]]
+    parse: Callable[[str], List[USC]]
+    cache_ttl: timedelta
+    interval: Optional[timedelta] = None
+    jitter: timedelta = DEFAULT_JITTER
+
+    def __post_init__(self):
+        if self.interval is None or self.interval < self.cache_ttl:
+            self.interval = self.cache_ttl
+
+
+def default_sources() -> List[SourceSchedule]:
+    """
+    Space-Track every 2 hours, its cache TTL, and DISCOS incrementally every day, so every
+    DISCOS object is revalidated within DISCOS_REVALIDATION_SLICES days.
+    """
+    return [
+        SourceSchedule(
+            name="space-track",
+            fetch=lambda settings, session: fetch_full_catlog_ST(settings, session),
+            parse=lambda filename: parseSpaceTrack(filename, keep_epochs=1),
+            cache_ttl=SPACE_TRACK_CACHE_TTL,
+        ),
+        SourceSchedule(
+            name="discos",
+            fetch=lambda settings, session: save_discos_objects(
+                settings,
+                incremental=True,
+                max_cache_age=DISCOS_SYNC_INTERVAL,
+                session=session,
+            ),
+            parse=parseDISCOSJSON,
+            cache_ttl=DISCOS_SYNC_INTERVAL,
+        ),
+    ]
+
+
+@dataclass
+class SourceState:
+    last_file: Optional[str] = None
+    last_run: Optional[datetime] = None
+    next_run: Optional[datetime] = None  # None runs at the next check
+    catalog: List[USC] = field(default_factory=list)
+    loaded: bool = False
+
+
+class RefreshScheduler:
+    """
+    Refreshes sources on their schedules and publishes snapshots when content changed.
+
+    Args:
+        settings: Settings passed to every fetch.
+        snapshot_dir: Where snapshots are published.
+        sources: Schedules, defaults to default_sources().
+        formats: Export formats of every snapshot.
+        keep: Number of snapshots kept on disk.
+        seed: Seed for the jitter.
+    """
+
+    def __init__(
+        self,
+        settings,
+        snapshot_dir: str,
+        sources: Optional[List[SourceSchedule]] = None,
+        formats=DEFAULT_SNAPSHOT_FORMATS,
+        keep: int = DEFAULT_KEEP_SNAPSHOTS,
+        seed: Optional[int] = None,
+    ):
+        self.settings = settings
+        self.snapshot_dir = snapshot_dir
+        self.sources = {s.name: s for s in (sources or default_sources())}
+        self.formats = formats
+        self.keep = keep
+        self.sessions: Dict[str, Session] = {name: Session() for name in self.sources}
+        self.state: Dict[str, SourceState] = {
+            name: SourceState() for name in self.sources
+        }
+        self.published: Optional[str] = None
+        self._rng = random.Random(seed)
+        self._stop = threading.Event()
+
+    def catalogs(self) -> Dict[str, List[USC]]:
+        """
+        The latest catalog of every source that was loaded at least once.
+        """
+        return {
+            name: state.catalog for name, state in self.state.items() if state.loaded
+        }
+
+    def _schedule(self, name: str, now: datetime, delay: timedelta):
+        source = self.sources[name]
+        jitter = source.jitter.total_seconds() * self._rng.random()
+        self.state[name].next_run = now + delay + timedelta(seconds=jitter)
+
+    def refresh(self, name: str, now: Optional[datetime] = None) -> bool:
+        """
+        Refreshes one source now.
+
+        Returns:
+            True when its content changed.
+        """
+        now = now or datetime.now()
+        source, state = self.sources[name], self.state[name]
+        state.last_run = now
+        # scheduled as failed first, so an exception in fetch or parse is retried too
+        self._schedule(name, now, RETRY_DELAY)
+
+        started = time.monotonic()
+        filename = source.fetch(self.settings, self.sessions[name])
+        if filename is None:
+            print(f"Refreshing {name} failed, retrying in {RETRY_DELAY}")
+            return False
+        # the cache age counts from the end of the download, so the next run does too
+        finished = now + timedelta(seconds=time.monotonic() - started)
+
+        if filename == state.last_file:
+            self._schedule(name, finished, source.interval)
+            return False
+
+        catalog = source.parse(filename)
+        changed = not state.loaded or bool(diff_snapshots(state.catalog, catalog))
+        # committed only now, so a parse or diff that raised is retried with the same file
+        state.last_file = filename
+        self._schedule(name, finished, source.interval)
+        if not changed:
+            print(f"{name} downloaded {filename} without changes")
+            return False
+        state.catalog = catalog
+        state.loaded = True
+        return True
+
+    def run_pending(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Refreshes every source that is due, all at once, and publishes one snapshot when any
+        changed.
+
+        Returns:
+            Names of the sources whose content changed.
+        """
+        now = now or datetime.now()
+        due = [
+            name
+            for name, state in self.state.items()
+            if state.next_run is None or state.next_run <= now
+        ]
+        # due sources are refreshed at the same time, they only share the jitter rng
+        report = run_stages(
+            Stage(name, lambda inputs, name=name: self.refresh(name, now))
+            for name in due
+        )
+        changed = []
+        for name in due:
+            result = report.stages[name]
+            if result.error is not None:
+                # keep the other sources and the daemon going, this one is retried later
+                print(
+                    f"Refreshing {name} failed with an unexpected error: {result.error}"
+                )
+            elif result.value:
+                changed.append(name)
+        if changed:
+            self.published = publish_snapshot(
+                self.snapshot_dir, self.catalogs(), self.formats, self.keep
+            )
+            print(f"Published snapshot {self.published} after changes in {changed}")
+        return changed
+
+    def seconds_until_next_run(self, now: Optional[datetime] = None) -> float:
+        now = now or datetime.now()
+        pending = [state.next_run for state in self.state.values()]
+        if any(next_run is None for next_run in pending):
+            return 0.0
+        return max(min(pending) - now, timedelta(0)).total_seconds()
+
+    def run_forever(self):
+        """
+        Runs until stop() is called, sleeping between due refreshes.
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(self.seconds_until_next_run())
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Background catalog refresh")
+    parser.add_argument("--snapshot-dir", default="snapshots")
+    parser.add_argument(
+        "--once", action="store_true", help="refresh every source once and exit"
+    )
+    args = parser.parse_args(argv)
+
+    from Spade.config import settings
+
+    scheduler = RefreshScheduler(settings, args.snapshot_dir)
+    if args.once:
+        scheduler.run_pending()
+        return
+
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
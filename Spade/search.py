@@ -0,0 +1,439 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from Spade.diff import SnapshotDiff, snapshot_key
+from Spade.models import USC
+
+"""
+This file contains a trigram search index over object names and DISCOS mission text. Every
+value is split into words and every word, padded with two spaces in front and one behind,
+into three character trigrams. Each trigram maps to the objects containing it, so a search
+only counts shared trigrams over the query's posting lists instead of scanning every name.
+Misspelled or partial names still share most of their trigrams, which makes it fuzzy.
+
+Results are ranked by the share of the query's trigrams an object contains, then by the
+similarity of the whole value, so "STARLINK-3" lists STARLINK-3 before STARLINK-3021.
+
+Example:
+    index = TrigramIndex(listOfUSCs)
+    index.search("cosmos 22")
+    index.apply_diff(diff_snapshots(old, new))  # after a refresh
+"""
+
+SEARCH_FIELDS = ("SATELLITE_NAME", "MISSION_DESC")
+DEFAULT_SEARCH_LIMIT = 10
+DEFAULT_MIN_SCORE = 0.5
+# Name matches below this similarity are not used to reconcile objects
+RECONCILE_MIN_SIMILARITY = 0.8
+# The index is rebuilt once removed objects are this share of it
+_COMPACT_RATIO = 0.5
+# Keys of objects without a snapshot_key start with this, followed by their position
+_UNKEYED_PREFIX = "#"
+
+_WORD_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def trigrams(text: Optional[str], prefix: bool = False) -> Set[str]:
+    """
+    The trigrams of `text`, case and punctuation insensitive.
+
+    Args:
+        text: Any name or description, None has no trigrams.
+        prefix: Leaves out the trigram that ends the last word, so a partly typed word
+                matches every word it starts.
+    """
+    if not text:
+        return set()
+    words = [word for word in _WORD_SEPARATORS.split(text.upper()) if word]
+    grams = set()
+    for number, word in enumerate(words):
+        padded = "  " + word
+        if not (prefix and number == len(words) - 1):
+            padded += " "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass
+class SearchResult:
+    """
+    One object found by TrigramIndex.search.
+
+    Attributes:
+        usc: The object.
+        score: Share of the query's trigrams found in the value, 1.0 contains them all.
+        similarity: Shared trigrams over all trigrams of query and value, 1.0 is the same
+                    text up to case and punctuation.
+        field: The field that matched best.
+    """
+
+    usc: USC
+    score: float
+    similarity: float
+    field: str
+
+
+class _FieldIndex:
+    """
+    Trigram postings of the distinct values of one field. Catalogs repeat names like
+    "FALCON 9 R/B" and mission texts thousands of times, so values are indexed once and
+    map to the positions of their objects.
+    """
+
+    def __init__(self):
+        self.value_ids: Dict[str, int] = {}
+        self.positions: List[List[int]] = []  # object positions by value id
+        self.sizes: List[int] = []  # trigrams by value id
+        self.postings: Dict[str, np.ndarray] = {}
+        # value ids added since the last flush
+        self.pending: Dict[str, List[int]] = {}
+        self.size_array = np.zeros(0, dtype=np.intp)
+
+    def add(self, value: str, position: int):
+        value_id = self.value_ids.get(value)
+        if value_id is None:
+            value_id = len(self.positions)
+            self.value_ids[value] = value_id
+            self.positions.append([])
+            grams = trigrams(value)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.pending.setdefault(gram, []).append(value_id)
+        self.positions[value_id].append(position)
+
+    def flush(self):
+        for gram, value_ids in self.pending.items():
+            # intp, so np.bincount does not copy every list to convert it
+            added = np.array(value_ids, dtype=np.intp)
+            if gram in self.postings:
+                added = np.concatenate((self.postings[gram], added))
+            self.postings[gram] = added
+        self.pending = {}
+        self.size_array = np.array(self.sizes, dtype=np.intp)
+
+    def candidates(
+        self, query: Set[str], needed: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Value ids sharing at least `needed` trigrams with the query, with the number of
+        shared trigrams and the similarity of each.
+        """
+        lists = [self.postings[gram] for gram in query if gram in self.postings]
+        if len(lists) < needed:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty, np.zeros(0)
+        counts = np.bincount(np.concatenate(lists))
+        value_ids = np.flatnonzero(counts >= needed)
+        shared = counts[value_ids]
+        similarity = shared / (len(query) + self.size_array[value_ids] - shared)
+        return value_ids, shared, similarity
+
+
+def _top(rank: np.ndarray, count: int) -> np.ndarray:
+    """
+    Indexes of the `count` highest ranks, highest first and ties in index order.
+    """
+    if len(rank) > count:
+        kth = np.partition(rank, len(rank) - count)[len(rank) - count]
+        above = np.flatnonzero(rank > kth)
+        tied = np.flatnonzero(rank == kth)[: count - len(above)]
+        chosen = np.concatenate((above, tied))
+    else:
+        chosen = np.arange(len(rank))
+    return chosen[np.argsort(-rank[chosen], kind="stable")]
+
+
+class TrigramIndex:
+    """
+    Trigram inverted index over text fields of a catalog.
+
+    Unlike CatalogIndex it is updated in place: add, remove and apply_diff only touch the
+    posting lists of the changed objects. Objects are keyed like diff.snapshot_key, adding
+    an object with the key of an indexed one replaces it. Objects without a key never
+    replace each other, they are keyed by their position.
+
+    Args:
+        catalog: The objects to index.
+        fields: Text fields that are indexed and searched.
+    """
+
+    def __init__(
+        self, catalog: Iterable[USC] = (), fields: Sequence[str] = SEARCH_FIELDS
+    ):
+        self.fields = tuple(fields)
+        self._reset()
+        self.update(catalog)
+
+    def _reset(self):
+        self._objects: List[Optional[USC]] = []  # by position, None once removed
+        self._positions: Dict[str, int] = {}
+        self._unkeyed: Set[str] = set()
+        self._fields = {name: _FieldIndex() for name in self.fields}
+        self._removed = 0
+        self._stale = False
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def get(self, key: str) -> Optional[USC]:
+        position = self._positions.get(key)
+        return None if position is None else self._objects[position]
+
+    def add(self, usc: USC):
+        key = snapshot_key(usc)
+        position = len(self._objects)
+        if key is None:
+            key = f"{_UNKEYED_PREFIX}{position}"
+            self._unkeyed.add(key)
+        elif key in self._positions:
+            self.remove(key)
+        self._objects.append(usc)
+        self._positions[key] = position
+        for name, field_index in self._fields.items():
+            value = getattr(usc, name)
+            if value:
+                field_index.add(value, position)
+        self._stale = True
+
+    def update(self, uscs: Iterable[USC]):
+        for usc in uscs:
+            self.add(usc)
+
+    def remove(self, usc: Union[USC, str]) -> bool:
+        """
+        Removes an object, given as a USC or its key.
+
+        Returns:
+            False when it was not indexed.
+        """
+        key = usc if isinstance(usc, str) else snapshot_key(usc)
+        if key is None:
+            # nothing identifies an unkeyed object but the object itself
+            key = next(
+                (k for k in self._unkeyed if self._objects[self._positions[k]] is usc),
+                None,
+            )
+        position = self._positions.pop(key, None)
+        if position is None:
+            return False
+        self._unkeyed.discard(key)
+        self._objects[position] = None
+        self._removed += 1
+        return True
+
+    def apply_diff(self, diff: SnapshotDiff):
+        """
+        Brings the index from the old snapshot of `diff` to the new one. Changed objects
+        whose indexed fields are the same only have their USC swapped. Objects without a
+        key can not be matched, the unkeyed objects of the new snapshot replace all of them.
+        """
+        for key in list(self._unkeyed):
+            self.remove(key)
+        for usc in diff.unkeyed:
+            self.add(usc)
+        for usc in diff.removed:
+            self.remove(usc)
+        for usc in diff.added:
+            self.add(usc)
+        for change in diff.changed:
+            position = self._positions.get(snapshot_key(change.new))
+            if position is None or any(name in self.fields for name in change.fields):
+                self.add(change.new)
+            else:
+                self._objects[position] = change.new
+
+    def _flush(self):
+        # removed objects stay in the postings until compacted, search skips them
+        if self._removed > _COMPACT_RATIO * len(self._objects):
+            live = [usc for usc in self._objects if usc is not None]
+            self._reset()
+            self.update(live)
+        if self._stale:
+            for field_index in self._fields.values():
+                field_index.flush()
+            self._stale = False
+
+    def search(
+        self,
+        text: str,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+        min_score: float = DEFAULT_MIN_SCORE,
+        fields: Optional[Sequence[str]] = None,
+        prefix: bool = True,
+    ) -> List[SearchResult]:
+        """
+        Finds the objects whose indexed text best matches `text`.
+
+        Args:
+            text: Query, e.g. a partial name like "STARLINK-3" or words like "weather".
+            limit: Maximum number of results.
+            min_score: Minimum share of the query's trigrams an object must contain.
+            fields: Fields searched, defaults to all indexed fields.
+            prefix: Treats the last word of the query as the start of a word.
+
+        Returns:
+            The best matches, best first. Objects with the same rank are in the order
+            they were added.
+        """
+        self._flush()
+        query = trigrams(text, prefix)
+        if not query or limit <= 0:
+            return []
+        # a small epsilon keeps e.g. 0.6 * 5 from rounding up to 4
+        needed = max(1, math.ceil(min_score * len(query) - 1e-9))
+
+        searched = tuple(fields or self.fields)
+        found = [self._fields[name].candidates(query, needed) for name in searched]
+        field_numbers = np.concatenate(
+            [np.full(len(value_ids), n) for n, (value_ids, _, _) in enumerate(found)]
+        )
+        if len(field_numbers) == 0:
+            return []
+        value_ids = np.concatenate([value_ids for value_ids, _, _ in found])
+        shared = np.concatenate([shared for _, shared, _ in found])
+        similarity = np.concatenate([similarity for _, _, similarity in found])
+        # shared counts are integers and similarity is at most 1, so this ranks by
+        # shared trigrams first and similarity second
+        rank = shared + 0.5 * similarity
+
+        # most values have a live object, so the best `limit` values usually suffice
+        count = limit
+        while True:
+            results: List[SearchResult] = []
+            seen: Set[int] = set()
+            order = _top(rank, count)
+            for i in order.tolist():
+                name = searched[field_numbers[i]]
+                for position in self._fields[name].positions[value_ids[i]]:
+                    usc = self._objects[position]
+                    if usc is None or position in seen:
+                        continue
+                    seen.add(position)
+                    results.append(
+                        SearchResult(
+                            usc=usc,
+                            score=float(shared[i]) / len(query),
+                            similarity=float(similarity[i]),
+                            field=name,
+                        )
+                    )
+                    if len(results) == limit:
+                        return results
+            if len(order) == len(rank):
+                return results
+            count *= 4
+
+
+@dataclass
+class Reconciliation:
+    """
+    Result of reconcile for one record.
+
+    Attributes:
+        record: The record that was matched.
+        match: The catalog object it describes, None when no match was found.
+        method: Field the match was made on: INTERNATIONAL_DESIGNATOR, NORAD_CAT_ID or
+                SATELLITE_NAME. None without a match.
+        similarity: Name similarity of SATELLITE_NAME matches, 1.0 for id matches.
+    """
+
+    record: USC
+    match: Optional[USC] = None
+    method: Optional[str] = None
+    similarity: float = 0.0
+
+
+def _designator(usc: USC) -> Optional[str]:
+    if not usc.INTERNATIONAL_DESIGNATOR:
+        return None
+    return usc.INTERNATIONAL_DESIGNATOR.strip().upper() or None
+
+
+def _norad(usc: USC) -> Optional[str]:
+    if not usc.NORAD_CAT_ID:
+        return None
+    return usc.NORAD_CAT_ID.strip().lstrip("0") or "0"
+
+
+def reconcile(
+    records: Iterable[USC],
+    catalog: Sequence[USC],
+    index: Optional[TrigramIndex] = None,
+    min_similarity: float = RECONCILE_MIN_SIMILARITY,
+) -> List[Reconciliation]:
+    """
+    Matches the records of one source to the objects of another, e.g. DISCOS objects to a
+    Space-Track catalog.
+
+    Records with a COSPAR id are matched on it alone. Records without one are matched on
+    NORAD_CAT_ID and then, as a fallback, by name through the trigram index. A name match
+    must be at least `min_similarity` similar, better than any other candidate and not
+    already matched by id, otherwise the record stays unmatched.
+
+    Args:
+        records: Objects to match.
+        catalog: Objects to match against.
+        index: A TrigramIndex over `catalog` with SATELLITE_NAME, built when None.
+        min_similarity: Lowest trigram similarity accepted for name matches.
+
+    Returns:
+        One Reconciliation per record, in the order of `records`.
+    """
+    by_designator: Dict[str, USC] = {}
+    by_norad: Dict[str, USC] = {}
+    for usc in catalog:
+        designator, norad = _designator(usc), _norad(usc)
+        if designator is not None:
+            by_designator.setdefault(designator, usc)
+        if norad is not None:
+            by_norad.setdefault(norad, usc)
+
+    results: List[Reconciliation] = []
+    unmatched: List[Reconciliation] = []
+    claimed: Set[int] = set()
+    for record in records:
+        result = Reconciliation(record)
+        results.append(result)
+        designator, norad = _designator(record), _norad(record)
+        if designator is not None:
+            match = by_designator.get(designator)
+            if match is not None:
+                result.match, result.method = match, "INTERNATIONAL_DESIGNATOR"
+        elif norad is not None and norad in by_norad:
+            result.match, result.method = by_norad[norad], "NORAD_CAT_ID"
+        elif record.SATELLITE_NAME:
+            unmatched.append(result)
+        if result.match is not None:
+            result.similarity = 1.0
+            claimed.add(id(result.match))
+
+    if not unmatched:
+        return results
+    if index is None:
+        index = TrigramIndex(catalog, fields=("SATELLITE_NAME",))
+    for result in unmatched:
+        candidates = [
+            found
+            for found in index.search(
+                result.record.SATELLITE_NAME,
+                limit=5,
+                min_score=min_similarity,
+                fields=("SATELLITE_NAME",),
+                prefix=False,
+            )
+            if id(found.usc) not in claimed
+        ]
+        candidates.sort(key=lambda found: found.similarity, reverse=True)
+        if not candidates or candidates[0].similarity < min_similarity:
+            continue
+        if len(candidates) > 1 and candidates[1].similarity >= candidates[0].similarity:
+            continue
+        best = candidates[0]
+        result.match, result.method = best.usc, "SATELLITE_NAME"
+        result.similarity = best.similarity
+        claimed.add(id(best.usc))
+    return results
@@ -0,0 +1,696 @@
+import argparse
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from Spade.exporters import EXPORT_COLUMNS, column_type, json_record
+from Spade.importers import iterNDJSONtoUSC
+from Spade.models import USC
+from Spade.query import Between, CatalogIndex, Equals, OneOf
+from Spade.search import DEFAULT_SEARCH_LIMIT, TrigramIndex
+from Spade.snapshots import (
+    MANIFEST_FILE,
+    current_snapshot,
+    list_snapshots,
+    read_manifest,
+)
+
+"""
+This file contains an asyncio HTTP/1.1 server for the snapshots the refresh scheduler
+publishes. Export files are never generated per request, they are sent from disk with
+loop.sendfile, which uses the zero-copy sendfile(2) system call on plain sockets.
+
+Routes:
+    GET /                               manifest of the current snapshot
+    GET /download/<file>                a file of the current snapshot
+    GET /snapshots/<id>/<file>          a file of a specific snapshot, cacheable forever
+    GET /query?source=..&<FIELD>=..     objects of the current snapshot matching filters
+    GET /search?source=..&q=..          fuzzy name and mission search, see search.py
+
+Downloads support ETag/If-None-Match, Last-Modified/If-Modified-Since, single byte ranges
+and HEAD. Asking for `<source>.csv` with `Accept-Encoding: gzip` sends the pre-compressed
+`<source>.csv.gz` with `Content-Encoding: gzip`, unless gzip has q=0. A file that is only
+stored compressed is answered with 406 to clients that do not accept gzip.
+
+Query filters are `FIELD=value`, `FIELD=a,b,c` for any of several values and
+`FIELD=low..high` for ranges with either bound optional, e.g.
+    /query?source=space-track&OBJECT_TYPE=PAYLOAD&INCLINATION=97..99&limit=100
+
+Usage:
+    python -m Spade.server --snapshot-dir snapshots/ --port 8080
+"""
+
+DEFAULT_PORT = 8080
+MAX_HEADER_BYTES = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 15.0
+# How often CURRENT is checked for a newly published snapshot
+CURRENT_CHECK_SECONDS = 1.0
+DEFAULT_QUERY_LIMIT = 1000
+MAX_QUERY_LIMIT = 10_000
+
+CONTENT_TYPES = {
+    ".csv": "text/csv; charset=utf-8",
+    ".ndjson": "application/x-ndjson",
+    ".json": "application/json",
+    ".sqlite": "application/vnd.sqlite3",
+    ".tle": "text/plain; charset=utf-8",
+    ".3le": "text/plain; charset=utf-8",
+    ".gz": "application/gzip",
+}
+
+_REASONS = {
+    200: "OK",
+    206: "Partial Content",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    406: "Not Acceptable",
+    416: "Range Not Satisfiable",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: List[Tuple[str, str]]
+    version: str
+    headers: Dict[str, str]  # lower case names
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single `bytes=` range into an inclusive (first, last), clipped to the file.
+    Returns None for headers that are ignored (malformed or several ranges).
+
+    Raises:
+        HTTPError: 416 when the range starts past the end of the file.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, separator, last = ranges.strip().partition("-")
+    if not separator:
+        return None
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                raise HTTPError(416, "Empty suffix range")
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPError(416, "Range starts after the end of the file")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def gzip_quality(header: str) -> float:
+    """
+    The q-value an Accept-Encoding header gives gzip, through `gzip`, `x-gzip` or `*`.
+    0.0 when gzip is not accepted, e.g. for "gzip;q=0" or "identity".
+    """
+    qualities = {}
+    for part in header.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding]
+    return 0.0
+
+
+def _parse_value(field: str, text: str) -> Any:
+    kind = column_type(field)
+    if kind is float:
+        return float(text)
+    if kind is int:
+        return int(text)
+    if kind is datetime:
+        return datetime.fromisoformat(text)
+    if kind is date:
+        return date.fromisoformat(text)
+    return text
+
+
+def parse_filters(query: List[Tuple[str, str]]) -> List[Any]:
+    """
+    Turns `FIELD=value` query parameters into query predicates.
+
+    Raises:
+        HTTPError: 400 for unknown fields or values of the wrong type.
+    """
+    predicates = []
+    for field, text in query:
+        if field in ("source", "limit"):
+            continue
+        if field not in EXPORT_COLUMNS or column_type(field) is list:
+            raise HTTPError(400, f"Unknown filter field {field}")
+        try:
+            if ".." in text:
+                low, high = text.split("..", 1)
+                predicates.append(
+                    Between(
+                        field,
+                        _parse_value(field, low) if low else None,
+                        _parse_value(field, high) if high else None,
+                    )
+                )
+            elif "," in text:
+                values = [_parse_value(field, part) for part in text.split(",")]
+                predicates.append(OneOf(field, values))
+            else:
+                predicates.append(Equals(field, _parse_value(field, text)))
+        except ValueError:
+            raise HTTPError(400, f"Bad value for {field}: {text}")
+    return predicates
+
+
+class SnapshotServer:
+    """
+    Serves the snapshots in `snapshot_dir`.
+
+    Args:
+        snapshot_dir: Directory the scheduler publishes into.
+        host: Address to listen on.
+        port: Port to listen on, 0 picks a free one.
+        backlog: Listen backlog, large so bursts of connections are not refused.
+    """
+
+    def __init__(
+        self,
+        snapshot_dir: str,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        backlog: int = 4096,
+    ):
+        self.snapshot_dir = snapshot_dir
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._current: Optional[str] = None
+        self._current_checked = float("-inf")
+        self._manifests: Dict[str, Dict[str, Any]] = {}
+        # catalogs and indexes by (snapshot id, source, kind)
+        self._cache: Dict[Tuple[str, str, str], "asyncio.Future[Any]"] = {}
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> "SnapshotServer":
+        self._server = await asyncio.start_server(
+            self._handle,
+            self.host,
+            self.port,
+            backlog=self.backlog,
+            limit=MAX_HEADER_BYTES,
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # idle keep-alive connections would hold wait_closed() open
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # Snapshots
+
+    def current(self) -> Optional[str]:
+        now = asyncio.get_running_loop().time()
+        if now - self._current_checked >= CURRENT_CHECK_SECONDS:
+            self._current = current_snapshot(self.snapshot_dir)
+            self._current_checked = now
+        return self._current
+
+    def manifest(self, snapshot_id: str) -> Dict[str, Any]:
+        """
+        The manifest of a published snapshot. Every route reads it before touching a file,
+        so ids that are not published, like "..", never reach the file system.
+
+        Raises:
+            HTTPError: 404 for ids that are not published snapshots.
+        """
+        if snapshot_id not in self._manifests:
+            if (
+                "/" in snapshot_id
+                or "\\" in snapshot_id
+                or ".." in snapshot_id
+                or snapshot_id not in list_snapshots(self.snapshot_dir)
+            ):
+                raise HTTPError(404, f"No snapshot {snapshot_id}")
+            try:
+                self._manifests[snapshot_id] = read_manifest(
+                    self.snapshot_dir, snapshot_id
+                )
+            except (OSError, ValueError):
+                raise HTTPError(404, f"No snapshot {snapshot_id}")
+        return self._manifests[snapshot_id]
+
+    def _require_current(self) -> str:
+        snapshot_id = self.current()
+        if snapshot_id is None:
+            raise HTTPError(503, "No snapshot published yet")
+        return snapshot_id
+
+    async def _cached(self, key: Tuple[str, str, str], build: Callable[[], Any]) -> Any:
+        """
+        Runs `build` once per key in a worker thread, concurrent requests share it.
+        """
+        if key not in self._cache:
+            # older snapshots are not queried any more
+            for old in [k for k in self._cache if k[0] != key[0]]:
+                del self._cache[old]
+            self._cache[key] = asyncio.ensure_future(asyncio.to_thread(build))
+        try:
+            return await asyncio.shield(self._cache[key])
+        except Exception:
+            self._cache.pop(key, None)
+            raise
+
+    async def catalog(self, snapshot_id: str, source: str) -> List[USC]:
+        """
+        The objects of one source of a snapshot, read from its NDJSON export.
+        """
+        files = self.manifest(snapshot_id)["files"]
+        name = next(
+            (
+                name
+                for name in (f"{source}.ndjson.gz", f"{source}.ndjson")
+                if name in files
+            ),
+            None,
+        )
+        if name is None:
+            raise HTTPError(404, f"No queryable export of {source}")
+        filename = os.path.join(self.snapshot_dir, snapshot_id, name)
+        return await self._cached(
+            (snapshot_id, source, "catalog"),
+            lambda: list(iterNDJSONtoUSC(filename)),
+        )
+
+    async def index(self, snapshot_id: str, source: str) -> CatalogIndex:
+        """
+        The query index of one source of a snapshot, built once.
+        """
+        catalog = await self.catalog(snapshot_id, source)
+        return await self._cached(
+            (snapshot_id, source, "index"), lambda: CatalogIndex(catalog)
+        )
+
+    async def search_index(self, snapshot_id: str, source: str) -> TrigramIndex:
+        """
+        The name and mission search index of one source of a snapshot, built once.
+        """
+        catalog = await self.catalog(snapshot_id, source)
+        return await self._cached(
+            (snapshot_id, source, "search"), lambda: TrigramIndex(catalog)
+        )
+
+    # HTTP
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                try:
+                    await self._dispatch(request, writer)
+                except HTTPError as e:
+                    await self._send_error(writer, request, e.status, str(e))
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    print(f"Error answering {request.method} {request.path}: {e}")
+                    await self._send_error(writer, None, 500, "Internal error")
+                    break
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as e:
+            # the request itself could not be read, answer and drop the connection
+            try:
+                await self._send_error(writer, None, e.status, str(e))
+            except ConnectionError:
+                pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        try:
+            head = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT
+            )
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(400, "Request headers too large")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        # GET and HEAD have no body. Other requests are rejected without reading theirs, so
+        # the connection can not be reused after them
+        if headers.get("content-length", "0") != "0" or "transfer-encoding" in headers:
+            headers["connection"] = "close"
+        parts = urlsplit(target)
+        return Request(
+            method=method,
+            path=unquote(parts.path),
+            query=parse_qsl(parts.query),
+            version=version,
+            headers=headers,
+        )
+
+    async def _dispatch(self, request: Request, writer: asyncio.StreamWriter):
+        if request.method not in ("GET", "HEAD"):
+            raise HTTPError(405, f"{request.method} is not supported")
+
+        parts = [part for part in request.path.split("/") if part]
+        if not parts:
+            snapshot_id = self._require_current()
+            await self._send_file(writer, request, snapshot_id, MANIFEST_FILE)
+        elif parts[0] == "download" and len(parts) == 2:
+            snapshot_id = self._require_current()
+            await self._send_file(writer, request, snapshot_id, parts[1])
+        elif parts[0] == "snapshots" and len(parts) == 3:
+            await self._send_file(writer, request, parts[1], parts[2], immutable=True)
+        elif parts == ["query"]:
+            await self._query(writer, request)
+        elif parts == ["search"]:
+            await self._search(writer, request)
+        else:
+            raise HTTPError(404, f"No route for {request.path}")
+
+    def _resolve(
+        self, request: Request, snapshot_id: str, name: str
+    ) -> Tuple[str, Dict]:
+        """
+        Returns the file to send and extra headers. Only files listed in the manifest of a
+        published snapshot are served, which keeps paths inside the snapshot directory.
+
+        Raises:
+            HTTPError: 404 for unknown files, 406 when only the gzip file is stored and the
+                       client does not accept gzip.
+        """
+        files = self.manifest(snapshot_id)["files"]
+        content_type = CONTENT_TYPES.get(
+            os.path.splitext(name)[1], "application/octet-stream"
+        )
+        if f"{name}.gz" in files:
+            accept_encoding = request.headers.get("accept-encoding")
+            if accept_encoding is None:
+                # any coding is acceptable, the plain file is still preferred
+                accepts_gzip = name not in files
+            else:
+                accepts_gzip = gzip_quality(accept_encoding) > 0
+            if accepts_gzip:
+                return f"{name}.gz", {
+                    "Content-Encoding": "gzip",
+                    "Content-Type": content_type,
+                    "Vary": "Accept-Encoding",
+                }
+            if name in files:
+                return name, {"Content-Type": content_type, "Vary": "Accept-Encoding"}
+            raise HTTPError(406, f"{name} is only available gzip compressed")
+        if name not in files and name != MANIFEST_FILE:
+            raise HTTPError(404, f"No file {name} in snapshot {snapshot_id}")
+        return name, {"Content-Type": content_type}
+
+    async def _send_file(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Request,
+        snapshot_id: str,
+        name: str,
+        immutable: bool = False,
+    ):
+        name, headers = self._resolve(request, snapshot_id, name)
+        path = os.path.join(self.snapshot_dir, snapshot_id, name)
+        try:
+            file = open(path, "rb")
+        except OSError:
+            raise HTTPError(404, f"No file {name} in snapshot {snapshot_id}")
+
+        with file:
+            stat = os.fstat(file.fileno())
+            size = stat.st_size
+            etag = f'"{snapshot_id}-{name}"'
+            headers.update(
+                {
+                    "ETag": etag,
+                    "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+                    "Accept-Ranges": "bytes",
+                    "Cache-Control": (
+                        "public, max-age=31536000, immutable"
+                        if immutable
+                        else "no-cache"
+                    ),
+                }
+            )
+            if name != MANIFEST_FILE:
+                download_name = name[:-3] if "Content-Encoding" in headers else name
+                headers["Content-Disposition"] = (
+                    f'attachment; filename="{snapshot_id}-{download_name}"'
+                )
+
+            if self._not_modified(request, etag, stat.st_mtime):
+                await self._send_head(writer, request, 304, headers)
+                return
+
+            status, offset, count = 200, 0, size
+            range_header = request.headers.get("range")
+            if_range = request.headers.get("if-range")
+            if range_header and (if_range is None or if_range == etag):
+                try:
+                    byte_range = parse_range(range_header, size)
+                except HTTPError:
+                    headers["Content-Range"] = f"bytes */{size}"
+                    await self._send_head(
+                        writer, request, 416, headers, content_length=0
+                    )
+                    return
+                if byte_range is not None:
+                    first, last = byte_range
+                    status, offset, count = 206, first, last - first + 1
+                    headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+
+            await self._send_head(writer, request, status, headers, count)
+            if request.method == "HEAD" or count == 0:
+                return
+            await writer.drain()
+            await asyncio.get_running_loop().sendfile(
+                writer.transport, file, offset, count
+            )
+
+    def _not_modified(self, request: Request, etag: str, mtime: float) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or etag in [
+                tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+            ]
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def _source_and_limit(
+        self, request: Request, snapshot_id: str, default_limit: int
+    ) -> Tuple[str, int]:
+        params = dict(request.query)
+        sources = self.manifest(snapshot_id)["counts"]
+        source = params.get("source") or next(iter(sources), None)
+        if source not in sources:
+            raise HTTPError(404, f"No source {source} in snapshot {snapshot_id}")
+        try:
+            limit = int(params.get("limit", default_limit))
+        except ValueError:
+            raise HTTPError(400, "limit must be a number")
+        return source, max(0, min(limit, MAX_QUERY_LIMIT))
+
+    async def _send_json(
+        self, writer: asyncio.StreamWriter, request: Request, document: Dict
+    ):
+        body = json.dumps(document, ensure_ascii=False).encode()
+        await self._send_body(
+            writer,
+            request,
+            200,
+            body,
+            {"Content-Type": "application/json", "Cache-Control": "no-cache"},
+        )
+
+    async def _query(self, writer: asyncio.StreamWriter, request: Request):
+        snapshot_id = self._require_current()
+        source, limit = self._source_and_limit(
+            request, snapshot_id, DEFAULT_QUERY_LIMIT
+        )
+        predicates = parse_filters(request.query)
+        index = await self.index(snapshot_id, source)
+        positions = index.query_positions(*predicates)
+        results = [
+            json_record(index.catalog[position])
+            for position in positions[:limit].tolist()
+        ]
+        await self._send_json(
+            writer,
+            request,
+            {
+                "snapshot": snapshot_id,
+                "source": source,
+                "count": len(positions),
+                "results": results,
+            },
+        )
+
+    async def _search(self, writer: asyncio.StreamWriter, request: Request):
+        snapshot_id = self._require_current()
+        source, limit = self._source_and_limit(
+            request, snapshot_id, DEFAULT_SEARCH_LIMIT
+        )
+        text = dict(request.query).get("q", "").strip()
+        if not text:
+            raise HTTPError(400, "q is required")
+        index = await self.search_index(snapshot_id, source)
+        results = [
+            {
+                "score": round(found.score, 4),
+                "similarity": round(found.similarity, 4),
+                "field": found.field,
+                "object": json_record(found.usc),
+            }
+            for found in index.search(text, limit=limit)
+        ]
+        await self._send_json(
+            writer,
+            request,
+            {"snapshot": snapshot_id, "source": source, "results": results},
+        )
+
+    async def _send_head(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Optional[Request],
+        status: int,
+        headers: Dict[str, str],
+        content_length: Optional[int] = None,
+    ):
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+        headers = dict(headers)
+        headers["Date"] = formatdate(usegmt=True)
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+        if request is None or not request.keep_alive:
+            headers["Connection"] = "close"
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_body(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Optional[Request],
+        status: int,
+        body: bytes,
+        headers: Dict[str, str],
+    ):
+        await self._send_head(writer, request, status, headers, len(body))
+        if request is None or request.method != "HEAD":
+            writer.write(body)
+        await writer.drain()
+
+    async def _send_error(
+        self,
+        writer: asyncio.StreamWriter,
+        request: Optional[Request],
+        status: int,
+        message: str,
+    ):
+        body = json.dumps({"error": message}).encode()
+        await self._send_body(
+            writer, request, status, body, {"Content-Type": "application/json"}
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve published catalog snapshots")
+    parser.add_argument("--snapshot-dir", default="snapshots")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    server = SnapshotServer(args.snapshot_dir, args.host, args.port)
+    print(f"Serving {args.snapshot_dir} on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from Spade.exporters import export
+from Spade.models import USC
+
+"""
+This file contains the on-disk layout of published catalog snapshots. A snapshot is a
+directory of export files, one per source and format, plus a manifest:
+
+    snapshot_dir/
+        CURRENT                      id of the newest complete snapshot
+        20250609T042109123456Z/
+            manifest.json
+            space-track.csv.gz
+            space-track.sqlite
+            discos.csv.gz
+            ...
+
+A snapshot is written into a temporary directory and renamed into place before CURRENT is
+replaced, so readers only ever see complete snapshots.
+"""
+
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+DEFAULT_SNAPSHOT_FORMATS = ("csv.gz", "ndjson.gz", "json.gz", "sqlite")
+DEFAULT_KEEP_SNAPSHOTS = 3
+_TEMPORARY_PREFIX = ".tmp-"
+
+
+def _snapshot_id(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+
+class SnapshotWriter:
+    """
+    Writes one snapshot source by source, so a source can be exported as soon as its
+    catalog is ready. add may be called from several threads at once.
+
+    Args:
+        snapshot_dir: Directory holding all snapshots, created when missing.
+        formats: File extensions understood by exporters.export.
+        created: Time of the snapshot, defaults to now.
+    """
+
+    def __init__(
+        self,
+        snapshot_dir: str,
+        formats: Iterable[str] = DEFAULT_SNAPSHOT_FORMATS,
+        created: Optional[datetime] = None,
+    ):
+        self.snapshot_dir = snapshot_dir
+        self.formats = tuple(formats)
+        self.created = created or datetime.now(timezone.utc)
+        self.snapshot_id = _snapshot_id(self.created)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self.temporary = os.path.join(
+            snapshot_dir, _TEMPORARY_PREFIX + self.snapshot_id
+        )
+        os.makedirs(self.temporary)
+
+    def add(self, source: str, catalog: Iterable[USC]) -> int:
+        """
+        Exports the catalog of one source in every format.
+
+        Returns:
+            Number of USC objects in the catalog.
+        """
+        catalog = list(catalog)
+        files: Dict[str, Dict[str, Any]] = {}
+        for extension in self.formats:
+            name = f"{source}.{extension}"
+            export(catalog, os.path.join(self.temporary, name))
+            files[name] = {
+                "source": source,
+                "format": extension,
+                "size": os.path.getsize(os.path.join(self.temporary, name)),
+            }
+        with self._lock:
+            self.counts[source] = len(catalog)
+            self.files.update(files)
+        return len(catalog)
+
+    def publish(self, keep: int = DEFAULT_KEEP_SNAPSHOTS) -> str:
+        """
+        Writes the manifest, moves the snapshot into place and makes it current.
+
+        Returns:
+            The id of the new snapshot.
+        """
+        manifest = {
+            "id": self.snapshot_id,
+            "created": self.created.isoformat(),
+            "counts": self.counts,
+            "files": self.files,
+        }
+        try:
+            with open(
+                os.path.join(self.temporary, MANIFEST_FILE), "w", encoding="utf-8"
+            ) as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(self.temporary, os.path.join(self.snapshot_dir, self.snapshot_id))
+        except BaseException:
+            self.discard()
+            raise
+
+        current = os.path.join(self.snapshot_dir, CURRENT_FILE)
+        with open(current + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.snapshot_id)
+        os.replace(current + ".tmp", current)
+
+        prune_snapshots(self.snapshot_dir, keep)
+        return self.snapshot_id
+
+    def discard(self):
+        """
+        Deletes what was written so far, for a snapshot that will not be published.
+        """
+        shutil.rmtree(self.temporary, ignore_errors=True)
+
+
+def publish_snapshot(
+    snapshot_dir: str,
+    catalogs: Dict[str, Iterable[USC]],
+    formats: Iterable[str] = DEFAULT_SNAPSHOT_FORMATS,
+    keep: int = DEFAULT_KEEP_SNAPSHOTS,
+    created: Optional[datetime] = None,
+) -> str:
+    """
+    Exports every catalog in every format as a new snapshot and makes it current.
+
+    Args:
+        snapshot_dir: Directory holding all snapshots, created when missing.
+        catalogs: USC objects by source name, e.g. {"space-track": [...]}.
+        formats: File extensions understood by exporters.export.
+        keep: Number of snapshots kept, older ones are deleted after publishing.
+        created: Time of the snapshot, defaults to now.
+
+    Returns:
+        The id of the new snapshot.
+    """
+    writer = SnapshotWriter(snapshot_dir, formats, created)
+    try:
+        for source, catalog in catalogs.items():
+            writer.add(source, catalog)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.publish(keep)
+
+
+def list_snapshots(snapshot_dir: str) -> List[str]:
+    """
+    Returns the ids of all complete snapshots, oldest first.
+    """
+    if not os.path.isdir(snapshot_dir):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(snapshot_dir)
+        if not name.startswith(_TEMPORARY_PREFIX)
+        and os.path.isfile(os.path.join(snapshot_dir, name, MANIFEST_FILE))
+    )
+
+
+def current_snapshot(snapshot_dir: str) -> Optional[str]:
+    """
+    Returns the id of the current snapshot, or None when nothing was published yet.
+    """
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILE), encoding="utf-8") as f:
+            snapshot_id = f.read().strip()
+    except OSError:
+        return None
+    return snapshot_id or None
+
+
+def read_manifest(snapshot_dir: str, snapshot_id: str) -> Dict[str, Any]:
+    with open(
+        os.path.join(snapshot_dir, snapshot_id, MANIFEST_FILE), encoding="utf-8"
+    ) as f:
+        return json.load(f)
+
+
+def prune_snapshots(snapshot_dir: str, keep: int = DEFAULT_KEEP_SNAPSHOTS):
+    """
+    Deletes all but the newest `keep` snapshots. The current snapshot is never deleted.
+    """
+    current = current_snapshot(snapshot_dir)
+    snapshots = list_snapshots(snapshot_dir)
+    for snapshot_id in snapshots[: max(len(snapshots) - keep, 0)]:
+        if snapshot_id != current:
+            shutil.rmtree(os.path.join(snapshot_dir, snapshot_id), ignore_errors=True)
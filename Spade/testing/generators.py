@@ -0,0 +1,550 @@
+import csv
+import json
+import math
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+from xml.sax.saxutils import escape
+
+from Spade.importers import convert_types
+from Spade.models import USC
+from Spade.orbit_parameters import EARTH_MU, EARTH_RADIUS
+
+"""
+This file contains generators for synthetic but realistic catalogs. They are modeled on the
+files in tests/testFiles and are used by the benchmarks and the mock servers so that large
+imports can be measured without downloading anything.
+"""
+
+DEFAULT_BASE_EPOCH = datetime(2025, 6, 9, 4, 21, 9)
+
+# (name prefix, OBJECT_TYPE, DISCOS objectClass, country, site)
+_NAME_FAMILIES = [
+    ("STARLINK-", "PAYLOAD", "Payload", "US", "AFETR"),
+    ("ONEWEB-", "PAYLOAD", "Payload", "UK", "TYMSC"),
+    ("COSMOS ", "PAYLOAD", "Payload", "CIS", "PKMTR"),
+    ("IRIDIUM ", "PAYLOAD", "Payload", "US", "AFWTR"),
+    ("GPS BIIR-", "PAYLOAD", "Payload", "US", "AFETR"),
+    ("YAOGAN-", "PAYLOAD", "Payload", "PRC", "JSC"),
+    ("FENGYUN 1C DEB", "DEBRIS", "Payload Fragmentation Debris", "PRC", "TSC"),
+    ("COSMOS 2251 DEB", "DEBRIS", "Payload Fragmentation Debris", "CIS", "PKMTR"),
+    ("SL-16 R/B", "ROCKET BODY", "Rocket Body", "CIS", "TYMSC"),
+    ("CZ-2C R/B", "ROCKET BODY", "Rocket Body", "PRC", "JSC"),
+    ("FALCON 9 R/B", "ROCKET BODY", "Rocket Body", "US", "AFETR"),
+    ("TBA - TO BE ASSIGNED", "UNKNOWN", "Unknown", None, None),
+]
+
+_LEO_INCLINATIONS = [53.0, 97.5, 51.6, 70.0, 82.5, 86.4, 43.0, 65.0, 98.7]
+
+_SHAPES = [
+    "Box",
+    "Cyl",
+    "Sphere",
+    "Hex Cyl + 2 Pan",
+    "Box + 2 Pan",
+    "Cone",
+    "Irregular",
+]
+
+_MISSIONS = [
+    "Communications",
+    "Earth Observation",
+    "Navigation",
+    "Amateur Technology",
+    "Defense Technology",
+    "Meteorology",
+    "Civil Science",
+    "Rocket Body",
+    None,
+]
+
+
+def _orbit(rng: random.Random) -> Dict[str, float]:
+    """
+    Draws a mean motion, eccentricity and inclination from a rough mix of orbit regimes.
+    """
+    regime = rng.random()
+    if regime < 0.80:  # LEO
+        mean_motion = rng.uniform(11.25, 16.2)
+        eccentricity = rng.uniform(0.0, 0.02)
+        inclination = rng.choice(_LEO_INCLINATIONS) + rng.gauss(0.0, 0.3)
+    elif regime < 0.85:  # MEO
+        mean_motion = rng.uniform(1.9, 2.3)
+        eccentricity = rng.uniform(0.0, 0.02)
+        inclination = rng.uniform(50.0, 65.0)
+    elif regime < 0.93:  # GEO
+        mean_motion = rng.uniform(0.99, 1.01)
+        eccentricity = rng.uniform(0.0, 0.001)
+        inclination = rng.uniform(0.0, 15.0)
+    else:  # GTO / Molniya
+        mean_motion = rng.uniform(2.0, 3.5)
+        eccentricity = rng.uniform(0.55, 0.74)
+        inclination = rng.choice([27.0, 63.4, 7.0]) + rng.gauss(0.0, 0.5)
+
+    return {
+        "MEAN_MOTION": mean_motion,
+        "ECCENTRICITY": eccentricity,
+        "INCLINATION": min(max(inclination, 0.0), 180.0),
+    }
+
+
+def derived_parameters(mean_motion: float, eccentricity: float) -> Dict[str, float]:
+    """
+    Computes SEMIMAJOR_AXIS, PERIOD, APOAPSIS and PERIAPSIS the same way Space-Track does.
+    """
+    n_rad_s = mean_motion * 2.0 * math.pi / 86400.0
+    semimajor_axis = (EARTH_MU / (n_rad_s * n_rad_s)) ** (1.0 / 3.0)
+    return {
+        "SEMIMAJOR_AXIS": semimajor_axis,
+        "PERIOD": 1440.0 / mean_motion,
+        "APOAPSIS": semimajor_axis * (1.0 + eccentricity) - EARTH_RADIUS,
+        "PERIAPSIS": semimajor_axis * (1.0 - eccentricity) - EARTH_RADIUS,
+    }
+
+
+def iter_synthetic_objects(
+    count: int,
+    seed: int = 0,
+    epochs_per_object: int = 1,
+    base_epoch: datetime = DEFAULT_BASE_EPOCH,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields raw OMM style records (string values, same keys as USC) for a synthetic catalog.
+
+    Records are ordered by NORAD_CAT_ID and then EPOCH, exactly like the Space-Track
+    `gp` query in Settings.SPACE_TRACKER_FULL_CATLOG. The same seed always yields
+    the same catalog so different writers describe the same objects.
+
+    Args:
+        count: Number of distinct objects.
+        seed: Seed for the random generator.
+        epochs_per_object: How many element sets to emit for each object.
+        base_epoch: Newest possible epoch of the catalog.
+    """
+    rng = random.Random(seed)
+    norad_id = 0
+    launch_number: Dict[int, int] = {}
+
+    for index in range(count):
+        norad_id += rng.randint(1, 3)
+        name_prefix, object_type, _, country, site = rng.choice(_NAME_FAMILIES)
+        if name_prefix.endswith(("-", " ")):
+            name = f"{name_prefix}{rng.randint(1, 9999)}"
+        else:
+            name = name_prefix
+
+        launch_year = rng.randint(1958, base_epoch.year)
+        launch_number[launch_year] = launch_number.get(launch_year, 0) + 1
+        piece = chr(ord("A") + rng.randint(0, 25))
+        cospar = f"{launch_year}-{launch_number[launch_year] % 1000:03d}{piece}"
+        launch_date = datetime(launch_year, rng.randint(1, 12), rng.randint(1, 28))
+
+        orbit = _orbit(rng)
+        raan = rng.uniform(0.0, 360.0)
+        arg_of_perigee = rng.uniform(0.0, 360.0)
+        mean_anomaly = rng.uniform(0.0, 360.0)
+        b_star = rng.uniform(-0.0001, 0.001) if orbit["MEAN_MOTION"] > 11.0 else 0.0
+        rev_at_epoch = rng.randint(1, 99999)
+
+        newest = base_epoch - timedelta(seconds=rng.uniform(0, 3 * 86400))
+        for epoch_index in range(epochs_per_object):
+            age = epochs_per_object - 1 - epoch_index
+            epoch = newest - timedelta(hours=12 * age)
+            mean_motion = orbit["MEAN_MOTION"] * (1.0 - 1e-7 * age)
+            derived = derived_parameters(mean_motion, orbit["ECCENTRICITY"])
+
+            yield {
+                "SATELLITE_NAME": name,
+                "INTERNATIONAL_DESIGNATOR": cospar,
+                "CENTER_NAME": "EARTH",
+                "TIME_SYSTEM": "UTC",
+                "MEAN_ELEMENT_THEORY": "SGP4",
+                "EPOCH": epoch.isoformat(timespec="microseconds"),
+                "MEAN_MOTION": f"{mean_motion:.8f}",
+                "ECCENTRICITY": f"{orbit['ECCENTRICITY']:.8f}",
+                "INCLINATION": f"{orbit['INCLINATION']:.4f}",
+                "RA_OF_ASC_NODE": f"{raan:.4f}",
+                "ARG_OF_PERIGEE": f"{arg_of_perigee:.4f}",
+                "MEAN_ANOMALY": f"{mean_anomaly:.4f}",
+                "EPHEMERIS_TYPE": "0",
+                "CLASSIFICATION": "U",
+                "NORAD_CAT_ID": str(norad_id),
+                "ELEMENT_SET_NUM": "999",
+                "REV_AT_EPOCH": str(max(rev_at_epoch - age, 0)),
+                "B_STAR": f"{b_star:.14f}",
+                "MEAN_MOTION_DOT": f"{b_star * 0.01:.8f}",
+                "MEAN_MOTION_DDOT": f"{0.0:.13f}",
+                "SEMIMAJOR_AXIS": f"{derived['SEMIMAJOR_AXIS']:.3f}",
+                "PERIOD": f"{derived['PERIOD']:.3f}",
+                "APOAPSIS": f"{derived['APOAPSIS']:.3f}",
+                "PERIAPSIS": f"{derived['PERIAPSIS']:.3f}",
+                "OBJECT_TYPE": object_type,
+                "RCS_SIZE": rng.choice(["SMALL", "MEDIUM", "LARGE", None]),
+                "COUNTRY_CODE": country,
+                "LAUNCH_DATE": launch_date.date().isoformat(),
+                "SITE": site,
+                "DECAY_DATE": None,
+                "_INDEX": index,
+            }
+
+
+def synthetic_uscs(count: int, seed: int = 0) -> List[USC]:
+    """
+    The catalog iter_synthetic_objects(count, seed) describes, as USC objects.
+    """
+    catalog = []
+    for record in iter_synthetic_objects(count, seed):
+        record.pop("_INDEX")
+        catalog.append(USC(**convert_types(record)))
+    return catalog
+
+
+_SEGMENT_TEMPLATE = """    <omm id="CCSDS_OMM_VERS" version="3.0">
+        <header>
+            <COMMENT>GENERATED VIA SPACE-TRACK.ORG API</COMMENT>
+            <CREATION_DATE>{creation_date}</CREATION_DATE>
+            <ORIGINATOR>18 SPCS</ORIGINATOR>
+        </header>
+        <body>
+            <segment>
+                <metadata>
+                    <OBJECT_NAME>{SATELLITE_NAME}</OBJECT_NAME>
+                    <OBJECT_ID>{INTERNATIONAL_DESIGNATOR}</OBJECT_ID>
+                    <CENTER_NAME>{CENTER_NAME}</CENTER_NAME>
+                    <REF_FRAME>TEME</REF_FRAME>
+                    <TIME_SYSTEM>{TIME_SYSTEM}</TIME_SYSTEM>
+                    <MEAN_ELEMENT_THEORY>{MEAN_ELEMENT_THEORY}</MEAN_ELEMENT_THEORY>
+                </metadata>
+                <data>
+                    <meanElements>
+                        <EPOCH>{EPOCH}</EPOCH>
+                        <MEAN_MOTION>{MEAN_MOTION}</MEAN_MOTION>
+                        <ECCENTRICITY>{ECCENTRICITY}</ECCENTRICITY>
+                        <INCLINATION>{INCLINATION}</INCLINATION>
+                        <RA_OF_ASC_NODE>{RA_OF_ASC_NODE}</RA_OF_ASC_NODE>
+                        <ARG_OF_PERICENTER>{ARG_OF_PERIGEE}</ARG_OF_PERICENTER>
+                        <MEAN_ANOMALY>{MEAN_ANOMALY}</MEAN_ANOMALY>
+                    </meanElements>
+                    <tleParameters>
+                        <EPHEMERIS_TYPE>{EPHEMERIS_TYPE}</EPHEMERIS_TYPE>
+                        <CLASSIFICATION_TYPE>{CLASSIFICATION}</CLASSIFICATION_TYPE>
+                        <NORAD_CAT_ID>{NORAD_CAT_ID}</NORAD_CAT_ID>
+                        <ELEMENT_SET_NO>{ELEMENT_SET_NUM}</ELEMENT_SET_NO>
+                        <REV_AT_EPOCH>{REV_AT_EPOCH}</REV_AT_EPOCH>
+                        <BSTAR>{B_STAR}</BSTAR>
+                        <MEAN_MOTION_DOT>{MEAN_MOTION_DOT}</MEAN_MOTION_DOT>
+                        <MEAN_MOTION_DDOT>{MEAN_MOTION_DDOT}</MEAN_MOTION_DDOT>
+                    </tleParameters>
+                    <userDefinedParameters>
+{user_defined}
+                    </userDefinedParameters>
+                </data>
+            </segment>
+        </body>
+    </omm>
+"""
+
+_USER_DEFINED_KEYS = [
+    "SEMIMAJOR_AXIS",
+    "PERIOD",
+    "APOAPSIS",
+    "PERIAPSIS",
+    "OBJECT_TYPE",
+    "RCS_SIZE",
+    "COUNTRY_CODE",
+    "LAUNCH_DATE",
+    "SITE",
+    "DECAY_DATE",
+]
+
+
+def _user_defined_xml(record: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for key in _USER_DEFINED_KEYS:
+        value = record.get(key)
+        if value is None:
+            lines.append(f'                        <USER_DEFINED parameter="{key}"/>')
+        else:
+            lines.append(
+                f'                        <USER_DEFINED parameter="{key}">{escape(value)}</USER_DEFINED>'
+            )
+    lines.append(
+        f'                        <USER_DEFINED parameter="GP_ID">{289500000 + record["_INDEX"]}</USER_DEFINED>'
+    )
+    return "\n".join(lines)
+
+
+def omm_segment_xml(record: Dict[str, Any], creation_date: str) -> str:
+    """
+    Renders one record from iter_synthetic_objects as an <omm> element.
+    """
+    values = {
+        key: escape(value) if isinstance(value, str) else value
+        for key, value in record.items()
+    }
+    return _SEGMENT_TEMPLATE.format(
+        creation_date=creation_date,
+        user_defined=_user_defined_xml(record),
+        **values,
+    )
+
+
+def write_omm_xml(
+    filename: str,
+    count: int,
+    seed: int = 0,
+    epochs_per_object: int = 1,
+    base_epoch: datetime = DEFAULT_BASE_EPOCH,
+) -> str:
+    """
+    Writes a Space-Track style OMM XML file with `count` objects.
+
+    Returns:
+        The filename that was written.
+    """
+    creation_date = base_epoch.isoformat(timespec="seconds")
+    with open(filename, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write("<ndm>\n")
+        for record in iter_synthetic_objects(
+            count, seed, epochs_per_object, base_epoch
+        ):
+            f.write(omm_segment_xml(record, creation_date))
+        f.write("</ndm>\n")
+    return filename
+
+
+# Column order of Space-Track's `gp` CSV and JSON output, with the record key of each
+# column. The columns without a key are written with fixed or empty values.
+_OMM_COLUMNS = [
+    ("CCSDS_OMM_VERS", None),
+    ("COMMENT", None),
+    ("CREATION_DATE", None),
+    ("ORIGINATOR", None),
+    ("OBJECT_NAME", "SATELLITE_NAME"),
+    ("OBJECT_ID", "INTERNATIONAL_DESIGNATOR"),
+    ("CENTER_NAME", "CENTER_NAME"),
+    ("REF_FRAME", None),
+    ("TIME_SYSTEM", "TIME_SYSTEM"),
+    ("MEAN_ELEMENT_THEORY", "MEAN_ELEMENT_THEORY"),
+    ("EPOCH", "EPOCH"),
+    ("MEAN_MOTION", "MEAN_MOTION"),
+    ("ECCENTRICITY", "ECCENTRICITY"),
+    ("INCLINATION", "INCLINATION"),
+    ("RA_OF_ASC_NODE", "RA_OF_ASC_NODE"),
+    ("ARG_OF_PERICENTER", "ARG_OF_PERIGEE"),
+    ("MEAN_ANOMALY", "MEAN_ANOMALY"),
+    ("EPHEMERIS_TYPE", "EPHEMERIS_TYPE"),
+    ("CLASSIFICATION_TYPE", "CLASSIFICATION"),
+    ("NORAD_CAT_ID", "NORAD_CAT_ID"),
+    ("ELEMENT_SET_NO", "ELEMENT_SET_NUM"),
+    ("REV_AT_EPOCH", "REV_AT_EPOCH"),
+    ("BSTAR", "B_STAR"),
+    ("MEAN_MOTION_DOT", "MEAN_MOTION_DOT"),
+    ("MEAN_MOTION_DDOT", "MEAN_MOTION_DDOT"),
+    *((key, key) for key in _USER_DEFINED_KEYS),
+    ("FILE", None),
+    ("GP_ID", None),
+]
+OMM_CSV_HEADER = [column for column, _ in _OMM_COLUMNS]
+
+
+def omm_record(record: Dict[str, Any], creation_date: str) -> Dict[str, Optional[str]]:
+    """
+    Renders one record from iter_synthetic_objects as an object of Space-Track's `gp`
+    JSON output. Values are strings or null like Space-Track writes them.
+    """
+    row = {column: record.get(key) if key else None for column, key in _OMM_COLUMNS}
+    row.update(
+        CCSDS_OMM_VERS="3.0",
+        COMMENT="GENERATED VIA SPACE-TRACK.ORG API",
+        CREATION_DATE=creation_date,
+        ORIGINATOR="18 SPCS",
+        REF_FRAME="TEME",
+        FILE="4500000",
+        GP_ID=str(289500000 + record["_INDEX"]),
+    )
+    return row
+
+
+def iter_omm_records(
+    count: int,
+    seed: int = 0,
+    epochs_per_object: int = 1,
+    base_epoch: datetime = DEFAULT_BASE_EPOCH,
+) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Yields the synthetic catalog as objects of Space-Track's `gp` JSON or CSV output.
+    """
+    creation_date = base_epoch.isoformat(timespec="seconds")
+    for record in iter_synthetic_objects(count, seed, epochs_per_object, base_epoch):
+        yield omm_record(record, creation_date)
+
+
+def write_omm_csv(
+    filename: str,
+    count: int,
+    seed: int = 0,
+    epochs_per_object: int = 1,
+    base_epoch: datetime = DEFAULT_BASE_EPOCH,
+) -> str:
+    """
+    Writes the catalog write_omm_xml writes as a Space-Track style `gp` CSV file.
+
+    Returns:
+        The filename that was written.
+    """
+    with open(filename, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(OMM_CSV_HEADER)
+        for row in iter_omm_records(count, seed, epochs_per_object, base_epoch):
+            writer.writerow(row.values())
+    return filename
+
+
+def write_omm_json(
+    filename: str,
+    count: int,
+    seed: int = 0,
+    epochs_per_object: int = 1,
+    base_epoch: datetime = DEFAULT_BASE_EPOCH,
+) -> str:
+    """
+    Writes the catalog write_omm_xml writes as a Space-Track style `gp` JSON file.
+
+    Returns:
+        The filename that was written.
+    """
+    with open(filename, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write("[")
+        for index, row in enumerate(
+            iter_omm_records(count, seed, epochs_per_object, base_epoch)
+        ):
+            if index:
+                f.write(",")
+            f.write(json.dumps(row))
+        f.write("]")
+    return filename
+
+
+def _discos_object_class(object_type: str) -> str:
+    for _, family_type, object_class, _, _ in _NAME_FAMILIES:
+        if family_type == object_type:
+            return object_class
+    return "Unknown"
+
+
+def discos_object(record: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """
+    Builds a DISCOS `/api/objects` entry that describes the same object as `record`.
+    """
+    object_id = str(10000 + record["_INDEX"])
+    width = round(rng.uniform(0.1, 6.0), 3)
+    height = round(rng.uniform(0.1, 12.0), 3)
+    depth = round(rng.uniform(0.1, 6.0), 3)
+    span = round(max(width, height, depth) * rng.uniform(1.0, 4.0), 3)
+    x_sect_max = round(width * height, 4)
+    x_sect_min = round(min(width, depth) * min(height, depth), 4)
+    link = f"/api/objects/{object_id}"
+
+    return {
+        "id": object_id,
+        "type": "object",
+        "attributes": {
+            "cosparId": record["INTERNATIONAL_DESIGNATOR"],
+            "vimpelId": None,
+            "satno": int(record["NORAD_CAT_ID"]),
+            "name": record["SATELLITE_NAME"],
+            "objectClass": _discos_object_class(record["OBJECT_TYPE"]),
+            "mass": round(rng.uniform(1.0, 9000.0), 1),
+            "shape": rng.choice(_SHAPES),
+            "width": width,
+            "height": height,
+            "depth": depth,
+            "diameter": None,
+            "span": span,
+            "xSectMax": x_sect_max,
+            "xSectMin": x_sect_min,
+            "xSectAvg": round((x_sect_max + x_sect_min) / 2.0, 4),
+            "firstEpoch": record["LAUNCH_DATE"],
+            "mission": rng.choice(_MISSIONS),
+            "predDecayDate": None,
+            "active": True,
+            "cataloguedFragments": 0,
+            "onOrbitCataloguedFragments": 0,
+        },
+        "relationships": {
+            name: {
+                "links": {
+                    "self": f"{link}/relationships/{name}",
+                    "related": f"{link}/{name}",
+                }
+            }
+            for name in (
+                "launch",
+                "reentry",
+                "initialOrbits",
+                "destinationOrbits",
+                "states",
+                "operators",
+                "tags",
+                "constellations",
+            )
+        },
+        "links": {"self": link, "related": None},
+    }
+
+
+def iter_discos_objects(count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yields DISCOS objects for the same catalog iter_synthetic_objects(count, seed) describes.
+    """
+    rng = random.Random(seed + 1)
+    for record in iter_synthetic_objects(count, seed):
+        yield discos_object(record, rng)
+
+
+def write_discos_json(filename: str, count: int, seed: int = 0) -> str:
+    """
+    Writes a DISCOS object list in the same layout save_discos_objects produces.
+
+    Returns:
+        The filename that was written.
+    """
+    with open(filename, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write("[")
+        for index, item in enumerate(iter_discos_objects(count, seed)):
+            if index:
+                f.write(",")
+            f.write("\n")
+            f.write(json.dumps(item, indent=2, ensure_ascii=False))
+        f.write("\n]")
+    return filename
+
+
+def write_cache_directory(
+    path: str,
+    count: int,
+    prefixes: Optional[List[str]] = None,
+    date_format: str = "%Y_%m_%d-%I_%M_%S_%p",
+    newest: datetime = DEFAULT_BASE_EPOCH,
+) -> str:
+    """
+    Fills `path` with `count` empty cache files named like the ones in downloaded_data/.
+
+    Files are spread over the given prefixes with timestamps one minute apart going back
+    from `newest`. Every 50th file has an unparseable name to exercise the error path.
+    """
+    if prefixes is None:
+        prefixes = ["FULL_CATLOG_", "DISCOS_ALL_", "OTHER_RESULT_"]
+
+    os.makedirs(path, exist_ok=True)
+    for index in range(count):
+        prefix = prefixes[index % len(prefixes)]
+        if index % 50 == 49:
+            name = f"{prefix}corrupted_{index}.json"
+        else:
+            timestamp = newest - timedelta(minutes=index)
+            name = prefix + timestamp.strftime(date_format) + ".json"
+        open(os.path.join(path, name), "w").close()
+    return path
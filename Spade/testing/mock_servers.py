@@ -0,0 +1,501 @@
+import csv
+import io
+import json
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from uuid import uuid4
+
+from Spade.testing.generators import (
+    DEFAULT_BASE_EPOCH,
+    OMM_CSV_HEADER,
+    iter_discos_objects,
+    iter_omm_records,
+    iter_synthetic_objects,
+    omm_segment_xml,
+)
+
+"""
+This file contains in-process fakes of the Space-Track and DISCOSweb APIs. They serve
+synthetic catalogs from generators.py so fetchers can be tested and load tested without
+credentials or network access.
+"""
+
+SPACE_TRACK_LOGIN_PATH = "/ajaxauth/login"
+SPACE_TRACK_GP_PATH = "/basicspacedata/query/class/gp/"
+DISCOS_OBJECTS_PATH = "/api/objects"
+DISCOS_MAX_PAGE_SIZE = 100
+
+
+@dataclass
+class MockServerConfig:
+    """
+    Behaviour knobs shared by both mock servers.
+
+    Attributes:
+        catalog_size: Number of objects in the synthetic catalog.
+        seed: Seed for the catalog and for randomly injected faults.
+        latency: Seconds to wait before answering every request.
+        bandwidth: Maximum response body bytes per second, None for unlimited.
+        rate_limit: Requests allowed per `rate_window` seconds before answering 429.
+        rate_window: Length of the rate limit window in seconds.
+        fault_rate: Fraction of requests that fail with `fault_status`.
+        fault_requests: Request numbers (1-based) that always fail, for exact scenarios.
+        fault_status: HTTP status used for injected faults.
+        fault_kind: "status" answers with fault_status, "truncate" sends half the body
+                    and closes the connection.
+    """
+
+    catalog_size: int = 1000
+    seed: int = 0
+    latency: float = 0.0
+    bandwidth: Optional[int] = None
+    rate_limit: Optional[int] = None
+    rate_window: float = 60.0
+    fault_rate: float = 0.0
+    fault_requests: List[int] = field(default_factory=list)
+    fault_status: int = 500
+    fault_kind: str = "status"
+
+
+@dataclass
+class MockServerStats:
+    requests: int = 0
+    rate_limited: int = 0
+    faults: int = 0
+    bytes_sent: int = 0
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_MockHTTPServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        mock = self.server.mock
+        # Always drain the body so keep-alive connections stay usable after a 429 or fault
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        _, limited, fault = mock._admit()
+
+        if mock.config.latency:
+            time.sleep(mock.config.latency)
+
+        if limited:
+            self._send(429, b'{"error": "Too Many Requests"}', {"Retry-After": "1"})
+            return
+        if fault and mock.config.fault_kind == "status":
+            self._send(mock.config.fault_status, b"Injected fault")
+            return
+
+        status, payload, headers = mock.handle(method, self.path, self.headers, body)
+
+        if fault:  # truncate
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload[: len(payload) // 2])
+            self.close_connection = True
+            return
+
+        self._send(status, payload, headers)
+
+    def _send(
+        self, status: int, payload: bytes, headers: Optional[Dict[str, str]] = None
+    ):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+
+        bandwidth = self.server.mock.config.bandwidth
+        if bandwidth is None:
+            self.wfile.write(payload)
+        else:
+            chunk_size = max(bandwidth // 20, 1)
+            for start in range(0, len(payload), chunk_size):
+                self.wfile.write(payload[start : start + chunk_size])
+                time.sleep(chunk_size / bandwidth)
+        self.server.mock._count_bytes(len(payload))
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    mock: "MockServer"
+
+
+class MockServer(ABC):
+    """
+    Base class that runs a ThreadingHTTPServer on localhost in a background thread.
+    Subclasses implement handle().
+
+    Use as a context manager or call start() and stop().
+    """
+
+    def __init__(self, config: Optional[MockServerConfig] = None, **overrides: Any):
+        self.config = config or MockServerConfig()
+        for name, value in overrides.items():
+            setattr(self.config, name, value)
+        self.stats = MockServerStats()
+        self._lock = threading.Lock()
+        self._recent: Deque[float] = deque()
+        self._fault_rng = random.Random(self.config.seed)
+        self._server: Optional[_MockHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Mock server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        self._server = _MockHTTPServer(("127.0.0.1", 0), _MockHandler)
+        self._server.mock = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _admit(self) -> Tuple[int, bool, bool]:
+        """
+        Counts a request and decides whether it is rate limited or gets a fault injected.
+        """
+        with self._lock:
+            self.stats.requests += 1
+            number = self.stats.requests
+
+            if self.config.rate_limit is not None:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= self.config.rate_window:
+                    self._recent.popleft()
+                if len(self._recent) >= self.config.rate_limit:
+                    self.stats.rate_limited += 1
+                    return number, True, False
+                self._recent.append(now)
+
+            fault = number in self.config.fault_requests or (
+                self.config.fault_rate > 0
+                and self._fault_rng.random() < self.config.fault_rate
+            )
+            if fault:
+                self.stats.faults += 1
+            return number, False, fault
+
+    def _count_bytes(self, count: int):
+        with self._lock:
+            self.stats.bytes_sent += count
+
+    @abstractmethod
+    def handle(
+        self, method: str, path: str, headers: Any, body: bytes
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        """
+        Answers one request that got past rate limiting and fault injection.
+
+        Returns:
+            The status code, the body and extra headers.
+        """
+
+
+_SPACE_TRACK_CONTENT_TYPES = {
+    "xml": "text/xml",
+    "csv": "text/csv",
+    "json": "application/json",
+}
+
+
+class MockSpaceTrackServer(MockServer):
+    """
+    Fake of the Space-Track login endpoint and the `gp` query used by fetch_full_catlog_ST.
+    """
+
+    def __init__(
+        self,
+        config: Optional[MockServerConfig] = None,
+        username: str = "mock-user",
+        password: str = "mock-password",
+        epochs_per_object: int = 1,
+        **overrides: Any,
+    ):
+        super().__init__(config, **overrides)
+        self.username = username
+        self.password = password
+        self.epochs_per_object = epochs_per_object
+        self._sessions: set = set()
+        self._catalog_cache: Dict[str, bytes] = {}
+
+    def settings(
+        self, download_path: str = "", output_format: str = "xml", **overrides: Any
+    ) -> SimpleNamespace:
+        """
+        Returns a settings object pointing the Space-Track fetchers at this server, asking
+        for the catalog as `output_format` (xml, csv or json).
+        """
+        values = {
+            "SPACE_TRACKER_AUTH_URL": self.url + SPACE_TRACK_LOGIN_PATH,
+            "SPACE_TRACKER_FORMAT": output_format,
+            "SPACE_TRACKER_FULL_CATLOG": self.url
+            + SPACE_TRACK_GP_PATH
+            + "EPOCH/%3Enow-30/orderby/NORAD_CAT_ID,EPOCH/format/"
+            + output_format,
+            "SPACE_TRACKER_USERNAME": self.username,
+            "SPACE_TRACKER_PASSWORD": self.password,
+            "DOWNLOADED_DATA_PATH": download_path,
+            "DATE_FORMAT": "%Y_%m_%d-%I_%M_%S_%p",
+        }
+        values.update(overrides)
+        return SimpleNamespace(**values)
+
+    def catalog(self, output_format: str = "xml") -> bytes:
+        with self._lock:
+            if output_format not in self._catalog_cache:
+                self._catalog_cache[output_format] = self._render(output_format)
+            return self._catalog_cache[output_format]
+
+    def _render(self, output_format: str) -> bytes:
+        if output_format == "csv":
+            text = io.StringIO(newline="")
+            writer = csv.writer(text)
+            writer.writerow(OMM_CSV_HEADER)
+            writer.writerows(row.values() for row in self._omm_records())
+            return text.getvalue().encode()
+        if output_format == "json":
+            return json.dumps(list(self._omm_records())).encode()
+
+        records = iter_synthetic_objects(
+            self.config.catalog_size, self.config.seed, self.epochs_per_object
+        )
+        creation_date = DEFAULT_BASE_EPOCH.isoformat(timespec="seconds")
+        parts = ["<ndm>\n"]
+        parts.extend(omm_segment_xml(record, creation_date) for record in records)
+        parts.append("</ndm>\n")
+        return "".join(parts).encode()
+
+    def _omm_records(self):
+        return iter_omm_records(
+            self.config.catalog_size, self.config.seed, self.epochs_per_object
+        )
+
+    def handle(self, method, path, headers, body):
+        parsed = urlparse(path)
+
+        if parsed.path == SPACE_TRACK_LOGIN_PATH and method == "POST":
+            form = parse_qs(body.decode())
+            identity = form.get("identity", [None])[0]
+            password = form.get("password", [None])[0]
+            if identity != self.username or password != self.password:
+                return 401, b'{"Login":"Failed"}', {}
+            token = uuid4().hex
+            with self._lock:
+                self._sessions.add(token)
+            return 200, b'""', {"Set-Cookie": f"chocolatechip={token}; Path=/"}
+
+        if parsed.path.startswith(SPACE_TRACK_GP_PATH) and method == "GET":
+            cookie = headers.get("Cookie") or ""
+            tokens = {
+                part.strip().split("=", 1)[1]
+                for part in cookie.split(";")
+                if part.strip().startswith("chocolatechip=")
+            }
+            if not tokens & self._sessions:
+                return 401, b'{"error":"You must be logged in"}', {}
+
+            segments = parsed.path.rstrip("/").split("/")
+            output_format = "xml"
+            if "format" in segments and segments.index("format") + 1 < len(segments):
+                output_format = segments[segments.index("format") + 1]
+            if output_format not in _SPACE_TRACK_CONTENT_TYPES:
+                return 400, b'{"error":"Unsupported format"}', {}
+            return (
+                200,
+                self.catalog(output_format),
+                {"Content-Type": _SPACE_TRACK_CONTENT_TYPES[output_format]},
+            )
+
+        return 404, b'{"error":"Not Found"}', {}
+
+
+_DISCOS_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "ge": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "le": lambda a, b: a is not None and a <= b,
+}
+
+
+def _split_arguments(text: str) -> List[str]:
+    """
+    Splits `a,f(b,c),d` on the commas outside of parentheses.
+    """
+    parts, depth, start = [], 0, 0
+    for position, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:position])
+            start = position + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts]
+
+
+def _filter_value(text: str) -> Any:
+    if text in ("true", "false"):
+        return text == "true"
+    if text == "null":
+        return None
+    if len(text) >= 2 and text[0] == text[-1] == "'":
+        return text[1:-1]
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+def _object_value(item: Dict[str, Any], name: str) -> Any:
+    if name == "id":
+        return int(item["id"])
+    return item["attributes"].get(name)
+
+
+def parse_discos_filter(expression: str) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Parses the subset of DISCOSweb filter expressions the fetchers use into a predicate over
+    `/api/objects` entries: eq, ne, gt, ge, lt, le, and, or, plus the `name=value` form.
+
+    Raises:
+        ValueError: For expressions outside of that subset.
+    """
+    expression = expression.strip()
+    if "(" not in expression and "=" in expression:
+        name, value = expression.split("=", 1)
+        return parse_discos_filter(f"eq({name},{value})")
+
+    if not expression.endswith(")") or "(" not in expression:
+        raise ValueError(f"Unsupported filter: {expression}")
+    operator, arguments = expression[:-1].split("(", 1)
+    arguments = _split_arguments(arguments)
+
+    if operator in ("and", "or"):
+        predicates = [parse_discos_filter(argument) for argument in arguments]
+        combine = all if operator == "and" else any
+        return lambda item: combine(predicate(item) for predicate in predicates)
+
+    if operator not in _DISCOS_COMPARISONS or len(arguments) != 2:
+        raise ValueError(f"Unsupported filter: {expression}")
+    compare = _DISCOS_COMPARISONS[operator]
+    name, value = arguments[0], _filter_value(arguments[1])
+    return lambda item: compare(_object_value(item, name), value)
+
+
+class MockDiscosServer(MockServer):
+    """
+    Fake of the DISCOSweb `/api/objects` endpoint with page[size]/page[number] pagination
+    and the `filter` expressions understood by parse_discos_filter.
+
+    `objects` can be changed while the server runs to simulate launches and decays.
+    """
+
+    def __init__(
+        self,
+        config: Optional[MockServerConfig] = None,
+        token: str = "mock-token",
+        **overrides: Any,
+    ):
+        super().__init__(config, **overrides)
+        self.token = token
+        self.objects: List[Dict[str, Any]] = list(
+            iter_discos_objects(self.config.catalog_size, self.config.seed)
+        )
+
+    def settings(self, download_path: str = "", **overrides: Any) -> SimpleNamespace:
+        """
+        Returns a settings object pointing the DISCOS fetchers at this server.
+        """
+        values = {
+            "DISCOS_BASE_URL": self.url,
+            "DISCOS_TOKEN": self.token,
+            "DOWNLOADED_DATA_PATH": download_path,
+            "DATE_FORMAT": "%Y_%m_%d-%I_%M_%S_%p",
+        }
+        values.update(overrides)
+        return SimpleNamespace(**values)
+
+    def handle(self, method, path, headers, body):
+        parsed = urlparse(path)
+        if parsed.path != DISCOS_OBJECTS_PATH or method != "GET":
+            return 404, b'{"errors":[{"title":"Not Found"}]}', {}
+
+        if headers.get("Authorization") != f"Bearer {self.token}":
+            return 401, b'{"errors":[{"title":"Unauthorized"}]}', {}
+
+        query = parse_qs(parsed.query)
+        try:
+            page_size = int(query.get("page[size]", ["10"])[0])
+            page_number = int(query.get("page[number]", ["1"])[0])
+        except ValueError:
+            return 400, b'{"errors":[{"title":"Bad page parameters"}]}', {}
+        if not 1 <= page_size <= DISCOS_MAX_PAGE_SIZE or page_number < 1:
+            return 400, b'{"errors":[{"title":"Bad page parameters"}]}', {}
+
+        objects = self.objects
+        if "filter" in query:
+            try:
+                predicate = parse_discos_filter(query["filter"][0])
+                objects = [item for item in objects if predicate(item)]
+            except (ValueError, TypeError):
+                return 400, b'{"errors":[{"title":"Bad filter"}]}', {}
+
+        total_pages = max((len(objects) + page_size - 1) // page_size, 1)
+        start = (page_number - 1) * page_size
+        document = {
+            "data": objects[start : start + page_size],
+            "links": {"self": path, "related": None},
+            "meta": {
+                "pagination": {
+                    "totalPages": total_pages,
+                    "currentPage": page_number,
+                    "pageSize": page_size,
+                }
+            },
+        }
+        return (
+            200,
+            json.dumps(document).encode(),
+            {"Content-Type": "application/vnd.api+json"},
+        )
@@ -0,0 +1,131 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from Spade.conjunction import (
+    DEFAULT_HARD_BODY_RADIUS_M,
+    grid_pairs,
+    hard_body_radius,
+    objects_with_overlap,
+    screen_conjunctions,
+    shells_overlap,
+)
+from Spade.models import USC
+from Spade.propagation import OrbitalElements, propagate
+
+"""
+This file contains tests for the conjunction screening engine.
+"""
+
+EPOCH = datetime(2025, 6, 9, 4, 0, 0)
+
+
+def leo(norad_id: str, mean_anomaly: float, **overrides) -> USC:
+    values = dict(
+        INTERNATIONAL_DESIGNATOR=f"2025-{norad_id}A",
+        NORAD_CAT_ID=norad_id,
+        EPOCH=EPOCH,
+        MEAN_MOTION=15.5,
+        ECCENTRICITY=0.0005,
+        INCLINATION=51.6,
+        RA_OF_ASC_NODE=10.0,
+        ARG_OF_PERIGEE=0.0,
+        MEAN_ANOMALY=mean_anomaly,
+        B_STAR=0.0,
+    )
+    values.update(overrides)
+    return USC(**values)
+
+
+class TestOrbitFilter(unittest.TestCase):
+
+    def test_shells_overlap(self):
+        perigee = np.array([6700.0, 6750.0, 42000.0])
+        apogee = np.array([6800.0, 6760.0, 42200.0])
+        overlap = shells_overlap(
+            perigee, apogee, np.array([0, 0]), np.array([1, 2]), 10.0
+        )
+        self.assertEqual(list(overlap), [True, False])
+
+    def test_objects_with_overlap(self):
+        perigee = np.array([42000.0, 6700.0, 6750.0, 20000.0])
+        apogee = np.array([42200.0, 6800.0, 6760.0, 20100.0])
+        mask = objects_with_overlap(perigee, apogee, 10.0)
+        self.assertEqual(list(mask), [False, True, True, False])
+
+
+class TestGridPairs(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(1)
+        position = rng.uniform(-100.0, 100.0, size=(400, 3))
+        first, second = grid_pairs(position, 12.0)
+        found = {tuple(sorted(pair)) for pair in zip(first.tolist(), second.tolist())}
+
+        distance = np.linalg.norm(position[:, None] - position[None, :], axis=-1)
+        i, j = np.nonzero(np.triu(distance <= 12.0, k=1))
+        self.assertEqual(found, set(zip(i.tolist(), j.tolist())))
+        self.assertEqual(len(found), len(first))
+
+
+class TestScreenConjunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.times = np.datetime64("2025-06-09T04:00") + np.arange(0, 600, 30).astype(
+            "timedelta64[s]"
+        )
+
+    def test_finds_close_pair(self):
+        catalog = [
+            leo("1", 0.0, SPAN=4.0),
+            leo("2", 0.01),
+            leo("3", 0.0, MEAN_MOTION=1.0027),  # geostationary, filtered out
+        ]
+        found = screen_conjunctions(catalog, self.times, threshold=5.0)
+        self.assertEqual(len(found), 1)
+        self.assertEqual((found[0].primary, found[0].secondary), ("1", "2"))
+        self.assertEqual((found[0].primary_index, found[0].secondary_index), (0, 1))
+        self.assertLess(found[0].miss_distance, 5.0)
+        self.assertAlmostEqual(
+            found[0].combined_hard_body_radius, 2.0 + DEFAULT_HARD_BODY_RADIUS_M
+        )
+
+    def test_far_apart_pair_is_ignored(self):
+        catalog = [leo("1", 0.0), leo("2", 180.0)]
+        self.assertEqual(screen_conjunctions(catalog, self.times, threshold=5.0), [])
+
+    def test_heo_perigee_head_on(self):
+        # a retrograde HEO at its 500 km perigee meets a LEO object at about 17 km/s
+        catalog = [
+            leo("1", 0.0, MEAN_MOTION=15.2, ECCENTRICITY=0.0005, INCLINATION=10.0),
+            leo("2", 0.0, MEAN_MOTION=2.5, ECCENTRICITY=0.7, INCLINATION=170.0),
+        ]
+        fine = np.datetime64("2025-06-09T04:00") + np.arange(-100, 100).astype(
+            "timedelta64[s]"
+        )
+        ephemeris = propagate(OrbitalElements.from_catalog(catalog), fine)
+        distance = np.linalg.norm(ephemeris.position[0] - ephemeris.position[1], axis=1)
+        tca = fine[distance.argmin()]
+
+        # the closest approach falls halfway between two steps 90 s from it, so the
+        # grid must assume more than 16 km/s to see the pair at either step
+        times = tca + np.array([-90, 90]).astype("timedelta64[s]")
+        (found,) = screen_conjunctions(catalog, times, threshold=100.0)
+        self.assertGreater(found.relative_speed, 16.0)
+        self.assertLess(found.miss_distance, distance.min() + 5.0)
+
+
+class TestHardBodyRadius(unittest.TestCase):
+
+    def test_prefers_span(self):
+        self.assertEqual(
+            hard_body_radius(leo("1", 0.0, SPAN=10.0, X_SECT_AVG=1.0)), 5.0
+        )
+
+    def test_from_cross_section(self):
+        self.assertAlmostEqual(hard_body_radius(leo("1", 0.0, X_SECT_AVG=np.pi)), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
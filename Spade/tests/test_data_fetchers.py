@@ -7,34 +7,42 @@ from Spade.data_fetcher import (
     fetch_api,
     fetch_full_catlog_ST,
 )
+from Spade.importers import spaceTrackXML
+from Spade.testing.mock_servers import MockSpaceTrackServer
 from requests import Session
-from Spade.config import settings
 import os
+import tempfile
 
 
 class TestGetAuthSpaceTracker(unittest.TestCase):
 
     def test_bad_login_fails_smoothly(self):
-        mock_settings = MagicMock()
-        mock_settings.SPACE_TRACKER_AUTH_URL = (
-            "https://www.space-track.org/ajaxauth/login"
-        )
-        mock_settings.SPACE_TRACKER_USERNAME = "badusername"
-        mock_settings.SPACE_TRACKER_PASSWORD = "badpassword"
-        session = Session()
-        loginSuccess = get_auth_space_tracker(session, mock_settings)
+        with MockSpaceTrackServer(catalog_size=5) as server:
+            mock_settings = server.settings(
+                SPACE_TRACKER_USERNAME="badusername",
+                SPACE_TRACKER_PASSWORD="badpassword",
+            )
+            session = Session()
+            loginSuccess = get_auth_space_tracker(session, mock_settings)
         self.assertFalse(loginSuccess)
 
     def test_correct_login(self):
-        session = Session()
-        loginSuccess = get_auth_space_tracker(session, settings)
+        with MockSpaceTrackServer(catalog_size=5) as server:
+            session = Session()
+            loginSuccess = get_auth_space_tracker(session, server.settings())
         self.assertTrue(loginSuccess)
 
 
 class TestisCacheAvaliable(unittest.TestCase):
 
     def test_bad_fileprefix_returns_None(self):
-        result = isCacheAvaliable("asdfasdfsf", timedelta(days=2), settings)
+        mock_settings = MagicMock()
+        dirname = os.path.dirname(__file__)
+        mock_settings.DOWNLOADED_DATA_PATH = os.path.join(
+            dirname, "testFiles/test_Downloaded_Data_Cache"
+        )
+        mock_settings.DATE_FORMAT = "%Y_%m_%d-%I_%M_%S_%p"
+        result = isCacheAvaliable("asdfasdfsf", timedelta(days=2), mock_settings)
         self.assertIsNone(result)
 
     def test_finds_single_file(self):
@@ -76,17 +84,24 @@ class TestisCacheAvaliable(unittest.TestCase):
 
 class Testfetch_api(unittest.TestCase):
     def test_fails_smoothly(self):
-        session = Session()
-        res = fetch_api(session, "https://asdfasdfadsasdsadsadsassfsdgfs.com")
+        with MockSpaceTrackServer(catalog_size=5) as server:
+            session = Session()
+            res = fetch_api(session, server.url + "/missing")
         self.assertIsNone(res)
 
     def test_works(self):
-        session = Session()
-        res = fetch_api(session, "https://google.com")
+        with MockSpaceTrackServer(catalog_size=5) as server:
+            settings = server.settings()
+            session = Session()
+            get_auth_space_tracker(session, settings)
+            res = fetch_api(session, settings.SPACE_TRACKER_FULL_CATLOG)
         self.assertIsNotNone(res)
 
 
 class Testfetch_full_catlog_ST(unittest.TestCase):
-    def test_greater_than_10k_objects(self):
-        fileName = fetch_full_catlog_ST(settings)
-        self.assertIsNotNone(fileName)
+    def test_downloads_every_object(self):
+        with MockSpaceTrackServer(catalog_size=50) as server:
+            with tempfile.TemporaryDirectory() as tmp:
+                fileName = fetch_full_catlog_ST(server.settings(tmp + os.sep))
+                self.assertIsNotNone(fileName)
+                self.assertEqual(len(spaceTrackXML(fileName)), 50)
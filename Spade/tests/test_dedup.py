@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from Spade.dedup import latest_epochs
+from Spade.importers import (
+    SPACE_TRACK_XML_MAP,
+    XMLtoUSC,
+    iterSpaceTrackXML,
+    spaceTrackXML,
+)
+from Spade.models import USC
+from Spade.testing.generators import write_omm_xml
+
+"""
+This file contains tests for the streaming latest epoch deduplication.
+"""
+
+
+def element_set(norad_id: str, day: int) -> USC:
+    return USC(
+        INTERNATIONAL_DESIGNATOR=f"ID-{norad_id}",
+        NORAD_CAT_ID=norad_id,
+        EPOCH=datetime(2025, 6, day),
+    )
+
+
+class TestLatestEpochs(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = [
+            element_set("5", 1),
+            element_set("5", 2),
+            element_set("5", 3),
+            element_set("11", 1),
+            element_set("25544", 2),
+            element_set("25544", 4),
+        ]
+
+    def test_keeps_newest(self):
+        result = list(latest_epochs(self.catalog))
+        self.assertEqual(
+            [(usc.NORAD_CAT_ID, usc.EPOCH.day) for usc in result],
+            [("5", 3), ("11", 1), ("25544", 4)],
+        )
+
+    def test_keeps_last_k(self):
+        result = list(latest_epochs(self.catalog, keep=2))
+        self.assertEqual(
+            [(usc.NORAD_CAT_ID, usc.EPOCH.day) for usc in result],
+            [("5", 2), ("5", 3), ("11", 1), ("25544", 2), ("25544", 4)],
+        )
+
+    def test_objects_without_norad_id_are_kept(self):
+        unnumbered = [
+            USC(INTERNATIONAL_DESIGNATOR=f"2025-00{n}A", SATELLITE_NAME=f"OBJECT {n}")
+            for n in range(5)
+        ]
+        catalog = [self.catalog[0], *unnumbered[:2], *self.catalog[1:], *unnumbered[2:]]
+        result = list(latest_epochs(catalog))
+        self.assertEqual(
+            [usc for usc in result if usc.NORAD_CAT_ID is None], unnumbered
+        )
+        self.assertEqual(
+            [usc.NORAD_CAT_ID for usc in result if usc.NORAD_CAT_ID is not None],
+            ["5", "11", "25544"],
+        )
+
+    def test_unordered_ids_raise(self):
+        with self.assertRaises(ValueError):
+            list(latest_epochs([element_set("11", 1), element_set("5", 1)]))
+
+    def test_unordered_epochs_raise(self):
+        with self.assertRaises(ValueError):
+            list(latest_epochs([element_set("5", 2), element_set("5", 1)]))
+
+
+class TestSpaceTrackXMLKeepEpochs(unittest.TestCase):
+
+    def test_streams_generated_catalog(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_omm_xml(
+                os.path.join(tmp, "omm.xml"), 40, seed=2, epochs_per_object=3
+            )
+            everything = spaceTrackXML(path)
+            streamed = list(iterSpaceTrackXML(path))
+            latest = spaceTrackXML(path, keep_epochs=1)
+
+        self.assertEqual(len(everything), 120)
+        self.assertEqual(streamed, everything)
+        self.assertEqual(len(latest), 40)
+        self.assertEqual(latest, everything[2::3])
+
+    def test_any_xpath_location(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_omm_xml(os.path.join(tmp, "omm.xml"), 10, seed=2)
+            expected = spaceTrackXML(path)
+            for location in (
+                ".//segment",
+                "./*/body/segment",
+                "./omm/body/segment[data]",
+                "omm/body/segment",
+            ):
+                with self.subTest(location=location):
+                    found = XMLtoUSC(path, location, SPACE_TRACK_XML_MAP)
+                    self.assertEqual(found, expected)
+            self.assertEqual(XMLtoUSC(path, "./omm/segment", SPACE_TRACK_XML_MAP), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from Spade.diff import diff_snapshots, iter_change_feed, write_change_feed
+from Spade.models import USC
+
+"""
+This file contains tests for the snapshot diff engine.
+"""
+
+
+def catalog_object(norad_id: str, **fields) -> USC:
+    values = dict(
+        INTERNATIONAL_DESIGNATOR=f"2025-{norad_id}A",
+        SATELLITE_NAME=f"SAT {norad_id}",
+        NORAD_CAT_ID=norad_id,
+        EPOCH=datetime(2025, 6, 1, 12),
+        MEAN_MOTION=15.5,
+        ECCENTRICITY=0.0001,
+        INCLINATION=53.0,
+        SEMIMAJOR_AXIS=6790.0,
+        DRY_MASS=250.0,
+        SHAPE="Box",
+        SOURCES=["space-track"],
+    )
+    values.update(fields)
+    return USC(**values)
+
+
+class TestDiffSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.old = [
+            catalog_object("5"),
+            catalog_object("11"),
+            catalog_object("20"),
+            catalog_object("25544"),
+        ]
+        self.new = [
+            catalog_object("5"),
+            catalog_object("11", DRY_MASS=260.0, SHAPE="Box + 2 Pan"),
+            catalog_object(
+                "25544",
+                EPOCH=datetime(2025, 6, 2, 12),
+                SEMIMAJOR_AXIS=6795.0,
+                MEAN_MOTION=15.45,
+            ),
+            catalog_object("60000"),
+        ]
+
+    def test_added_removed_changed(self):
+        diff = diff_snapshots(self.old, self.new)
+        self.assertEqual([usc.NORAD_CAT_ID for usc in diff.added], ["60000"])
+        self.assertEqual([usc.NORAD_CAT_ID for usc in diff.removed], ["20"])
+        self.assertEqual([change.key for change in diff.changed], ["11", "25544"])
+        self.assertEqual(diff.unchanged, 1)
+
+        mass = diff.changed[0].change("DRY_MASS")
+        self.assertEqual((mass.old, mass.new, mass.delta), (250.0, 260.0, 10.0))
+        self.assertEqual(diff.changed[0].fields, ["DRY_MASS", "SHAPE"])
+        self.assertIsNone(diff.changed[0].change("SHAPE").delta)
+        self.assertFalse(diff.changed[0].elements_only)
+        self.assertTrue(diff.changed[1].elements_only)
+
+    def test_element_jumps(self):
+        diff = diff_snapshots(self.old, self.new)
+        self.assertEqual([c.key for c in diff.element_jumps()], ["25544"])
+        self.assertEqual(diff.element_jumps({"SEMIMAJOR_AXIS": 10.0}), [])
+        self.assertEqual([c.key for c in diff.changed_field("DRY_MASS")], ["11"])
+
+    def test_formatting_differences_are_unchanged(self):
+        old = [catalog_object("5", SHAPE="Box", INCLINATION=53.0)]
+        new = [
+            catalog_object(
+                "5",
+                SHAPE="Box ",
+                INCLINATION=53.0000000000001,
+                SOURCES=["space-track", "discos"],
+            )
+        ]
+        diff = diff_snapshots(old, new)
+        self.assertFalse(diff)
+        self.assertEqual(diff.unchanged, 1)
+
+    def test_diff_fields(self):
+        diff = diff_snapshots(self.old, self.new, diff_fields=("DRY_MASS",))
+        self.assertEqual([change.key for change in diff.changed], ["11"])
+
+    def test_later_duplicates_win(self):
+        old = [catalog_object("5", MEAN_MOTION=15.0), catalog_object("5")]
+        self.assertFalse(diff_snapshots(old, [catalog_object("5")]))
+
+    def test_objects_without_norad_or_cosparid(self):
+        def discos(discos_id, mass):
+            return USC(
+                INTERNATIONAL_DESIGNATOR=None, DISCOS_ID=discos_id, DRY_MASS=mass
+            )
+
+        old = [discos("101", 10.0), discos("102", 5.0), discos(None, 1.0)]
+        new = [discos("101", 12.0), discos("103", 5.0), discos(None, 2.0)]
+        diff = diff_snapshots(old, new)
+        self.assertEqual([change.key for change in diff.changed], ["DISCOS:101"])
+        self.assertEqual([usc.DISCOS_ID for usc in diff.added], ["103"])
+        self.assertEqual([usc.DISCOS_ID for usc in diff.removed], ["102"])
+        self.assertEqual(diff.unkeyed, [new[2]])
+        self.assertEqual(len(list(iter_change_feed(diff))), 3)
+
+    def test_change_feed(self):
+        diff = diff_snapshots(self.old, self.new)
+        feed = list(iter_change_feed(diff))
+        self.assertEqual(
+            [change["op"] for change in feed], ["add", "remove"] + 2 * ["change"]
+        )
+        self.assertEqual(feed[0]["record"]["EPOCH"], "2025-06-01T12:00:00")
+        self.assertNotIn("WET_MASS", feed[0]["record"])
+        self.assertEqual(feed[1], {"op": "remove", "key": "20"})
+        self.assertEqual(
+            feed[2]["fields"],
+            {"DRY_MASS": [250.0, 260.0], "SHAPE": ["Box", "Box + 2 Pan"]},
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "changes.ndjson")
+            self.assertEqual(write_change_feed(diff, filename), 4)
+            with open(filename, encoding="utf-8") as f:
+                self.assertEqual([json.loads(line) for line in f], feed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import date, datetime
+
+from Spade.exporters import (
+    EXPORT_COLUMNS,
+    export,
+    export_csv,
+    export_format,
+    export_json,
+    export_ndjson,
+    export_sqlite,
+)
+from Spade.models import USC
+
+"""
+This file contains tests for the streaming exporters.
+"""
+
+
+def catalog(count: int):
+    for number in range(1, count + 1):
+        yield USC(
+            INTERNATIONAL_DESIGNATOR=f"2025-{number:03d}A",
+            SATELLITE_NAME=f"SAT, {number}" if number % 2 else None,
+            NORAD_CAT_ID=str(number),
+            EPOCH=datetime(2025, 6, 1, 12, 0, 0, number),
+            INCLINATION=53.0 + number,
+            ELEMENT_SET_NUM=999,
+            LAUNCH_DATE=date(2025, 1, number),
+            SOURCES=["space-track", "discos"],
+        )
+
+
+class TestExporters(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp.name, name)
+
+    def test_csv(self):
+        self.assertEqual(export_csv(catalog(3), self.path("c.csv")), 3)
+        with open(self.path("c.csv"), newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(tuple(rows[0]), EXPORT_COLUMNS)
+        first = dict(zip(rows[0], rows[1]))
+        self.assertEqual(first["SATELLITE_NAME"], "SAT, 1")
+        self.assertEqual(first["EPOCH"], "2025-06-01T12:00:00.000001")
+        self.assertEqual(first["LAUNCH_DATE"], "2025-01-01")
+        self.assertEqual(first["SOURCES"], "space-track;discos")
+        self.assertEqual(first["DRY_MASS"], "")
+        self.assertEqual(dict(zip(rows[0], rows[2]))["SATELLITE_NAME"], "")
+
+    def test_gzip(self):
+        export(catalog(5), self.path("c.csv.gz"))
+        with gzip.open(self.path("c.csv.gz"), "rt", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 6)
+
+        export_ndjson(catalog(5), self.path("plain.ndjson"), compress=True)
+        with gzip.open(self.path("plain.ndjson"), "rt", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 5)
+
+    def test_ndjson(self):
+        export(catalog(4), self.path("c.jsonl"))
+        with open(self.path("c.jsonl"), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 4)
+        self.assertEqual(list(records[0]), list(EXPORT_COLUMNS))
+        self.assertEqual(records[3]["INCLINATION"], 57.0)
+        self.assertEqual(records[3]["SOURCES"], ["space-track", "discos"])
+
+    def test_json(self):
+        for count in (0, 1, 3):
+            with self.subTest(count=count):
+                filename = self.path(f"c{count}.json.gz")
+                self.assertEqual(export_json(catalog(count), filename), count)
+                with gzip.open(filename, "rt", encoding="utf-8") as f:
+                    records = json.load(f)
+                self.assertEqual(
+                    [r["NORAD_CAT_ID"] for r in records],
+                    [str(n) for n in range(1, count + 1)],
+                )
+
+    def test_sqlite(self):
+        filename = self.path("c.sqlite")
+        export(catalog(25), filename)
+        # a second export replaces the table
+        self.assertEqual(export_sqlite(catalog(12), filename), 12)
+        with sqlite3.connect(filename) as connection:
+            count = connection.execute("SELECT COUNT(*) FROM satellites").fetchone()
+            row = connection.execute(
+                "SELECT INCLINATION, ELEMENT_SET_NUM, EPOCH, DRY_MASS FROM satellites "
+                "WHERE NORAD_CAT_ID = '7'"
+            ).fetchone()
+        connection.close()
+        self.assertEqual(count, (12,))
+        self.assertEqual(row, (60.0, 999, "2025-06-01T12:00:00.000007", None))
+
+    def test_unknown_formats(self):
+        self.assertEqual(export_format("catalog.JSON.gz"), "json")
+        with self.assertRaises(ValueError):
+            export(catalog(1), self.path("c.xml"))
+        with self.assertRaises(ValueError):
+            export(catalog(1), self.path("c.sqlite.gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
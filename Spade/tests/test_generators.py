@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from Spade.importers import parseDISCOSJSON, spaceTrackXML
+from Spade.testing.generators import (
+    derived_parameters,
+    iter_synthetic_objects,
+    synthetic_uscs,
+    write_cache_directory,
+    write_discos_json,
+    write_omm_xml,
+)
+
+"""
+This file contains tests for the synthetic catalog generators.
+"""
+
+
+class TestWriteOmmXml(unittest.TestCase):
+
+    def test_imports_every_object(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_omm_xml(os.path.join(tmp, "omm.xml"), 250, seed=3)
+            listUSCs = spaceTrackXML(path)
+        self.assertEqual(len(listUSCs), 250)
+
+    def test_sorted_like_space_track(self):
+        records = list(iter_synthetic_objects(50, seed=1, epochs_per_object=3))
+        keys = [(int(r["NORAD_CAT_ID"]), r["EPOCH"]) for r in records]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(records), 150)
+
+    def test_same_seed_same_catalog(self):
+        first = list(iter_synthetic_objects(20, seed=9))
+        second = list(iter_synthetic_objects(20, seed=9))
+        self.assertEqual(first, second)
+
+    def test_synthetic_uscs_match_the_xml(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_omm_xml(os.path.join(tmp, "omm.xml"), 40, seed=5)
+            self.assertEqual(synthetic_uscs(40, seed=5), spaceTrackXML(path))
+
+
+class TestWriteDiscosJson(unittest.TestCase):
+
+    def test_imports_every_object(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_discos_json(os.path.join(tmp, "discos.json"), 120, seed=3)
+            with open(path, "r") as f:
+                data = json.load(f)
+            listUSCs = parseDISCOSJSON(path)
+        self.assertEqual(len(data), 120)
+        self.assertEqual(len(listUSCs), 120)
+        self.assertEqual(listUSCs[0].DISCOS_ID, str(data[0]["id"]))
+
+    def test_matches_omm_catalog(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            omm = spaceTrackXML(write_omm_xml(os.path.join(tmp, "omm.xml"), 30))
+            discos = parseDISCOSJSON(write_discos_json(os.path.join(tmp, "d.json"), 30))
+        self.assertEqual(
+            [usc.INTERNATIONAL_DESIGNATOR for usc in omm],
+            [usc.INTERNATIONAL_DESIGNATOR for usc in discos],
+        )
+
+
+class TestDerivedParameters(unittest.TestCase):
+
+    def test_matches_space_track_values(self):
+        # VANGUARD 1 from testSpaceTrack.xml
+        derived = derived_parameters(10.85926524, 0.18418470)
+        self.assertAlmostEqual(derived["SEMIMAJOR_AXIS"], 8613.934, places=2)
+        self.assertAlmostEqual(derived["PERIOD"], 132.606, places=2)
+        self.assertAlmostEqual(derived["APOAPSIS"], 3822.354, places=2)
+        self.assertAlmostEqual(derived["PERIAPSIS"], 649.244, places=2)
+
+
+class TestWriteCacheDirectory(unittest.TestCase):
+
+    def test_newest_file_is_found(self):
+        from Spade.data_fetcher import isCacheAvaliable
+
+        with tempfile.TemporaryDirectory() as tmp:
+            write_cache_directory(tmp, 200)
+            mock_settings = MagicMock()
+            mock_settings.DOWNLOADED_DATA_PATH = tmp
+            mock_settings.DATE_FORMAT = "%Y_%m_%d-%I_%M_%S_%p"
+            result = isCacheAvaliable(
+                "FULL_CATLOG_", timedelta(weeks=100000), mock_settings
+            )
+        self.assertIsNotNone(result)
+        self.assertIn("FULL_CATLOG_2025_06_09-04_21_09_AM", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
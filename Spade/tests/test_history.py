@@ -0,0 +1,137 @@
+import os
+import random
+import tempfile
+import unittest
+from datetime import datetime
+
+from Spade.history import ElementHistoryStore, norad_number
+from Spade.models import USC
+
+"""
+This file contains tests for the element set history store.
+"""
+
+
+def element_set(norad_id: str, day: int, b_star=0.0001, mean_motion=15.5) -> USC:
+    return USC(
+        INTERNATIONAL_DESIGNATOR=f"2025-{norad_id}A",
+        SATELLITE_NAME=f"SAT {norad_id}",
+        NORAD_CAT_ID=norad_id,
+        EPOCH=datetime(2025, 6, day, 12, 30, 15, 123456),
+        MEAN_MOTION=mean_motion + day * 0.0001,
+        ECCENTRICITY=0.0001,
+        INCLINATION=53.0,
+        RA_OF_ASC_NODE=10.0 + day,
+        ARG_OF_PERIGEE=90.0,
+        MEAN_ANOMALY=270.0,
+        B_STAR=b_star,
+        ELEMENT_SET_NUM=999,
+        REV_AT_EPOCH=1000 + day,
+    )
+
+
+class TestElementHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+        self.store = ElementHistoryStore(self.path)
+        self.store.append([element_set("5", 1), element_set("25544", 1)])
+        self.store.append(
+            [element_set("5", 1), element_set("5", 3), element_set("25544", 2)]
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_new_element_sets_are_stored(self):
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store.append([element_set("5", 3)]), 0)
+        self.assertEqual(len(os.listdir(self.path)), 2)
+
+    def test_history_between(self):
+        history = self.store.history("5", datetime(2025, 6, 2), datetime(2025, 6, 30))
+        self.assertEqual(len(history), 1)
+        self.assertEqual(
+            history.epoch[0].item(), datetime(2025, 6, 3, 12, 30, 15, 123456)
+        )
+        self.assertAlmostEqual(history.columns["MEAN_MOTION"][0], 15.5003)
+        self.assertEqual(len(self.store.history("5")), 2)
+        self.assertEqual(len(self.store.history("99999")), 0)
+
+    def test_as_of(self):
+        catalog = self.store.as_of(datetime(2025, 6, 2, 23))
+        self.assertEqual([usc.NORAD_CAT_ID for usc in catalog], ["5", "25544"])
+        self.assertEqual(catalog[0], element_set("5", 1))
+        self.assertEqual(catalog[1], element_set("25544", 2))
+
+    def test_reopen_and_compact(self):
+        self.store.append([element_set("11", 4, b_star=None)])
+        self.store.compact()
+        self.assertEqual(len(os.listdir(self.path)), 1)
+
+        reopened = ElementHistoryStore(self.path)
+        self.assertEqual(len(reopened), 5)
+        latest = reopened.as_of(datetime(2025, 7, 1))
+        self.assertEqual(
+            latest,
+            [
+                element_set("5", 3),
+                element_set("11", 4, b_star=None),
+                element_set("25544", 2),
+            ],
+        )
+
+    def test_interrupted_compaction(self):
+        before = {}
+        for name in os.listdir(self.path):
+            with open(os.path.join(self.path, name), "rb") as f:
+                before[name] = f.read()
+        self.store.compact()
+        # put the old segments back, as if compact stopped before removing them
+        for name, data in before.items():
+            with open(os.path.join(self.path, name), "wb") as f:
+                f.write(data)
+        self.assertEqual(len(os.listdir(self.path)), 3)
+
+        reopened = ElementHistoryStore(self.path)
+        self.assertEqual(len(reopened), 4)
+        self.assertEqual(len(reopened.history("5")), 2)
+        reopened.compact()
+        self.assertEqual(len(ElementHistoryStore(self.path)), 4)
+
+    def test_appends_merge_in_order(self):
+        rng = random.Random(4)
+        expected = {"5": {1, 3}, "25544": {1, 2}, "11": set(), "A0001": set()}
+        for _ in range(20):
+            refresh = [
+                element_set(rng.choice(list(expected)), rng.randint(1, 28))
+                for _ in range(5)
+            ]
+            self.store.append(refresh)
+            for usc in refresh:
+                expected[usc.NORAD_CAT_ID].add(usc.EPOCH.day)
+        for store in (self.store, ElementHistoryStore(self.path)):
+            for norad_id, days in expected.items():
+                with self.subTest(norad_id=norad_id):
+                    epochs = store.history(norad_id).epoch.astype(datetime)
+                    self.assertEqual([epoch.day for epoch in epochs], sorted(days))
+
+    def test_alpha5_ids_round_trip(self):
+        self.store.append([element_set("A0001", 4)])
+        for store in (self.store, ElementHistoryStore(self.path)):
+            latest = store.as_of(datetime(2025, 7, 1))
+            self.assertEqual(latest[-1], element_set("A0001", 4))
+        self.assertEqual(len(self.store.history("A0001")), 1)
+
+
+class TestNoradNumber(unittest.TestCase):
+
+    def test_alpha5(self):
+        self.assertEqual(norad_number("25544"), 25544)
+        self.assertEqual(norad_number("A0001"), 100001)
+        self.assertEqual(norad_number("Z9999"), 339999)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from timeit import default_timer as timer
+
+from requests import Session
+
+from Spade.data_fetcher import (
+    DISCOS_FILE_PREFIX,
+    fetch_all_objects_DISCOS,
+    fetch_api,
+    fetch_full_catlog_ST,
+    get_auth_space_tracker,
+    load_discos_sync_state,
+    revalidation_range,
+    save_discos_objects,
+    sync_discos_objects,
+)
+from Spade.importers import spaceTrackXML
+from Spade.testing.generators import iter_discos_objects
+from Spade.testing.mock_servers import (
+    MockDiscosServer,
+    MockSpaceTrackServer,
+    parse_discos_filter,
+)
+
+"""
+This file contains offline tests for the fetchers, run against the mock servers.
+"""
+
+
+class TestMockSpaceTrack(unittest.TestCase):
+
+    def test_login(self):
+        with MockSpaceTrackServer(catalog_size=5) as server:
+            self.assertTrue(get_auth_space_tracker(Session(), server.settings()))
+
+    def test_bad_login_fails_smoothly(self):
+        with MockSpaceTrackServer(catalog_size=5) as server:
+            settings = server.settings(SPACE_TRACKER_PASSWORD="badpassword")
+            self.assertFalse(get_auth_space_tracker(Session(), settings))
+
+    def test_catalog_needs_login(self):
+        with MockSpaceTrackServer(catalog_size=5) as server:
+            res = fetch_api(Session(), server.settings().SPACE_TRACKER_FULL_CATLOG)
+        self.assertIsNone(res)
+
+    def test_fetch_full_catlog(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with MockSpaceTrackServer(catalog_size=40, epochs_per_object=2) as server:
+                fileName = fetch_full_catlog_ST(server.settings(tmp + os.sep))
+            self.assertIsNotNone(fileName)
+            listUSCs = spaceTrackXML(fileName)
+        self.assertEqual(len(listUSCs), 80)
+
+    def test_rate_limit(self):
+        with MockSpaceTrackServer(catalog_size=5, rate_limit=2) as server:
+            session = Session()
+            settings = server.settings()
+            self.assertTrue(get_auth_space_tracker(session, settings))
+            self.assertIsNotNone(fetch_api(session, settings.SPACE_TRACKER_FULL_CATLOG))
+            self.assertIsNone(fetch_api(session, settings.SPACE_TRACKER_FULL_CATLOG))
+            self.assertEqual(server.stats.rate_limited, 1)
+
+
+class TestMockDiscos(unittest.TestCase):
+
+    def test_paginates_whole_catalog(self):
+        with MockDiscosServer(catalog_size=250) as server:
+            objects = fetch_all_objects_DISCOS(server.settings(), page_size=100)
+            self.assertEqual(server.stats.requests, 3)
+        self.assertIsNotNone(objects)
+        self.assertEqual([o["id"] for o in objects], [o["id"] for o in server.objects])
+
+    def test_bad_token(self):
+        with MockDiscosServer(catalog_size=10) as server:
+            settings = server.settings(DISCOS_TOKEN="wrong")
+            self.assertIsNone(fetch_all_objects_DISCOS(settings))
+
+    def test_injected_fault_aborts_fetch(self):
+        with MockDiscosServer(catalog_size=300, fault_requests=[2]) as server:
+            self.assertIsNone(fetch_all_objects_DISCOS(server.settings()))
+            self.assertEqual(server.stats.faults, 1)
+
+    def test_truncated_response(self):
+        with MockDiscosServer(
+            catalog_size=10, fault_requests=[1], fault_kind="truncate"
+        ) as server:
+            self.assertIsNone(fetch_all_objects_DISCOS(server.settings()))
+
+    def test_latency(self):
+        with MockDiscosServer(catalog_size=10, latency=0.05) as server:
+            start = timer()
+            fetch_all_objects_DISCOS(server.settings())
+            self.assertGreaterEqual(timer() - start, 0.05)
+
+    def test_bandwidth_cap(self):
+        with MockDiscosServer(catalog_size=20, bandwidth=200_000) as server:
+            start = timer()
+            fetch_all_objects_DISCOS(server.settings())
+            elapsed = timer() - start
+            self.assertGreaterEqual(elapsed, server.stats.bytes_sent / 200_000 * 0.8)
+
+    def test_filter(self):
+        with MockDiscosServer(catalog_size=250) as server:
+            server.objects[3]["attributes"]["active"] = False
+            objects = fetch_all_objects_DISCOS(
+                server.settings(), filter="and(eq(active,true),le(id,10010))"
+            )
+        self.assertEqual(
+            [o["id"] for o in objects], [str(10000 + i) for i in range(11) if i != 3]
+        )
+
+    def test_parse_filter(self):
+        item = next(iter_discos_objects(1))
+        item["attributes"]["satno"] = 25544
+        self.assertTrue(parse_discos_filter("satno=25544")(item))
+        self.assertTrue(parse_discos_filter("or(lt(id,5),eq(satno,25544))")(item))
+        self.assertFalse(parse_discos_filter("and(ge(id,0),eq(mass,null))")(item))
+        with self.assertRaises(ValueError):
+            parse_discos_filter("like(name,'ISS')")
+
+
+class TestDiscosSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = MockDiscosServer(catalog_size=280).start()
+        self.settings = self.server.settings(self.tmp.name + os.sep)
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def load(self, filename):
+        with open(filename, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_first_sync_fetches_everything(self):
+        filename = sync_discos_objects(self.settings, slices=4)
+        self.assertEqual(len(self.load(filename)), 280)
+        state = load_discos_sync_state(self.settings)
+        self.assertEqual(state["last_id"], 10279)
+        self.assertEqual(state["cursor"], 0)
+        self.assertEqual(len(state["ids"]), 280)
+
+    def test_incremental_sync(self):
+        sync_discos_objects(self.settings, slices=4)
+        requests = self.server.stats.requests
+
+        # a launch, a decay in the first slice and a mass update in the first slice
+        launched = next(iter_discos_objects(1, seed=9))
+        launched["id"] = "20000"
+        self.server.objects.append(launched)
+        self.server.objects[5]["attributes"]["active"] = False
+        self.server.objects[6]["attributes"]["mass"] = 1.5
+        self.server.objects[200]["attributes"]["mass"] = 1.5  # not in the slice yet
+
+        filename = sync_discos_objects(self.settings, slices=4)
+        # one page of new objects and one page for the 70 objects of the slice
+        self.assertEqual(self.server.stats.requests - requests, 2)
+
+        objects = {item["id"]: item for item in self.load(filename)}
+        self.assertEqual(len(objects), 280)
+        self.assertIn("20000", objects)
+        self.assertNotIn("10005", objects)
+        self.assertEqual(objects["10006"]["attributes"]["mass"], 1.5)
+        self.assertNotEqual(objects["10200"]["attributes"]["mass"], 1.5)
+
+        state = load_discos_sync_state(self.settings)
+        self.assertEqual((state["last_id"], state["cursor"]), (20000, 1))
+
+        for _ in range(3):
+            filename = sync_discos_objects(self.settings, slices=4)
+        objects = {item["id"]: item for item in self.load(filename)}
+        self.assertEqual(objects["10200"]["attributes"]["mass"], 1.5)
+
+    def test_reactivated_objects_between_slices(self):
+        # inactive during the first sync, so its id is between two slices of known ids
+        self.server.objects[70]["attributes"]["active"] = False
+        sync_discos_objects(self.settings, slices=4)
+        self.assertEqual(revalidation_range([10, 20, 30, 40], 0, slices=2), (0, 20))
+        self.assertEqual(revalidation_range([10, 20, 30, 40], 1, slices=2), (21, 40))
+
+        self.server.objects[70]["attributes"]["active"] = True
+        for _ in range(4):
+            filename = sync_discos_objects(self.settings, slices=4)
+        self.assertIn("10070", {item["id"] for item in self.load(filename)})
+
+    def test_old_downloads_are_removed(self):
+        for day in (1, 2, 3):
+            old = datetime(2025, 6, day).strftime(self.settings.DATE_FORMAT)
+            with open(f"{self.tmp.name}/{DISCOS_FILE_PREFIX}{old}.json", "w") as f:
+                f.write("[]")
+        filename = sync_discos_objects(self.settings, slices=4)
+        old = datetime(2025, 6, 3).strftime(self.settings.DATE_FORMAT)
+        self.assertEqual(
+            sorted(
+                n for n in os.listdir(self.tmp.name) if n.startswith(DISCOS_FILE_PREFIX)
+            ),
+            sorted([os.path.basename(filename), f"{DISCOS_FILE_PREFIX}{old}.json"]),
+        )
+
+    def test_failed_sync_keeps_previous(self):
+        first = sync_discos_objects(self.settings, slices=4)
+        self.server.config.fault_requests = [self.server.stats.requests + 2]
+        self.assertIsNone(sync_discos_objects(self.settings, slices=4))
+        self.assertEqual(load_discos_sync_state(self.settings)["file"], first)
+
+    def test_save_incremental(self):
+        first = save_discos_objects(self.settings)
+        self.assertEqual(save_discos_objects(self.settings, incremental=True), first)
+        requests = self.server.stats.requests
+        second = save_discos_objects(
+            self.settings, incremental=True, max_cache_age=timedelta(0)
+        )
+        self.assertEqual(len(self.load(second)), 280)
+        self.assertEqual(self.server.stats.requests - requests, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import csv
+import json
+import os
+import re
+import tempfile
+import unittest
+from dataclasses import replace
+
+from Spade.data_fetcher import fetch_full_catlog_ST, space_track_extension
+from Spade.importers import (
+    iterSpaceTrackCSV,
+    iterSpaceTrackJSON,
+    parseSpaceTrack,
+    spaceTrackXML,
+)
+from Spade.testing.generators import write_omm_csv, write_omm_json, write_omm_xml
+from Spade.testing.mock_servers import MockSpaceTrackServer
+
+"""
+This file contains tests for the Space-Track CSV and JSON importers.
+"""
+
+
+class TestOmmFormats(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        path = cls.tmp.name
+        cls.xml = write_omm_xml(os.path.join(path, "gp.XML"), 200, 4, 2)
+        cls.csv = write_omm_csv(os.path.join(path, "gp.csv"), 200, 4, 2)
+        cls.json = write_omm_json(os.path.join(path, "gp.json"), 200, 4, 2)
+        cls.expected = spaceTrackXML(cls.xml)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_same_objects_as_xml(self):
+        self.assertEqual(len(self.expected), 400)
+        self.assertEqual(list(iterSpaceTrackCSV(self.csv)), self.expected)
+        self.assertEqual(list(iterSpaceTrackJSON(self.json)), self.expected)
+
+    def test_parse_space_track_picks_format(self):
+        latest = spaceTrackXML(self.xml, keep_epochs=1)
+        self.assertEqual(len(latest), 200)
+        for path in (self.xml, self.csv, self.json):
+            with self.subTest(path=path):
+                self.assertEqual(parseSpaceTrack(path, keep_epochs=1), latest)
+        with self.assertRaises(ValueError):
+            parseSpaceTrack("gp.txt")
+
+    def test_bad_rows_are_skipped(self):
+        path = os.path.join(self.tmp.name, "bad.csv")
+        with open(self.csv) as f:
+            lines = f.read().splitlines()
+        lines[1] = lines[1].replace("EARTH", "EARTH,extra", 1)
+        lines[2] = lines[2].replace(",0,U,", ",zero,U,", 1)
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        self.assertEqual(list(iterSpaceTrackCSV(path)), self.expected[2:])
+
+    def test_blank_and_padded_cells(self):
+        path = os.path.join(self.tmp.name, "blank.csv")
+        with open(self.csv, newline="") as f:
+            header, *rows = csv.reader(f)
+        blank = {"EPHEMERIS_TYPE": "", "CLASSIFICATION_TYPE": "   "}
+        padded = {
+            name: f" {rows[0][header.index(name)]}\t"
+            for name in ("OBJECT_NAME", "NORAD_CAT_ID", "INCLINATION")
+        }
+        expected = replace(self.expected[0], EPHEMERIS_TYPE=None, CLASSIFICATION=None)
+        for name, value in {**blank, **padded}.items():
+            rows[0][header.index(name)] = value
+        with open(path, "w", newline="") as f:
+            csv.writer(f).writerows([header, *rows])
+        self.assertEqual(next(iterSpaceTrackCSV(path)), expected)
+
+        path = os.path.join(self.tmp.name, "blank.json")
+        with open(self.json) as f:
+            data = json.load(f)
+        data[0].update(blank, **padded)
+        with open(path, "w") as f:
+            json.dump(data, f)
+        self.assertEqual(next(iterSpaceTrackJSON(path)), expected)
+
+        path = os.path.join(self.tmp.name, "blank.XML")
+        with open(self.xml) as f:
+            text = f.read()
+        for name, value in padded.items():
+            text = re.sub(f"<{name}>[^<]*<", f"<{name}>{value}<", text, count=1)
+        # truly empty elements, without any text
+        text = re.sub(
+            "<EPHEMERIS_TYPE>[^<]*</EPHEMERIS_TYPE>", "<EPHEMERIS_TYPE/>", text, count=1
+        )
+        text = re.sub(
+            "<CLASSIFICATION_TYPE>[^<]*<", "<CLASSIFICATION_TYPE><", text, count=1
+        )
+        with open(path, "w") as f:
+            f.write(text)
+        self.assertEqual(spaceTrackXML(path)[0], expected)
+
+
+class TestFetchFormats(unittest.TestCase):
+
+    def test_extension(self):
+        self.assertEqual(space_track_extension("https://x/gp/format/xml"), ".XML")
+        self.assertEqual(space_track_extension("https://x/gp/format/csv/"), ".csv")
+        self.assertEqual(space_track_extension("https://x/gp/NORAD_CAT_ID/1"), ".XML")
+        with self.assertRaises(ValueError):
+            space_track_extension("https://x/gp/format/kvn")
+
+    def test_fetch_csv_and_json(self):
+        with MockSpaceTrackServer(catalog_size=30, epochs_per_object=2) as server:
+            for output_format in ("csv", "json"):
+                with self.subTest(output_format=output_format):
+                    with tempfile.TemporaryDirectory() as tmp:
+                        settings = server.settings(tmp + os.sep, output_format)
+                        fileName = fetch_full_catlog_ST(settings)
+                        self.assertTrue(fileName.endswith("." + output_format))
+                        listUSCs = parseSpaceTrack(fileName, keep_epochs=1)
+                    self.assertEqual(len(listUSCs), 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import unittest
+
+import numpy as np
+
+from Spade.importers import spaceTrackXML
+from Spade.models import USC
+from Spade.orbit_parameters import (
+    compute_derived_parameters,
+    fill_derived_parameters,
+)
+
+"""
+This file contains tests for the derived orbit parameter stage.
+"""
+
+TEST_FILE = os.path.join(os.path.dirname(__file__), "testFiles", "testSpaceTrack.xml")
+
+
+def vanguard(**overrides) -> USC:
+    values = dict(
+        INTERNATIONAL_DESIGNATOR="1958-002B",
+        NORAD_CAT_ID="5",
+        MEAN_MOTION=10.85926524,
+        ECCENTRICITY=0.18418470,
+    )
+    values.update(overrides)
+    return USC(**values)
+
+
+class TestComputeDerivedParameters(unittest.TestCase):
+
+    def test_matches_space_track_values(self):
+        derived = compute_derived_parameters(
+            np.array([10.85926524]), np.array([0.1841847])
+        )
+        self.assertAlmostEqual(derived["SEMIMAJOR_AXIS"][0], 8613.934, places=2)
+        self.assertAlmostEqual(derived["PERIOD"][0], 132.606, places=2)
+        self.assertAlmostEqual(derived["APOAPSIS"][0], 3822.354, places=2)
+        self.assertAlmostEqual(derived["PERIAPSIS"][0], 649.244, places=2)
+
+    def test_bad_mean_motion_is_nan(self):
+        derived = compute_derived_parameters(
+            np.array([0.0, np.nan]), np.array([0.1, 0.1])
+        )
+        self.assertTrue(np.isnan(derived["PERIOD"]).all())
+
+
+class TestFillDerivedParameters(unittest.TestCase):
+
+    def test_fills_missing_values(self):
+        catalog = [vanguard()]
+        mismatches = fill_derived_parameters(catalog)
+        self.assertEqual(mismatches, [])
+        self.assertAlmostEqual(catalog[0].SEMIMAJOR_AXIS, 8613.934, places=2)
+        self.assertAlmostEqual(catalog[0].PERIAPSIS, 649.244, places=2)
+
+    def test_flags_disagreeing_values(self):
+        catalog = [vanguard(), vanguard(NORAD_CAT_ID="6", APOAPSIS=3900.0)]
+        mismatches = fill_derived_parameters(catalog)
+        self.assertEqual(len(mismatches), 1)
+        self.assertEqual(mismatches[0].index, 1)
+        self.assertEqual(mismatches[0].field, "APOAPSIS")
+        self.assertAlmostEqual(mismatches[0].difference, 77.646, places=2)
+        # supplied values are reported, never overwritten
+        self.assertEqual(catalog[1].APOAPSIS, 3900.0)
+
+    def test_skips_objects_without_elements(self):
+        catalog = [vanguard(MEAN_MOTION=None)]
+        self.assertEqual(fill_derived_parameters(catalog), [])
+        self.assertIsNone(catalog[0].SEMIMAJOR_AXIS)
+
+    def test_skips_objects_without_eccentricity(self):
+        catalog = [vanguard(ECCENTRICITY=None, PERIOD=1.0)]
+        self.assertEqual(fill_derived_parameters(catalog), [])
+        self.assertIsNone(catalog[0].SEMIMAJOR_AXIS)
+        self.assertIsNone(catalog[0].APOAPSIS)
+        self.assertEqual(catalog[0].PERIOD, 1.0)
+
+    def test_space_track_file_is_consistent(self):
+        catalog = spaceTrackXML(TEST_FILE)
+        self.assertEqual(fill_derived_parameters(catalog), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
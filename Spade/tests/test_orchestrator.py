@@ -0,0 +1,181 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from types import SimpleNamespace
+
+from Spade.models import USC
+from Spade.orchestrator import Stage, StageFailed, refresh_all, run_stages
+from Spade.scheduler import SourceSchedule, default_sources
+from Spade.snapshots import current_snapshot, list_snapshots, read_manifest
+from Spade.testing.mock_servers import MockDiscosServer, MockSpaceTrackServer
+
+"""
+This file contains tests for the concurrent refresh orchestrator.
+"""
+
+
+def sleeping(seconds: float, value=None):
+    def run(inputs):
+        time.sleep(seconds)
+        return value if value is not None else inputs
+
+    return run
+
+
+class TestRunStages(unittest.TestCase):
+
+    def test_independent_stages_overlap(self):
+        report = run_stages(
+            [
+                Stage("a", sleeping(0.3, 1)),
+                Stage("b", sleeping(0.3, 2)),
+                Stage("sum", lambda inputs: inputs["a"] + inputs["b"], ("a", "b")),
+            ]
+        )
+        self.assertTrue(report.ok)
+        self.assertEqual(report.value("sum"), 3)
+        self.assertLess(report.wall_time, 0.55)
+
+    def test_stage_starts_when_its_inputs_are_ready(self):
+        report = run_stages(
+            [
+                Stage("slow", sleeping(0.4, "slow")),
+                Stage("fast", sleeping(0.05, "fast")),
+                Stage("after-fast", sleeping(0.05), ("fast",)),
+            ]
+        )
+        self.assertLess(
+            report.stages["after-fast"].finished, report.stages["slow"].finished
+        )
+        self.assertEqual(report.value("after-fast"), {"fast": "fast"})
+        self.assertEqual([r.name for r in report.critical_path()], ["slow"])
+        self.assertEqual(
+            [r.name for r in report.critical_path("after-fast")],
+            ["fast", "after-fast"],
+        )
+
+    def test_failures_skip_dependents_only(self):
+        def broken(inputs):
+            raise StageFailed("no file")
+
+        report = run_stages(
+            [
+                Stage("fetch:a", broken, source="a"),
+                Stage("parse:a", sleeping(0), ("fetch:a",), "a"),
+                Stage("export:a", sleeping(0), ("parse:a",), "a"),
+                Stage("fetch:b", sleeping(0, "file"), source="b"),
+                Stage("both", sleeping(0), ("parse:a", "fetch:b")),
+            ]
+        )
+        self.assertFalse(report.ok)
+        self.assertIsInstance(report.stages["fetch:a"].error, StageFailed)
+        self.assertTrue(report.stages["parse:a"].skipped)
+        self.assertTrue(report.stages["export:a"].skipped)
+        self.assertTrue(report.stages["both"].skipped)
+        self.assertEqual(report.value("fetch:b"), "file")
+        self.assertIn("failed: no file", report.summary())
+
+    def test_invalid_graphs(self):
+        with self.assertRaises(ValueError):
+            run_stages([Stage("a", sleeping(0), ("missing",))])
+        with self.assertRaises(ValueError):
+            run_stages(
+                [Stage("a", sleeping(0), ("b",)), Stage("b", sleeping(0), ("a",))]
+            )
+        with self.assertRaises(ValueError):
+            run_stages([Stage("a", sleeping(0)), Stage("a", sleeping(0))])
+        self.assertTrue(run_stages([]).ok)
+
+
+def fake_source(name: str, seconds: float, catalog, calls=None) -> SourceSchedule:
+    def fetch(settings, session):
+        time.sleep(seconds)
+        if calls is not None:
+            calls.append(threading.current_thread().name)
+        return None if catalog is None else f"{name}.file"
+
+    return SourceSchedule(name, fetch, lambda filename: list(catalog), timedelta(0))
+
+
+class TestRefreshAll(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.space_track = [
+            USC(INTERNATIONAL_DESIGNATOR="1998-067A", NORAD_CAT_ID="25544"),
+            USC(INTERNATIONAL_DESIGNATOR="1990-037B", NORAD_CAT_ID="20580"),
+        ]
+        self.discos = [USC(INTERNATIONAL_DESIGNATOR="1998-067A", SATELLITE_NAME="ISS")]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sources_run_concurrently_and_publish(self):
+        calls = []
+        sources = [
+            fake_source("space-track", 0.3, self.space_track, calls),
+            fake_source("discos", 0.3, self.discos, calls),
+        ]
+        report = refresh_all(
+            None, sources, snapshot_dir=self.tmp.name, formats=("csv",)
+        )
+        self.assertTrue(report.ok, report.summary())
+        self.assertLess(report.wall_time, 0.55)
+        self.assertEqual(len(set(calls)), 2)
+
+        manifest = read_manifest(self.tmp.name, current_snapshot(self.tmp.name))
+        self.assertEqual(manifest["counts"], {"space-track": 2, "discos": 1})
+        self.assertEqual(report.value("publish"), current_snapshot(self.tmp.name))
+        (match,) = report.value("reconcile")
+        self.assertEqual(match.match.NORAD_CAT_ID, "25544")
+
+        paths = report.source_critical_paths()
+        self.assertEqual(
+            [r.name for r in paths["discos"]],
+            ["fetch:discos", "parse:discos", "export:discos"],
+        )
+        self.assertEqual(report.critical_path()[-1].name, "publish")
+
+    def test_failed_source_publishes_nothing(self):
+        sources = [
+            fake_source("space-track", 0, self.space_track),
+            fake_source("discos", 0, None),
+        ]
+        report = refresh_all(
+            None, sources, snapshot_dir=self.tmp.name, formats=("csv",)
+        )
+        self.assertEqual(len(report.value("parse:space-track")), 2)
+        self.assertTrue(report.stages["publish"].skipped)
+        self.assertTrue(report.stages["reconcile"].skipped)
+        self.assertEqual(list_snapshots(self.tmp.name), [])
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_mock_servers_overlap(self):
+        with MockSpaceTrackServer(
+            catalog_size=40, latency=0.3
+        ) as space_track, MockDiscosServer(catalog_size=40, latency=0.1) as discos:
+            settings = SimpleNamespace(
+                **vars(space_track.settings(self.tmp.name + os.sep, "csv")),
+                **{
+                    key: value
+                    for key, value in vars(discos.settings()).items()
+                    if key.startswith("DISCOS")
+                },
+            )
+            report = refresh_all(settings, default_sources())
+        self.assertTrue(report.ok, report.summary())
+        self.assertEqual(len(report.value("parse:space-track")), 40)
+        self.assertEqual(len(report.value("parse:discos")), 40)
+        sequential = sum(
+            report.stages[f"fetch:{name}"].duration
+            for name in ("space-track", "discos")
+        )
+        self.assertLess(report.wall_time, sequential)
+        self.assertTrue(all(r.match for r in report.value("reconcile")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from datetime import datetime, timedelta
+
+from Spade.models import USC
+from Spade.passes import GroundStation, can_be_visible, predict_passes
+from Spade.propagation import OrbitalElements
+
+"""
+This file contains tests for the pass predictor. Expected ISS passes were computed with
+Skyfield from the same element set.
+"""
+
+ISS = USC(
+    INTERNATIONAL_DESIGNATOR="1998-067A",
+    NORAD_CAT_ID="25544",
+    EPOCH=datetime(2025, 6, 9, 4, 19, 12),
+    MEAN_MOTION=15.50377579,
+    ECCENTRICITY=0.0006703,
+    INCLINATION=51.6416,
+    RA_OF_ASC_NODE=247.4627,
+    ARG_OF_PERIGEE=130.5360,
+    MEAN_ANOMALY=325.0288,
+    B_STAR=0.00030270,
+)
+
+GEO = USC(
+    INTERNATIONAL_DESIGNATOR="2005-008A",
+    NORAD_CAT_ID="28626",
+    EPOCH=datetime(2025, 6, 9),
+    MEAN_MOTION=1.00270176,
+    ECCENTRICITY=0.0000335,
+    INCLINATION=0.0019,
+    RA_OF_ASC_NODE=286.9433,
+    ARG_OF_PERIGEE=13.7918,
+    MEAN_ANOMALY=55.6504,
+    B_STAR=0.0,
+)
+
+BOSTON = GroundStation("Boston", 42.36, -71.06, 0.0, 10.0)
+
+
+class TestPredictPasses(unittest.TestCase):
+
+    def assertTimeClose(self, first: datetime, second: datetime):
+        self.assertLess(abs(first - second), timedelta(seconds=2))
+
+    def test_matches_reference_passes(self):
+        passes = predict_passes(
+            [ISS], [BOSTON], datetime(2025, 6, 9, 6), timedelta(hours=5)
+        )
+        expected = [
+            (
+                datetime(2025, 6, 9, 7, 12, 35, 588218),
+                datetime(2025, 6, 9, 7, 15, 55, 141189),
+                datetime(2025, 6, 9, 7, 19, 15, 266999),
+                70.756,
+            ),
+            (
+                datetime(2025, 6, 9, 8, 50, 30, 717727),
+                datetime(2025, 6, 9, 8, 53, 5, 179170),
+                datetime(2025, 6, 9, 8, 55, 39, 798489),
+                20.204,
+            ),
+            (
+                datetime(2025, 6, 9, 10, 28, 22, 685314),
+                datetime(2025, 6, 9, 10, 30, 41, 847826),
+                datetime(2025, 6, 9, 10, 33, 0, 967007),
+                17.287,
+            ),
+        ]
+        self.assertEqual(len(passes), len(expected))
+        for found, (aos, tca, los, max_elevation) in zip(passes, expected):
+            self.assertEqual(found.station, "Boston")
+            self.assertEqual(found.norad_cat_id, "25544")
+            self.assertTimeClose(found.aos, aos)
+            self.assertTimeClose(found.tca, tca)
+            self.assertTimeClose(found.los, los)
+            self.assertAlmostEqual(found.max_elevation, max_elevation, places=1)
+
+    def test_geostationary_object_is_always_up(self):
+        station = GroundStation("Pontianak", -0.03, 109.34)
+        passes = predict_passes(
+            [GEO, ISS], [station], datetime(2025, 6, 9), timedelta(hours=2)
+        )
+        geo = [found for found in passes if found.norad_cat_id == "28626"]
+        self.assertEqual(len(geo), 1)
+        self.assertTrue(geo[0].aos_clipped)
+        self.assertTrue(geo[0].los_clipped)
+        self.assertEqual(geo[0].index, 0)
+
+
+class TestCanBeVisible(unittest.TestCase):
+
+    def test_prunes_by_latitude(self):
+        elements = OrbitalElements.from_catalog([ISS, GEO])
+        svalbard = GroundStation("Svalbard", 78.23, 15.39)
+        oslo = GroundStation("Oslo", 59.91, 10.75)
+        self.assertEqual(list(can_be_visible(elements, BOSTON)), [True, True])
+        self.assertEqual(list(can_be_visible(elements, oslo)), [True, True])
+        self.assertEqual(list(can_be_visible(elements, svalbard)), [False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
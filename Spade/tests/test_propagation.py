@@ -0,0 +1,144 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+
+from Spade.models import USC
+from Spade.propagation import (
+    ERROR_NONE,
+    OrbitalElements,
+    iter_propagate,
+    propagate,
+)
+
+"""
+This file contains tests for the vectorized SGP4 propagator. Expected states come from
+Vallado's reference implementation for the published verification element sets.
+"""
+
+# 00005 from SGP4-VER.TLE, a near earth object
+VANGUARD = USC(
+    INTERNATIONAL_DESIGNATOR="1958-002B",
+    NORAD_CAT_ID="5",
+    EPOCH=datetime(2000, 6, 27) + timedelta(microseconds=67819733568),
+    MEAN_MOTION=10.82419157,
+    ECCENTRICITY=0.1859667,
+    INCLINATION=34.2682,
+    RA_OF_ASC_NODE=348.7242,
+    ARG_OF_PERIGEE=331.7664,
+    MEAN_ANOMALY=19.3264,
+    B_STAR=0.000028098,
+)
+
+# 28626 from SGP4-VER.TLE, a geosynchronous deep space object
+XM_RADIO = USC(
+    INTERNATIONAL_DESIGNATOR="2005-008A",
+    NORAD_CAT_ID="28626",
+    EPOCH=datetime(2006, 6, 25) + timedelta(microseconds=40334455008),
+    MEAN_MOTION=1.00270176,
+    ECCENTRICITY=0.0000335,
+    INCLINATION=0.0019,
+    RA_OF_ASC_NODE=286.9433,
+    ARG_OF_PERIGEE=13.7918,
+    MEAN_ANOMALY=55.6504,
+    B_STAR=0.0001,
+)
+
+MINUTES = [0, 360, 720]
+
+
+def at_minutes(usc: USC):
+    return [usc.EPOCH + timedelta(minutes=m) for m in MINUTES]
+
+
+class TestPropagate(unittest.TestCase):
+
+    def test_near_earth_matches_reference(self):
+        ephemeris = propagate([VANGUARD], at_minutes(VANGUARD))
+        expected_position = [
+            [7022.46529266, -1400.08296755, 0.03995155],
+            [-7154.03120202, -3783.17682504, -3536.19412294],
+            [-7134.59340119, 6531.68641334, 3260.27186483],
+        ]
+        expected_velocity = [
+            [1.89384101, 6.40589376, 4.53480725],
+            [4.74188741, -4.15181777, -2.09393542],
+            [-4.11379303, -2.91192204, -2.55732785],
+        ]
+        np.testing.assert_allclose(ephemeris.position[0], expected_position, atol=1e-6)
+        np.testing.assert_allclose(ephemeris.velocity[0], expected_velocity, atol=1e-8)
+        self.assertTrue((ephemeris.error == ERROR_NONE).all())
+
+    def test_deep_space_matches_reference(self):
+        ephemeris = propagate([XM_RADIO], at_minutes(XM_RADIO))
+        expected_position = [
+            [42080.71852213, -2646.86387436, 0.81851294],
+            [2467.44290178, 42093.60909959, 5.15062987],
+            [-42103.20138132, 2291.06228893, -0.13274964],
+        ]
+        np.testing.assert_allclose(ephemeris.position[0], expected_position, atol=1e-6)
+        self.assertTrue((ephemeris.error == ERROR_NONE).all())
+
+    def test_mixed_catalog_matches_single_objects(self):
+        times = at_minutes(VANGUARD)
+        together = propagate([XM_RADIO, VANGUARD, XM_RADIO], times)
+        for row, usc in enumerate([XM_RADIO, VANGUARD, XM_RADIO]):
+            alone = propagate([usc], times)
+            np.testing.assert_allclose(together.position[row], alone.position[0])
+            np.testing.assert_allclose(together.velocity[row], alone.velocity[0])
+
+    def test_skips_incomplete_objects(self):
+        incomplete = USC(
+            INTERNATIONAL_DESIGNATOR="1999-999A",
+            NORAD_CAT_ID="99999",
+            EPOCH=VANGUARD.EPOCH,
+        )
+        ephemeris = propagate([incomplete, VANGUARD], VANGUARD.EPOCH)
+        self.assertEqual(ephemeris.position.shape, (1, 1, 3))
+        self.assertEqual(list(ephemeris.elements.index), [1])
+        self.assertEqual(list(ephemeris.elements.norad_cat_id), ["5"])
+
+
+class TestIterPropagate(unittest.TestCase):
+
+    def setUp(self):
+        self.elements = OrbitalElements.from_catalog([VANGUARD, XM_RADIO] * 5)
+        self.times = np.datetime64("2006-06-26T00:00") + np.arange(0, 600, 60).astype(
+            "timedelta64[m]"
+        )
+
+    def test_chunks_cover_catalog(self):
+        parts = list(iter_propagate(self.elements, self.times, chunk_size=3))
+        self.assertEqual([len(part.elements) for part in parts], [3, 3, 3, 1])
+        whole = propagate(self.elements, self.times)
+        np.testing.assert_array_equal(
+            np.concatenate([part.position for part in parts]), whole.position
+        )
+
+    def test_processes_submit_one_chunk_per_worker_ahead(self):
+        submitted = []
+
+        class Pool(ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                submitted.append(args[0])
+                return super().submit(fn, *args)
+
+        with mock.patch("Spade.propagation.ProcessPoolExecutor", Pool):
+            parts = iter_propagate(self.elements, self.times, chunk_size=1, processes=2)
+            ahead = []
+            for part in parts:
+                ahead.append(len(submitted) - len(ahead) - 1)
+        self.assertEqual(len(submitted), 10)
+        self.assertLessEqual(max(ahead), 2)
+
+    def test_processes_match_in_process(self):
+        pooled = propagate(self.elements, self.times, chunk_size=4, processes=2)
+        serial = propagate(self.elements, self.times, chunk_size=4)
+        np.testing.assert_array_equal(pooled.position, serial.position)
+        np.testing.assert_array_equal(pooled.error, serial.error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,234 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from Spade.data_fetcher import isCacheAvaliable
+from Spade.importers import (
+    iterSpaceTrackCSV,
+    iterSpaceTrackJSON,
+    jsonToUSC,
+    replayQuarantine,
+    spaceTrackXML,
+)
+from Spade.quarantine import (
+    ErrorRateExceeded,
+    NotReplayable,
+    Quarantine,
+    iter_quarantine,
+)
+from Spade.testing.generators import write_omm_csv, write_omm_json, write_omm_xml
+
+"""
+This file contains tests for the import quarantine.
+"""
+
+
+class TestQuarantine(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "quarantine.ndjson")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_buffers_counts_and_writes(self):
+        with Quarantine(self.path, buffer_size=2) as quarantine:
+            quarantine.add({"EPOCH": "x"}, ValueError("bad epoch"), 3, "a.XML")
+            quarantine.add({"EPOCH": "y"}, ValueError("bad epoch"), 7, "a.XML")
+            self.assertEqual(quarantine.records, [])
+            quarantine.add(["1", "2"], KeyError("NORAD_CAT_ID"), 9, "b.csv")
+            self.assertEqual(len(quarantine.records), 1)
+        self.assertEqual(quarantine.counts, {"ValueError": 2, "KeyError": 1})
+        self.assertEqual(
+            quarantine.summary(), "Quarantined 3 records: ValueError 2, KeyError 1"
+        )
+
+        records = list(iter_quarantine(self.path))
+        self.assertEqual([r.offset for r in records], [3, 7, 9])
+        self.assertEqual(records[0].raw, {"EPOCH": "x"})
+        self.assertEqual(records[2].source, "b.csv")
+        self.assertEqual(records[2].error_type, "KeyError")
+
+    def test_error_rate(self):
+        quarantine = Quarantine(max_error_rate=0.1, min_records=10)
+        # a bad first record does not abort before min_records were seen
+        for offset in (0, 19, 39, 40):
+            quarantine.add({}, ValueError(), offset, "a")
+        # the rate is per source
+        quarantine.add({}, ValueError(), 20, "b")
+        with self.assertRaises(ErrorRateExceeded) as caught:
+            quarantine.add({}, ValueError(), 41, "a")
+        self.assertEqual((caught.exception.failed, caught.exception.seen), (5, 42))
+
+
+class TestImporters(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        path = cls.tmp.name
+        cls.xml = write_omm_xml(os.path.join(path, "gp.XML"), 100, 2, 5)
+        cls.expected = spaceTrackXML(cls.xml)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def broken_xml(self, count: int = -1) -> str:
+        """
+        Copy of the XML with an invalid BSTAR in the first `count` segments, all with -1.
+        """
+        path = os.path.join(self.tmp.name, "bad.XML")
+        with open(self.xml) as f:
+            text = f.read()
+        with open(path, "w") as f:
+            f.write(text.replace("<BSTAR>", "<BSTAR>x", count))
+        return path
+
+    def check(self, parse, path: str, quarantined_norad_ids):
+        quarantine = Quarantine()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            catalog = list(parse(path, quarantine))
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(
+            len(catalog) + quarantine.failed, len(self.expected), quarantine.summary()
+        )
+        self.assertEqual(
+            [r.raw["NORAD_CAT_ID"] for r in quarantine.records],
+            quarantined_norad_ids,
+        )
+        self.assertEqual(set(quarantine.counts), {"ValueError"})
+        return quarantine
+
+    def test_xml(self):
+        quarantine = self.check(
+            lambda p, q: spaceTrackXML(p, quarantine=q),
+            self.broken_xml(3),
+            [usc.NORAD_CAT_ID for usc in self.expected[:3]],
+        )
+        self.assertEqual([r.offset for r in quarantine.records], [0, 1, 2])
+        self.assertTrue(quarantine.records[0].raw["B_STAR"].startswith("x"))
+
+    def test_csv_and_json(self):
+        path = write_omm_csv(os.path.join(self.tmp.name, "bad.csv"), 100, 2, 5)
+        with open(path, newline="") as f:
+            header, *rows = csv.reader(f)
+        for i in (0, 3):
+            rows[i][header.index("EPOCH")] = "yesterday"
+        with open(path, "w", newline="") as f:
+            csv.writer(f).writerows([header, *rows])
+        quarantine = self.check(
+            iterSpaceTrackCSV,
+            path,
+            [self.expected[0].NORAD_CAT_ID, self.expected[3].NORAD_CAT_ID],
+        )
+        self.assertEqual([r.offset for r in quarantine.records], [0, 3])
+        self.assertEqual(quarantine.records[0].raw["EPOCH"], "yesterday")
+
+        path = write_omm_json(os.path.join(self.tmp.name, "bad.json"), 100, 2, 5)
+        with open(path) as f:
+            data = json.load(f)
+        data[10]["MEAN_MOTION"] = "fast"
+        with open(path, "w") as f:
+            json.dump(data, f)
+        self.check(iterSpaceTrackJSON, path, [self.expected[10].NORAD_CAT_ID])
+
+    def test_error_rate_aborts_early(self):
+        quarantine = Quarantine(max_error_rate=0.5, min_records=20)
+        with self.assertRaises(ErrorRateExceeded) as caught:
+            spaceTrackXML(self.broken_xml(), quarantine=quarantine)
+        self.assertEqual(caught.exception.seen, 20)
+        self.assertEqual(quarantine.failed, 20)
+
+    def test_replay(self):
+        path = self.broken_xml(4)
+        quarantined = os.path.join(self.tmp.name, "replay.ndjson")
+        with Quarantine(quarantined) as quarantine:
+            catalog = spaceTrackXML(path, quarantine=quarantine)
+        self.assertEqual(len(catalog), len(self.expected) - 4)
+
+        # fix the bad batch and import just that, without the XML
+        fixed = os.path.join(self.tmp.name, "fixed.ndjson")
+        with open(quarantined) as f, open(fixed, "w") as out:
+            for line in f:
+                record = json.loads(line)
+                record["raw"]["B_STAR"] = record["raw"]["B_STAR"].lstrip("x")
+                out.write(json.dumps(record) + "\n")
+        self.assertEqual(list(replayQuarantine(fixed)), self.expected[:4])
+
+        again = Quarantine()
+        self.assertEqual(list(replayQuarantine(quarantined, again)), [])
+        self.assertEqual([r.source for r in again.records], [path] * 4)
+
+    def test_replay_csv_rows_with_wrong_column_count(self):
+        path = write_omm_csv(os.path.join(self.tmp.name, "extra.csv"), 100, 2, 5)
+        with open(path, newline="") as f:
+            header, *rows = csv.reader(f)
+        rows[1].append("extra")
+        with open(path, "w", newline="") as f:
+            csv.writer(f).writerows([header, *rows])
+        quarantined = os.path.join(self.tmp.name, "extra.ndjson")
+        with Quarantine(quarantined) as quarantine:
+            catalog = list(iterSpaceTrackCSV(path, quarantine))
+        self.assertEqual(len(catalog), len(self.expected) - 1)
+        self.assertEqual(list(replayQuarantine(quarantined)), [self.expected[1]])
+
+        with Quarantine(quarantined) as quarantine:
+            quarantine.add("FULL_CATLOG_today.csv", ValueError("no date"), 0, "dir")
+        again = Quarantine()
+        self.assertEqual(list(replayQuarantine(quarantined, again)), [self.expected[1]])
+        self.assertEqual(again.counts, {NotReplayable.__name__: 1})
+
+    def test_default_reports_once(self):
+        path = os.path.join(self.tmp.name, "discos.json")
+        data = [
+            {"attributes": {"cosparId": "1998-067A", "launch": "soon"}},
+            {"attributes": {"cosparId": "1998-067B", "launch": "soon"}},
+            {"attributes": {"cosparId": "1998-067C", "launch": "1998-11-20"}},
+        ]
+        with open(path, "w") as f:
+            json.dump(data, f)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            catalog = jsonToUSC(
+                path, {"INTERNATIONAL_DESIGNATOR": "cosparId", "LAUNCH_DATE": "launch"}
+            )
+        self.assertEqual(len(catalog), 1)
+        self.assertEqual(
+            output.getvalue(),
+            f"{path}: skipped 2 records that could not be read (ValueError 2)\n",
+        )
+
+
+class TestCacheFilenames(unittest.TestCase):
+
+    def test_unparseable_filenames(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            settings = SimpleNamespace(
+                DOWNLOADED_DATA_PATH=tmp, DATE_FORMAT="%Y-%m-%d_%H-%M-%S"
+            )
+            fresh = "FULL_CATLOG_" + datetime.now().strftime(settings.DATE_FORMAT)
+            for name in (fresh + ".csv", "FULL_CATLOG_today.csv", "FULL_CATLOG_.XML"):
+                open(os.path.join(tmp, name), "w").close()
+
+            quarantine = Quarantine()
+            result = isCacheAvaliable(
+                "FULL_CATLOG_", timedelta(hours=1), settings, quarantine
+            )
+        self.assertEqual(result, os.path.join(tmp, fresh + ".csv"))
+        self.assertEqual(
+            sorted(r.raw for r in quarantine.records),
+            ["FULL_CATLOG_.XML", "FULL_CATLOG_today.csv"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from datetime import datetime
+
+from Spade.models import USC
+from Spade.query import Between, CatalogIndex, Equals, OneOf
+from Spade.testing.generators import synthetic_uscs
+
+"""
+This file contains tests for the indexed query engine.
+"""
+
+
+class TestCatalogIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.catalog = synthetic_uscs(2000, seed=4)
+        cls.index = CatalogIndex(cls.catalog)
+
+    def brute_force(self, *predicates):
+        return [
+            usc
+            for usc in self.catalog
+            if all(predicate.matches(usc) for predicate in predicates)
+        ]
+
+    def test_lookup(self):
+        usc = self.catalog[123]
+        self.assertEqual(self.index.lookup("NORAD_CAT_ID", usc.NORAD_CAT_ID), [usc])
+        self.assertEqual(self.index.lookup("NORAD_CAT_ID", "not an id"), [])
+
+    def test_matches_full_scan(self):
+        queries = [
+            (
+                Equals("OBJECT_TYPE", "PAYLOAD"),
+                Equals("COUNTRY_CODE", "US"),
+                Between("INCLINATION", 97.0, 99.0),
+                Between("PERIAPSIS", None, 2000.0),
+            ),
+            (OneOf("COUNTRY_CODE", ["UK", "PRC"]), Between("PERIOD", 90.0, 100.0)),
+            (Between("EPOCH", datetime(2025, 6, 5), None),),
+            (Equals("RCS_SIZE", "LARGE"), Equals("SITE", "AFETR")),
+        ]
+        for predicates in queries:
+            with self.subTest(predicates=predicates):
+                expected = self.brute_force(*predicates)
+                self.assertEqual(self.index.query(*predicates), expected)
+                self.assertTrue(expected)
+
+    def test_objects_without_value_never_match(self):
+        catalog = [
+            USC(INTERNATIONAL_DESIGNATOR="1", INCLINATION=None),
+            USC(INTERNATIONAL_DESIGNATOR="2", INCLINATION=98.0),
+        ]
+        index = CatalogIndex(catalog)
+        self.assertEqual(index.query(Between("INCLINATION", None, None)), [catalog[1]])
+
+    def test_none_matches_like_a_scan(self):
+        catalog = [
+            USC(INTERNATIONAL_DESIGNATOR="1", COUNTRY_CODE=None, INCLINATION=98.0),
+            USC(INTERNATIONAL_DESIGNATOR="2", COUNTRY_CODE="US", INCLINATION=98.0),
+            USC(INTERNATIONAL_DESIGNATOR="3", COUNTRY_CODE="UK", INCLINATION=None),
+        ]
+        indexed = CatalogIndex(catalog)
+        scanned = CatalogIndex(catalog, hash_fields=(), range_fields=())
+        queries = [
+            (Equals("COUNTRY_CODE", None),),
+            (OneOf("COUNTRY_CODE", ["UK", None]),),
+            # the country is checked on the candidates of the inclination index
+            (Between("INCLINATION", 90.0, None), Equals("COUNTRY_CODE", None)),
+        ]
+        for predicates in queries:
+            with self.subTest(predicates=predicates):
+                expected = scanned.query(*predicates)
+                self.assertTrue(expected)
+                self.assertEqual(indexed.query(*predicates), expected)
+        self.assertEqual(indexed.lookup("COUNTRY_CODE", None), [catalog[0]])
+        self.assertEqual(sorted(indexed.values("COUNTRY_CODE")), ["UK", "US"])
+
+    def test_no_predicates_returns_everything(self):
+        self.assertEqual(len(self.index.query()), len(self.catalog))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from requests import Session
+
+from Spade.data_fetcher import fetch_full_catlog_ST
+from Spade.models import USC
+from Spade.scheduler import RETRY_DELAY, RefreshScheduler, SourceSchedule
+from Spade.snapshots import current_snapshot, list_snapshots, read_manifest
+from Spade.testing.mock_servers import MockSpaceTrackServer
+
+"""
+This file contains tests for the background refresh scheduler.
+"""
+
+START = datetime(2025, 6, 9, 12)
+
+
+class FakeSource:
+    """
+    A source whose downloads are set by the test.
+    """
+
+    def __init__(self):
+        self.downloads = 0
+        self.filename = "file-1"
+        self.catalog = [USC(INTERNATIONAL_DESIGNATOR="1", NORAD_CAT_ID="1")]
+        self.sessions = []
+
+    def fetch(self, settings, session):
+        self.downloads += 1
+        self.sessions.append(session)
+        return self.filename
+
+    def parse(self, filename):
+        return list(self.catalog)
+
+
+class TestRefreshScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = FakeSource()
+        self.schedule = SourceSchedule(
+            name="fake",
+            fetch=self.source.fetch,
+            parse=self.source.parse,
+            cache_ttl=timedelta(hours=2),
+            interval=timedelta(minutes=10),
+            jitter=timedelta(minutes=5),
+        )
+        self.scheduler = RefreshScheduler(
+            None, self.tmp.name, [self.schedule], formats=("csv",), seed=1
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_interval_respects_cache_ttl(self):
+        self.assertEqual(self.schedule.interval, timedelta(hours=2))
+
+    def test_publishes_only_changes(self):
+        self.assertEqual(self.scheduler.run_pending(START), ["fake"])
+        first = current_snapshot(self.tmp.name)
+        next_run = self.scheduler.state["fake"].next_run
+        self.assertGreaterEqual(next_run, START + timedelta(hours=2))
+        self.assertLessEqual(next_run, START + timedelta(hours=2, minutes=5, seconds=1))
+
+        # not due yet
+        self.assertEqual(self.scheduler.run_pending(START + timedelta(hours=1)), [])
+        self.assertEqual(self.source.downloads, 1)
+
+        # cache hit, same file
+        later = START + timedelta(hours=3)
+        self.assertEqual(self.scheduler.run_pending(later), [])
+        # new file with the same content
+        self.source.filename = "file-2"
+        self.assertEqual(self.scheduler.run_pending(later + timedelta(hours=3)), [])
+        self.assertEqual(current_snapshot(self.tmp.name), first)
+
+        self.source.filename = "file-3"
+        self.source.catalog.append(USC(INTERNATIONAL_DESIGNATOR="2", NORAD_CAT_ID="2"))
+        self.assertEqual(
+            self.scheduler.run_pending(later + timedelta(hours=6)), ["fake"]
+        )
+        self.assertNotEqual(current_snapshot(self.tmp.name), first)
+        manifest = read_manifest(self.tmp.name, current_snapshot(self.tmp.name))
+        self.assertEqual(manifest["counts"], {"fake": 2})
+
+        self.assertEqual(self.source.downloads, 4)
+        self.assertEqual(len({id(session) for session in self.source.sessions}), 1)
+
+    def test_failures_are_retried(self):
+        self.source.filename = None
+        self.assertEqual(self.scheduler.run_pending(START), [])
+        next_run = self.scheduler.state["fake"].next_run
+        self.assertLess(next_run, START + RETRY_DELAY + timedelta(minutes=6))
+        self.assertEqual(list_snapshots(self.tmp.name), [])
+
+        def broken(filename):
+            raise ValueError("broken file")
+
+        self.source.filename = "file-1"
+        self.schedule.parse = broken
+        self.assertEqual(self.scheduler.run_pending(next_run), [])
+        self.assertIsNotNone(self.scheduler.state["fake"].next_run)
+
+    def test_failed_diff_is_retried(self):
+        self.scheduler.run_pending(START)
+        self.source.filename = "file-2"
+        self.source.catalog.append(USC(INTERNATIONAL_DESIGNATOR="2", NORAD_CAT_ID="2"))
+        later = START + timedelta(hours=3)
+        with mock.patch(
+            "Spade.scheduler.diff_snapshots", side_effect=RuntimeError("diff failed")
+        ):
+            self.assertEqual(self.scheduler.run_pending(later), [])
+        state = self.scheduler.state["fake"]
+        self.assertEqual(state.last_file, "file-1")
+        self.assertLess(state.next_run, later + RETRY_DELAY + timedelta(minutes=6))
+
+        # the same file again is parsed and published, not taken as a cache hit
+        self.assertEqual(self.scheduler.run_pending(state.next_run), ["fake"])
+        self.assertEqual(state.last_file, "file-2")
+        self.assertEqual(len(state.catalog), 2)
+
+    def test_seconds_until_next_run(self):
+        self.assertEqual(self.scheduler.seconds_until_next_run(START), 0.0)
+        self.scheduler.run_pending(START)
+        self.assertGreaterEqual(self.scheduler.seconds_until_next_run(START), 7200)
+
+
+class TestWarmSpaceTrackSession(unittest.TestCase):
+
+    def test_session_logs_in_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with MockSpaceTrackServer(catalog_size=5) as server:
+                settings = server.settings(tmp + os.sep)
+                session = Session()
+                self.assertIsNotNone(fetch_full_catlog_ST(settings, session))
+                self.assertEqual(server.stats.requests, 2)
+                for filename in os.listdir(tmp):
+                    os.remove(os.path.join(tmp, filename))
+                self.assertIsNotNone(fetch_full_catlog_ST(settings, session))
+                self.assertEqual(server.stats.requests, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
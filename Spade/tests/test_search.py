@@ -0,0 +1,202 @@
+import unittest
+from dataclasses import replace
+
+from Spade.diff import diff_snapshots
+from Spade.models import USC
+from Spade.search import TrigramIndex, reconcile, trigrams
+from Spade.testing.generators import synthetic_uscs
+
+"""
+This file contains tests for the trigram search index and reconciliation.
+"""
+
+
+def named(norad_id: str, name: str, mission=None, designator="") -> USC:
+    return USC(
+        INTERNATIONAL_DESIGNATOR=designator,
+        NORAD_CAT_ID=norad_id,
+        SATELLITE_NAME=name,
+        MISSION_DESC=mission,
+    )
+
+
+class TestTrigrams(unittest.TestCase):
+
+    def test_case_and_punctuation_insensitive(self):
+        self.assertEqual(trigrams("Starlink-30"), trigrams("STARLINK 30"))
+        self.assertEqual(trigrams(None), set())
+        self.assertIn("  S", trigrams("sl-16"))
+        self.assertIn("16 ", trigrams("sl-16"))
+
+    def test_prefix_leaves_the_last_word_open(self):
+        self.assertNotIn(" 3 ", trigrams("STARLINK-3", prefix=True))
+        self.assertTrue(trigrams("STARLINK-3", True) <= trigrams("STARLINK-3021"))
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = [
+            named("1", "STARLINK-3021"),
+            named("2", "STARLINK-3"),
+            named("3", "STARLINK-1130"),
+            named("4", "COSMOS 2251 DEB"),
+            named("5", "COSMOS 2251", "Defense Technology"),
+            named("6", "NOAA 19", "Meteorology"),
+            named("7", "FENGYUN 1C DEB"),
+        ]
+        self.index = TrigramIndex(self.catalog)
+
+    def names(self, results):
+        return [result.usc.SATELLITE_NAME for result in results]
+
+    def test_partial_names_rank_shortest_first(self):
+        results = self.index.search("starlink-3")
+        self.assertEqual(self.names(results)[:2], ["STARLINK-3", "STARLINK-3021"])
+        self.assertEqual(results[0].score, 1.0)
+        self.assertGreater(results[0].similarity, results[1].similarity)
+
+        results = self.index.search("COSMOS 2251")
+        self.assertEqual(self.names(results), ["COSMOS 2251", "COSMOS 2251 DEB"])
+
+    def test_fuzzy_and_mission_search(self):
+        self.assertEqual(
+            self.names(self.index.search("STRALINK 3021"))[0], "STARLINK-3021"
+        )
+        results = self.index.search("meteo")
+        self.assertEqual(self.names(results), ["NOAA 19"])
+        self.assertEqual(results[0].field, "MISSION_DESC")
+        self.assertEqual(self.index.search("meteo", fields=["SATELLITE_NAME"]), [])
+        self.assertEqual(self.index.search("zzzz"), [])
+
+    def test_limit_and_min_score(self):
+        self.assertEqual(len(self.index.search("STARLINK", limit=2)), 2)
+        self.assertEqual(self.index.search("STARLINK", limit=0), [])
+        for result in self.index.search("STARLINK 99", min_score=0.9):
+            self.assertGreaterEqual(result.score, 0.9)
+
+    def test_incremental_updates(self):
+        self.index.remove(self.catalog[1])
+        self.assertNotIn("STARLINK-3", self.names(self.index.search("starlink-3")))
+
+        self.index.add(named("1", "ONEWEB-0012"))
+        self.assertEqual(len(self.index), 6)
+        self.assertNotIn("STARLINK-3021", self.names(self.index.search("starlink")))
+        self.assertEqual(self.names(self.index.search("oneweb")), ["ONEWEB-0012"])
+
+    def test_apply_diff(self):
+        new = [replace(usc) for usc in self.catalog[1:]]
+        new[0].SATELLITE_NAME = "STARLINK-3 RENAMED"
+        new[3].MISSION_DESC = "Earth Observation"
+        new[4].INCLINATION = 99.1
+        new.append(named("8", "IRIDIUM 33 DEB"))
+
+        self.index.apply_diff(diff_snapshots(self.catalog, new))
+        incremental = TrigramIndex(new)
+        for text in ("starlink-3", "earth observation", "noaa", "iridium", "cosmos"):
+            with self.subTest(text=text):
+                self.assertEqual(self.index.search(text), incremental.search(text))
+        # unindexed fields only swap the object
+        self.assertEqual(self.index.search("NOAA 19")[0].usc.INCLINATION, 99.1)
+
+    def test_objects_without_ids(self):
+        debris = [named("", "UNKNOWN DEB"), named("", "UNKNOWN DEB")]
+        discos = [
+            replace(named("", "UNKNOWN DEB"), DISCOS_ID=str(number))
+            for number in (1, 2)
+        ]
+        index = TrigramIndex(self.catalog + debris + discos)
+        self.assertEqual(len(index), len(self.catalog) + 4)
+        self.assertEqual(len(index.search("unknown deb")), 4)
+        self.assertIs(index.get("DISCOS:2"), discos[1])
+
+        self.assertTrue(index.remove(debris[1]))
+        self.assertFalse(index.remove(debris[1]))
+        self.assertEqual(len(index.search("unknown deb")), 3)
+
+        new = self.catalog + [named("", "UNKNOWN DEB")] + discos
+        index.apply_diff(diff_snapshots(self.catalog + debris + discos, new))
+        self.assertEqual(len(index), len(new))
+        self.assertEqual(
+            sorted(str(r.usc.DISCOS_ID) for r in index.search("unknown deb")),
+            ["1", "2", "None"],
+        )
+
+    def test_matches_scan_of_synthetic_catalog(self):
+        catalog = synthetic_uscs(3000, seed=8)
+        index = TrigramIndex(catalog)
+        for text in ("COSMOS 2", "FALCON 9", "ONEWEB-1"):
+            with self.subTest(text=text):
+                query = trigrams(text, prefix=True)
+                expected = [
+                    usc
+                    for usc in catalog
+                    if query <= trigrams(usc.SATELLITE_NAME)
+                    or query <= trigrams(usc.MISSION_DESC)
+                ]
+                found = [
+                    result.usc
+                    for result in index.search(text, limit=len(catalog), min_score=1.0)
+                ]
+                self.assertCountEqual(found, expected)
+                self.assertTrue(expected)
+
+    def test_compacts_after_many_removals(self):
+        catalog = synthetic_uscs(200, seed=8)
+        index = TrigramIndex(catalog)
+        for usc in catalog[:150]:
+            index.remove(usc)
+        index.search("COSMOS")
+        self.assertEqual(len(index._objects), 50)
+        self.assertEqual(len(index), 50)
+
+
+class TestReconcile(unittest.TestCase):
+
+    def test_ids_first_then_names(self):
+        catalog = [
+            named("25544", "ISS (ZARYA)", designator="1998-067A"),
+            named("43013", "NOAA 20", designator="2017-073A"),
+            named("44713", "STARLINK-1007", designator="2019-074A"),
+            named("44714", "STARLINK-1008", designator="2019-074B"),
+            named("90001", "TBA - TO BE ASSIGNED", designator="2025-999A"),
+            named("90002", "TBA - TO BE ASSIGNED", designator="2025-999B"),
+        ]
+        records = [
+            named(None, "ISS", designator="1998-067a"),
+            named("44713", "renamed"),
+            named(None, "Starlink 1008"),
+            named(None, "NOAA-20"),
+            named(None, "TBA TO BE ASSIGNED"),
+            named(None, "SOMETHING ELSE"),
+            named(None, "NOT IN CATALOG", designator="2000-001A"),
+        ]
+        results = reconcile(records, catalog)
+        self.assertEqual(
+            [(r.match and r.match.NORAD_CAT_ID, r.method) for r in results],
+            [
+                ("25544", "INTERNATIONAL_DESIGNATOR"),
+                ("44713", "NORAD_CAT_ID"),
+                ("44714", "SATELLITE_NAME"),
+                ("43013", "SATELLITE_NAME"),
+                (None, None),  # two candidates with the same name
+                (None, None),
+                (None, None),  # has a COSPAR id, never matched by name
+            ],
+        )
+        self.assertEqual(results[0].similarity, 1.0)
+        self.assertGreaterEqual(results[2].similarity, 0.8)
+
+    def test_names_do_not_claim_objects_matched_by_id(self):
+        catalog = [named("1", "DELTA 1 R/B", designator="1960-001B")]
+        records = [
+            named(None, "DELTA 1 R/B", designator="1960-001B"),
+            named(None, "DELTA 1 R/B"),
+        ]
+        results = reconcile(records, catalog)
+        self.assertEqual(results[0].method, "INTERNATIONAL_DESIGNATOR")
+        self.assertIsNone(results[1].match)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,268 @@
+import asyncio
+import gzip
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import requests
+
+from Spade.server import HTTPError, SnapshotServer, gzip_quality, parse_range
+from Spade.snapshots import publish_snapshot
+from Spade.testing.generators import synthetic_uscs
+
+"""
+This file contains tests for the snapshot download server.
+"""
+
+
+class TestParseRange(unittest.TestCase):
+
+    def test_ranges(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=990-2000", 1000), (990, 999))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 1000))
+        self.assertIsNone(parse_range("items=0-1", 1000))
+        self.assertIsNone(parse_range("bytes=5-1", 1000))
+        with self.assertRaises(HTTPError):
+            parse_range("bytes=1000-", 1000)
+
+
+class TestGzipQuality(unittest.TestCase):
+
+    def test_q_values(self):
+        self.assertEqual(gzip_quality("gzip, deflate"), 1.0)
+        self.assertEqual(gzip_quality("gzip;q=0"), 0.0)
+        self.assertEqual(gzip_quality("deflate, GZIP ; q=0.3"), 0.3)
+        self.assertEqual(gzip_quality("*;q=0.2, identity"), 0.2)
+        self.assertEqual(gzip_quality("gzip;q=0, *"), 0.0)
+        self.assertEqual(gzip_quality("identity"), 0.0)
+        self.assertEqual(gzip_quality("gzip;q=x"), 0.0)
+
+
+class TestSnapshotServer(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.catalog = synthetic_uscs(300, seed=6)
+        cls.snapshot_id = publish_snapshot(
+            cls.tmp.name,
+            {"space-track": cls.catalog},
+            formats=("csv", "csv.gz", "ndjson.gz"),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    async def asyncSetUp(self):
+        self.server = await SnapshotServer(self.tmp.name, port=0).start()
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def get(self, path: str, **headers) -> requests.Response:
+        return await asyncio.to_thread(
+            requests.get, self.server.url + path, headers=headers
+        )
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp.name, self.snapshot_id, name)
+
+    async def test_manifest(self):
+        res = await self.get("/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["id"], self.snapshot_id)
+
+    async def test_download(self):
+        res = await self.get("/download/space-track.csv", **{"Accept-Encoding": "x"})
+        self.assertEqual(res.status_code, 200)
+        with open(self.path("space-track.csv"), "rb") as f:
+            self.assertEqual(res.content, f.read())
+        self.assertEqual(res.headers["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn(self.snapshot_id, res.headers["ETag"])
+
+        # requests sends Accept-Encoding: gzip and decodes the pre-compressed file
+        res = await self.get("/download/space-track.csv")
+        self.assertEqual(res.headers["Content-Encoding"], "gzip")
+        with open(self.path("space-track.csv"), "rb") as f:
+            self.assertEqual(res.content, f.read())
+
+        res = await self.get(f"/snapshots/{self.snapshot_id}/space-track.ndjson.gz")
+        self.assertIn("immutable", res.headers["Cache-Control"])
+        self.assertEqual(len(gzip.decompress(res.content).splitlines()), 300)
+
+    async def test_accept_encoding_q_values(self):
+        res = await self.get(
+            "/download/space-track.csv", **{"Accept-Encoding": "br, gzip;q=0"}
+        )
+        self.assertNotIn("Content-Encoding", res.headers)
+        self.assertEqual(res.headers["Vary"], "Accept-Encoding")
+        res = await self.get(
+            "/download/space-track.csv", **{"Accept-Encoding": "*;q=0.5"}
+        )
+        self.assertEqual(res.headers["Content-Encoding"], "gzip")
+
+        # only the .gz of the NDJSON is stored
+        res = await self.get(
+            "/download/space-track.ndjson", **{"Accept-Encoding": "identity"}
+        )
+        self.assertEqual(res.status_code, 406)
+        res = await self.get("/download/space-track.ndjson")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.content.splitlines()), 300)
+
+    async def test_conditional_requests(self):
+        res = await self.get("/download/space-track.csv.gz")
+        etag, modified = res.headers["ETag"], res.headers["Last-Modified"]
+        res = await self.get("/download/space-track.csv.gz", **{"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b"")
+        res = await self.get(
+            "/download/space-track.csv.gz", **{"If-Modified-Since": modified}
+        )
+        self.assertEqual(res.status_code, 304)
+        res = await self.get(
+            "/download/space-track.csv.gz", **{"If-None-Match": '"other"'}
+        )
+        self.assertEqual(res.status_code, 200)
+
+    async def test_range(self):
+        with open(self.path("space-track.csv"), "rb") as f:
+            content = f.read()
+        headers = {"Accept-Encoding": "identity"}
+        res = await self.get(
+            "/download/space-track.csv", Range="bytes=10-19", **headers
+        )
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res.content, content[10:20])
+        self.assertEqual(res.headers["Content-Range"], f"bytes 10-19/{len(content)}")
+
+        res = await self.get(
+            "/download/space-track.csv", Range=f"bytes={len(content)}-", **headers
+        )
+        self.assertEqual(res.status_code, 416)
+
+        res = await self.get(
+            "/download/space-track.csv",
+            Range="bytes=10-19",
+            **{"If-Range": '"stale"'},
+            **headers,
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.content), len(content))
+
+    async def test_head_and_errors(self):
+        res = await asyncio.to_thread(
+            requests.head, self.server.url + "/download/space-track.csv.gz"
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            int(res.headers["Content-Length"]),
+            os.path.getsize(self.path("space-track.csv.gz")),
+        )
+        self.assertEqual((await self.get("/download/../CURRENT")).status_code, 404)
+        self.assertEqual((await self.get("/snapshots/nope/a.csv")).status_code, 404)
+        res = await asyncio.to_thread(
+            requests.post, self.server.url + "/download/x", data=b"body"
+        )
+        self.assertEqual(res.status_code, 405)
+
+    async def raw_status(self, server: SnapshotServer, path: str) -> int:
+        """
+        Status of a GET sent as is, the path is not normalized like requests does.
+        """
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(f"GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        writer.close()
+        await writer.wait_closed()
+        return int(status_line.split()[1])
+
+    async def test_snapshot_ids_stay_inside(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            served = os.path.join(tmp, "snapshots")
+            snapshot_id = publish_snapshot(
+                served, {"space-track": self.catalog[:5]}, formats=("csv",)
+            )
+            # a copy of the snapshot next to the served directory
+            for name in ("manifest.json", "space-track.csv"):
+                with open(os.path.join(served, snapshot_id, name), "rb") as f:
+                    data = f.read()
+                with open(os.path.join(tmp, name), "wb") as f:
+                    f.write(data)
+            os.mkdir(os.path.join(served, "unpublished"))
+
+            server = await SnapshotServer(served, port=0).start()
+            try:
+                for path in (
+                    "/snapshots/../manifest.json",
+                    "/snapshots/%2E%2E/space-track.csv",
+                    "/snapshots/..%5C/space-track.csv",
+                    "/snapshots/unpublished/manifest.json",
+                ):
+                    self.assertEqual(await self.raw_status(server, path), 404, path)
+                self.assertEqual(
+                    await self.raw_status(
+                        server, f"/snapshots/{snapshot_id}/space-track.csv"
+                    ),
+                    200,
+                )
+            finally:
+                await server.stop()
+
+    async def test_query(self):
+        res = await self.get(
+            "/query?source=space-track&OBJECT_TYPE=PAYLOAD"
+            "&INCLINATION=97..99&EPOCH=2025-06-05..&limit=3"
+        )
+        self.assertEqual(res.status_code, 200)
+        document = res.json()
+        expected = [
+            usc
+            for usc in self.catalog
+            if usc.OBJECT_TYPE == "PAYLOAD"
+            and 97 <= usc.INCLINATION <= 99
+            and usc.EPOCH >= datetime(2025, 6, 5)
+        ]
+        self.assertEqual(document["count"], len(expected))
+        self.assertEqual(
+            [r["NORAD_CAT_ID"] for r in document["results"]],
+            [usc.NORAD_CAT_ID for usc in expected[:3]],
+        )
+
+        res = await self.get("/query?COUNTRY_CODE=US,UK&limit=0")
+        self.assertEqual(
+            res.json()["count"],
+            sum(usc.COUNTRY_CODE in ("US", "UK") for usc in self.catalog),
+        )
+        self.assertEqual((await self.get("/query?NOPE=1")).status_code, 400)
+        self.assertEqual((await self.get("/query?INCLINATION=x")).status_code, 400)
+
+    async def test_search(self):
+        name = self.catalog[42].SATELLITE_NAME
+        res = await self.get(f"/search?source=space-track&q={name.lower()}&limit=5")
+        self.assertEqual(res.status_code, 200)
+        results = res.json()["results"]
+        self.assertLessEqual(len(results), 5)
+        self.assertEqual(results[0]["object"]["SATELLITE_NAME"], name)
+        self.assertEqual(results[0]["score"], 1.0)
+        self.assertEqual((await self.get("/search?q=")).status_code, 400)
+        self.assertEqual((await self.get("/search?q=x&source=nope")).status_code, 404)
+
+    async def test_no_snapshot(self):
+        with tempfile.TemporaryDirectory() as empty:
+            server = await SnapshotServer(empty, port=0).start()
+            try:
+                res = await asyncio.to_thread(requests.get, server.url + "/")
+            finally:
+                await server.stop()
+        self.assertEqual(res.status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
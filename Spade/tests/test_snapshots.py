@@ -0,0 +1,79 @@
+import gzip
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from Spade.models import USC
+from Spade.snapshots import (
+    current_snapshot,
+    list_snapshots,
+    publish_snapshot,
+    read_manifest,
+)
+
+"""
+This file contains tests for publishing catalog snapshots.
+"""
+
+START = datetime(2025, 6, 9, 4, 21, 9, tzinfo=timezone.utc)
+
+
+def catalog(count: int):
+    return [
+        USC(INTERNATIONAL_DESIGNATOR=f"2025-{n:03d}A", NORAD_CAT_ID=str(n))
+        for n in range(count)
+    ]
+
+
+class TestPublishSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_publish(self):
+        self.assertIsNone(current_snapshot(self.path))
+        snapshot_id = publish_snapshot(
+            self.path,
+            {"space-track": catalog(3), "discos": iter(catalog(2))},
+            created=START,
+        )
+        self.assertEqual(snapshot_id, "20250609T042109000000Z")
+        self.assertEqual(current_snapshot(self.path), snapshot_id)
+
+        manifest = read_manifest(self.path, snapshot_id)
+        self.assertEqual(manifest["counts"], {"space-track": 3, "discos": 2})
+        self.assertEqual(len(manifest["files"]), 8)
+        info = manifest["files"]["discos.csv.gz"]
+        filename = os.path.join(self.path, snapshot_id, "discos.csv.gz")
+        self.assertEqual(info["size"], os.path.getsize(filename))
+        with gzip.open(filename, "rt") as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_prunes_old_snapshots(self):
+        for hour in range(5):
+            publish_snapshot(
+                self.path,
+                {"space-track": catalog(1)},
+                formats=("csv",),
+                keep=2,
+                created=START + timedelta(hours=hour),
+            )
+        snapshots = list_snapshots(self.path)
+        self.assertEqual(len(snapshots), 2)
+        self.assertEqual(snapshots[-1], current_snapshot(self.path))
+
+    def test_failed_export_leaves_current(self):
+        first = publish_snapshot(self.path, {"a": catalog(1)}, formats=("csv",))
+        with self.assertRaises(ValueError):
+            publish_snapshot(self.path, {"a": catalog(1)}, formats=("xml",))
+        self.assertEqual(current_snapshot(self.path), first)
+        self.assertEqual(sorted(os.listdir(self.path)), sorted(["CURRENT", first]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import gzip
+import os
+import tempfile
+import unittest
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+
+from Spade.exporters import export, export_3le
+from Spade.importers import iterTLEtoUSC
+from Spade.models import USC
+from Spade.testing.generators import synthetic_uscs
+from Spade.tle import checksum, format_tle, format_tles, parse_tle
+
+"""
+This file contains tests for the TLE writer and parser.
+"""
+
+ISS_LINE1 = "1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927"
+ISS_LINE2 = "2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537"
+
+
+def iss() -> USC:
+    return USC(
+        INTERNATIONAL_DESIGNATOR="1998-067A",
+        SATELLITE_NAME="ISS (ZARYA)",
+        NORAD_CAT_ID="25544",
+        CLASSIFICATION="U",
+        EPOCH=datetime(2008, 1, 1) + timedelta(days=263.51782528),
+        MEAN_MOTION_DOT=-0.00002182,
+        MEAN_MOTION_DDOT=0.0,
+        B_STAR=-0.11606e-4,
+        EPHEMERIS_TYPE=0,
+        ELEMENT_SET_NUM=292,
+        INCLINATION=51.6416,
+        RA_OF_ASC_NODE=247.4627,
+        ECCENTRICITY=0.0006703,
+        ARG_OF_PERIGEE=130.536,
+        MEAN_ANOMALY=325.0288,
+        MEAN_MOTION=15.72125391,
+        REV_AT_EPOCH=56353,
+    )
+
+
+class TestFormatTle(unittest.TestCase):
+
+    def test_checksum(self):
+        self.assertEqual(checksum(ISS_LINE1), 7)
+        self.assertEqual(checksum(ISS_LINE2), 7)
+
+    def test_iss(self):
+        line1, line2 = format_tle(iss()).splitlines()
+        # zero is written "+0" instead of "-0", which changes the checksum
+        self.assertEqual(line1, ISS_LINE1.replace("00000-0", "00000+0")[:-1] + "6")
+        self.assertEqual(line2, ISS_LINE2)
+        self.assertEqual(
+            format_tle(iss(), three_line=True).splitlines()[0], "0 ISS (ZARYA)"
+        )
+
+    def test_fields(self):
+        usc = replace(
+            iss(),
+            NORAD_CAT_ID="123456",
+            CLASSIFICATION=None,
+            MEAN_MOTION_DOT=0.000123456,
+            MEAN_MOTION_DDOT=1.23456e-9,
+            B_STAR=0.999999,
+            EPOCH=datetime(1999, 12, 31, 23, 59, 59, 999999, tzinfo=timezone.utc),
+        )
+        line1, line2 = format_tle(usc).splitlines()
+        self.assertEqual(line1[2:8], "C3456U")
+        self.assertEqual(line2[2:7], "C3456")
+        # rounds into the next year, 1999 has no day 366
+        self.assertEqual(line1[18:32], "00001.00000000")
+        self.assertEqual(line1[33:43], " .00012346")
+        self.assertEqual(line1[44:52], " 12346-8")
+        self.assertEqual(line1[53:61], " 10000+1")
+
+        usc.MEAN_MOTION_DDOT = 1e-12
+        self.assertEqual(format_tle(usc)[44:52], " 00000+0")
+
+    def test_epochs_around_new_year(self):
+        for epoch, expected in (
+            (datetime(2024, 12, 31, 23, 59, 59, 999999), "25001.00000000"),
+            (datetime(2024, 12, 31, 23, 59, 59, 999500), "24366.99999999"),
+            (datetime(2024, 12, 31, 12), "24366.50000000"),
+            (datetime(2025, 1, 1, 0, 0, 0, 431), "25001.00000000"),
+        ):
+            with self.subTest(epoch=epoch):
+                self.assertEqual(
+                    format_tle(replace(iss(), EPOCH=epoch))[18:32], expected
+                )
+
+    def test_skips_objects_that_do_not_fit(self):
+        ok = iss()
+        unusable = [
+            replace(ok, NORAD_CAT_ID=None),
+            replace(ok, NORAD_CAT_ID="340000"),
+            replace(ok, EPOCH=None),
+            replace(ok, MEAN_MOTION=None),
+            replace(ok, MEAN_MOTION=100.0),
+            replace(ok, ECCENTRICITY=1.5),
+            replace(ok, B_STAR=1e12),
+        ]
+        text, count = format_tles([ok, *unusable, ok], three_line=True)
+        self.assertEqual(count, 2)
+        self.assertEqual(len(text.splitlines()), 6)
+        for usc in unusable:
+            with self.assertRaises(ValueError):
+                format_tle(usc)
+
+
+class TestParseTle(unittest.TestCase):
+
+    def test_parse(self):
+        (usc,) = parse_tle(["ISS (ZARYA)", ISS_LINE1, ISS_LINE2])
+        self.assertEqual(usc.NORAD_CAT_ID, "25544")
+        self.assertEqual(usc.SATELLITE_NAME, "ISS (ZARYA)")
+        self.assertEqual(usc.INTERNATIONAL_DESIGNATOR, "1998-067A")
+        self.assertAlmostEqual(usc.B_STAR, -0.11606e-4)
+        self.assertEqual(usc.ECCENTRICITY, 0.0006703)
+        self.assertEqual(usc.REV_AT_EPOCH, 56353)
+        self.assertEqual(usc.EPOCH.strftime("%y%j"), "08264")
+
+        (usc,) = parse_tle(["", ISS_LINE1, ISS_LINE2, ""])
+        self.assertIsNone(usc.SATELLITE_NAME)
+
+    def test_errors(self):
+        with self.assertRaisesRegex(ValueError, "Line 2 has a bad checksum"):
+            list(parse_tle([ISS_LINE1, ISS_LINE2[:-1] + "0"]))
+        with self.assertRaisesRegex(ValueError, "no second line"):
+            list(parse_tle(["0 ISS", ISS_LINE1]))
+        with self.assertRaisesRegex(ValueError, "Line 2 is not part of a TLE"):
+            list(parse_tle(["0 ISS", "0 ISS", ISS_LINE1, ISS_LINE2]))
+
+    def test_round_trip(self):
+        catalog = synthetic_uscs(2000, seed=9)
+        text, count = format_tles(catalog, three_line=True)
+        self.assertEqual(count, 2000)
+        parsed = list(parse_tle(text.splitlines()))
+        self.assertEqual(format_tles(parsed, three_line=True), (text, 2000))
+        for usc, back in zip(catalog, parsed):
+            self.assertEqual(back.NORAD_CAT_ID, usc.NORAD_CAT_ID)
+            self.assertEqual(back.SATELLITE_NAME, usc.SATELLITE_NAME)
+            self.assertAlmostEqual(back.MEAN_MOTION, usc.MEAN_MOTION, places=8)
+            self.assertLess(abs(back.EPOCH - usc.EPOCH), timedelta(milliseconds=1))
+
+
+class TestExportTle(unittest.TestCase):
+
+    def test_export_and_import(self):
+        catalog = synthetic_uscs(300, seed=9)
+        catalog[5] = replace(catalog[5], EPOCH=None)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(export(catalog, os.path.join(tmp, "a.tle")), 299)
+            path = os.path.join(tmp, "a.3le.gz")
+            self.assertEqual(export_3le(catalog, path), 299)
+            with gzip.open(path, "rt") as f:
+                self.assertEqual(f.readline(), f"0 {catalog[0].SATELLITE_NAME}\n")
+
+            parsed = list(iterTLEtoUSC(path))
+            self.assertEqual(
+                [usc.NORAD_CAT_ID for usc in parsed],
+                [usc.NORAD_CAT_ID for i, usc in enumerate(catalog) if i != 5],
+            )
+            export(parsed, os.path.join(tmp, "b.3le.gz"))
+            with gzip.open(path) as a, gzip.open(os.path.join(tmp, "b.3le.gz")) as b:
+                self.assertEqual(a.read(), b.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,461 @@
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Spade.models import USC
+
+"""
+This file contains a writer and a parser for two-line element sets (TLE) and their three
+line variant with a name line (3LE):
+
+    0 ISS (ZARYA)
+    1 25544U 98067A   08264.51782528 -.00002182  00000+0 -11606-4 0  2926
+    2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537
+
+format_tles formats a whole batch at once with NumPy: every fixed width field is rounded
+to integers and written digit by digit into an objects x 69 byte array, and the checksums
+are summed over that array. A 100k object catalog formats in under a second.
+
+MEAN_MOTION_DOT and MEAN_MOTION_DDOT are written as given, like Space-Track's OMM they
+already hold the TLE values (n-dot / 2 and n-ddot / 6). MEAN_MOTION_DDOT and B_STAR use the
+implied decimal exponent notation: "-11606-4" is -0.11606e-4 and zero is "00000+0" like
+Space-Track writes it. NORAD ids from 100000 to 339999 are written in Alpha-5, e.g. "A0000".
+
+parse_tle reads what format_tles writes, so Space-Track TLEs survive TLE -> USC -> TLE
+unchanged.
+"""
+
+TLE_LINE_LENGTH = 69
+# Alpha-5 leaves out I and O, which look like 1 and 0
+ALPHA5_LETTERS = "ABCDEFGHJKLMNPQRSTUVWXYZ"
+MAX_NORAD_CAT_ID = 339999
+
+# maps every digit to its value and "-" to 1, the rest of a line counts nothing
+_CHECKSUM_VALUES = bytearray(256)
+for _digit in range(10):
+    _CHECKSUM_VALUES[ord("0") + _digit] = _digit
+_CHECKSUM_VALUES[ord("-")] = 1
+_CHECKSUM_VALUES = bytes(_CHECKSUM_VALUES)
+_CHECKSUM_ARRAY = np.frombuffer(_CHECKSUM_VALUES, dtype=np.uint8)
+
+_ALPHA5_ARRAY = np.frombuffer(ALPHA5_LETTERS.encode("ascii"), dtype=np.uint8)
+_MICROSECONDS_PER_TICK = 864  # the epoch is written in 1e-8 days
+_SPACE, _DOT, _PLUS, _MINUS = (ord(c) for c in " .+-")
+_UNIX_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_NAT = np.iinfo(np.int64).min
+
+_TLE_FIELDS = (
+    "NORAD_CAT_ID",
+    "CLASSIFICATION",
+    "INTERNATIONAL_DESIGNATOR",
+    "EPOCH",
+    "MEAN_MOTION_DOT",
+    "MEAN_MOTION_DDOT",
+    "B_STAR",
+    "EPHEMERIS_TYPE",
+    "ELEMENT_SET_NUM",
+    "INCLINATION",
+    "RA_OF_ASC_NODE",
+    "ECCENTRICITY",
+    "ARG_OF_PERIGEE",
+    "MEAN_ANOMALY",
+    "MEAN_MOTION",
+    "REV_AT_EPOCH",
+)
+_TLE_GETTERS = tuple(map(attrgetter, _TLE_FIELDS))
+
+
+def checksum(line: str) -> int:
+    """
+    Modulo 10 checksum of the first 68 characters of a TLE line.
+    """
+    return sum(line[:68].encode("ascii").translate(_CHECKSUM_VALUES)) % 10
+
+
+def _norad_number(norad_cat_id: Optional[str]) -> int:
+    try:
+        return int(norad_cat_id)
+    except (TypeError, ValueError):
+        return -1
+
+
+def _norad_numbers(norad_ids: Sequence[Optional[str]]) -> np.ndarray:
+    """
+    NORAD ids as integers, -1 where an id is missing or not a number.
+    """
+    try:
+        return np.array(norad_ids, dtype=np.int64)
+    except (TypeError, ValueError):
+        return np.array([_norad_number(n) for n in norad_ids], dtype=np.int64)
+
+
+def _parse_satnum(text: str) -> str:
+    text = text.strip()
+    if text and text[0].isalpha():
+        return str((ALPHA5_LETTERS.index(text[0].upper()) + 10) * 10000 + int(text[1:]))
+    return str(int(text))
+
+
+def _designator_columns(designators: Sequence[Optional[str]]) -> np.ndarray:
+    """
+    "1998-067A" -> "98067A  " as an objects x 8 byte array, blank where the designator is
+    missing or not in that form.
+    """
+    chars = (
+        np.array([d or "" for d in designators], dtype="U11")
+        .view(np.uint32)
+        .reshape(len(designators), 11)
+    )
+    columns = chars[:, [2, 3, 5, 6, 7, 8, 9, 10]]
+    columns[columns == 0] = _SPACE
+    columns[(chars[:, 4] != _MINUS) | (chars[:, 8] == 0)] = _SPACE
+    return _printable(columns)
+
+
+def _printable(chars: np.ndarray) -> np.ndarray:
+    """
+    Code points as ASCII bytes, "?" for anything that is not printable ASCII.
+    """
+    chars[(chars < _SPACE) | (chars > ord("~"))] = ord("?")
+    return chars.astype(np.uint8)
+
+
+def _parse_designator(text: str) -> str:
+    text = text.strip()
+    if len(text) < 5:
+        return text
+    year = int(text[:2])
+    year += 1900 if year >= 57 else 2000
+    return f"{year}-{text[2:5]}{text[5:]}"
+
+
+def _parse_exponent(text: str) -> float:
+    text = text.strip()
+    if not text:
+        return 0.0
+    sign = -1.0 if text[0] == "-" else 1.0
+    text = text.lstrip("+-")
+    mantissa, exponent = text[:-2], text[-2:]
+    return sign * float("0." + mantissa) * 10.0 ** int(exponent)
+
+
+def _parse_epoch(text: str) -> datetime:
+    year = int(text[:2])
+    year += 1900 if year >= 57 else 2000
+    return datetime(year, 1, 1) + timedelta(days=float(text[2:]) - 1.0)
+
+
+def _epoch_array(epochs: Sequence[Optional[datetime]]) -> np.ndarray:
+    """
+    Converts datetimes to datetime64[us], aware ones in UTC and None to NaT. Subtracting
+    datetimes is several times faster than letting NumPy convert them.
+    """
+    if any(epoch is not None and epoch.tzinfo for epoch in epochs):
+        epochs = [
+            epoch and epoch.astimezone(timezone.utc).replace(tzinfo=None)
+            for epoch in epochs
+        ]
+    microseconds = [
+        _NAT if epoch is None else (epoch - _UNIX_EPOCH) // _MICROSECOND
+        for epoch in epochs
+    ]
+    return np.array(microseconds, dtype=np.int64).view("datetime64[us]")
+
+
+def _floats(values: Sequence[Optional[float]]) -> np.ndarray:
+    """
+    None becomes 0.0, like a missing value in a TLE.
+    """
+    return np.nan_to_num(np.array(values, dtype=np.float64), nan=0.0)
+
+
+def _ints(values: Sequence[Optional[int]]) -> np.ndarray:
+    return _floats(values).astype(np.int64)
+
+
+def _put_digits(
+    lines: np.ndarray, column: int, width: int, values: np.ndarray, blank=False
+):
+    """
+    Writes non-negative integers right aligned into `width` columns, zero padded or, with
+    `blank`, space padded like %d.
+    """
+    values = values.copy()
+    for offset in range(width - 1, -1, -1):
+        digits = (values % 10).astype(np.uint8) + ord("0")
+        if blank and offset < width - 1:
+            digits[values == 0] = _SPACE
+        lines[:, column + offset] = digits
+        values //= 10
+
+
+def _put_fixed(
+    lines: np.ndarray,
+    column: int,
+    whole: int,
+    decimals: int,
+    values: np.ndarray,
+    valid: np.ndarray,
+):
+    """
+    Writes non-negative values like %{whole + 1 + decimals}.{decimals}f. Values that do not
+    fit are marked invalid.
+    """
+    ticks = np.rint(values * 10.0**decimals).astype(np.int64)
+    valid &= (ticks >= 0) & (ticks < 10 ** (whole + decimals))
+    _put_digits(lines, column, whole, ticks // 10**decimals, blank=True)
+    lines[:, column + whole] = _DOT
+    _put_digits(lines, column + whole + 1, decimals, ticks % 10**decimals)
+
+
+def _put_exponent(
+    lines: np.ndarray, column: int, values: np.ndarray, valid: np.ndarray
+):
+    """
+    Writes values in implied decimal point notation, " 11606-4" for 0.11606e-4, rounded
+    to 5 significant digits.
+    """
+    magnitude = np.abs(values)
+    nonzero = magnitude > 0
+    exponent = np.zeros(len(values), dtype=np.int64)
+    exponent[nonzero] = np.floor(np.log10(magnitude[nonzero])).astype(np.int64) + 1
+    mantissa = np.rint(magnitude * 10.0 ** (5 - exponent)).astype(np.int64)
+    # log10 can be off by one next to powers of ten, and rounding can carry to 100000
+    high = mantissa >= 100_000
+    low = nonzero & (mantissa < 10_000)
+    exponent += high.astype(np.int64) - low.astype(np.int64)
+    mantissa = np.where(
+        high | low, np.rint(magnitude * 10.0 ** (5 - exponent)), mantissa
+    ).astype(np.int64)
+
+    underflow = exponent < -9
+    mantissa[underflow] = 0
+    exponent[underflow | ~nonzero] = 0
+    valid &= exponent <= 9
+
+    lines[:, column] = np.where(values < 0, _MINUS, _SPACE)
+    lines[mantissa == 0, column] = _SPACE
+    _put_digits(lines, column + 1, 5, mantissa)
+    lines[:, column + 6] = np.where(exponent < 0, _MINUS, _PLUS)
+    _put_digits(lines, column + 7, 1, np.abs(exponent))
+
+
+def _put_checksums(lines: np.ndarray):
+    lines[:, 68] = _CHECKSUM_ARRAY[lines[:, :68]].sum(axis=1) % 10 + ord("0")
+
+
+def format_tles(uscs: Sequence[USC], three_line: bool = False) -> Tuple[str, int]:
+    """
+    Formats the element sets of a batch of USC objects as TLE text.
+
+    Objects without a NORAD_CAT_ID, EPOCH or MEAN_MOTION, and objects with a value that
+    does not fit its fixed width field, are left out. Other missing values are written as 0.
+
+    Args:
+        uscs: The objects, formatted in this order.
+        three_line: Writes a "0 NAME" line before every TLE.
+
+    Returns:
+        The text, one line per newline, and the number of objects it contains.
+    """
+    count = len(uscs)
+    if count == 0:
+        return "", 0
+    (
+        norad_ids,
+        classifications,
+        designators,
+        epochs,
+        mean_motion_dot,
+        mean_motion_ddot,
+        b_star,
+        ephemeris_type,
+        element_set_num,
+        inclination,
+        ra_of_asc_node,
+        eccentricity,
+        arg_of_perigee,
+        mean_anomaly,
+        mean_motion,
+        rev_at_epoch,
+    ) = [list(map(getter, uscs)) for getter in _TLE_GETTERS]
+
+    numbers = _norad_numbers(norad_ids)
+    epoch = _epoch_array(epochs)
+    mean_motion = np.array(mean_motion, dtype=np.float64)
+    valid = (
+        (numbers >= 0)
+        & (numbers <= MAX_NORAD_CAT_ID)
+        & ~np.isnat(epoch)
+        & ~np.isnan(mean_motion)
+    )
+    numbers[~valid] = 0
+    epoch[~valid] = np.datetime64(0, "us")
+
+    line1 = np.full((count, TLE_LINE_LENGTH), _SPACE, dtype=np.uint8)
+    line2 = np.full((count, TLE_LINE_LENGTH), _SPACE, dtype=np.uint8)
+    line1[:, 0] = ord("1")
+    line2[:, 0] = ord("2")
+
+    for lines in (line1, line2):
+        _put_digits(lines, 2, 5, numbers)
+        alpha5 = numbers >= 100_000
+        lines[alpha5, 2] = _ALPHA5_ARRAY[numbers[alpha5] // 10_000 - 10]
+
+    line1[:, 7] = _printable(
+        np.array([(c or "U")[0] for c in classifications], dtype="U1").view(np.uint32)
+    )
+    line1[:, 9:17] = _designator_columns(designators)
+
+    # rounded before it is split, so an epoch just before New Year moves into the next year
+    # instead of day 366 or 367. Days since 1970 are whole ticks, so are years
+    epoch = (
+        (epoch.astype(np.int64) * 2 + _MICROSECONDS_PER_TICK)
+        // (2 * _MICROSECONDS_PER_TICK)
+        * _MICROSECONDS_PER_TICK
+    ).astype("datetime64[us]")
+    year_start = epoch.astype("datetime64[Y]")
+    ticks = (epoch - year_start.astype("datetime64[us]")).astype(
+        np.int64
+    ) // _MICROSECONDS_PER_TICK
+    _put_digits(line1, 18, 2, year_start.astype(np.int64) + 1970)
+    _put_digits(line1, 20, 3, ticks // 10**8 + 1)
+    line1[:, 23] = _DOT
+    _put_digits(line1, 24, 8, ticks % 10**8)
+
+    mean_motion_dot = _floats(mean_motion_dot)
+    dot_ticks = np.rint(np.abs(mean_motion_dot) * 1e8).astype(np.int64)
+    valid &= (dot_ticks >= 0) & (dot_ticks < 10**8)
+    line1[:, 33] = np.where((mean_motion_dot < 0) & (dot_ticks > 0), _MINUS, _SPACE)
+    line1[:, 34] = _DOT
+    _put_digits(line1, 35, 8, dot_ticks)
+
+    _put_exponent(line1, 44, _floats(mean_motion_ddot), valid)
+    _put_exponent(line1, 53, _floats(b_star), valid)
+    _put_digits(line1, 62, 1, _ints(ephemeris_type) % 10)
+    _put_digits(line1, 64, 4, _ints(element_set_num) % 10_000, blank=True)
+
+    _put_fixed(line2, 8, 3, 4, _floats(inclination), valid)
+    _put_fixed(line2, 17, 3, 4, _floats(ra_of_asc_node), valid)
+    eccentricity_ticks = np.rint(_floats(eccentricity) * 1e7).astype(np.int64)
+    valid &= (eccentricity_ticks >= 0) & (eccentricity_ticks < 10**7)
+    _put_digits(line2, 26, 7, eccentricity_ticks)
+    _put_fixed(line2, 34, 3, 4, _floats(arg_of_perigee), valid)
+    _put_fixed(line2, 43, 3, 4, _floats(mean_anomaly), valid)
+    _put_fixed(line2, 52, 2, 8, np.nan_to_num(mean_motion), valid)
+    _put_digits(line2, 63, 5, _ints(rev_at_epoch) % 100_000, blank=True)
+
+    _put_checksums(line1)
+    _put_checksums(line2)
+
+    rows = np.concatenate(
+        (
+            line1,
+            np.full((count, 1), ord("\n"), dtype=np.uint8),
+            line2,
+            np.full((count, 1), ord("\n"), dtype=np.uint8),
+        ),
+        axis=1,
+    )[valid]
+    text = rows.tobytes().decode("ascii")
+    if not three_line:
+        return text, len(rows)
+
+    tle_lines = text.splitlines(keepends=True)
+    parts = [""] * (3 * len(rows))
+    parts[0::3] = [
+        f"0 {usc.SATELLITE_NAME or ''}\n" for usc, ok in zip(uscs, valid.tolist()) if ok
+    ]
+    parts[1::3] = tle_lines[0::2]
+    parts[2::3] = tle_lines[1::2]
+    return "".join(parts), len(rows)
+
+
+def format_tle(usc: USC, three_line: bool = False) -> str:
+    """
+    The TLE of one USC as text ending in a newline, with a "0 NAME" line first for 3LE.
+
+    Raises:
+        ValueError: When the USC can not be written as a TLE, see format_tles.
+    """
+    text, count = format_tles([usc], three_line)
+    if count == 0:
+        raise ValueError(f"NORAD ID {usc.NORAD_CAT_ID} can not be written as a TLE")
+    return text
+
+
+def _check_line(line: str, number: str, line_number: int):
+    if len(line) != TLE_LINE_LENGTH or line[0] != number:
+        raise ValueError(f"Line {line_number} is not TLE line {number}: {line!r}")
+    if not line[68].isdigit() or checksum(line) != int(line[68]):
+        raise ValueError(f"Line {line_number} has a bad checksum: {line!r}")
+
+
+def parse_tle_lines(
+    line1: str, line2: str, name: Optional[str] = None, line_number: int = 1
+) -> USC:
+    """
+    Builds a USC from the two element lines of a TLE.
+
+    Raises:
+        ValueError: When a line is malformed or its checksum does not match.
+    """
+    _check_line(line1, "1", line_number)
+    _check_line(line2, "2", line_number + 1)
+    if line1[2:7] != line2[2:7]:
+        raise ValueError(
+            f"Lines {line_number} and {line_number + 1} differ in NORAD ID"
+        )
+
+    return USC(
+        INTERNATIONAL_DESIGNATOR=_parse_designator(line1[9:17]),
+        SATELLITE_NAME=name,
+        NORAD_CAT_ID=_parse_satnum(line1[2:7]),
+        CLASSIFICATION=line1[7],
+        EPOCH=_parse_epoch(line1[18:32]),
+        MEAN_MOTION_DOT=float(line1[33:43].replace(" ", "")),
+        MEAN_MOTION_DDOT=_parse_exponent(line1[44:52]),
+        B_STAR=_parse_exponent(line1[53:61]),
+        EPHEMERIS_TYPE=int(line1[62].strip() or 0),
+        ELEMENT_SET_NUM=int(line1[64:68].strip() or 0),
+        INCLINATION=float(line2[8:16]),
+        RA_OF_ASC_NODE=float(line2[17:25]),
+        ECCENTRICITY=float("0." + line2[26:33]),
+        ARG_OF_PERIGEE=float(line2[34:42]),
+        MEAN_ANOMALY=float(line2[43:51]),
+        MEAN_MOTION=float(line2[52:63]),
+        REV_AT_EPOCH=int(line2[63:68].strip() or 0),
+        CENTER_NAME="EARTH",
+        TIME_SYSTEM="UTC",
+        MEAN_ELEMENT_THEORY="SGP4",
+    )
+
+
+def parse_tle(lines: Iterable[str]) -> Iterator[USC]:
+    """
+    Reads TLE or 3LE text, one USC per element set. Name lines may start with "0 ".
+    Blank lines are skipped.
+
+    Raises:
+        ValueError: On the first malformed line or bad checksum.
+    """
+    name = None
+    pending: Optional[Tuple[str, int]] = None
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if pending is not None:
+            yield parse_tle_lines(pending[0], line.rstrip(), name, pending[1])
+            name, pending = None, None
+        elif line.startswith("1 ") and len(line.rstrip()) == TLE_LINE_LENGTH:
+            pending = (line.rstrip(), line_number)
+        elif name is None:
+            name = line[2:].strip() if line.startswith("0 ") else line.strip()
+        else:
+            raise ValueError(f"Line {line_number} is not part of a TLE: {line!r}")
+    if pending is not None:
+        raise ValueError(f"Line {pending[1]} has no second line")
@@ -79,4 +79,15 @@ class DiscosObjectListResponse(TypedDict):
     meta: ResponsePagination
 
 
+class DiscosSyncState(TypedDict):
+    """
+    What the last incremental DISCOS sync knew, stored next to the downloaded catalog.
+    """
+
+    file: str  # The DISCOS_ALL_ file the sync wrote
+    last_id: int  # Largest DISCOS object id seen, newer objects have larger ids
+    ids: List[int]  # Ids of all objects in `file`, sorted
+    cursor: int  # Next slice of `ids` to revalidate
+
+
 ######################################
@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from Spade.snapshots import publish_snapshot
+from Spade.testing.generators import synthetic_uscs
+
+"""
+Load test for the snapshot download server.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 2000 --requests 20000
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 --path /download/space-track.csv
+
+Without --url a synthetic snapshot of --size objects is published into a temporary directory
+and served by `python -m Spade.server` in a child process, so the server does not share a
+CPU with the client. Every client keeps its connection alive and downloads --path until
+--requests downloads have finished in total.
+"""
+
+DEFAULT_PATH = "/download/space-track.csv.gz"
+CHUNK_SIZE = 1 << 16
+
+
+def publish_synthetic_snapshot(snapshot_dir: str, size: int) -> str:
+    catalog = synthetic_uscs(size, seed=size)
+    return publish_snapshot(
+        snapshot_dir, {"space-track": catalog}, formats=("csv.gz", "ndjson.gz")
+    )
+
+
+async def _wait_for_port(host: str, port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def _download(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes
+) -> Tuple[int, int]:
+    """
+    Sends one request and reads the response. Returns the status and body size.
+    """
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    remaining = length
+    while remaining:
+        chunk = await reader.read(min(remaining, CHUNK_SIZE))
+        if not chunk:
+            raise ConnectionError("Connection closed during the body")
+        remaining -= len(chunk)
+    return status, length
+
+
+async def _client(
+    host: str,
+    port: int,
+    request: bytes,
+    remaining: List[int],
+    latencies: List[float],
+    results: dict,
+):
+    reader = writer = None
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            status, length = await _download(reader, writer, request)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            results["errors"] += 1
+            results["last_error"] = repr(e)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        results["bytes"] += length
+        if status != 200:
+            results["errors"] += 1
+            results["last_error"] = f"HTTP {status}"
+    if writer is not None:
+        writer.close()
+
+
+async def run_load_test(url: str, path: str, concurrency: int, requests: int) -> dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    await _wait_for_port(host, port)
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+        "Accept-Encoding: identity\r\n\r\n"
+    ).encode()
+
+    remaining = [requests]
+    latencies: List[float] = []
+    results = {"errors": 0, "bytes": 0, "last_error": None}
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(host, port, request, remaining, latencies, results)
+            for _ in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(fraction: float) -> float:
+        if not latencies:
+            return float("nan")
+        return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)]
+
+    results.update(
+        {
+            "requests": len(latencies),
+            "seconds": elapsed,
+            "requests_per_second": len(latencies) / elapsed,
+            "megabytes_per_second": results["bytes"] / elapsed / 1e6,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+        }
+    )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the snapshot server")
+    parser.add_argument("--url", help="server to test, default starts a local one")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument(
+        "--size", type=int, default=30000, help="objects in the synthetic snapshot"
+    )
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args(argv)
+
+    server = None
+    tmp = None
+    url = args.url
+    if url is None:
+        tmp = tempfile.TemporaryDirectory()
+        publish_synthetic_snapshot(tmp.name, args.size)
+        url = f"http://127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "Spade.server",
+                "--snapshot-dir",
+                tmp.name,
+                "--port",
+                str(args.port),
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+
+    try:
+        results = asyncio.run(
+            run_load_test(url, args.path, args.concurrency, args.requests)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if tmp is not None:
+            tmp.cleanup()
+
+    print(
+        f"{results['requests']} downloads of {args.path} with {args.concurrency} "
+        f"connections in {results['seconds']:.2f}s"
+    )
+    print(
+        f"  {results['requests_per_second']:.0f} requests/s, "
+        f"{results['megabytes_per_second']:.1f} MB/s"
+    )
+    print(
+        f"  latency p50 {results['p50'] * 1000:.1f} ms, "
+        f"p95 {results['p95'] * 1000:.1f} ms, p99 {results['p99'] * 1000:.1f} ms"
+    )
+    print(f"  errors: {results['errors']}")
+    if results["last_error"]:
+        print(f"  last error: {results['last_error']}")
+    return 1 if results["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
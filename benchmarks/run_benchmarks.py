@@ -0,0 +1,385 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+from dataclasses import replace
+from datetime import datetime, timedelta
+from timeit import default_timer as timer
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+# The fetchers import Spade.config, which refuses to load without credentials. The
+# benchmarks never talk to the real services so placeholder values are enough.
+os.environ.setdefault("SPACE_TRACKER_USERNAME", "benchmark")
+os.environ.setdefault("SPACE_TRACKER_PASSWORD", "benchmark")
+os.environ.setdefault("DISCOS_TOKEN", "benchmark")
+
+from Spade.data_fetcher import (
+    fetch_all_objects_DISCOS,
+    fetch_full_catlog_ST,
+    isCacheAvaliable,
+)
+from Spade.diff import diff_snapshots
+from Spade.exporters import export
+from Spade.importers import (
+    convert_types,
+    parseDISCOSJSON,
+    parseSpaceTrack,
+    spaceTrackXML,
+)
+from Spade.orbit_parameters import fill_derived_parameters
+from Spade.query import Between, CatalogIndex, Equals
+from Spade.search import TrigramIndex
+from Spade.testing.generators import (
+    DEFAULT_BASE_EPOCH,
+    iter_synthetic_objects,
+    synthetic_uscs,
+    write_cache_directory,
+    write_discos_json,
+    write_omm_csv,
+    write_omm_json,
+    write_omm_xml,
+)
+from Spade.testing.mock_servers import MockDiscosServer, MockSpaceTrackServer
+
+"""
+Benchmark suite for the import pipeline.
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes 10k 100k 1m
+    python -m benchmarks.run_benchmarks --sizes 10k --save-baseline
+    python -m benchmarks.run_benchmarks --sizes 10k --check
+
+Every benchmark reports throughput in items per second. --check compares the run against
+benchmarks/baselines/baseline.json and exits with status 1 when any benchmark got slower
+than the allowed threshold.
+"""
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "baseline.json")
+DEFAULT_THRESHOLD = 0.20
+DATE_FORMAT = "%Y_%m_%d-%I_%M_%S_%p"
+
+# A cache directory with one file per catalog object is unrealistic, so the cache
+# benchmark scales the number of files down by this factor.
+CACHE_FILES_DIVISOR = 10
+
+Benchmark = Callable[[int, str], Tuple[int, Callable[[], None]]]
+
+
+def parse_size(value: str) -> int:
+    """
+    Parses sizes like `10000`, `10k` or `1m`.
+    """
+    value = value.strip().lower()
+    multiplier = 1
+    if value.endswith("k"):
+        multiplier, value = 1_000, value[:-1]
+    elif value.endswith("m"):
+        multiplier, value = 1_000_000, value[:-1]
+    return int(float(value) * multiplier)
+
+
+def _cached_file(workdir: str, name: str, build: Callable[[str], str]) -> str:
+    path = os.path.join(workdir, name)
+    if not os.path.isfile(path):
+        build(path)
+    return path
+
+
+def bench_xml_to_usc(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    path = _cached_file(
+        workdir, f"omm_{size}.xml", lambda p: write_omm_xml(p, size, seed=size)
+    )
+    return size, lambda: spaceTrackXML(path)
+
+
+def bench_csv_to_usc(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    path = _cached_file(
+        workdir, f"omm_{size}.csv", lambda p: write_omm_csv(p, size, seed=size)
+    )
+    return size, lambda: parseSpaceTrack(path)
+
+
+def bench_omm_json_to_usc(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    path = _cached_file(
+        workdir, f"omm_{size}.json", lambda p: write_omm_json(p, size, seed=size)
+    )
+    return size, lambda: parseSpaceTrack(path)
+
+
+def bench_json_to_usc(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    path = _cached_file(
+        workdir, f"discos_{size}.json", lambda p: write_discos_json(p, size, seed=size)
+    )
+    return size, lambda: parseDISCOSJSON(path)
+
+
+def bench_convert_types(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    records = []
+    for record in iter_synthetic_objects(size, seed=size):
+        record.pop("_INDEX")
+        records.append(record)
+
+    def run():
+        for record in records:
+            convert_types(record)
+
+    return size, run
+
+
+def bench_fill_derived_parameters(
+    size: int, workdir: str
+) -> Tuple[int, Callable[[], None]]:
+    catalog = synthetic_uscs(size, seed=size)
+
+    def run():
+        # Clear the values so every run fills the whole catalog
+        for usc in catalog:
+            usc.SEMIMAJOR_AXIS = usc.PERIOD = usc.APOAPSIS = usc.PERIAPSIS = None
+        fill_derived_parameters(catalog)
+
+    return size, run
+
+
+def bench_catalog_query(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    catalog = synthetic_uscs(size, seed=size)
+    index = CatalogIndex(catalog)
+    queries = 1000
+
+    def run():
+        for number in range(queries):
+            index.query_positions(
+                Equals("OBJECT_TYPE", "PAYLOAD"),
+                Between("INCLINATION", 97.0 + number % 10 * 0.1, 99.0),
+                Between("PERIAPSIS", None, 2000.0),
+            )
+
+    return queries, run
+
+
+def bench_trigram_search(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    catalog = synthetic_uscs(size, seed=size)
+    index = TrigramIndex(catalog)
+    texts = ["STARLINK-3", "cosmos 22", "ONEWEB 01", "falcon 9 r/b", "fengyun"]
+    queries = 1000
+
+    def run():
+        for number in range(queries):
+            index.search(texts[number % len(texts)])
+
+    return queries, run
+
+
+def bench_diff_snapshots(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    old = synthetic_uscs(size, seed=size)
+    # one percent decayed, one percent new and two percent with a new element set
+    new = [replace(usc) for usc in old[size // 100 :]]
+    new.extend(
+        replace(usc, NORAD_CAT_ID=f"9{usc.NORAD_CAT_ID}") for usc in old[: size // 100]
+    )
+    for usc in new[::50]:
+        usc.MEAN_ANOMALY = (usc.MEAN_ANOMALY or 0.0) + 1.0
+
+    def run():
+        diff_snapshots(old, new)
+
+    return size, run
+
+
+def bench_export(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    catalog = synthetic_uscs(size, seed=size)
+    filenames = [
+        os.path.join(workdir, f"export_{size}.{extension}")
+        for extension in ("csv.gz", "ndjson", "sqlite")
+    ]
+
+    def run():
+        for filename in filenames:
+            export(catalog, filename)
+
+    return size, run
+
+
+def bench_export_tle(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    catalog = synthetic_uscs(size, seed=size)
+    filename = os.path.join(workdir, f"export_{size}.3le")
+
+    def run():
+        export(catalog, filename)
+
+    return size, run
+
+
+def bench_is_cache_avaliable(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    file_count = max(size // CACHE_FILES_DIVISOR, 1)
+    path = os.path.join(workdir, f"cache_{file_count}")
+    if not os.path.isdir(path):
+        write_cache_directory(path, file_count, date_format=DATE_FORMAT)
+
+    settings = SimpleNamespace(DOWNLOADED_DATA_PATH=path, DATE_FORMAT=DATE_FORMAT)
+    max_age = datetime.now() - DEFAULT_BASE_EPOCH + timedelta(days=1)
+
+    def run():
+        isCacheAvaliable("FULL_CATLOG_", max_age, settings)
+
+    return file_count, run
+
+
+def bench_fetch_loop(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    server = MockDiscosServer(catalog_size=size, seed=size).start()
+    settings = server.settings()
+    return size, lambda: fetch_all_objects_DISCOS(settings, page_size=100)
+
+
+def bench_fetch_full_catlog(size: int, workdir: str) -> Tuple[int, Callable[[], None]]:
+    server = MockSpaceTrackServer(catalog_size=size, seed=size).start()
+    server.catalog()  # render once up front so only the transfer is timed
+    download_path = os.path.join(workdir, f"downloads_{size}") + os.sep
+    os.makedirs(download_path, exist_ok=True)
+    # fetch_full_catlog_ST answers from a fresh cache file, so each run starts empty
+    settings = server.settings(download_path)
+
+    def run():
+        for filename in os.listdir(download_path):
+            os.remove(os.path.join(download_path, filename))
+        fetch_full_catlog_ST(settings)
+
+    return size, run
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "XMLtoUSC": bench_xml_to_usc,
+    "CSVtoUSC": bench_csv_to_usc,
+    "OMMJSONtoUSC": bench_omm_json_to_usc,
+    "jsonToUSC": bench_json_to_usc,
+    "convert_types": bench_convert_types,
+    "fill_derived_parameters": bench_fill_derived_parameters,
+    "CatalogIndex.query": bench_catalog_query,
+    "TrigramIndex.search": bench_trigram_search,
+    "diff_snapshots": bench_diff_snapshots,
+    "export": bench_export,
+    "export_tle": bench_export_tle,
+    "isCacheAvaliable": bench_is_cache_avaliable,
+    "fetch_all_objects_DISCOS": bench_fetch_loop,
+    "fetch_full_catlog_ST": bench_fetch_full_catlog,
+}
+
+
+def run_benchmarks(
+    sizes: List[int], names: List[str], workdir: str, repeat: int
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Runs each benchmark at each size and keeps the fastest of `repeat` runs.
+
+    Returns:
+        {benchmark name: {size: {"items", "seconds", "throughput"}}}
+    """
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for name in names:
+        results[name] = {}
+        for size in sizes:
+            items, run = BENCHMARKS[name](size, workdir)
+            best = float("inf")
+            for _ in range(repeat):
+                # Progress and error prints are part of the measured cost but not of the report
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = timer()
+                    run()
+                    elapsed = timer() - start
+                best = min(best, elapsed)
+            results[name][str(size)] = {
+                "items": items,
+                "seconds": best,
+                "throughput": items / best if best > 0 else float("inf"),
+            }
+            print(f"{name:>26} {size:>9}: {best:8.3f}s  {items / best:12.0f} items/s")
+    return results
+
+
+def check_regressions(
+    results: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    threshold: float,
+) -> List[str]:
+    """
+    Returns a message for every benchmark whose throughput dropped more than `threshold`
+    (a fraction, 0.2 = 20%) below the baseline. Benchmarks missing from the baseline are skipped.
+    """
+    failures: List[str] = []
+    for name, by_size in results.items():
+        for size, result in by_size.items():
+            expected = baseline.get(name, {}).get(size)
+            if expected is None:
+                continue
+            floor = expected["throughput"] * (1.0 - threshold)
+            if result["throughput"] < floor:
+                failures.append(
+                    f"{name} @ {size}: {result['throughput']:.0f} items/s is below "
+                    f"{floor:.0f} (baseline {expected['throughput']:.0f}, threshold {threshold:.0%})"
+                )
+    return failures
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Spade import benchmarks")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k", "1m"])
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=None, help="reuse generated files here")
+    parser.add_argument("--output", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes]
+    names = args.only or list(BENCHMARKS)
+
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(workdir, exist_ok=True)
+        results = run_benchmarks(sizes, names, workdir, args.repeat)
+
+    document = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {"results": {}}
+        if os.path.isfile(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        for name, by_size in results.items():
+            baseline["results"].setdefault(name, {}).update(by_size)
+        baseline.update({k: v for k, v in document.items() if k != "results"})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if args.check:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = check_regressions(results, baseline["results"], args.threshold)
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        if failures:
+            return 1
+        print("No regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,26 @@
-from Spade.data_fetcher import fetch_full_catlog_ST, save_discos_objects
-from Spade.importers import parseDISCOSJSON, spaceTrackXML
-from timeit import default_timer as timer
-import os
+from Spade.orchestrator import refresh_all
+from Spade.scheduler import default_sources
 from Spade.config import settings
 
 
 def main():
     """
     This function just starts the program as a whole calling different sub modules.
+    Space-Track and DISCOS are downloaded and parsed at the same time.
     """
     if not settings:
         print("Could not start due to missing config")
 
-    # Downloads fill catlog from Space Track
-    # filename = fetch_full_catlog_ST(settings)
-    # if filename is None:
-    #     return
-    # print("Filename for downloaded file is: ", filename)
+    report = refresh_all(settings, default_sources())
+    print(report.summary())
 
-    # listOfUSCs = spaceTrackXML(filename)
-
-    # print(len(listOfUSCs))
-
-    discosFile = save_discos_objects(settings)
-    if discosFile is None:
-        return
-    print("DISCOS Data saved to: ", discosFile)
-
-    discosUSCS = parseDISCOSJSON(discosFile)
-    print("Number of satellites from discos: ", len(discosUSCS))
+    for name in ("space-track", "discos"):
+        parse = report.stages[f"parse:{name}"]
+        if parse.ok:
+            print(f"Number of satellites from {name}: ", len(parse.value))
+    if report.stages["reconcile"].ok:
+        matched = sum(r.match is not None for r in report.value("reconcile"))
+        print("DISCOS objects matched to Space-Track: ", matched)
 
 
 if __name__ == "__main__":